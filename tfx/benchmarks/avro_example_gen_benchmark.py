@@ -0,0 +1,100 @@
+# Lint as: python2, python3
+# Copyright 2020 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks for Avro record to tf.Example conversion in ExampleGen."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import random
+import time
+
+# Standard Imports
+
+import tfx
+from tensorflow.python.platform import test  # pylint: disable=g-direct-tensorflow-import
+from tfx.components.example_gen import utils
+from tfx.components.example_gen.custom_executors import avro_executor
+
+# Number of converted Avro records.
+_NUM_RECORDS = 100000
+# Number of records per batch, as batched by the executor.
+_BATCH_SIZE = 1000
+_NUM_INT_FIELDS = 10
+_NUM_FLOAT_FIELDS = 5
+_NUM_STRING_FIELDS = 3
+
+
+class AvroExampleGenBenchmark(test.Benchmark):
+  """Avro ExampleGen benchmarks."""
+
+  def report_benchmark(self, **kwargs):
+    if "extras" not in kwargs:
+      kwargs["extras"] = {}
+    # Note that the GIT_COMMIT_ID is not included in the packages themselves:
+    # it must be injected by an external script.
+    kwargs["extras"]["commit_tfx"] = getattr(tfx, "GIT_COMMIT_ID",
+                                             tfx.__version__)
+    super(AvroExampleGenBenchmark, self).report_benchmark(**kwargs)
+
+  def _generate_records(self):
+    """Returns an Avro schema and records with about 5% null values."""
+    rng = random.Random(0)
+    fields = []
+    generators = {}
+    for i in range(_NUM_INT_FIELDS):
+      fields.append({"name": "int_%d" % i, "type": ["null", "long"]})
+      generators["int_%d" % i] = lambda: rng.randint(-1000000, 1000000)
+    for i in range(_NUM_FLOAT_FIELDS):
+      fields.append({"name": "float_%d" % i, "type": ["null", "double"]})
+      generators["float_%d" % i] = lambda: rng.random() * 1000
+    for i in range(_NUM_STRING_FIELDS):
+      fields.append({"name": "string_%d" % i, "type": ["null", "string"]})
+      generators["string_%d" % i] = lambda: "value_%d" % rng.randint(0, 100)
+    avro_schema = {"name": "record", "type": "record", "fields": fields}
+    records = [{
+        name: None if rng.random() < 0.05 else generate()
+        for name, generate in generators.items()
+    } for _ in range(_NUM_RECORDS)]
+    return avro_schema, records
+
+  def _report(self, name, wall_time):
+    self.report_benchmark(
+        name=name,
+        iters=1,
+        wall_time=wall_time,
+        extras={"records_per_sec": _NUM_RECORDS / wall_time})
+
+  def benchmarkPerRecordConversion(self):
+    """Benchmark the former conversion with dict_to_example per record."""
+    _, records = self._generate_records()
+    start = time.time()
+    for record in records:
+      utils.dict_to_example(record).SerializeToString(deterministic=True)
+    self._report("AvroExampleGen.PerRecordConversion", time.time() - start)
+
+  def benchmarkBatchedConversion(self):
+    """Benchmark the conversion of batches of records by the Avro schema."""
+    avro_schema, records = self._generate_records()
+    do_fn = avro_executor._AvroRecordsToSerializedExamples(avro_schema)  # pylint: disable=protected-access
+    start = time.time()
+    for i in range(0, _NUM_RECORDS, _BATCH_SIZE):
+      for _ in do_fn.process(records[i:i + _BATCH_SIZE]):
+        pass
+    self._report("AvroExampleGen.BatchedConversion", time.time() - start)
+
+
+if __name__ == "__main__":
+  test.main()
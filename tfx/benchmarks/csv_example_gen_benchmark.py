@@ -0,0 +1,123 @@
+# Lint as: python2, python3
+# Copyright 2020 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks for CSV to tf.Example conversion in CsvExampleGen."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import random
+import time
+
+# Standard Imports
+
+import tensorflow as tf
+import tfx
+from tensorflow.python.platform import test  # pylint: disable=g-direct-tensorflow-import
+from tfx.components.example_gen.csv_example_gen import executor
+from tfx_bsl.coders import csv_decoder
+
+# Number of converted CSV lines.
+_NUM_LINES = 100000
+# Number of lines per batch, as batched by the executor.
+_BATCH_SIZE = 1000
+_NUM_INT_COLUMNS = 10
+_NUM_FLOAT_COLUMNS = 5
+_NUM_STRING_COLUMNS = 3
+
+
+def _per_line_to_serialized_example(csv_cells, column_infos):
+  """Converts a parsed CSV line the way CsvExampleGen did before batching."""
+  feature = {}
+  for csv_cell, column_info in zip(csv_cells, column_infos):
+    if not csv_cell:
+      feature[column_info.name] = tf.train.Feature()
+    elif column_info.type == csv_decoder.ColumnType.INT:
+      feature[column_info.name] = tf.train.Feature(
+          int64_list=tf.train.Int64List(value=[int(csv_cell)]))
+    elif column_info.type == csv_decoder.ColumnType.FLOAT:
+      feature[column_info.name] = tf.train.Feature(
+          float_list=tf.train.FloatList(value=[float(csv_cell)]))
+    else:
+      feature[column_info.name] = tf.train.Feature(
+          bytes_list=tf.train.BytesList(value=[csv_cell]))
+  return tf.train.Example(features=tf.train.Features(
+      feature=feature)).SerializeToString(deterministic=True)
+
+
+class CsvExampleGenBenchmark(test.Benchmark):
+  """CsvExampleGen benchmarks."""
+
+  def report_benchmark(self, **kwargs):
+    if "extras" not in kwargs:
+      kwargs["extras"] = {}
+    # Note that the GIT_COMMIT_ID is not included in the packages themselves:
+    # it must be injected by an external script.
+    kwargs["extras"]["commit_tfx"] = getattr(tfx, "GIT_COMMIT_ID",
+                                             tfx.__version__)
+    super(CsvExampleGenBenchmark, self).report_benchmark(**kwargs)
+
+  def _generate_lines(self):
+    """Returns column infos and parsed lines with about 5% empty cells."""
+    rng = random.Random(0)
+    column_infos = []
+    generators = []
+    for i in range(_NUM_INT_COLUMNS):
+      column_infos.append(
+          csv_decoder.ColumnInfo("int_%d" % i, csv_decoder.ColumnType.INT))
+      generators.append(lambda: str(rng.randint(-1000000, 1000000)))
+    for i in range(_NUM_FLOAT_COLUMNS):
+      column_infos.append(
+          csv_decoder.ColumnInfo("float_%d" % i, csv_decoder.ColumnType.FLOAT))
+      generators.append(lambda: repr(rng.random() * 1000))
+    for i in range(_NUM_STRING_COLUMNS):
+      column_infos.append(
+          csv_decoder.ColumnInfo("string_%d" % i,
+                                 csv_decoder.ColumnType.STRING))
+      generators.append(lambda: "value_%d" % rng.randint(0, 100))
+    lines = [[
+        b"" if rng.random() < 0.05 else generate().encode("utf-8")
+        for generate in generators
+    ] for _ in range(_NUM_LINES)]
+    return column_infos, lines
+
+  def _report(self, name, wall_time):
+    self.report_benchmark(
+        name=name,
+        iters=1,
+        wall_time=wall_time,
+        extras={"rows_per_sec": _NUM_LINES / wall_time})
+
+  def benchmarkPerLineConversion(self):
+    """Benchmark the former conversion building one tf.Example per line."""
+    column_infos, lines = self._generate_lines()
+    start = time.time()
+    for csv_cells in lines:
+      _per_line_to_serialized_example(csv_cells, column_infos)
+    self._report("CsvExampleGen.PerLineConversion", time.time() - start)
+
+  def benchmarkBatchedConversion(self):
+    """Benchmark the conversion of batches of lines through RecordBatches."""
+    column_infos, lines = self._generate_lines()
+    do_fn = executor._ParsedCsvLinesToSerializedExamples()  # pylint: disable=protected-access
+    start = time.time()
+    for i in range(0, _NUM_LINES, _BATCH_SIZE):
+      for _ in do_fn.process(lines[i:i + _BATCH_SIZE], column_infos):
+        pass
+    self._report("CsvExampleGen.BatchedConversion", time.time() - start)
+
+
+if __name__ == "__main__":
+  test.main()
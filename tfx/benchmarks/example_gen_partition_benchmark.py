@@ -0,0 +1,113 @@
+# Lint as: python2, python3
+# Copyright 2020 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks for the assignment of examples to splits in ExampleGen."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import bisect
+import hashlib
+import random
+import time
+
+# Standard Imports
+
+import tensorflow as tf
+import tfx
+from tensorflow.python.platform import test  # pylint: disable=g-direct-tensorflow-import
+from tfx.components.example_gen import base_example_gen_executor
+from tfx.proto import example_gen_pb2
+
+# Number of partitioned examples.
+_NUM_EXAMPLES = 100000
+# Hash buckets of a train:eval=2:1 split config.
+_BUCKETS = [2, 3]
+
+
+def _sha256_partition_fn(record, num_partitions, buckets):
+  """Assigns a split the way ExampleGen did before hash functions were added."""
+  assert num_partitions == len(
+      buckets), "Partitions do not match bucket number."
+  bucket = int(hashlib.sha256(record).hexdigest(), 16) % buckets[-1]
+  return bisect.bisect(buckets, bucket)
+
+
+class ExampleGenPartitionBenchmark(test.Benchmark):
+  """ExampleGen partition benchmarks."""
+
+  def report_benchmark(self, **kwargs):
+    if "extras" not in kwargs:
+      kwargs["extras"] = {}
+    # Note that the GIT_COMMIT_ID is not included in the packages themselves:
+    # it must be injected by an external script.
+    kwargs["extras"]["commit_tfx"] = getattr(tfx, "GIT_COMMIT_ID",
+                                             tfx.__version__)
+    super(ExampleGenPartitionBenchmark, self).report_benchmark(**kwargs)
+
+  def _generate_records(self):
+    """Returns serialized examples of about 300 bytes."""
+    rng = random.Random(0)
+    records = []
+    for i in range(_NUM_EXAMPLES):
+      example = tf.train.Example()
+      feature = example.features.feature
+      feature["user"].int64_list.value.append(rng.randint(0, 1000))
+      feature["index"].int64_list.value.append(i)
+      feature["values"].float_list.value.extend(
+          rng.random() for _ in range(50))
+      feature["name"].bytes_list.value.append(b"name_%d" % rng.randint(0, 100))
+      records.append(example.SerializeToString(deterministic=True))
+    return records
+
+  def _run(self, name, partition_fn, *args):
+    records = self._generate_records()
+    start = time.time()
+    for record in records:
+      partition_fn(record, len(_BUCKETS), _BUCKETS, *args)
+    wall_time = time.time() - start
+    self.report_benchmark(
+        name=name,
+        iters=1,
+        wall_time=wall_time,
+        extras={"examples_per_sec": _NUM_EXAMPLES / wall_time})
+
+  def benchmarkFormerSha256Partition(self):
+    """Benchmark the former partition function."""
+    self._run("ExampleGen.FormerSha256Partition", _sha256_partition_fn)
+
+  def benchmarkSha256Partition(self):
+    self._run("ExampleGen.Sha256Partition",
+              base_example_gen_executor._PartitionFn,  # pylint: disable=protected-access
+              example_gen_pb2.SplitConfig())
+
+  def benchmarkCrc32Partition(self):
+    self._run(
+        "ExampleGen.Crc32Partition",
+        base_example_gen_executor._PartitionFn,  # pylint: disable=protected-access
+        example_gen_pb2.SplitConfig(
+            hash_function=example_gen_pb2.SplitConfig.CRC32))
+
+  def benchmarkCrc32PartitionByFeature(self):
+    self._run(
+        "ExampleGen.Crc32PartitionByFeature",
+        base_example_gen_executor._PartitionFn,  # pylint: disable=protected-access
+        example_gen_pb2.SplitConfig(
+            partition_feature_name="user",
+            hash_function=example_gen_pb2.SplitConfig.CRC32))
+
+
+if __name__ == "__main__":
+  test.main()
@@ -0,0 +1,80 @@
+# Lint as: python2, python3
+# Copyright 2020 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks for the fingerprint of input files in io_utils."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import tempfile
+import time
+
+# Standard Imports
+
+import tfx
+from tensorflow.python.platform import test  # pylint: disable=g-direct-tensorflow-import
+from tfx.utils import io_utils
+
+# Number of fingerprinted files.
+_NUM_FILES = 50000
+# Size of each file in bytes.
+_FILE_SIZE = 100
+
+
+class FingerprintBenchmark(test.Benchmark):
+  """Fingerprint benchmarks."""
+
+  def report_benchmark(self, **kwargs):
+    if "extras" not in kwargs:
+      kwargs["extras"] = {}
+    # Note that the GIT_COMMIT_ID is not included in the packages themselves:
+    # it must be injected by an external script.
+    kwargs["extras"]["commit_tfx"] = getattr(tfx, "GIT_COMMIT_ID",
+                                             tfx.__version__)
+    super(FingerprintBenchmark, self).report_benchmark(**kwargs)
+
+  def _write_files(self):
+    """Writes small files to a local directory and returns their pattern."""
+    directory = tempfile.mkdtemp()
+    for i in range(_NUM_FILES):
+      with open(os.path.join(directory, "data_%05d" % i), "wb") as f:
+        f.write(os.urandom(_FILE_SIZE))
+    return os.path.join(directory, "*")
+
+  def _run(self, name, **kwargs):
+    file_pattern = self._write_files()
+    start = time.time()
+    io_utils.generate_fingerprint("split", file_pattern, **kwargs)
+    wall_time = time.time() - start
+    self.report_benchmark(
+        name=name,
+        iters=1,
+        wall_time=wall_time,
+        extras={"files_per_sec": _NUM_FILES / wall_time})
+
+  def benchmarkSequentialFingerprint(self):
+    """Benchmark the former fingerprint stat'ing one file after another."""
+    self._run("Fingerprint.Sequential", max_workers=1)
+
+  def benchmarkConcurrentFingerprint(self):
+    self._run("Fingerprint.Concurrent")
+
+  def benchmarkConcurrentContentFingerprint(self):
+    self._run("Fingerprint.ConcurrentContent", content_hash=True)
+
+
+if __name__ == "__main__":
+  test.main()
@@ -0,0 +1,115 @@
+# Lint as: python2, python3
+# Copyright 2020 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks for tfx.orchestration.metadata."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+# Standard Imports
+
+from ml_metadata.proto import metadata_store_pb2
+import tfx
+from tensorflow.python.platform import test  # pylint: disable=g-direct-tensorflow-import
+from tfx.orchestration import data_types
+from tfx.orchestration import metadata
+from tfx.types import standard_artifacts
+
+# Number of historical executions in the pipeline context for each run of the
+# benchmark.
+_HISTORY_SIZES = (10, 100, 1000, 5000)
+# Number of cache lookups timed for each history size.
+_LOOKUP_ITERS = 20
+
+
+class MetadataBenchmark(test.Benchmark):
+  """Metadata benchmarks."""
+
+  def report_benchmark(self, **kwargs):
+    if "extras" not in kwargs:
+      kwargs["extras"] = {}
+    # Note that the GIT_COMMIT_ID is not included in the packages themselves:
+    # it must be injected by an external script.
+    kwargs["extras"]["commit_tfx"] = getattr(tfx, "GIT_COMMIT_ID",
+                                             tfx.__version__)
+    super(MetadataBenchmark, self).report_benchmark(**kwargs)
+
+  def _publish_execution(self, m, pipeline_info, run_index, input_artifacts):
+    """Registers and publishes one execution of the benchmark component."""
+    component_info = data_types.ComponentInfo(
+        component_type="a.b.c",
+        component_id="my_component",
+        pipeline_info=pipeline_info)
+    contexts = m.register_pipeline_contexts_if_not_exists(pipeline_info)
+    m.register_execution(
+        input_artifacts=input_artifacts,
+        exec_properties={"run_index": run_index},
+        pipeline_info=pipeline_info,
+        component_info=component_info,
+        contexts=contexts)
+    output_artifact = standard_artifacts.Examples()
+    output_artifact.uri = "output_%d" % run_index
+    m.publish_execution(
+        component_info=component_info,
+        output_artifacts={"output": [output_artifact]})
+
+  def benchmarkGetCachedOutputs(self):
+    """Benchmark Metadata.get_cached_outputs.
+
+    Publishes a growing number of executions of the same component with
+    distinct execution properties, then times cache lookups of the first one.
+    Lookup time is expected to stay flat as the history grows.
+    """
+    connection_config = metadata_store_pb2.ConnectionConfig()
+    connection_config.sqlite.SetInParent()
+    with metadata.Metadata(connection_config=connection_config) as m:
+      input_artifacts = {"input": [standard_artifacts.Examples()]}
+      published = 0
+      for history_size in _HISTORY_SIZES:
+        while published < history_size:
+          pipeline_info = data_types.PipelineInfo(
+              pipeline_name="my_pipeline",
+              pipeline_root="/tmp",
+              run_id="run_%d" % published)
+          self._publish_execution(m, pipeline_info, published, input_artifacts)
+          published += 1
+
+        pipeline_info = data_types.PipelineInfo(
+            pipeline_name="my_pipeline", pipeline_root="/tmp", run_id="lookup")
+        component_info = data_types.ComponentInfo(
+            component_type="a.b.c",
+            component_id="my_component",
+            pipeline_info=pipeline_info)
+        start = time.time()
+        for _ in range(_LOOKUP_ITERS):
+          cached_outputs = m.get_cached_outputs(
+              input_artifacts=input_artifacts,
+              exec_properties={"run_index": 0},
+              pipeline_info=pipeline_info,
+              component_info=component_info)
+          assert cached_outputs, "Expected a cache hit."
+        delta = time.time() - start
+
+        self.report_benchmark(
+            name="benchmarkGetCachedOutputs_history_%d" % history_size,
+            iters=_LOOKUP_ITERS,
+            wall_time=delta / _LOOKUP_ITERS,
+            extras={"history_size": history_size})
+
+
+if __name__ == "__main__":
+  test.main()
@@ -0,0 +1,118 @@
+# Lint as: python2, python3
+# Copyright 2020 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks for Parquet to tf.Example conversion in ExampleGen."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import random
+import tempfile
+import time
+
+# Standard Imports
+
+import pyarrow as pa
+from pyarrow import parquet as pq
+import tfx
+from tensorflow.python.platform import test  # pylint: disable=g-direct-tensorflow-import
+from tfx.components.example_gen import utils
+from tfx.components.example_gen.custom_executors import parquet_executor
+from tfx.proto import example_gen_pb2
+
+# Number of rows of the wide table.
+_NUM_ROWS = 5000
+_NUM_ROWS_PER_ROW_GROUP = 1000
+# Number of int, float and string columns each, 510 columns in total.
+_NUM_COLUMNS_PER_TYPE = 170
+# Number of columns converted to features.
+_NUM_SELECTED_COLUMNS = 40
+
+
+class ParquetExampleGenBenchmark(test.Benchmark):
+  """Parquet ExampleGen benchmarks."""
+
+  def report_benchmark(self, **kwargs):
+    if "extras" not in kwargs:
+      kwargs["extras"] = {}
+    # Note that the GIT_COMMIT_ID is not included in the packages themselves:
+    # it must be injected by an external script.
+    kwargs["extras"]["commit_tfx"] = getattr(tfx, "GIT_COMMIT_ID",
+                                             tfx.__version__)
+    super(ParquetExampleGenBenchmark, self).report_benchmark(**kwargs)
+
+  def _write_wide_table(self):
+    """Writes a wide Parquet table and returns its path and column names."""
+    rng = random.Random(0)
+    arrays = []
+    names = []
+    for i in range(_NUM_COLUMNS_PER_TYPE):
+      arrays.append(
+          pa.array([rng.randint(0, 1000000) for _ in range(_NUM_ROWS)]))
+      names.append("int_%d" % i)
+      arrays.append(pa.array([rng.random() for _ in range(_NUM_ROWS)]))
+      names.append("float_%d" % i)
+      arrays.append(
+          pa.array(
+              ["value_%d" % rng.randint(0, 100) for _ in range(_NUM_ROWS)]))
+      names.append("string_%d" % i)
+    path = os.path.join(tempfile.mkdtemp(), "wide.parquet")
+    pq.write_table(
+        pa.Table.from_arrays(arrays, names),
+        path,
+        row_group_size=_NUM_ROWS_PER_ROW_GROUP)
+    return path, names
+
+  def _report(self, name, wall_time):
+    self.report_benchmark(
+        name=name,
+        iters=1,
+        wall_time=wall_time,
+        extras={"rows_per_sec": _NUM_ROWS / wall_time})
+
+  def _run_row_groups(self, name, path, parquet_config):
+    start = time.time()
+    for row_group in parquet_executor._ListRowGroups(path, parquet_config):  # pylint: disable=protected-access
+      for _ in parquet_executor._ReadRowGroup(row_group, parquet_config):  # pylint: disable=protected-access
+        pass
+    self._report(name, time.time() - start)
+
+  def benchmarkPerRowConversion(self):
+    """Benchmark the former read of all columns and per row conversion."""
+    path, _ = self._write_wide_table()
+    start = time.time()
+    columns = pq.read_table(path).to_pydict()
+    for row in range(_NUM_ROWS):
+      utils.dict_to_example({name: columns[name][row] for name in columns
+                            }).SerializeToString(deterministic=True)
+    self._report("ParquetExampleGen.PerRowConversion", time.time() - start)
+
+  def benchmarkRowGroupConversion(self):
+    """Benchmark the conversion of row groups with all columns."""
+    path, _ = self._write_wide_table()
+    self._run_row_groups("ParquetExampleGen.RowGroupConversion", path,
+                         example_gen_pb2.ParquetConfig())
+
+  def benchmarkProjectedRowGroupConversion(self):
+    """Benchmark the conversion of row groups with selected columns."""
+    path, names = self._write_wide_table()
+    self._run_row_groups(
+        "ParquetExampleGen.ProjectedRowGroupConversion", path,
+        example_gen_pb2.ParquetConfig(columns=names[:_NUM_SELECTED_COLUMNS]))
+
+
+if __name__ == "__main__":
+  test.main()
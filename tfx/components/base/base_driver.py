@@ -130,8 +130,8 @@ class BaseDriver(object):
         resolved.
     """
     result = {}
-    for name, input_channel in input_dict.items():
-      if driver_args.interactive_resolution:
+    if driver_args.interactive_resolution:
+      for name, input_channel in input_dict.items():
         artifacts = list(input_channel.get())
         for artifact in artifacts:
           # Note: when not initialized, artifact.uri is '' and artifact.id is 0.
@@ -143,13 +143,17 @@ class BaseDriver(object):
                 '`interactive_context.run(component)` before their outputs can '
                 'be used in downstream components.') % (artifact, name))
         result[name] = artifacts
-      else:
-        result[name] = self._metadata_handler.search_artifacts(
-            artifact_name=input_channel.output_key,
-            pipeline_info=pipeline_info,
-            producer_component_id=input_channel.producer_component_id)
-        # TODO(ccy): add this code path to interactive resolution.
-        for artifact in result[name]:
+    else:
+      # Resolves all input channels in one pass over the pipeline run.
+      result = self._metadata_handler.search_artifacts_in_bulk(
+          artifact_queries=dict(
+              (name, (input_channel.output_key,
+                      input_channel.producer_component_id))
+              for name, input_channel in input_dict.items()),
+          pipeline_info=pipeline_info)
+      # TODO(ccy): add this code path to interactive resolution.
+      for artifacts in result.values():
+        for artifact in artifacts:
           if isinstance(artifact, types.ValueArtifact):
             # Resolve the content of file into value field for string-typed
             # artifacts.
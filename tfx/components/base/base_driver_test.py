@@ -110,8 +110,10 @@ class BaseDriverTest(tf.test.TestCase):
   )
   @mock.patch.object(types.ValueArtifact, 'read', fake_read)
   def testPreExecutionNewExecution(self, mock_verify_input_artifacts_fn):
-    self._mock_metadata.search_artifacts.return_value = list(
-        self._input_dict['input_string'].get())
+    self._mock_metadata.search_artifacts_in_bulk.return_value = {
+        'input_data': list(self._input_dict['input_data'].get()),
+        'input_string': list(self._input_dict['input_string'].get()),
+    }
     self._mock_metadata.get_artifacts_by_info.side_effect = list(
         self._input_dict['input_data'].get()) + list(
             self._input_dict['input_string'].get())
@@ -140,14 +142,22 @@ class BaseDriverTest(tf.test.TestCase):
                      str(self._execution_id)))
     self.assertEqual(execution_decision.input_dict['input_string'][0].value,
                      _STRING_VALUE)
+    self._mock_metadata.search_artifacts_in_bulk.assert_called_once_with(
+        artifact_queries={
+            'input_data': ('k', 'c'),
+            'input_string': ('k2', 'c2')
+        },
+        pipeline_info=self._pipeline_info)
 
   @mock.patch(
       'tfx.components.base.base_driver.BaseDriver.verify_input_artifacts'
   )
   @mock.patch.object(types.ValueArtifact, 'read', fake_read)
   def testPreExecutionCached(self, mock_verify_input_artifacts_fn):
-    self._mock_metadata.search_artifacts.return_value = list(
-        self._input_dict['input_string'].get())
+    self._mock_metadata.search_artifacts_in_bulk.return_value = {
+        'input_data': list(self._input_dict['input_data'].get()),
+        'input_string': list(self._input_dict['input_string'].get()),
+    }
     self._mock_metadata.get_artifacts_by_info.side_effect = list(
         self._input_dict['input_data'].get()) + list(
             self._input_dict['input_string'].get())
@@ -19,7 +19,7 @@ from __future__ import division
 from __future__ import print_function
 
 import os
-from typing import Any, Dict, List, Mapping, Text
+from typing import Any, Dict, List, Mapping, Optional, Text
 
 from absl import logging
 import apache_beam as beam
@@ -31,8 +31,10 @@ from google.protobuf import json_format
 from tensorflow_serving.apis import prediction_log_pb2
 from tfx import types
 from tfx.components.base import base_executor
+from tfx.components.util import examples_utils
 from tfx.components.util import model_utils
 from tfx.proto import bulk_inferrer_pb2
+from tfx.proto import example_gen_pb2
 from tfx.types import artifact_utils
 from tfx.utils import io_utils
 from tfx.utils import path_utils
@@ -92,27 +94,28 @@ class Executor(base_executor.BaseExecutor):
     data_spec = bulk_inferrer_pb2.DataSpec()
     json_format.Parse(exec_properties['data_spec'], data_spec)
     example_uris = {}
-    if data_spec.example_splits:
-      for example in input_dict['examples']:
-        for split in artifact_utils.decode_split_names(example.split_names):
-          if split in data_spec.example_splits:
-            example_uris[split] = os.path.join(example.uri, split)
-    else:
-      for example in input_dict['examples']:
-        for split in artifact_utils.decode_split_names(example.split_names):
+    example_file_formats = {}
+    for example in input_dict['examples']:
+      for split in artifact_utils.decode_split_names(example.split_names):
+        if (not data_spec.example_splits or
+            split in data_spec.example_splits):
           example_uris[split] = os.path.join(example.uri, split)
+          example_file_formats[split] = examples_utils.get_file_format(example)
     model_spec = bulk_inferrer_pb2.ModelSpec()
     json_format.Parse(exec_properties['model_spec'], model_spec)
     output_path = os.path.join(output.uri, _PREDICTION_LOGS_DIR_NAME)
     self._run_model_inference(model_path, example_uris, output_path,
-                              model_spec)
+                              model_spec, example_file_formats)
     logging.info('BulkInferrer generates prediction log to %s', output_path)
     output.set_int_custom_property('inferred', 1)
 
   def _run_model_inference(self, model_path: Text,
                            example_uris: Mapping[Text, Text],
                            output_path: Text,
-                           model_spec: bulk_inferrer_pb2.ModelSpec) -> None:
+                           model_spec: bulk_inferrer_pb2.ModelSpec,
+                           example_file_formats: Optional[Mapping[Text,
+                                                                  int]] = None
+                          ) -> None:
     """Runs model inference on given example data.
 
     Args:
@@ -120,6 +123,9 @@ class Executor(base_executor.BaseExecutor):
       example_uris: Mapping of example split name to example uri.
       output_path: Path to output generated prediction logs.
       model_spec: bulk_inferrer_pb2.ModelSpec instance.
+      example_file_formats: Mapping of example split name to the
+        example_gen_pb2.Output.FileFormat of its files. Splits default to GZIP
+        compressed TFRecords.
 
     Returns:
       None
@@ -131,12 +137,17 @@ class Executor(base_executor.BaseExecutor):
         signature_name=model_spec.model_signature_name)
     inference_endpoint = model_spec_pb2.InferenceEndpoint()
     inference_endpoint.saved_model_spec.CopyFrom(saved_model_spec)
+    example_file_formats = example_file_formats or {}
     with self._make_beam_pipeline() as pipeline:
       data_list = []
       for split, example_uri in example_uris.items():
         data = (
-            pipeline | 'ReadData[{}]'.format(split) >> beam.io.ReadFromTFRecord(
-                file_pattern=io_utils.all_files_pattern(example_uri)))
+            pipeline
+            | 'ReadData[{}]'.format(split) >>
+            examples_utils.ReadSerializedExamples(  # pylint: disable=no-value-for-parameter
+                io_utils.all_files_pattern(example_uri),
+                example_file_formats.get(
+                    split, example_gen_pb2.Output.FORMAT_TFRECORDS_GZIP)))
         data_list.append(data)
       _ = (
           [data for data in data_list]
@@ -22,13 +22,13 @@ import os
 from typing import Any, Dict, List, Text
 
 import absl
-import apache_beam as beam
 import tensorflow_model_analysis as tfma
 
 from google.protobuf import json_format
 from tfx import types
 from tfx.components.base import base_executor
 from tfx.components.evaluator import constants
+from tfx.components.util import examples_utils
 from tfx.proto import evaluator_pb2
 from tfx.types import artifact_utils
 from tfx.utils import io_utils
@@ -173,10 +173,13 @@ class Executor(base_executor.BaseExecutor):
     with self._make_beam_pipeline() as pipeline:
       # pylint: disable=expression-not-assigned
       (pipeline
-       | 'ReadData' >> beam.io.ReadFromTFRecord(
-           file_pattern=io_utils.all_files_pattern(
+       | 'ReadData' >> examples_utils.ReadSerializedExamples(  # pylint: disable=no-value-for-parameter
+           io_utils.all_files_pattern(
                artifact_utils.get_split_uri(input_dict[constants.EXAMPLES_KEY],
-                                            'eval')))
+                                            'eval')),
+           examples_utils.get_file_format(
+               artifact_utils.get_single_instance(
+                   input_dict[constants.EXAMPLES_KEY])))
        |
        'ExtractEvaluateAndWriteResults' >> tfma.ExtractEvaluateAndWriteResults(
            eval_shared_model=models[0] if len(models) == 1 else models,
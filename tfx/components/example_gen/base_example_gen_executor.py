@@ -22,32 +22,93 @@ import abc
 import bisect
 import hashlib
 import os
-from typing import Any, Dict, List, Text
+import random
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Text, Tuple, Union
 
 import absl
 import apache_beam as beam
+from apache_beam.io import filesystems
+import pyarrow as pa
+from pyarrow import parquet as pq
 from six import with_metaclass
+import tensorflow as tf
 
 from google.protobuf import json_format
 from tfx import types
 from tfx.components.base import base_executor
 from tfx.components.example_gen import utils
+from tfx.components.util import examples_utils
 from tfx.proto import example_gen_pb2
 from tfx.types import artifact_utils
 
 # Default file name for TFRecord output file prefix.
 DEFAULT_FILE_NAME = 'data_tfrecord'
+# Default file name for Parquet output file prefix.
+DEFAULT_PARQUET_FILE_NAME = 'data_parquet'
 # Key for input in executor input_dict.
 INPUT_KEY = 'input'
 
 # Key for output examples in executor output_dict.
 EXAMPLES_KEY = 'examples'
 
-
-def _PartitionFn(record: bytes, num_partitions: int, buckets: List[int]) -> int:
+# Maximum size of the serialized examples shuffled together by LOCAL_SHUFFLE.
+_LOCAL_SHUFFLE_BUFFER_BYTES = 64 << 20
+
+# Number of files of each split in FORMAT_PARQUET_FEATURES_SNAPPY if
+# Output.num_shards is unset.
+_DEFAULT_PARQUET_FEATURES_NUM_SHARDS = 16
+# Number of examples per row group of Parquet files with a column per feature.
+_PARQUET_FEATURES_ROW_GROUP_SIZE = 10000
+# Arrow types of the values of the kinds of tf.train.Feature.
+_FEATURE_KIND_ARROW_TYPES = {
+    'bytes_list': pa.binary(),
+    'float_list': pa.float32(),
+    'int64_list': pa.int64(),
+}
+
+
+def _Sha256(data: bytes) -> int:
+  return int(hashlib.sha256(data).hexdigest(), 16)
+
+
+# Hash functions of SplitConfig.HashFunction, from bytes to a non negative int.
+_HASH_FUNCTIONS = {
+    example_gen_pb2.SplitConfig.SHA256: _Sha256,
+    example_gen_pb2.SplitConfig.CRC32: zlib.crc32,
+}  # type: Dict[int, Callable[[bytes], int]]
+
+
+def _GeneratePartitionKey(record: bytes,
+                          split_config: example_gen_pb2.SplitConfig) -> bytes:
+  """Returns the bytes hashed to assign a serialized example to a split."""
+  if not split_config.partition_feature_name:
+    return record
+
+  features = tf.train.Example.FromString(record).features.feature
+  if split_config.partition_feature_name not in features:
+    raise RuntimeError('Feature name `{}` does not exist.'.format(
+        split_config.partition_feature_name))
+  feature = features[split_config.partition_feature_name]
+  if not feature.HasField('kind'):
+    raise RuntimeError('Partition feature does not contain any value.')
+  if (not feature.HasField('bytes_list') and
+      not feature.HasField('int64_list')):
+    raise RuntimeError('Only `bytes_list` and `int64_list` features are '
+                       'supported for partition.')
+  return feature.SerializeToString(deterministic=True)
+
+
+def _PartitionFn(
+    record: bytes,
+    num_partitions: int,
+    buckets: List[int],
+    split_config: Optional[example_gen_pb2.SplitConfig] = None) -> int:
   assert num_partitions == len(
       buckets), 'Partitions do not match bucket number.'
-  bucket = int(hashlib.sha256(record).hexdigest(), 16) % buckets[-1]
+  split_config = split_config or example_gen_pb2.SplitConfig()
+  hash_fn = _HASH_FUNCTIONS[split_config.hash_function]
+  bucket = hash_fn(_GeneratePartitionKey(record, split_config)) % buckets[-1]
   # For example, if buckets is [10,50,80], there will be 3 splits:
   #   bucket >=0 && < 10, returns 0
   #   bucket >=10 && < 50, returns 1
@@ -55,19 +116,301 @@ def _PartitionFn(record: bytes, num_partitions: int, buckets: List[int]) -> int:
   return bisect.bisect(buckets, bucket)
 
 
+@beam.typehints.with_input_types(bytes)
+@beam.typehints.with_output_types(bytes)
+class _LocalShuffleFn(beam.DoFn):
+  """Shuffles examples in memory, in batches of the examples of a bundle."""
+
+  def __init__(self, buffer_bytes: int = _LOCAL_SHUFFLE_BUFFER_BYTES):
+    self._buffer_bytes = buffer_bytes
+    self._buffer = []
+    self._buffered_bytes = 0
+
+  def _flush(self) -> List[bytes]:
+    buffer = self._buffer
+    random.shuffle(buffer)
+    self._buffer = []
+    self._buffered_bytes = 0
+    return buffer
+
+  def start_bundle(self):
+    self._buffer = []
+    self._buffered_bytes = 0
+
+  def process(self, example: bytes) -> Iterable[bytes]:
+    self._buffer.append(example)
+    self._buffered_bytes += len(example)
+    if self._buffered_bytes >= self._buffer_bytes:
+      for shuffled_example in self._flush():
+        yield shuffled_example
+
+  def finish_bundle(self):
+    for shuffled_example in self._flush():
+      yield beam.transforms.window.GlobalWindows.windowed_value(
+          shuffled_example)
+
+
+def _FeatureKinds(record: bytes) -> Dict[Text, Text]:
+  """Returns the kind of each feature with values of a serialized example."""
+  features = tf.train.Example.FromString(record).features.feature
+  kinds = {}
+  for name, feature in features.items():
+    kind = feature.WhichOneof('kind')
+    if kind:
+      kinds[name] = kind
+  return kinds
+
+
+class _MergeFeatureKindsFn(beam.CombineFn):
+  """Merges the feature kinds of examples, which must agree."""
+
+  def create_accumulator(self) -> Dict[Text, Text]:
+    return {}
+
+  def add_input(self, accumulator: Dict[Text, Text],
+                kinds: Dict[Text, Text]) -> Dict[Text, Text]:
+    for name, kind in kinds.items():
+      if accumulator.setdefault(name, kind) != kind:
+        raise ValueError('Feature {} has values of both {} and {}.'.format(
+            name, accumulator[name], kind))
+    return accumulator
+
+  def merge_accumulators(
+      self, accumulators: Iterable[Dict[Text, Text]]) -> Dict[Text, Text]:
+    result = {}
+    for accumulator in accumulators:
+      self.add_input(result, accumulator)
+    return result
+
+  def extract_output(self, accumulator: Dict[Text, Text]) -> Dict[Text, Text]:
+    return accumulator
+
+
+def _WriteParquetFeaturesShard(shard: Tuple[int, Iterable[bytes]],
+                               output_path: Text, num_shards: int, codec: Text,
+                               feature_kinds: Dict[Text, Text]) -> None:
+  """Writes the examples of a shard to a Parquet file with a feature column."""
+  index, records = shard
+  names = sorted(feature_kinds)
+  if not names:
+    return
+  arrow_types = [
+      pa.list_(_FEATURE_KIND_ARROW_TYPES[feature_kinds[name]])
+      for name in names
+  ]
+  schema = pa.schema(list(zip(names, arrow_types)))
+  file_path = '{}-{:05d}-of-{:05d}.parquet'.format(
+      os.path.join(output_path, DEFAULT_PARQUET_FILE_NAME), index, num_shards)
+
+  def _WriteRowGroup(writer, columns):
+    writer.write_table(
+        pa.Table.from_arrays([
+            pa.array(column, arrow_type)
+            for column, arrow_type in zip(columns, arrow_types)
+        ], names))
+
+  with filesystems.FileSystems.create(file_path) as f:
+    writer = pq.ParquetWriter(f, schema, compression=codec)
+    columns = [[] for _ in names]
+    for record in records:
+      features = tf.train.Example.FromString(record).features.feature
+      for name, column in zip(names, columns):
+        if name in features:
+          column.append(
+              list(getattr(features[name], feature_kinds[name]).value))
+        else:
+          column.append(None)
+      if len(columns[0]) == _PARQUET_FEATURES_ROW_GROUP_SIZE:
+        _WriteRowGroup(writer, columns)
+        columns = [[] for _ in names]
+    if columns[0]:
+      _WriteRowGroup(writer, columns)
+    writer.close()
+
+
+@beam.ptransform_fn
+@beam.typehints.with_input_types(bytes)
+@beam.typehints.with_output_types(beam.pvalue.PDone)
+def _WriteParquetFeatures(examples: beam.pvalue.PCollection, output_path: Text,
+                          codec: Text, num_shards: int) -> beam.pvalue.PDone:
+  """Writes examples to Parquet files with a column per feature.
+
+  The column types are the kinds of the features, merged over all the examples
+  before the files are written.
+
+  Args:
+    examples: PCollection of serialized examples.
+    output_path: directory of the files.
+    codec: Parquet codec.
+    num_shards: number of files.
+
+  Returns:
+    PDone.
+  """
+  feature_kinds = (
+      examples
+      | 'FeatureKinds' >> beam.Map(_FeatureKinds)
+      | 'MergeFeatureKinds' >> beam.CombineGlobally(_MergeFeatureKindsFn()))
+  return (examples
+          # Shards are deterministic, so that retries overwrite the same files.
+          | 'AssignShard' >> beam.Map(
+              lambda record: (zlib.crc32(record) % num_shards, record))
+          | 'GroupByShard' >> beam.GroupByKey()
+          | 'WriteShard' >> beam.Map(_WriteParquetFeaturesShard, output_path,
+                                     num_shards, codec,
+                                     beam.pvalue.AsSingleton(feature_kinds)))
+
+
+def _WriteFormat(examples: beam.pvalue.PCollection,
+                 output_path: Text,
+                 file_format: int,
+                 num_shards: int,
+                 label_suffix: Text = '') -> beam.pvalue.PDone:
+  """Writes examples to the files of a directory in a file format."""
+  if file_format in examples_utils.PARQUET_FEATURES_CODECS:
+    return (examples
+            | 'Write' + label_suffix >> _WriteParquetFeatures(  # pylint: disable=no-value-for-parameter
+                output_path,
+                examples_utils.PARQUET_FEATURES_CODECS[file_format],
+                num_shards or _DEFAULT_PARQUET_FEATURES_NUM_SHARDS))
+  if file_format in examples_utils.PARQUET_CODECS:
+    return (examples
+            | 'ToParquetRow' + label_suffix >> beam.Map(lambda example: {
+                examples_utils.PARQUET_EXAMPLE_COLUMN: example
+            })
+            | 'Write' + label_suffix >> beam.io.WriteToParquet(
+                os.path.join(output_path, DEFAULT_PARQUET_FILE_NAME),
+                examples_utils.PARQUET_SCHEMA,
+                codec=examples_utils.PARQUET_CODECS[file_format],
+                file_name_suffix='.parquet',
+                num_shards=num_shards))
+  if file_format == example_gen_pb2.Output.FORMAT_TFRECORDS_UNCOMPRESSED:
+    file_name_suffix = ''
+  else:
+    file_name_suffix = '.gz'
+  # The compression is set by the file name suffix.
+  return (examples
+          | 'Write' + label_suffix >> beam.io.WriteToTFRecord(
+              os.path.join(output_path, DEFAULT_FILE_NAME),
+              file_name_suffix=file_name_suffix,
+              num_shards=num_shards))
+
+
 @beam.ptransform_fn
 @beam.typehints.with_input_types(bytes)
 @beam.typehints.with_output_types(beam.pvalue.PDone)
-def _WriteSplit(example_split: beam.pvalue.PCollection,
-                output_split_path: Text) -> beam.pvalue.PDone:
-  """Shuffles and writes output split."""
-  return (example_split
-          # TODO(jyzhao): make shuffle optional.
-          | 'Shuffle' >> beam.transforms.Reshuffle()
-          # TODO(jyzhao): multiple output format.
-          | 'Write' >> beam.io.WriteToTFRecord(
-              os.path.join(output_split_path, DEFAULT_FILE_NAME),
-              file_name_suffix='.gz'))
+def _WriteSplit(
+    example_split: beam.pvalue.PCollection,
+    output_split_path: Text,
+    output_config: example_gen_pb2.Output,
+    additional_split_paths: Optional[Dict[int, Text]] = None
+) -> beam.pvalue.PDone:
+  """Shuffles and writes output split.
+
+  Args:
+    example_split: PCollection of serialized examples of the split.
+    output_split_path: directory of the split.
+    output_config: output configuration, giving the shuffle mode, the file
+      format and the number of shards.
+    additional_split_paths: optional dict from each additional file format of
+      output_config to the directory of the split in this format.
+
+  Returns:
+    PDone.
+  """
+  if output_config.shuffle_mode == example_gen_pb2.Output.NO_SHUFFLE:
+    shuffled_split = example_split
+  elif output_config.shuffle_mode == example_gen_pb2.Output.LOCAL_SHUFFLE:
+    shuffled_split = example_split | 'Shuffle' >> beam.ParDo(_LocalShuffleFn())
+  else:
+    shuffled_split = example_split | 'Shuffle' >> beam.transforms.Reshuffle()
+
+  # Additional formats are written from the same shuffled examples.
+  for file_format, path in (additional_split_paths or {}).items():
+    _WriteFormat(
+        shuffled_split, path, file_format, output_config.num_shards,
+        '[{}]'.format(example_gen_pb2.Output.FileFormat.Name(file_format)))
+  return _WriteFormat(shuffled_split, output_split_path,
+                      output_config.file_format, output_config.num_shards)
+
+
+def _CheckFileFormats(output_config: example_gen_pb2.Output) -> None:
+  """Checks the file format and the additional file formats of the output.
+
+  Args:
+    output_config: output configuration.
+
+  Raises:
+    ValueError: if examples cannot be read back from the file format, if an
+      additional file format is unspecified, or if a format is listed twice.
+  """
+  file_format = output_config.file_format
+  if file_format in examples_utils.PARQUET_FEATURES_CODECS:
+    raise ValueError('{} is only an additional file format.'.format(
+        example_gen_pb2.Output.FileFormat.Name(file_format)))
+  if (example_gen_pb2.Output.FILE_FORMAT_UNSPECIFIED in
+      output_config.additional_file_formats):
+    raise ValueError('Additional file formats must be specified.')
+  if file_format == example_gen_pb2.Output.FILE_FORMAT_UNSPECIFIED:
+    file_format = example_gen_pb2.Output.FORMAT_TFRECORDS_GZIP
+  file_formats = [file_format] + list(output_config.additional_file_formats)
+  if len(set(file_formats)) != len(file_formats):
+    raise ValueError('Output file formats are listed twice: {}.'.format(
+        ', '.join(
+            example_gen_pb2.Output.FileFormat.Name(f) for f in file_formats)))
+
+
+def _SerializeDeterministically(
+    example: Union[tf.train.Example, bytes]) -> bytes:
+  """Serializes an example, unless it is already serialized."""
+  # Input sources may convert records to serialized examples in bulk.
+  if isinstance(example, bytes):
+    return example
+  return example.SerializeToString(deterministic=True)
+
+
+def _IsSampled(record: bytes, rate: float) -> bool:
+  """Returns whether a serialized example is kept at a sampling rate."""
+  # MD5 is independent of the hash functions assigning examples to splits, so
+  # that sampling keeps the split ratios.
+  return int(hashlib.md5(record).hexdigest()[:15], 16) < rate * (1 << 60)
+
+
+def _SerializeAndSample(example: Union[tf.train.Example, bytes],
+                        rate: float) -> Iterable[bytes]:
+  """Serializes an example and yields it if it is kept at a sampling rate."""
+  record = _SerializeDeterministically(example)
+  if _IsSampled(record, rate):
+    yield record
+
+
+def _GetSamplingRates(output_config: example_gen_pb2.Output,
+                      split_names: List[Text]) -> Dict[Text, float]:
+  """Returns the sampling rate of each sampled output split.
+
+  Args:
+    output_config: output configuration.
+    split_names: names of the output splits.
+
+  Returns:
+    Dict from the name of each sampled split to its sampling rate.
+
+  Raises:
+    ValueError: if a sampled split is not an output split or is sampled twice,
+      or if a sampling rate is not in (0, 1].
+  """
+  sampling_rates = {}
+  for sampling in output_config.sampling:
+    if sampling.split_name not in split_names:
+      raise ValueError('Sampled split {} is not an output split.'.format(
+          sampling.split_name))
+    if sampling.split_name in sampling_rates:
+      raise ValueError('Split {} is sampled twice.'.format(sampling.split_name))
+    if not 0 < sampling.rate <= 1:
+      raise ValueError('Sampling rate of split {} must be in (0, 1], got '
+                       '{}.'.format(sampling.split_name, sampling.rate))
+    sampling_rates[sampling.split_name] = sampling.rate
+  return sampling_rates
 
 
 @beam.ptransform_fn
@@ -77,14 +420,44 @@ def _InputToSerializedExample(pipeline: beam.Pipeline,
                               input_to_example: beam.PTransform,
                               input_dict: Dict[Text, List[types.Artifact]],
                               exec_properties: Dict[Text, Any],
-                              split_pattern: Text) -> beam.pvalue.PCollection:
-  """Converts input to serialized TF examples."""
-  return (pipeline
-          | 'InputSourceToExample' >> input_to_example(
-              input_dict, exec_properties, split_pattern)
+                              split_patterns: List[Text],
+                              sampling_rate: float = 1.0
+                             ) -> beam.pvalue.PCollection:
+  """Converts the input of the patterns of a split to serialized TF examples.
+
+  Args:
+    pipeline: beam pipeline.
+    input_to_example: PTransform converting the input of a pattern to TF
+      examples.
+    input_dict: Input dict from input key to a list of Artifacts.
+    exec_properties: A dict of execution properties.
+    split_patterns: patterns of the input of the split.
+    sampling_rate: fraction of the examples that are kept.
+
+  Returns:
+    PCollection of serialized examples.
+  """
+  if len(split_patterns) == 1:
+    examples = pipeline | 'InputSourceToExample' >> input_to_example(
+        input_dict, exec_properties, split_patterns[0])
+  else:
+    # E.g., the patterns of the spans of a range of spans.
+    pattern_examples = []
+    for index, split_pattern in enumerate(split_patterns):
+      pattern_examples.append(
+          pipeline
+          | 'InputSourceToExample[{}]'.format(index) >> input_to_example(
+              input_dict, exec_properties, split_pattern))
+    examples = pattern_examples | 'FlattenPatterns' >> beam.Flatten()
+  if sampling_rate < 1:
+    # Dropped examples are neither split, shuffled nor written.
+    return (examples
+            | 'SerializeAndSample' >> beam.FlatMap(_SerializeAndSample,
+                                                   sampling_rate))
+  return (examples
           # Returns deterministic string as partition is based on it.
           | 'SerializeDeterministically' >>
-          beam.Map(lambda x: x.SerializeToString(deterministic=True)))
+          beam.Map(_SerializeDeterministically))
 
 
 class BaseExampleGenExecutor(
@@ -119,6 +492,8 @@ class BaseExampleGenExecutor(
 
     Note that each input split will be transformed by this function separately.
     For complex use case, consider override 'GenerateExamplesByBeam' instead.
+    The PTransform may also output examples already serialized
+    deterministically, e.g. when it converts records in bulk.
 
     Here is an example PTransform:
       @beam.ptransform_fn
@@ -156,7 +531,11 @@ class BaseExampleGenExecutor(
 
     Returns:
       Dict of beam PCollection with split name as key, each PCollection is a
-      single output split that contains serialized TF Examples.
+      single output split that contains serialized TF Examples, sampled as
+      given by the output configuration.
+
+    Raises:
+      ValueError: if the sampling of the output configuration is invalid.
     """
     # Get input split information.
     input_config = example_gen_pb2.Input()
@@ -166,13 +545,15 @@ class BaseExampleGenExecutor(
     json_format.Parse(exec_properties['output_config'], output_config)
     # Get output split names.
     split_names = utils.generate_output_split_names(input_config, output_config)
+    sampling_rates = _GetSamplingRates(output_config, split_names)
 
     example_splits = []
     input_to_example = self.GetInputSourceToExamplePTransform()
+    split_patterns = utils.get_split_patterns(input_config)
     if output_config.split_config.splits:
       # Use output splits, input must have only one split.
       assert len(
-          input_config.splits
+          split_patterns
       ) == 1, 'input must have only one split when output split is specified.'
       # Calculate split buckets.
       buckets = []
@@ -180,20 +561,35 @@ class BaseExampleGenExecutor(
       for split in output_config.split_config.splits:
         total_buckets += split.hash_buckets
         buckets.append(total_buckets)
-      example_splits = (
+      # Examples kept at a rate are kept at any higher rate, so that examples
+      # are sampled at the highest rate before being split, and each split is
+      # sampled further at its own rate.
+      split_rates = [sampling_rates.get(name, 1.0) for name in split_names]
+      max_rate = max(split_rates)
+      partitions = (
           pipeline
           | 'InputToSerializedExample' >> _InputToSerializedExample(  # pylint: disable=no-value-for-parameter
               input_to_example, input_dict, exec_properties,
-              input_config.splits[0].pattern)
-          | 'SplitData' >> beam.Partition(_PartitionFn, len(buckets), buckets))
+              list(split_patterns.values())[0], max_rate)
+          | 'SplitData' >> beam.Partition(_PartitionFn, len(buckets), buckets,
+                                          output_config.split_config))
+      for split_name, rate, partition in zip(split_names, split_rates,
+                                             partitions):
+        if rate < max_rate:
+          partition = (
+              partition
+              | 'Sample[{}]'.format(split_name) >> beam.Filter(
+                  _IsSampled, rate))
+        example_splits.append(partition)
     else:
       # Use input splits.
-      for split in input_config.splits:
+      for split_name, patterns in split_patterns.items():
         examples = (
             pipeline
-            | 'InputToSerializedExample[{}]'.format(split.name) >>
+            | 'InputToSerializedExample[{}]'.format(split_name) >>
             _InputToSerializedExample(  # pylint: disable=no-value-for-parameter
-                input_to_example, input_dict, exec_properties, split.pattern))
+                input_to_example, input_dict, exec_properties, patterns,
+                sampling_rates.get(split_name, 1.0)))
         example_splits.append(examples)
 
     result = {}
@@ -223,16 +619,39 @@ class BaseExampleGenExecutor(
     """
     self._log_startup(input_dict, output_dict, exec_properties)
 
+    output_config = example_gen_pb2.Output()
+    json_format.Parse(exec_properties['output_config'], output_config)
+    _CheckFileFormats(output_config)
+
     absl.logging.info('Generating examples.')
     with self._make_beam_pipeline() as pipeline:
       example_splits = self.GenerateExamplesByBeam(pipeline, input_dict,
                                                    exec_properties)
 
+      output_examples = artifact_utils.get_single_instance(
+          output_dict['examples'])
       # pylint: disable=expression-not-assigned, no-value-for-parameter
       for split_name, example_split in example_splits.items():
+        additional_split_paths = {
+            file_format: examples_utils.get_format_split_uri(
+                output_examples, split_name, file_format)
+            for file_format in output_config.additional_file_formats
+        }
         (example_split
          | 'WriteSplit[{}]'.format(split_name) >> _WriteSplit(
-             artifact_utils.get_split_uri(output_dict['examples'], split_name)))
+             artifact_utils.get_split_uri(output_dict['examples'], split_name),
+             output_config, additional_split_paths))
       # pylint: enable=expression-not-assigned, no-value-for-parameter
 
+    for examples in output_dict['examples']:
+      examples_utils.set_file_format(examples, output_config.file_format)
+      if output_config.additional_file_formats:
+        examples_utils.set_additional_file_formats(
+            examples, list(output_config.additional_file_formats))
+      if output_config.sampling:
+        examples_utils.set_sampling_rates(
+            examples, {
+                sampling.split_name: sampling.rate
+                for sampling in output_config.sampling
+            })
     absl.logging.info('Examples generated.')
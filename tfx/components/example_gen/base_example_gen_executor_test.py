@@ -18,12 +18,19 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import bisect
+import hashlib
 import os
 import random
+import zlib
 import apache_beam as beam
+from apache_beam.testing import util
+import pyarrow as pa
+from pyarrow import parquet as pq
 import tensorflow as tf
 from google.protobuf import json_format
 from tfx.components.example_gen import base_example_gen_executor
+from tfx.components.util import examples_utils
 from tfx.proto import example_gen_pb2
 from tfx.types import artifact_utils
 from tfx.types import standard_artifacts
@@ -114,6 +121,35 @@ class BaseExampleGenExecutorTest(tf.test.TestCase):
         tf.io.gfile.GFile(self._train_output_file).size(),
         tf.io.gfile.GFile(self._eval_output_file).size())
 
+  def testDoInputSplitsWithSameName(self):
+    # Create exec proterties, with the eval patterns read in both splits.
+    exec_properties = {
+        'input_config':
+            json_format.MessageToJson(
+                example_gen_pb2.Input(splits=[
+                    example_gen_pb2.Input.Split(name='eval', pattern='eval/*'),
+                    example_gen_pb2.Input.Split(
+                        name='train', pattern='train/*'),
+                    example_gen_pb2.Input.Split(name='train', pattern='eval/*')
+                ]),
+                preserving_proto_field_name=True),
+        'output_config':
+            json_format.MessageToJson(
+                example_gen_pb2.Output(), preserving_proto_field_name=True)
+    }
+
+    # Run executor.
+    example_gen = TestExampleGenExecutor()
+    example_gen.Do({}, self._output_dict, exec_properties)
+
+    # Check example gen outputs.
+    self.assertTrue(tf.io.gfile.exists(self._train_output_file))
+    self.assertTrue(tf.io.gfile.exists(self._eval_output_file))
+    # Input train split is three times bigger than eval split.
+    self.assertGreater(
+        tf.io.gfile.GFile(self._train_output_file).size(),
+        2 * tf.io.gfile.GFile(self._eval_output_file).size())
+
   def testDoOutputSplit(self):
     # Create exec proterties.
     exec_properties = {
@@ -147,6 +183,373 @@ class BaseExampleGenExecutorTest(tf.test.TestCase):
         tf.io.gfile.GFile(self._train_output_file).size(),
         tf.io.gfile.GFile(self._eval_output_file).size())
 
+  def _read_examples(self, output_file):
+    return [
+        record.numpy() for record in tf.data.TFRecordDataset(
+            output_file, compression_type='GZIP')
+    ]
+
+  def testDoOutputSplitWithShuffleModes(self):
+    buckets = [2, 3]
+    for shuffle_mode in [
+        example_gen_pb2.Output.FULL_SHUFFLE,
+        example_gen_pb2.Output.LOCAL_SHUFFLE,
+        example_gen_pb2.Output.NO_SHUFFLE
+    ]:
+      exec_properties = {
+          'input_config':
+              json_format.MessageToJson(
+                  example_gen_pb2.Input(splits=[
+                      example_gen_pb2.Input.Split(
+                          name='single', pattern='single/*'),
+                  ]),
+                  preserving_proto_field_name=True),
+          'output_config':
+              json_format.MessageToJson(
+                  example_gen_pb2.Output(
+                      split_config=example_gen_pb2.SplitConfig(splits=[
+                          example_gen_pb2.SplitConfig.Split(
+                              name='train', hash_buckets=2),
+                          example_gen_pb2.SplitConfig.Split(
+                              name='eval', hash_buckets=1)
+                      ]),
+                      shuffle_mode=shuffle_mode))
+      }
+      examples = standard_artifacts.Examples()
+      examples.uri = os.path.join(self._output_dict['examples'][0].uri,
+                                  str(shuffle_mode))
+      examples.split_names = artifact_utils.encode_split_names(
+          ['train', 'eval'])
+
+      example_gen = TestExampleGenExecutor()
+      example_gen.Do({}, {'examples': [examples]}, exec_properties)
+
+      # Shuffling does not change the split of any example.
+      train_examples = self._read_examples(
+          os.path.join(examples.uri, 'train',
+                       'data_tfrecord-00000-of-00001.gz'))
+      eval_examples = self._read_examples(
+          os.path.join(examples.uri, 'eval',
+                       'data_tfrecord-00000-of-00001.gz'))
+      self.assertEqual(30000, len(train_examples) + len(eval_examples))
+      for split_index, examples in enumerate([train_examples, eval_examples]):
+        for example in examples:
+          self.assertEqual(
+              split_index,
+              base_example_gen_executor._PartitionFn(example, 2, buckets))
+
+  def testDoWithFileFormats(self):
+    for file_format, file_name in [
+        (example_gen_pb2.Output.FORMAT_TFRECORDS_GZIP,
+         'data_tfrecord-00001-of-00002.gz'),
+        (example_gen_pb2.Output.FORMAT_TFRECORDS_UNCOMPRESSED,
+         'data_tfrecord-00001-of-00002'),
+        (example_gen_pb2.Output.FORMAT_PARQUET_SNAPPY,
+         'data_parquet-00001-of-00002.parquet'),
+        (example_gen_pb2.Output.FORMAT_PARQUET_ZSTD,
+         'data_parquet-00001-of-00002.parquet'),
+    ]:
+      exec_properties = {
+          'input_config':
+              json_format.MessageToJson(
+                  example_gen_pb2.Input(splits=[
+                      example_gen_pb2.Input.Split(
+                          name='train', pattern='train/*'),
+                      example_gen_pb2.Input.Split(
+                          name='eval', pattern='eval/*')
+                  ]),
+                  preserving_proto_field_name=True),
+          'output_config':
+              json_format.MessageToJson(
+                  example_gen_pb2.Output(
+                      file_format=file_format, num_shards=2),
+                  preserving_proto_field_name=True)
+      }
+      examples = standard_artifacts.Examples()
+      examples.uri = os.path.join(self._output_dict['examples'][0].uri,
+                                  str(file_format))
+      examples.split_names = artifact_utils.encode_split_names(
+          ['train', 'eval'])
+
+      example_gen = TestExampleGenExecutor()
+      example_gen.Do({}, {'examples': [examples]}, exec_properties)
+
+      self.assertEqual(file_format, examples_utils.get_file_format(examples))
+      self.assertTrue(
+          tf.io.gfile.exists(os.path.join(examples.uri, 'eval', file_name)))
+      with beam.Pipeline() as pipeline:
+        eval_examples = (
+            pipeline
+            | examples_utils.ReadSerializedExamples(  # pylint: disable=no-value-for-parameter
+                os.path.join(examples.uri, 'eval', '*'), file_format)
+            | beam.Map(tf.train.Example.FromString)
+            | beam.combiners.Count.Globally())
+        util.assert_that(eval_examples, util.equal_to([10000]))
+
+  def testDoWithAdditionalFileFormats(self):
+    exec_properties = {
+        'input_config':
+            json_format.MessageToJson(
+                example_gen_pb2.Input(splits=[
+                    example_gen_pb2.Input.Split(
+                        name='train', pattern='train/*'),
+                    example_gen_pb2.Input.Split(name='eval', pattern='eval/*')
+                ]),
+                preserving_proto_field_name=True),
+        'output_config':
+            json_format.MessageToJson(
+                example_gen_pb2.Output(
+                    additional_file_formats=[
+                        example_gen_pb2.Output.FORMAT_PARQUET_SNAPPY,
+                        example_gen_pb2.Output.FORMAT_PARQUET_FEATURES_SNAPPY
+                    ],
+                    num_shards=2),
+                preserving_proto_field_name=True)
+    }
+    examples = self._output_dict['examples'][0]
+
+    example_gen = TestExampleGenExecutor()
+    example_gen.Do({}, self._output_dict, exec_properties)
+
+    self.assertEqual(example_gen_pb2.Output.FORMAT_TFRECORDS_GZIP,
+                     examples_utils.get_file_format(examples))
+    self.assertEqual([
+        example_gen_pb2.Output.FORMAT_PARQUET_SNAPPY,
+        example_gen_pb2.Output.FORMAT_PARQUET_FEATURES_SNAPPY
+    ], examples_utils.get_additional_file_formats(examples))
+    self.assertTrue(
+        tf.io.gfile.exists(
+            os.path.join(examples.uri, 'eval',
+                         'data_tfrecord-00001-of-00002.gz')))
+    parquet_split_uri = examples_utils.get_format_split_uri(
+        examples, 'eval', example_gen_pb2.Output.FORMAT_PARQUET_SNAPPY)
+    self.assertEqual(
+        os.path.join(examples.uri, 'format_parquet_snappy', 'eval'),
+        parquet_split_uri)
+    with beam.Pipeline() as pipeline:
+      eval_examples = (
+          pipeline
+          | examples_utils.ReadSerializedExamples(  # pylint: disable=no-value-for-parameter
+              os.path.join(parquet_split_uri, '*'),
+              example_gen_pb2.Output.FORMAT_PARQUET_SNAPPY)
+          | beam.combiners.Count.Globally())
+      util.assert_that(eval_examples, util.equal_to([10000]))
+
+    # Features of the eval examples are columns of lists of values.
+    features_split_uri = examples_utils.get_format_split_uri(
+        examples, 'eval', example_gen_pb2.Output.FORMAT_PARQUET_FEATURES_SNAPPY)
+    table = pa.concat_tables([
+        pq.read_table(os.path.join(features_split_uri, file_name))
+        for file_name in ['data_parquet-00000-of-00002.parquet',
+                          'data_parquet-00001-of-00002.parquet']
+    ])
+    self.assertEqual(10000, table.num_rows)
+    self.assertEqual(
+        pa.schema([('f', pa.list_(pa.float32())), ('i', pa.list_(pa.int64())),
+                   ('s', pa.list_(pa.binary()))]), table.schema)
+    # Features without values are empty lists, not nulls.
+    i_values = table.column('i').to_pylist()
+    self.assertNotIn(None, i_values)
+    self.assertLessEqual(
+        set(value for values in i_values for value in values),
+        set(range(10000)))
+
+  def testDoWithFeaturesFileFormat(self):
+    exec_properties = {
+        'input_config':
+            json_format.MessageToJson(
+                example_gen_pb2.Input(splits=[
+                    example_gen_pb2.Input.Split(
+                        name='train', pattern='train/*'),
+                    example_gen_pb2.Input.Split(name='eval', pattern='eval/*')
+                ]),
+                preserving_proto_field_name=True),
+        'output_config':
+            json_format.MessageToJson(
+                example_gen_pb2.Output(
+                    file_format=example_gen_pb2.Output
+                    .FORMAT_PARQUET_FEATURES_SNAPPY),
+                preserving_proto_field_name=True)
+    }
+
+    example_gen = TestExampleGenExecutor()
+    with self.assertRaisesRegexp(ValueError,
+                                 'only an additional file format'):
+      example_gen.Do({}, self._output_dict, exec_properties)
+
+  def testDoOutputSplitWithSampling(self):
+    exec_properties = {
+        'input_config':
+            json_format.MessageToJson(
+                example_gen_pb2.Input(splits=[
+                    example_gen_pb2.Input.Split(
+                        name='single', pattern='single/*'),
+                ]),
+                preserving_proto_field_name=True),
+        'output_config':
+            json_format.MessageToJson(
+                example_gen_pb2.Output(
+                    split_config=example_gen_pb2.SplitConfig(splits=[
+                        example_gen_pb2.SplitConfig.Split(
+                            name='train', hash_buckets=2),
+                        example_gen_pb2.SplitConfig.Split(
+                            name='eval', hash_buckets=1)
+                    ]),
+                    sampling=[
+                        example_gen_pb2.Output.Sampling(
+                            split_name='train', rate=0.1),
+                        example_gen_pb2.Output.Sampling(
+                            split_name='eval', rate=0.5)
+                    ]),
+                preserving_proto_field_name=True)
+    }
+
+    example_gen = TestExampleGenExecutor()
+    example_gen.Do({}, self._output_dict, exec_properties)
+
+    examples = self._output_dict['examples'][0]
+    self.assertEqual({
+        'train': 0.1,
+        'eval': 0.5
+    }, examples_utils.get_sampling_rates(examples))
+    # About 2000 of the 20000 train examples, and 5000 of the 10000 eval ones.
+    train_examples = self._read_examples(self._train_output_file)
+    self.assertBetween(len(train_examples), 1500, 2500)
+    eval_examples = self._read_examples(self._eval_output_file)
+    self.assertBetween(len(eval_examples), 4500, 5500)
+    for example in train_examples:
+      self.assertTrue(base_example_gen_executor._IsSampled(example, 0.1))
+    for example in eval_examples:
+      self.assertTrue(base_example_gen_executor._IsSampled(example, 0.5))
+
+  def testDoInputSplitWithSampling(self):
+    exec_properties = {
+        'input_config':
+            json_format.MessageToJson(
+                example_gen_pb2.Input(splits=[
+                    example_gen_pb2.Input.Split(
+                        name='train', pattern='train/*'),
+                    example_gen_pb2.Input.Split(name='eval', pattern='eval/*')
+                ]),
+                preserving_proto_field_name=True),
+        'output_config':
+            json_format.MessageToJson(
+                example_gen_pb2.Output(sampling=[
+                    example_gen_pb2.Output.Sampling(
+                        split_name='train', rate=0.1)
+                ]),
+                preserving_proto_field_name=True)
+    }
+
+    example_gen = TestExampleGenExecutor()
+    example_gen.Do({}, self._output_dict, exec_properties)
+
+    self.assertEqual({'train': 0.1},
+                     examples_utils.get_sampling_rates(
+                         self._output_dict['examples'][0]))
+    self.assertBetween(
+        len(self._read_examples(self._train_output_file)), 1500, 2500)
+    # Splits without sampling keep all their examples.
+    self.assertLen(self._read_examples(self._eval_output_file), 10000)
+
+  def testDoWithInvalidSampling(self):
+    for sampling, error in [
+        ([example_gen_pb2.Output.Sampling(split_name='test', rate=0.1)],
+         'not an output split'),
+        ([example_gen_pb2.Output.Sampling(split_name='train', rate=0.)],
+         'must be in'),
+        ([
+            example_gen_pb2.Output.Sampling(split_name='train', rate=0.1),
+            example_gen_pb2.Output.Sampling(split_name='train', rate=0.2)
+        ], 'sampled twice'),
+    ]:
+      exec_properties = {
+          'input_config':
+              json_format.MessageToJson(
+                  example_gen_pb2.Input(splits=[
+                      example_gen_pb2.Input.Split(
+                          name='train', pattern='train/*'),
+                      example_gen_pb2.Input.Split(
+                          name='eval', pattern='eval/*')
+                  ]),
+                  preserving_proto_field_name=True),
+          'output_config':
+              json_format.MessageToJson(
+                  example_gen_pb2.Output(sampling=sampling),
+                  preserving_proto_field_name=True)
+      }
+
+      example_gen = TestExampleGenExecutor()
+      with self.assertRaisesRegexp(ValueError, error):
+        example_gen.Do({}, self._output_dict, exec_properties)
+
+  def testIsSampledKeepsSamplesAtHigherRates(self):
+    records = [tf.compat.as_bytes('record_%d' % i) for i in range(10000)]
+    low_rate_samples = set(
+        r for r in records if base_example_gen_executor._IsSampled(r, 0.01))
+    high_rate_samples = set(
+        r for r in records if base_example_gen_executor._IsSampled(r, 0.2))
+    self.assertBetween(len(low_rate_samples), 50, 150)
+    self.assertBetween(len(high_rate_samples), 1800, 2200)
+    self.assertTrue(low_rate_samples.issubset(high_rate_samples))
+
+  def testPartitionFnHashFunctions(self):
+    buckets = [60, 70, 90]
+    for i in range(100):
+      record = tf.compat.as_bytes('record_%d' % i)
+      self.assertEqual(
+          bisect.bisect(buckets,
+                        int(hashlib.sha256(record).hexdigest(), 16) % 90),
+          base_example_gen_executor._PartitionFn(record, 3, buckets))
+      self.assertEqual(
+          bisect.bisect(buckets, zlib.crc32(record) % 90),
+          base_example_gen_executor._PartitionFn(
+              record, 3, buckets,
+              example_gen_pb2.SplitConfig(
+                  hash_function=example_gen_pb2.SplitConfig.CRC32)))
+
+  def testPartitionFnByFeature(self):
+    split_config = example_gen_pb2.SplitConfig(
+        partition_feature_name='user',
+        hash_function=example_gen_pb2.SplitConfig.CRC32)
+    partitions = set()
+    for i in range(100):
+      user_partitions = set()
+      for j in range(10):
+        example = tf.train.Example()
+        example.features.feature['user'].int64_list.value.append(i)
+        example.features.feature['event'].int64_list.value.append(j)
+        user_partitions.add(
+            base_example_gen_executor._PartitionFn(
+                example.SerializeToString(deterministic=True), 2, [2, 3],
+                split_config))
+      # Examples of a user are all in the same split.
+      self.assertEqual(1, len(user_partitions))
+      partitions.update(user_partitions)
+    self.assertEqual({0, 1}, partitions)
+
+  def testPartitionFnByMissingFeature(self):
+    split_config = example_gen_pb2.SplitConfig(partition_feature_name='user')
+    example = tf.train.Example()
+    example.features.feature['event'].int64_list.value.append(1)
+    with self.assertRaisesRegexp(RuntimeError, 'does not exist'):
+      base_example_gen_executor._PartitionFn(
+          example.SerializeToString(), 2, [2, 3], split_config)
+    example.features.feature['user'].float_list.value.append(1.)
+    with self.assertRaisesRegexp(RuntimeError, 'Only `bytes_list`'):
+      base_example_gen_executor._PartitionFn(
+          example.SerializeToString(), 2, [2, 3], split_config)
+
+  def testLocalShuffleFnKeepsAllExamples(self):
+    examples = [tf.compat.as_bytes(str(i)) for i in range(100)]
+    shuffle_fn = base_example_gen_executor._LocalShuffleFn(buffer_bytes=10)
+    shuffle_fn.start_bundle()
+    got = []
+    for example in examples:
+      got.extend(shuffle_fn.process(example))
+    got.extend(v.value for v in shuffle_fn.finish_bundle())
+    self.assertCountEqual(examples, got)
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -42,7 +42,9 @@ class BigQueryExampleGen(component._QueryBasedExampleGen):  # pylint: disable=pr
                input_config: Optional[example_gen_pb2.Input] = None,
                output_config: Optional[example_gen_pb2.Output] = None,
                example_artifacts: Optional[types.Channel] = None,
-               instance_name: Optional[Text] = None):
+               instance_name: Optional[Text] = None,
+               big_query_config: Optional[
+                   example_gen_pb2.BigQueryConfig] = None):
     """Constructs a BigQueryExampleGen component.
 
     Args:
@@ -62,6 +64,8 @@ class BigQueryExampleGen(component._QueryBasedExampleGen):  # pylint: disable=pr
         eval examples.
       instance_name: Optional unique instance name. Necessary if multiple
         BigQueryExampleGen components are declared in the same pipeline.
+      big_query_config: An optional example_gen_pb2.BigQueryConfig instance,
+        e.g., to read query results with the BigQuery Storage Read API.
 
     Raises:
       RuntimeError: Only one of query and input_config should be set.
@@ -69,8 +73,12 @@ class BigQueryExampleGen(component._QueryBasedExampleGen):  # pylint: disable=pr
     if bool(query) == bool(input_config):
       raise RuntimeError('Exactly one of query and input_config should be set.')
     input_config = input_config or utils.make_default_input_config(query)
+    custom_config = None
+    if big_query_config:
+      custom_config = utils.make_custom_config(big_query_config)
     super(BigQueryExampleGen, self).__init__(
         input_config=input_config,
         output_config=output_config,
+        custom_config=custom_config,
         example_artifacts=example_artifacts,
         instance_name=instance_name)
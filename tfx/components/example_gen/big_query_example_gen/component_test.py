@@ -19,6 +19,7 @@ from __future__ import division
 from __future__ import print_function
 
 import tensorflow as tf
+from google.protobuf import json_format
 from tfx.components.example_gen.big_query_example_gen import component
 from tfx.proto import example_gen_pb2
 from tfx.types import artifact_utils
@@ -69,6 +70,19 @@ class ComponentTest(tf.test.TestCase):
                      artifact_utils.decode_split_names(
                          artifact_collection[0].split_names))
 
+  def testConstructWithBigQueryConfig(self):
+    big_query_config = example_gen_pb2.BigQueryConfig(
+        use_storage_read_api=True, max_read_streams=4)
+    big_query_example_gen = component.BigQueryExampleGen(
+        query='query', big_query_config=big_query_config)
+
+    custom_config = example_gen_pb2.CustomConfig()
+    json_format.Parse(big_query_example_gen.exec_properties['custom_config'],
+                      custom_config)
+    unpacked_config = example_gen_pb2.BigQueryConfig()
+    custom_config.custom_config.Unpack(unpacked_config)
+    self.assertEqual(big_query_config, unpacked_config)
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -18,14 +18,28 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-from typing import Any, Dict, List, Text
+from typing import Any, Dict, Iterable, List, Optional, Text, Tuple
 
 import apache_beam as beam
+import pyarrow as pa
 import tensorflow as tf
 
 from google.cloud import bigquery
 from tfx import types
 from tfx.components.example_gen import base_example_gen_executor
+from tfx.components.example_gen import utils
+from tfx.proto import example_gen_pb2
+
+# Maximum number of BigQuery result rows converted together.
+_MAX_BATCH_SIZE = 1000
+
+# Arrow types of the values of BigQuery types converted to features.
+_ARROW_TYPES = {
+    'INTEGER': pa.int64(),
+    'BOOLEAN': pa.bool_(),
+    'FLOAT': pa.float64(),
+    'STRING': pa.string(),
+}
 
 
 class _BigQueryConverter(object):
@@ -39,6 +53,45 @@ class _BigQueryConverter(object):
     self._type_map = {}
     for field in results.schema:
       self._type_map[field.name] = field.field_type
+    # Example encoders by the columns of the rows they encode.
+    self._encoders = {}
+
+  def _GetEncoder(
+      self, columns: Iterable[Text]) -> Optional[utils.ExampleEncoder]:
+    """Returns the encoder of rows with given columns, None if unsupported."""
+    columns = tuple(columns)
+    if columns not in self._encoders:
+      arrow_types = [_ARROW_TYPES.get(self._type_map[c]) for c in columns]
+      self._encoders[columns] = None
+      if all(t is not None for t in arrow_types):
+        self._encoders[columns] = utils.make_example_encoder(
+            pa.schema(list(zip(columns, arrow_types))))
+    return self._encoders[columns]
+
+  def RowsToSerializedExamples(
+      self, instances: List[Dict[Text, Any]]) -> List[bytes]:
+    """Convert a batch of bigquery result rows to serialized tf examples.
+
+    Rows are converted column by column by an encoder built once per set of
+    columns, and give the same bytes as serializing deterministically the
+    result of RowToExample, which converts rows the encoder does not support.
+
+    Args:
+      instances: bigquery result rows.
+
+    Returns:
+      List of serialized tf examples, one for each row.
+    """
+    encoder = self._GetEncoder(instances[0]) if instances else None
+    if encoder is not None:
+      try:
+        return encoder.encode_batch(instances)
+      except ValueError:
+        pass
+    return [
+        self.RowToExample(instance).SerializeToString(deterministic=True)
+        for instance in instances
+    ]
 
   def RowToExample(self, instance: Dict[Text, Any]) -> tf.train.Example:
     """Convert bigquery result row to tf example."""
@@ -74,30 +127,109 @@ def _ReadFromBigQuery(  # pylint: disable=invalid-name
               beam.io.BigQuerySource(query=query, use_standard_sql=True)))
 
 
+class _StorageReadClient(object):
+  """Reads query results with the BigQuery Storage Read API."""
+
+  def __init__(self):
+    # Imported here as google-cloud-bigquery-storage is an optional dependency.
+    from google.cloud import bigquery_storage_v1  # pylint: disable=g-import-not-at-top
+    self._storage = bigquery_storage_v1
+    self._client = bigquery_storage_v1.BigQueryReadClient()
+
+  def CreateSession(self, query: Text,
+                    max_streams: int) -> Tuple[bytes, List[Text]]:
+    """Runs a query and creates a read session of its results.
+
+    Args:
+      query: BigQuery sql string.
+      max_streams: maximum number of streams, 0 to let BigQuery choose.
+
+    Returns:
+      Tuple of the serialized Arrow schema of the results, and the names of the
+      streams the results are read from.
+    """
+    query_job = bigquery.Client().query(query)
+    query_job.result()
+    # Results are read from the temporary table holding them.
+    table = query_job.destination
+    session = self._client.create_read_session(
+        'projects/{}'.format(table.project),
+        self._storage.types.ReadSession(
+            table='projects/{}/datasets/{}/tables/{}'.format(
+                table.project, table.dataset_id, table.table_id),
+            data_format=self._storage.enums.DataFormat.ARROW),
+        max_stream_count=max_streams)
+    return (session.arrow_schema.serialized_schema,
+            [stream.name for stream in session.streams])
+
+  def ReadStream(self, stream_name: Text) -> Iterable[bytes]:
+    """Yields the serialized Arrow record batches of a stream."""
+    for response in self._client.read_rows(stream_name):
+      yield response.arrow_record_batch.serialized_record_batch
+
+
+def _ReadStream(stream_name: Text,
+                serialized_schema: bytes) -> Iterable[pa.RecordBatch]:
+  """Yields the record batches of a stream of a read session."""
+  schema = pa.ipc.read_schema(pa.py_buffer(serialized_schema))
+  for serialized_record_batch in _StorageReadClient().ReadStream(stream_name):
+    yield pa.ipc.read_record_batch(
+        pa.py_buffer(serialized_record_batch), schema)
+
+
+@beam.ptransform_fn
+@beam.typehints.with_input_types(beam.Pipeline)
+@beam.typehints.with_output_types(pa.RecordBatch)
+def _ReadArrowFromBigQuery(  # pylint: disable=invalid-name
+    pipeline: beam.Pipeline, query: Text,
+    max_streams: int) -> beam.pvalue.PCollection:
+  """Reads query results as Arrow record batches with the Storage Read API."""
+  serialized_schema, stream_names = _StorageReadClient().CreateSession(
+      query, max_streams)
+  return (pipeline
+          | 'CreateStreams' >> beam.Create(stream_names)
+          # Distributes the streams to workers.
+          | 'ReshuffleStreams' >> beam.Reshuffle()
+          | 'ReadStreams' >> beam.FlatMap(_ReadStream, serialized_schema))
+
+
 @beam.ptransform_fn
 @beam.typehints.with_input_types(beam.Pipeline)
-@beam.typehints.with_output_types(tf.train.Example)
+@beam.typehints.with_output_types(bytes)
 def _BigQueryToExample(  # pylint: disable=invalid-name
     pipeline: beam.Pipeline,
     input_dict: Dict[Text, List[types.Artifact]],  # pylint: disable=unused-argument
-    exec_properties: Dict[Text, Any],  # pylint: disable=unused-argument
+    exec_properties: Dict[Text, Any],
     split_pattern: Text) -> beam.pvalue.PCollection:
-  """Read from BigQuery and transform to TF examples.
+  """Read from BigQuery and transform to serialized TF examples.
 
   Args:
     pipeline: beam pipeline.
     input_dict: Input dict from input key to a list of Artifacts.
     exec_properties: A dict of execution properties.
+      - custom_config: Optional JSON string of example_gen_pb2.CustomConfig
+        instance packing an example_gen_pb2.BigQueryConfig.
     split_pattern: Split.pattern in Input config, a BigQuery sql string.
 
   Returns:
-    PCollection of TF examples.
+    PCollection of serialized TF examples.
   """
+  big_query_config = utils.unpack_custom_config(
+      exec_properties, example_gen_pb2.BigQueryConfig())
+  if big_query_config.use_storage_read_api:
+    return (pipeline
+            | 'QueryTableWithStorageReadApi' >> _ReadArrowFromBigQuery(  # pylint: disable=no-value-for-parameter
+                split_pattern, big_query_config.max_read_streams)
+            | 'ToSerializedTFExample' >> beam.FlatMap(
+                utils.record_batch_to_serialized_examples))
+
   converter = _BigQueryConverter(split_pattern)
 
   return (pipeline
           | 'QueryTable' >> _ReadFromBigQuery(split_pattern)  # pylint: disable=no-value-for-parameter
-          | 'ToTFExample' >> beam.Map(converter.RowToExample))
+          | 'BatchRows' >> beam.BatchElements(max_batch_size=_MAX_BATCH_SIZE)
+          | 'ToSerializedTFExample' >> beam.FlatMap(
+              converter.RowsToSerializedExamples))
 
 
 class Executor(base_example_gen_executor.BaseExampleGenExecutor):
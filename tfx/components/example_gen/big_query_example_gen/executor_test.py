@@ -23,9 +23,11 @@ import random
 import apache_beam as beam
 from apache_beam.testing import util
 import mock
+import pyarrow as pa
 import tensorflow as tf
 from google.cloud import bigquery
 from google.protobuf import json_format
+from tfx.components.example_gen import utils
 from tfx.components.example_gen.big_query_example_gen import executor
 from tfx.proto import example_gen_pb2
 from tfx.types import artifact_utils
@@ -56,6 +58,38 @@ def _MockReadFromBigQuery2(pipeline, query):  # pylint: disable=invalid-name, un
   return pipeline | beam.Create(mock_query_results)
 
 
+class _StubStorageReadClient(object):
+  """Serves the rows of any query as Arrow record batches in two streams."""
+
+  SCHEMA = pa.schema([('i', pa.int64()), ('b', pa.bool_()),
+                      ('f', pa.float64()), ('s', pa.string())])
+  STREAMS = {
+      'stream0': [
+          pa.RecordBatch.from_arrays([
+              pa.array([1, None]),
+              pa.array([True, False]),
+              pa.array([2.0, None]),
+              pa.array(['abc', None])
+          ], SCHEMA.names)
+      ],
+      'stream1': [
+          pa.RecordBatch.from_arrays([
+              pa.array([3]),
+              pa.array([None], pa.bool_()),
+              pa.array([4.5]),
+              pa.array([''])
+          ], SCHEMA.names)
+      ],
+  }
+
+  def CreateSession(self, query, max_streams):  # pylint: disable=unused-argument
+    return self.SCHEMA.serialize().to_pybytes(), sorted(self.STREAMS)
+
+  def ReadStream(self, stream_name):
+    for record_batch in self.STREAMS[stream_name]:
+      yield record_batch.serialize().to_pybytes()
+
+
 class ExecutorTest(tf.test.TestCase):
 
   def setUp(self):
@@ -93,7 +127,66 @@ class ExecutorTest(tf.test.TestCase):
           bytes_list=tf.train.BytesList(value=[tf.compat.as_bytes('abc')]))
       example_proto = tf.train.Example(
           features=tf.train.Features(feature=feature))
-      util.assert_that(examples, util.equal_to([example_proto]))
+      util.assert_that(
+          examples,
+          util.equal_to([example_proto.SerializeToString(deterministic=True)]))
+
+  @mock.patch.object(executor, '_StorageReadClient', _StubStorageReadClient)
+  @mock.patch.object(bigquery, 'Client')
+  def testBigQueryToExampleWithStorageReadApi(self, mock_client):
+    exec_properties = {
+        'custom_config':
+            json_format.MessageToJson(
+                utils.make_custom_config(
+                    example_gen_pb2.BigQueryConfig(
+                        use_storage_read_api=True, max_read_streams=2)),
+                preserving_proto_field_name=True),
+    }
+    # Booleans are int64 features.
+    rows = [
+        {'i': 1, 'b': 1, 'f': 2.0, 's': 'abc'},
+        {'i': None, 'b': 0, 'f': None, 's': None},
+        {'i': 3, 'b': None, 'f': 4.5, 's': ''},
+    ]
+
+    with beam.Pipeline() as pipeline:
+      examples = (
+          pipeline | 'ToTFExample' >> executor._BigQueryToExample(
+              input_dict={},
+              exec_properties=exec_properties,
+              split_pattern='SELECT i, b, f, s FROM `fake`'))
+
+      util.assert_that(
+          examples,
+          util.equal_to([
+              utils.dict_to_example(row).SerializeToString(deterministic=True)
+              for row in rows
+          ]))
+
+    # The schema is taken from the read session, without a separate query.
+    mock_client.assert_not_called()
+
+  @mock.patch.object(bigquery, 'Client')
+  def testRowsToSerializedExamples(self, mock_client):
+    mock_client.return_value.query.return_value.result.return_value.schema = (
+        self._schema + [bigquery.SchemaField('d', 'DATE', mode='NULLABLE')])
+    converter = executor._BigQueryConverter('SELECT i, b, f, s, d FROM `fake`')
+    rows = [
+        {'i': 1, 'b': True, 'f': 2.0, 's': 'abc'},
+        {'i': None, 'b': False, 'f': None, 's': ''},
+    ]
+    self.assertEqual([
+        converter.RowToExample(row).SerializeToString(deterministic=True)
+        for row in rows
+    ], converter.RowsToSerializedExamples(rows))
+
+    # Rows with columns of unsupported types are converted row by row.
+    rows = [{'i': 1, 'd': None}]
+    self.assertEqual([
+        converter.RowToExample(rows[0]).SerializeToString(deterministic=True)
+    ], converter.RowsToSerializedExamples(rows))
+    with self.assertRaisesRegexp(RuntimeError, 'DATE is not supported'):
+      converter.RowsToSerializedExamples([{'i': 1, 'd': '2020-01-01'}])
 
   @mock.patch.multiple(
       executor,
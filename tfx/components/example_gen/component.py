@@ -184,7 +184,7 @@ class FileBasedExampleGen(base_component.BaseComponent):
       artifact.split_names = artifact_utils.encode_split_names(
           utils.generate_output_split_names(input_config, output_config))
       example_artifacts = channel_utils.as_channel([artifact])
-    spec = FileBasedExampleGenSpec(
+    spec = self._create_spec(
         input=input,
         input_config=input_config,
         output_config=output_config,
@@ -194,3 +194,7 @@ class FileBasedExampleGen(base_component.BaseComponent):
         spec=spec,
         custom_executor_spec=custom_executor_spec,
         instance_name=instance_name)
+
+  def _create_spec(self, **spec_args: Any) -> types.ComponentSpec:
+    """Returns the SPEC_CLASS instance, subclasses may add inputs to it."""
+    return self.SPEC_CLASS(**spec_args)
@@ -23,8 +23,10 @@ from typing import Any, Dict, Optional, Text, Union
 from tfx import types
 from tfx.components.base import executor_spec
 from tfx.components.example_gen import component
+from tfx.components.example_gen import utils
 from tfx.components.example_gen.csv_example_gen import executor
 from tfx.proto import example_gen_pb2
+from tfx.types.standard_component_specs import CsvExampleGenSpec
 
 
 class CsvExampleGen(component.FileBasedExampleGen):  # pylint: disable=protected-access
@@ -34,6 +36,7 @@ class CsvExampleGen(component.FileBasedExampleGen):  # pylint: disable=protected
   and eval examples for downsteam components.
   """
 
+  SPEC_CLASS = CsvExampleGenSpec
   EXECUTOR_SPEC = executor_spec.ExecutorClassSpec(executor.Executor)
 
   def __init__(
@@ -45,7 +48,9 @@ class CsvExampleGen(component.FileBasedExampleGen):  # pylint: disable=protected
                                                                  Any]]] = None,
       example_artifacts: Optional[types.Channel] = None,
       input_base: Optional[types.Channel] = None,
-      instance_name: Optional[Text] = None):
+      instance_name: Optional[Text] = None,
+      csv_config: Optional[example_gen_pb2.CsvConfig] = None,
+      schema: Optional[types.Channel] = None):
     """Construct a CsvExampleGen component.
 
     Args:
@@ -67,11 +72,24 @@ class CsvExampleGen(component.FileBasedExampleGen):  # pylint: disable=protected
       input_base: Backwards compatibility alias for the 'input' argument.
       instance_name: Optional unique instance name. Necessary if multiple
         CsvExampleGen components are declared in the same pipeline.
+      csv_config: An optional example_gen_pb2.CsvConfig instance, e.g., to infer
+        column types from a sample of the input instead of a full pass.
+      schema: An optional Channel of type `standard_artifacts.Schema`. If set,
+        column types are taken from the schema instead of being inferred.
     """
+    self._schema = schema
+    custom_config = None
+    if csv_config:
+      custom_config = utils.make_custom_config(csv_config)
     super(CsvExampleGen, self).__init__(
         input=input,
         input_config=input_config,
         output_config=output_config,
+        custom_config=custom_config,
         example_artifacts=example_artifacts,
         input_base=input_base,
         instance_name=instance_name)
+
+  def _create_spec(self, **spec_args: Any) -> types.ComponentSpec:
+    return super(CsvExampleGen, self)._create_spec(
+        schema=self._schema, **spec_args)
@@ -19,7 +19,9 @@ from __future__ import division
 from __future__ import print_function
 
 import tensorflow as tf
+from google.protobuf import json_format
 from tfx.components.example_gen.csv_example_gen import component
+from tfx.proto import example_gen_pb2
 from tfx.types import artifact_utils
 from tfx.types import channel_utils
 from tfx.types import standard_artifacts
@@ -39,6 +41,22 @@ class ComponentTest(tf.test.TestCase):
                      artifact_utils.decode_split_names(
                          artifact_collection[0].split_names))
 
+  def testConstructWithCsvConfigAndSchema(self):
+    input_base = standard_artifacts.ExternalArtifact()
+    schema = standard_artifacts.Schema()
+    csv_example_gen = component.CsvExampleGen(
+        input=channel_utils.as_channel([input_base]),
+        csv_config=example_gen_pb2.CsvConfig(type_inference_sample_size=100),
+        schema=channel_utils.as_channel([schema]))
+    self.assertEqual(standard_artifacts.Schema.TYPE_NAME,
+                     csv_example_gen.inputs['schema'].type_name)
+    custom_config = example_gen_pb2.CustomConfig()
+    json_format.Parse(csv_example_gen.exec_properties['custom_config'],
+                      custom_config)
+    csv_config = example_gen_pb2.CsvConfig()
+    custom_config.custom_config.Unpack(csv_config)
+    self.assertEqual(100, csv_config.type_inference_sample_size)
+
 
 if __name__ == '__main__':
   tf.test.main()
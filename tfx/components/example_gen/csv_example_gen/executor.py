@@ -18,83 +18,185 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import itertools
 import os
 from typing import Any, Dict, Iterable, List, Text
 
 import absl
 import apache_beam as beam
+import pyarrow as pa
 import tensorflow as tf
 from tfx_bsl.coders import csv_decoder
 
+from tensorflow_metadata.proto.v0 import schema_pb2
 from tfx import types
+from tfx.components.example_gen import utils
 from tfx.components.example_gen.base_example_gen_executor import BaseExampleGenExecutor
 from tfx.components.example_gen.base_example_gen_executor import INPUT_KEY
+from tfx.proto import example_gen_pb2
 from tfx.types import artifact_utils
 from tfx.utils import io_utils
 
+# Key for the optional schema in input_dict.
+SCHEMA_KEY = 'schema'
 
-@beam.typehints.with_input_types(List[csv_decoder.CSVCell],
-                                 List[csv_decoder.ColumnInfo])
-@beam.typehints.with_output_types(tf.train.Example)
-class _ParsedCsvToTfExample(beam.DoFn):
-  """A beam.DoFn to convert a parsed CSV line to a tf.Example."""
-
-  def __init__(self):
-    self._column_handlers = None
-
-  def _process_column_infos(self, column_infos: List[csv_decoder.ColumnInfo]):
-    column_handlers = []
-    for column_info in column_infos:
-      # pylint: disable=g-long-lambda
-      if column_info.type == csv_decoder.ColumnType.INT:
-        handler_fn = lambda csv_cell: tf.train.Feature(
-            int64_list=tf.train.Int64List(value=[int(csv_cell)]))
-      elif column_info.type == csv_decoder.ColumnType.FLOAT:
-        handler_fn = lambda csv_cell: tf.train.Feature(
-            float_list=tf.train.FloatList(value=[float(csv_cell)]))
-      elif column_info.type == csv_decoder.ColumnType.STRING:
-        handler_fn = lambda csv_cell: tf.train.Feature(
-            bytes_list=tf.train.BytesList(value=[csv_cell]))
-      else:
-        handler_fn = None
-      column_handlers.append((column_info.name, handler_fn))
-
-    self._column_handlers = column_handlers
-
-  def process(
-      self, csv_cells: List[csv_decoder.CSVCell],
-      column_infos: List[csv_decoder.ColumnInfo]) -> Iterable[tf.train.Example]:
-    if not self._column_handlers:
-      self._process_column_infos(column_infos)
-
-    # skip blank lines.
-    if not csv_cells:
-      return
-
-    if len(csv_cells) != len(self._column_handlers):
+
+# Maximum number of CSV lines converted together.
+_MAX_BATCH_SIZE = 1000
+
+_ARROW_TYPES = {
+    csv_decoder.ColumnType.INT: pa.int64(),
+    csv_decoder.ColumnType.FLOAT: pa.float64(),
+    csv_decoder.ColumnType.STRING: pa.binary(),
+}
+_CELL_PARSERS = {
+    csv_decoder.ColumnType.INT: int,
+    csv_decoder.ColumnType.FLOAT: float,
+    csv_decoder.ColumnType.STRING: lambda csv_cell: csv_cell,
+}
+_SCHEMA_COLUMN_TYPES = {
+    schema_pb2.INT: csv_decoder.ColumnType.INT,
+    schema_pb2.FLOAT: csv_decoder.ColumnType.FLOAT,
+    schema_pb2.BYTES: csv_decoder.ColumnType.STRING,
+}
+
+
+def _column_infos_from_schema(
+    column_names: List[Text],
+    schema: schema_pb2.Schema) -> List[csv_decoder.ColumnInfo]:
+  """Returns the types of the columns as given by the features of a schema.
+
+  Args:
+    column_names: names of the CSV columns.
+    schema: a schema with an INT, FLOAT or BYTES feature for each column.
+
+  Returns:
+    A ColumnInfo for each column.
+
+  Raises:
+    RuntimeError: if a column has no feature of a supported type in the schema.
+  """
+  feature_types = dict(
+      (feature.name, feature.type) for feature in schema.feature)
+  column_infos = []
+  for column_name in column_names:
+    column_type = _SCHEMA_COLUMN_TYPES.get(feature_types.get(column_name))
+    if column_type is None:
+      raise RuntimeError(
+          'Column {} has no INT, FLOAT or BYTES feature in the schema.'.format(
+              column_name))
+    column_infos.append(csv_decoder.ColumnInfo(column_name, column_type))
+  return column_infos
+
+
+def _infer_column_infos_from_sample(
+    csv_files: List[Text], column_names: List[Text],
+    sample_size: int) -> List[csv_decoder.ColumnInfo]:
+  """Infers the types of the columns from the first lines of CSV files.
+
+  Lines are read and parsed as in the pipeline, by ReadFromText and
+  ParseCSVLine, so that the sample is split into cells the same way as the
+  data converted with the inferred types.
+
+  Args:
+    csv_files: CSV files with a header line, read in order.
+    column_names: names of the CSV columns.
+    sample_size: maximum number of lines read, header lines excluded.
+
+  Returns:
+    A ColumnInfo for each column, inferred the same way as from a full pass.
+  """
+  inferrer = csv_decoder.ColumnTypeInferrer(
+      column_names, skip_blank_lines=True)
+  accumulator = inferrer.create_accumulator()
+  line_parser = csv_decoder.ParseCSVLine(delimiter=',')
+  line_parser.start_bundle()
+  num_lines = 0
+  for csv_file in csv_files:
+    with tf.io.gfile.GFile(csv_file, 'r') as f:
+      # Skips the header line.
+      for csv_line in itertools.islice(f, 1, 1 + sample_size - num_lines):
+        # ReadFromText strips the line separator.
+        for csv_cells in line_parser.process(csv_line.rstrip('\r\n')):
+          accumulator = inferrer.add_input(accumulator, csv_cells)
+        num_lines += 1
+    if num_lines >= sample_size:
+      break
+  absl.logging.info('Inferred column types from {} lines.'.format(num_lines))
+  return inferrer.extract_output(accumulator)
+
+
+def _parsed_csv_lines_to_record_batch(
+    csv_lines: List[List[csv_decoder.CSVCell]],
+    column_infos: List[csv_decoder.ColumnInfo]) -> pa.RecordBatch:
+  """Converts parsed CSV lines to a RecordBatch, one column at a time.
+
+  Args:
+    csv_lines: parsed CSV lines, blank lines are skipped.
+    column_infos: names and inferred types of the columns.
+
+  Returns:
+    A RecordBatch with a column for each CSV column. Empty cells are nulls.
+
+  Raises:
+    ValueError: if a line does not have a cell for each column, or a cell is not
+      a value of the type of its column.
+  """
+  csv_lines = [csv_cells for csv_cells in csv_lines if csv_cells]
+  for csv_cells in csv_lines:
+    if len(csv_cells) != len(column_infos):
       raise ValueError('Invalid CSV line: {}'.format(csv_cells))
 
-    feature = {}
-    for csv_cell, (column_name, handler_fn) in zip(csv_cells,
-                                                   self._column_handlers):
-      if not csv_cell:
-        feature[column_name] = tf.train.Feature()
-        continue
-      if not handler_fn:
-        raise ValueError(
-            'Internal error: failed to infer type of column {} while it'
-            'had at least some values {}'.format(column_name, csv_cell))
-      feature[column_name] = handler_fn(csv_cell)
-    yield tf.train.Example(features=tf.train.Features(feature=feature))
+  arrays = []
+  for index, column_info in enumerate(column_infos):
+    csv_cells = [csv_line[index] for csv_line in csv_lines]
+    parse_fn = _CELL_PARSERS.get(column_info.type)
+    if not parse_fn:
+      for csv_cell in csv_cells:
+        if csv_cell:
+          raise ValueError(
+              'Failed to infer type of column {} while it had at least some '
+              'values {}. If column types are inferred from a sample, increase '
+              'the sample size or provide a schema.'.format(
+                  column_info.name, csv_cell))
+      arrays.append(pa.array([None] * len(csv_cells), type=pa.null()))
+      continue
+    try:
+      values = [parse_fn(csv_cell) if csv_cell else None
+                for csv_cell in csv_cells]
+    except ValueError as e:
+      raise ValueError('Invalid value in column {} of type {}: {}'.format(
+          column_info.name, column_info.type, e))
+    arrays.append(pa.array(values, type=_ARROW_TYPES[column_info.type]))
+  return pa.RecordBatch.from_arrays(
+      arrays, [column_info.name for column_info in column_infos])
+
+
+@beam.typehints.with_input_types(List[List[csv_decoder.CSVCell]],
+                                 List[csv_decoder.ColumnInfo])
+@beam.typehints.with_output_types(bytes)
+class _ParsedCsvLinesToSerializedExamples(beam.DoFn):
+  """A beam.DoFn to convert batches of parsed CSV lines to serialized examples.
+
+  Lines are converted column by column through an Arrow RecordBatch, and give
+  the same bytes as serializing deterministically a tf.Example built per line.
+  """
+
+  def process(self, csv_lines: List[List[csv_decoder.CSVCell]],
+              column_infos: List[csv_decoder.ColumnInfo]) -> Iterable[bytes]:
+    record_batch = _parsed_csv_lines_to_record_batch(csv_lines, column_infos)
+    for serialized_example in utils.record_batch_to_serialized_examples(
+        record_batch):
+      yield serialized_example
 
 
 @beam.ptransform_fn
 @beam.typehints.with_input_types(beam.Pipeline)
-@beam.typehints.with_output_types(tf.train.Example)
+@beam.typehints.with_output_types(bytes)
 def _CsvToExample(  # pylint: disable=invalid-name
     pipeline: beam.Pipeline,
     input_dict: Dict[Text, List[types.Artifact]],
-    exec_properties: Dict[Text, Any],  # pylint: disable=unused-argument
+    exec_properties: Dict[Text, Any],
     split_pattern: Text) -> beam.pvalue.PCollection:
   """Read CSV files and transform to TF examples.
 
@@ -105,15 +207,19 @@ def _CsvToExample(  # pylint: disable=invalid-name
     input_dict: Input dict from input key to a list of Artifacts.
       - input_base: input dir that contains csv data. csv files must have header
         line.
+      - schema: optional schema giving the types of the columns. If unset,
+        column types are inferred from the data.
     exec_properties: A dict of execution properties.
+      - custom_config: optional CustomConfig packing a CsvConfig.
     split_pattern: Split.pattern in Input config, glob relative file pattern
       that maps to input files with root directory given by input_base.
 
   Returns:
-    PCollection of TF examples.
+    PCollection of serialized TF examples.
 
   Raises:
-    RuntimeError: if split is empty or csv headers are not equal.
+    RuntimeError: if split is empty, csv headers are not equal or the schema
+      misses a column.
   """
   input_base_uri = artifact_utils.get_single_uri(input_dict[INPUT_KEY])
   csv_pattern = os.path.join(input_base_uri, split_pattern)
@@ -126,8 +232,8 @@ def _CsvToExample(  # pylint: disable=invalid-name
         'Split pattern {} does not match any files.'.format(csv_pattern))
 
   column_names = io_utils.load_csv_column_names(csv_files[0])
-  for csv_files in csv_files[1:]:
-    if io_utils.load_csv_column_names(csv_files) != column_names:
+  for csv_file in csv_files[1:]:
+    if io_utils.load_csv_column_names(csv_file) != column_names:
       raise RuntimeError(
           'Files in same split {} have different header.'.format(csv_pattern))
 
@@ -136,13 +242,30 @@ def _CsvToExample(  # pylint: disable=invalid-name
       | 'ReadFromText' >> beam.io.ReadFromText(
           file_pattern=csv_pattern, skip_header_lines=1)
       | 'ParseCSVLine' >> beam.ParDo(csv_decoder.ParseCSVLine(delimiter=',')))
-  column_infos = beam.pvalue.AsSingleton(
-      parsed_csv_lines
-      | 'InferColumnTypes' >> beam.CombineGlobally(
-          csv_decoder.ColumnTypeInferrer(column_names, skip_blank_lines=True)))
+  csv_config = utils.unpack_custom_config(exec_properties,
+                                          example_gen_pb2.CsvConfig())
+  # Column types known before reading the data let the conversion stream,
+  # without waiting for a global combine over the split.
+  if input_dict.get(SCHEMA_KEY):
+    schema = io_utils.SchemaReader().read(
+        io_utils.get_only_uri_in_dir(
+            artifact_utils.get_single_uri(input_dict[SCHEMA_KEY])))
+    column_infos = _column_infos_from_schema(column_names, schema)
+  elif csv_config.type_inference_sample_size > 0:
+    column_infos = _infer_column_infos_from_sample(
+        sorted(csv_files), column_names, csv_config.type_inference_sample_size)
+  else:
+    column_infos = beam.pvalue.AsSingleton(
+        parsed_csv_lines
+        | 'InferColumnTypes' >> beam.CombineGlobally(
+            csv_decoder.ColumnTypeInferrer(
+                column_names, skip_blank_lines=True)))
 
   return (parsed_csv_lines
-          | 'ToTFExample' >> beam.ParDo(_ParsedCsvToTfExample(), column_infos))
+          | 'BatchCSVLines' >> beam.BatchElements(
+              max_batch_size=_MAX_BATCH_SIZE)
+          | 'ToSerializedTFExample' >> beam.ParDo(
+              _ParsedCsvLinesToSerializedExamples(), column_infos))
 
 
 class Executor(BaseExampleGenExecutor):
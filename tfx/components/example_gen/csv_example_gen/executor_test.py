@@ -22,12 +22,16 @@ import os
 import apache_beam as beam
 from apache_beam.testing import util
 import tensorflow as tf
+from tfx_bsl.coders import csv_decoder
+
 from google.protobuf import json_format
+from tensorflow_metadata.proto.v0 import schema_pb2
 from tfx.components.example_gen.base_example_gen_executor import INPUT_KEY
 from tfx.components.example_gen.csv_example_gen import executor
 from tfx.proto import example_gen_pb2
 from tfx.types import artifact_utils
 from tfx.types import standard_artifacts
+from tfx.utils import io_utils
 
 
 class ExecutorTest(tf.test.TestCase):
@@ -55,10 +59,170 @@ class ExecutorTest(tf.test.TestCase):
         # We use Python assertion here to avoid Beam serialization error in
         # pickling tf.test.TestCase.
         assert (15000 == len(got)), 'Unexpected example count'
-        assert (18 == len(got[0].features.feature)), 'Example not match'
+        example = tf.train.Example.FromString(got[0])
+        assert (18 == len(example.features.feature)), 'Example not match'
 
       util.assert_that(examples, check_result)
 
+  def testCsvToExampleWithSchema(self):
+    int_columns = [
+        'pickup_community_area', 'trip_start_month', 'trip_start_hour',
+        'trip_start_day', 'trip_start_timestamp', 'pickup_census_tract'
+    ]
+    string_columns = ['payment_type', 'company']
+    schema = schema_pb2.Schema()
+    for column_name in io_utils.load_csv_column_names(
+        os.path.join(self._input_dict[INPUT_KEY][0].uri, 'csv', 'data.csv')):
+      feature = schema.feature.add(name=column_name, type=schema_pb2.FLOAT)
+      if column_name in int_columns:
+        feature.type = schema_pb2.INT
+      elif column_name in string_columns:
+        feature.type = schema_pb2.BYTES
+    schema_artifact = standard_artifacts.Schema()
+    schema_artifact.uri = os.path.join(self.get_temp_dir(), 'schema')
+    io_utils.write_pbtxt_file(
+        os.path.join(schema_artifact.uri, 'schema.pbtxt'), schema)
+    input_dict = dict(self._input_dict)
+    input_dict[executor.SCHEMA_KEY] = [schema_artifact]
+
+    with beam.Pipeline() as pipeline:
+      examples = (
+          pipeline
+          | 'ToTFExample' >> executor._CsvToExample(
+              input_dict=input_dict,
+              exec_properties={},
+              split_pattern='csv/*'))
+
+      def check_result(got):
+        assert (15000 == len(got)), 'Unexpected example count'
+        for serialized_example in got:
+          feature = tf.train.Example.FromString(
+              serialized_example).features.feature
+          # Only one line has a census tract.
+          if feature['pickup_census_tract'].HasField('int64_list'):
+            return
+        raise AssertionError('Census tract is not an int64 feature')
+
+      util.assert_that(examples, check_result)
+
+  def testCsvToExampleWithSampledColumnTypes(self):
+    input_base = standard_artifacts.ExternalArtifact()
+    input_base.uri = self.get_temp_dir()
+    io_utils.write_string_file(
+        os.path.join(input_base.uri, 'sample', 'data.csv'),
+        'int_feature,float_feature,string_feature\n'
+        '1,0.5,a\n'
+        '2,1,b\n')
+    custom_config = example_gen_pb2.CustomConfig()
+    custom_config.custom_config.Pack(
+        example_gen_pb2.CsvConfig(type_inference_sample_size=1))
+    exec_properties = {
+        'custom_config': json_format.MessageToJson(custom_config)
+    }
+
+    with beam.Pipeline() as pipeline:
+      examples = (
+          pipeline
+          | 'ToTFExample' >> executor._CsvToExample(
+              input_dict={INPUT_KEY: [input_base]},
+              exec_properties=exec_properties,
+              split_pattern='sample/*'))
+
+      def check_result(got):
+        expected = []
+        for int_value, float_value, string_value in [(1, 0.5, b'a'),
+                                                     (2, 1., b'b')]:
+          example = tf.train.Example()
+          feature = example.features.feature
+          feature['int_feature'].int64_list.value.append(int_value)
+          feature['float_feature'].float_list.value.append(float_value)
+          feature['string_feature'].bytes_list.value.append(string_value)
+          expected.append(example.SerializeToString(deterministic=True))
+        assert sorted(expected) == sorted(got), 'Unexpected examples'
+
+      util.assert_that(examples, check_result)
+
+  def testInferColumnTypesFromSample(self):
+    csv_files = []
+    for i, content in enumerate(['a,b,c\n1,x,\n', 'a,b,c\n2,y,\n3,z,1.5\n']):
+      csv_files.append(os.path.join(self.get_temp_dir(), 'data%d.csv' % i))
+      io_utils.write_string_file(csv_files[-1], content)
+
+    column_infos = executor._infer_column_infos_from_sample(
+        csv_files, ['a', 'b', 'c'], sample_size=2)
+    self.assertEqual([
+        csv_decoder.ColumnType.INT, csv_decoder.ColumnType.STRING,
+        csv_decoder.ColumnType.UNKNOWN
+    ], [column_info.type for column_info in column_infos])
+
+    column_infos = executor._infer_column_infos_from_sample(
+        csv_files, ['a', 'b', 'c'], sample_size=10)
+    self.assertEqual(csv_decoder.ColumnType.FLOAT, column_infos[2].type)
+
+  def testInferColumnTypesFromSampleParsesLinesAsPipeline(self):
+    csv_file = os.path.join(self.get_temp_dir(), 'data.csv')
+    io_utils.write_string_file(csv_file, 'a,b,c\r\n"4","x,y",\r\n')
+
+    column_infos = executor._infer_column_infos_from_sample(
+        [csv_file], ['a', 'b', 'c'], sample_size=10)
+    self.assertEqual([
+        csv_decoder.ColumnType.INT, csv_decoder.ColumnType.STRING,
+        csv_decoder.ColumnType.UNKNOWN
+    ], [column_info.type for column_info in column_infos])
+
+  def testValueOfTypeWiderThanSampledType(self):
+    column_infos = [csv_decoder.ColumnInfo('a', csv_decoder.ColumnType.INT)]
+    with self.assertRaisesRegexp(ValueError, 'column a'):
+      list(executor._ParsedCsvLinesToSerializedExamples().process(
+          [[b'1'], [b'1.5']], column_infos))
+
+  def testSerializedExamplesMatchPerLineConversion(self):
+    column_infos = [
+        csv_decoder.ColumnInfo('int_feature', csv_decoder.ColumnType.INT),
+        csv_decoder.ColumnInfo('float_feature', csv_decoder.ColumnType.FLOAT),
+        csv_decoder.ColumnInfo('a_string', csv_decoder.ColumnType.STRING),
+        csv_decoder.ColumnInfo('empty', csv_decoder.ColumnType.UNKNOWN),
+    ]
+    csv_lines = [
+        [b'1', b'0.3', b'abc', b''],
+        [],
+        [b'-12', b'', b'', b''],
+        [b'', b'1e40', b'x y', b''],
+    ]
+
+    got = list(executor._ParsedCsvLinesToSerializedExamples().process(
+        csv_lines, column_infos))
+
+    expected = []
+    for csv_cells in [csv_lines[0], csv_lines[2], csv_lines[3]]:
+      int_cell, float_cell, string_cell, _ = csv_cells
+      example = tf.train.Example()
+      feature = example.features.feature
+      feature['empty'].SetInParent()
+      if int_cell:
+        feature['int_feature'].int64_list.value.append(int(int_cell))
+      else:
+        feature['int_feature'].SetInParent()
+      if float_cell:
+        feature['float_feature'].float_list.value.append(float(float_cell))
+      else:
+        feature['float_feature'].SetInParent()
+      if string_cell:
+        feature['a_string'].bytes_list.value.append(string_cell)
+      else:
+        feature['a_string'].SetInParent()
+      expected.append(example.SerializeToString(deterministic=True))
+    self.assertEqual(expected, got)
+
+  def testInvalidCsvLine(self):
+    column_infos = [
+        csv_decoder.ColumnInfo('a', csv_decoder.ColumnType.INT),
+        csv_decoder.ColumnInfo('b', csv_decoder.ColumnType.INT),
+    ]
+    with self.assertRaises(ValueError):
+      list(executor._ParsedCsvLinesToSerializedExamples().process(
+          [[b'1']], column_infos))
+
   def testDo(self):
     output_data_dir = os.path.join(
         os.environ.get('TEST_UNDECLARED_OUTPUTS_DIR', self.get_temp_dir()),
@@ -18,31 +18,159 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import json
 import os
-from typing import Any, Dict, List, Text
+from typing import Any, Dict, Iterable, List, Optional, Text
 
 import absl
 import apache_beam as beam
-import tensorflow as tf
+from apache_beam.io import fileio
+from apache_beam.io import filesystem
+from apache_beam.io import filesystems
+import fastavro
+import pyarrow as pa
 
 from tfx import types
+from tfx.components.example_gen import utils
 from tfx.components.example_gen.base_example_gen_executor import BaseExampleGenExecutor
 from tfx.components.example_gen.base_example_gen_executor import INPUT_KEY
 from tfx.components.example_gen.utils import dict_to_example
 from tfx.types import artifact_utils
 
+# Maximum number of Avro records converted together.
+_MAX_BATCH_SIZE = 1000
+
+# Arrow types of the values of Avro types converted to features.
+_ARROW_TYPES = {
+    'null': pa.null(),
+    'boolean': pa.bool_(),
+    'int': pa.int64(),
+    'long': pa.int64(),
+    'float': pa.float64(),
+    'double': pa.float64(),
+    'bytes': pa.binary(),
+    'fixed': pa.binary(),
+    'string': pa.string(),
+    'enum': pa.string(),
+}
+
+
+def _ToArrowType(avro_type: Any) -> Optional[pa.DataType]:
+  """Returns the Arrow type of the values of an Avro field type.
+
+  Args:
+    avro_type: type of a field in an Avro schema, e.g., 'long',
+      ['null', 'string'] or {'type': 'array', 'items': 'float'}.
+
+  Returns:
+    Arrow type of the values, or None if the type is not converted column by
+    column, e.g., records, maps, logical types or unions of several types.
+  """
+  if isinstance(avro_type, list):
+    # Nullable fields are unions of null with one type.
+    non_null_types = [t for t in avro_type if t != 'null']
+    if len(non_null_types) > 1:
+      return None
+    avro_type = non_null_types[0] if non_null_types else 'null'
+  if isinstance(avro_type, dict):
+    if 'logicalType' in avro_type:
+      return None
+    if avro_type['type'] == 'array':
+      items = avro_type['items']
+      value_type = None if isinstance(items, list) else _ToArrowType(items)
+      if value_type is None or pa.types.is_null(value_type):
+        return None
+      return pa.list_(value_type)
+    avro_type = avro_type['type']
+  return _ARROW_TYPES.get(avro_type)
+
+
+def _CompileArrowSchema(
+    avro_schema: Optional[Dict[Text, Any]]) -> Optional[pa.Schema]:
+  """Returns the Arrow schema records of an Avro schema are converted with.
+
+  Args:
+    avro_schema: Avro schema of a record, or None.
+
+  Returns:
+    Arrow schema with a field per record field, or None if the record is not
+    converted column by column.
+  """
+  if not avro_schema or avro_schema.get('type') != 'record':
+    return None
+  arrow_fields = []
+  for field in avro_schema['fields']:
+    arrow_type = _ToArrowType(field['type'])
+    if arrow_type is None:
+      return None
+    arrow_fields.append(pa.field(field['name'], arrow_type))
+  return pa.schema(arrow_fields)
+
+
+def _ReadAvroSchema(file_metadata: filesystem.FileMetadata) -> Text:
+  """Returns the JSON writer schema of an Avro file."""
+  with filesystems.FileSystems.open(
+      file_metadata.path,
+      compression_type=filesystem.CompressionTypes.UNCOMPRESSED) as avro_file:
+    return json.dumps(fastavro.reader(avro_file).writer_schema, sort_keys=True)
+
+
+class _AvroRecordsToSerializedExamples(beam.DoFn):
+  """A beam.DoFn to convert batches of Avro records to serialized examples.
+
+  Each writer schema of the input files is compiled into the plan of an
+  ExampleEncoder, which gives the same bytes as serializing deterministically
+  the tf.Example of dict_to_example. A batch is encoded by the first plan its
+  records and their values match, and otherwise, e.g. when it mixes records
+  of files with different schemas, record by record with dict_to_example.
+  """
+
+  def __init__(self):
+    super(_AvroRecordsToSerializedExamples, self).__init__()
+    # Encoders by JSON writer schema, None if not converted column by column.
+    self._encoders = {}  # type: Dict[Text, Optional[utils.ExampleEncoder]]
+
+  def _GetEncoder(self, avro_schema: Text) -> Optional[utils.ExampleEncoder]:
+    if avro_schema not in self._encoders:
+      arrow_schema = _CompileArrowSchema(json.loads(avro_schema))
+      self._encoders[avro_schema] = (
+          utils.make_example_encoder(arrow_schema) if arrow_schema else None)
+    return self._encoders[avro_schema]
+
+  def process(self, records: List[Dict[Text, Any]],
+              avro_schemas: List[Text]) -> Iterable[bytes]:
+    serialized_examples = None
+    for avro_schema in sorted(avro_schemas):
+      encoder = self._GetEncoder(avro_schema)
+      if encoder is None:
+        continue
+      try:
+        serialized_examples = encoder.encode_batch(records)
+        break
+      except ValueError:
+        pass
+    if serialized_examples is None:
+      serialized_examples = [
+          dict_to_example(record).SerializeToString(deterministic=True)
+          for record in records
+      ]
+    for serialized_example in serialized_examples:
+      yield serialized_example
+
 
 @beam.ptransform_fn
 @beam.typehints.with_input_types(beam.Pipeline)
-@beam.typehints.with_output_types(tf.train.Example)
+@beam.typehints.with_output_types(bytes)
 def _AvroToExample(  # pylint: disable=invalid-name
     pipeline: beam.Pipeline,
     input_dict: Dict[Text, List[types.Artifact]],
     exec_properties: Dict[Text, Any],  # pylint: disable=unused-argument
     split_pattern: Text) -> beam.pvalue.PCollection:
-  """Read Avro files and transform to TF examples.
+  """Read Avro files and transform to serialized TF examples.
 
   Note that each input split will be transformed by this function separately.
+  Records are converted in batches, according to the writer schemas of the
+  input files.
 
   Args:
     pipeline: beam pipeline.
@@ -53,16 +181,26 @@ def _AvroToExample(  # pylint: disable=invalid-name
       that maps to input files with root directory given by input_base.
 
   Returns:
-    PCollection of TF examples.
+    PCollection of serialized TF examples.
   """
   input_base_uri = artifact_utils.get_single_uri(input_dict[INPUT_KEY])
   avro_pattern = os.path.join(input_base_uri, split_pattern)
   absl.logging.info(
       'Processing input avro data {} to TFExample.'.format(avro_pattern))
 
+  avro_schemas = (
+      pipeline
+      | 'MatchAvroFiles' >> fileio.MatchFiles(avro_pattern)
+      | 'ReadAvroSchemas' >> beam.Map(_ReadAvroSchema)
+      | 'DistinctAvroSchemas' >> beam.Distinct())
+
   return (pipeline
           | 'ReadFromAvro' >> beam.io.ReadFromAvro(avro_pattern)
-          | 'ToTFExample' >> beam.Map(dict_to_example))
+          | 'BatchAvroRecords' >> beam.BatchElements(
+              max_batch_size=_MAX_BATCH_SIZE)
+          | 'ToSerializedTFExample' >> beam.ParDo(
+              _AvroRecordsToSerializedExamples(),
+              beam.pvalue.AsList(avro_schemas)))
 
 
 class Executor(BaseExampleGenExecutor):
@@ -78,7 +216,10 @@ class Executor(BaseExampleGenExecutor):
       Single value will be converted to a list of that single value.
       Missing value will be converted to empty tf.train.Feature().
 
-    For details, check the dict_to_example function in example_gen.utils.
+    Records are converted in batches by an ExampleEncoder, see
+    make_example_encoder in example_gen.utils, or record by
+    record by the dict_to_example function in example_gen.utils when the
+    schema has types not converted column by column, e.g. nested records.
 
 
   Example usage:
@@ -18,11 +18,14 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import json
 import os
 import apache_beam as beam
 from apache_beam.testing import util
+import fastavro
 import tensorflow as tf
 from google.protobuf import json_format
+from tfx.components.example_gen import utils
 from tfx.components.example_gen.base_example_gen_executor import INPUT_KEY
 from tfx.components.example_gen.custom_executors import avro_executor
 from tfx.proto import example_gen_pb2
@@ -55,10 +58,122 @@ class ExecutorTest(tf.test.TestCase):
         # We use Python assertion here to avoid Beam serialization error in
         # pickling tf.test.TestCase.
         assert (10000 == len(got)), 'Unexpected example count'
-        assert (18 == len(got[0].features.feature)), 'Example not match'
+        assert (18 == len(tf.train.Example.FromString(
+            got[0]).features.feature)), 'Example not match'
 
       util.assert_that(examples, check_result)
 
+  def testAvroToExampleMatchesDictToExample(self):
+    with open(
+        os.path.join(self._input_dict[INPUT_KEY][0].uri, 'avro', 'data.avro'),
+        'rb') as avro_file:
+      expected = [
+          utils.dict_to_example(record).SerializeToString(deterministic=True)
+          for record in fastavro.reader(avro_file)
+      ]
+
+    with beam.Pipeline() as pipeline:
+      examples = (
+          pipeline
+          | 'ToTFExample' >> avro_executor._AvroToExample(
+              input_dict=self._input_dict,
+              exec_properties={},
+              split_pattern='avro/*.avro'))
+
+      util.assert_that(examples, util.equal_to(expected))
+
+  def testAvroRecordsToSerializedExamples(self):
+    avro_schema = {
+        'name': 'record',
+        'type': 'record',
+        'fields': [
+            {'name': 'int', 'type': 'long'},
+            {'name': 'float', 'type': ['null', 'double']},
+            {'name': 'string', 'type': 'string'},
+            {'name': 'enum', 'type': {
+                'name': 'Enum', 'type': 'enum', 'symbols': ['A', 'B']}},
+            {'name': 'ints', 'type': {'type': 'array', 'items': 'int'}},
+            {'name': 'strings', 'type': [
+                'null', {'type': 'array', 'items': 'string'}]},
+            {'name': 'null', 'type': 'null'},
+        ]
+    }
+    records = [
+        {'int': 1, 'float': 2.5, 'string': 'a', 'enum': 'A', 'ints': [1, 2],
+         'strings': ['b', ''], 'null': None},
+        {'int': -1, 'float': None, 'string': '', 'enum': 'B', 'ints': [],
+         'strings': None, 'null': None},
+    ]
+    avro_schemas = [json.dumps(avro_schema)]
+    do_fn = avro_executor._AvroRecordsToSerializedExamples()
+    self.assertEqual([
+        utils.dict_to_example(record).SerializeToString(deterministic=True)
+        for record in records
+    ], list(do_fn.process(records, avro_schemas)))
+    self.assertIsNotNone(do_fn._encoders[avro_schemas[0]])
+
+    # Records of another schema are converted record by record.
+    other_records = [{'other': 1}]
+    self.assertEqual([
+        utils.dict_to_example(
+            other_records[0]).SerializeToString(deterministic=True)
+    ], list(do_fn.process(other_records, avro_schemas)))
+
+  def testAvroToExampleWithDifferentSchemas(self):
+    input_base_uri = os.path.join(
+        os.environ.get('TEST_UNDECLARED_OUTPUTS_DIR', self.get_temp_dir()),
+        self._testMethodName)
+    tf.io.gfile.makedirs(os.path.join(input_base_uri, 'avro'))
+    records = []
+    for name, field_type, values in (('long', 'long', [1, 2]),
+                                     ('double', 'double', [1.5, 3.0]),
+                                     ('string', 'string', ['a', 'b'])):
+      avro_schema = {
+          'name': 'record',
+          'type': 'record',
+          'fields': [{'name': 'x', 'type': field_type}]
+      }
+      file_records = [{'x': value} for value in values]
+      with open(os.path.join(input_base_uri, 'avro', name + '.avro'),
+                'wb') as avro_file:
+        fastavro.writer(avro_file, avro_schema, file_records)
+      records.extend(file_records)
+    input_base = standard_artifacts.ExternalArtifact()
+    input_base.uri = input_base_uri
+    expected = [
+        utils.dict_to_example(record).SerializeToString(deterministic=True)
+        for record in records
+    ]
+
+    with beam.Pipeline() as pipeline:
+      examples = (
+          pipeline
+          | 'ToTFExample' >> avro_executor._AvroToExample(
+              input_dict={INPUT_KEY: [input_base]},
+              exec_properties={},
+              split_pattern='avro/*.avro'))
+
+      util.assert_that(examples, util.equal_to(expected))
+
+  def testAvroSchemaNotConvertedByColumn(self):
+    for field_type in (['long', 'string'], {
+        'type': 'long',
+        'logicalType': 'timestamp-millis'
+    }, {
+        'type': 'array',
+        'items': ['null', 'long']
+    }, {
+        'name': 'Nested',
+        'type': 'record',
+        'fields': []
+    }):
+      self.assertIsNone(
+          avro_executor._CompileArrowSchema({
+              'name': 'record',
+              'type': 'record',
+              'fields': [{'name': 'field', 'type': field_type}]
+          }))
+
   def testDo(self):
     output_data_dir = os.path.join(
         os.environ.get('TEST_UNDECLARED_OUTPUTS_DIR', self.get_temp_dir()),
@@ -18,52 +18,195 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import operator
 import os
-from typing import Any, Dict, List, Text
+from typing import Any, Dict, Iterable, List, Text, Tuple
 
 import absl
 import apache_beam as beam
-import tensorflow as tf
+from apache_beam.io import fileio
+from apache_beam.io import filesystem
+from apache_beam.io import filesystems
+from pyarrow import parquet as pq
 
 from tfx import types
+from tfx.components.example_gen import utils
 from tfx.components.example_gen.base_example_gen_executor import BaseExampleGenExecutor
 from tfx.components.example_gen.base_example_gen_executor import INPUT_KEY
-from tfx.components.example_gen.utils import dict_to_example
+from tfx.proto import example_gen_pb2
 from tfx.types import artifact_utils
 
+_OPERATORS = {
+    example_gen_pb2.ParquetConfig.Filter.EQ: operator.eq,
+    example_gen_pb2.ParquetConfig.Filter.NE: operator.ne,
+    example_gen_pb2.ParquetConfig.Filter.LT: operator.lt,
+    example_gen_pb2.ParquetConfig.Filter.LE: operator.le,
+    example_gen_pb2.ParquetConfig.Filter.GT: operator.gt,
+    example_gen_pb2.ParquetConfig.Filter.GE: operator.ge,
+}
+
+
+def _OpenFile(path: Text) -> Any:
+  return filesystems.FileSystems.open(
+      path, compression_type=filesystem.CompressionTypes.UNCOMPRESSED)
+
+
+def _FilterValue(parquet_filter: example_gen_pb2.ParquetConfig.Filter,
+                 like: Any) -> Any:
+  """Returns the value of a filter, encoded if compared with bytes."""
+  value = getattr(parquet_filter, parquet_filter.WhichOneof('value'))
+  if isinstance(like, bytes) and not isinstance(value, bytes):
+    value = value.encode('utf-8')
+  return value
+
+
+def _MayPass(parquet_filter: example_gen_pb2.ParquetConfig.Filter,
+             statistics: Any) -> bool:
+  """Returns whether rows of a row group may pass a filter.
+
+  Args:
+    parquet_filter: filter on a column.
+    statistics: pyarrow Statistics of the column in the row group, or None.
+
+  Returns:
+    False if the statistics show that no row passes the filter, True otherwise.
+  """
+  if statistics is None or not statistics.has_min_max:
+    return True
+  minimum, maximum = statistics.min, statistics.max
+  value = _FilterValue(parquet_filter, minimum)
+  filter_type = example_gen_pb2.ParquetConfig.Filter
+  op = parquet_filter.operator
+  if op == filter_type.EQ:
+    return minimum <= value <= maximum
+  if op == filter_type.NE:
+    return not minimum == maximum == value
+  if op in (filter_type.LT, filter_type.LE):
+    return _OPERATORS[op](minimum, value)
+  return _OPERATORS[op](maximum, value)
+
+
+def _PassingRows(parquet_filter: example_gen_pb2.ParquetConfig.Filter,
+                 values: List[Any]) -> List[bool]:
+  """Returns whether each value of a column passes a filter."""
+  compare = _OPERATORS[parquet_filter.operator]
+  filter_value = None
+  passes = []
+  for value in values:
+    if value is None:
+      passes.append(False)
+      continue
+    if filter_value is None:
+      filter_value = _FilterValue(parquet_filter, value)
+    passes.append(compare(value, filter_value))
+  return passes
+
+
+def _ListRowGroups(
+    path: Text, parquet_config: example_gen_pb2.ParquetConfig
+) -> Iterable[Tuple[Text, int]]:
+  """Lists the row groups of a Parquet file which may pass the filters.
+
+  Args:
+    path: path of the Parquet file.
+    parquet_config: ParquetConfig with the filters.
+
+  Yields:
+    Tuples of the file path and of the index of a row group.
+  """
+  with _OpenFile(path) as f:
+    metadata = pq.ParquetFile(f).metadata
+  for index in range(metadata.num_row_groups):
+    row_group = metadata.row_group(index)
+    statistics = {}
+    for column_index in range(row_group.num_columns):
+      column = row_group.column(column_index)
+      statistics[column.path_in_schema] = (
+          column.statistics if column.is_stats_set else None)
+    if all(
+        _MayPass(f, statistics.get(f.column))
+        for f in parquet_config.filters):
+      yield path, index
+
+
+def _ReadRowGroup(
+    path_and_index: Tuple[Text, int],
+    parquet_config: example_gen_pb2.ParquetConfig) -> Iterable[bytes]:
+  """Reads a row group and converts its rows to serialized TF examples.
+
+  Args:
+    path_and_index: path of the Parquet file and index of the row group.
+    parquet_config: ParquetConfig with the columns to convert and the filters.
+
+  Yields:
+    Serialized TF examples of the rows which pass the filters.
+  """
+  path, index = path_and_index
+  columns = list(parquet_config.columns) or None
+  read_columns = columns
+  if columns and parquet_config.filters:
+    read_columns = sorted(
+        set(columns).union(f.column for f in parquet_config.filters))
+  with _OpenFile(path) as f:
+    table = pq.ParquetFile(f).read_row_group(index, columns=read_columns)
+  for record_batch in table.to_batches():
+    examples = utils.record_batch_to_serialized_examples(record_batch, columns)
+    if not parquet_config.filters:
+      for example in examples:
+        yield example
+      continue
+    names = record_batch.schema.names
+    passes = zip(*[
+        _PassingRows(f, record_batch.column(names.index(f.column)).to_pylist())
+        for f in parquet_config.filters
+    ])
+    for example, example_passes in zip(examples, passes):
+      if all(example_passes):
+        yield example
+
 
 @beam.ptransform_fn
 @beam.typehints.with_input_types(beam.Pipeline)
-@beam.typehints.with_output_types(tf.train.Example)
+@beam.typehints.with_output_types(bytes)
 def _ParquetToExample(  # pylint: disable=invalid-name
     pipeline: beam.Pipeline,
     input_dict: Dict[Text, List[types.Artifact]],
-    exec_properties: Dict[Text, Any],  # pylint: disable=unused-argument
+    exec_properties: Dict[Text, Any],
     split_pattern: Text) -> beam.pvalue.PCollection:
-  """Read Parquet files and transform to TF examples.
+  """Read Parquet files and transform to serialized TF examples.
 
   Note that each input split will be transformed by this function separately.
+  Row groups of the input files are read in parallel, with only the columns of
+  the ParquetConfig in custom_config, and converted to TF examples as Arrow
+  record batches.
 
   Args:
     pipeline: beam pipeline.
     input_dict: Input dict from input key to a list of Artifacts.
       - input_base: input dir that contains Parquet data.
     exec_properties: A dict of execution properties.
+      - custom_config: Optional JSON string of example_gen_pb2.CustomConfig
+        instance packing an example_gen_pb2.ParquetConfig.
     split_pattern: Split.pattern in Input config, glob relative file pattern
       that maps to input files with root directory given by input_base.
 
   Returns:
-    PCollection of TF examples.
+    PCollection of serialized TF examples.
   """
   input_base_uri = artifact_utils.get_single_uri(input_dict[INPUT_KEY])
   parquet_pattern = os.path.join(input_base_uri, split_pattern)
   absl.logging.info(
       'Processing input parquet data {} to TFExample.'.format(parquet_pattern))
+  parquet_config = utils.unpack_custom_config(exec_properties,
+                                              example_gen_pb2.ParquetConfig())
 
   return (pipeline
-          # TODO(jyzhao): support per column read by input_config.
-          | 'ReadFromParquet' >> beam.io.ReadFromParquet(parquet_pattern)
-          | 'ToTFExample' >> beam.Map(dict_to_example))
+          | 'MatchFiles' >> fileio.MatchFiles(parquet_pattern)
+          | 'ListRowGroups' >> beam.FlatMap(
+              lambda metadata: _ListRowGroups(metadata.path, parquet_config))
+          # Spreads the reads of the row groups of large files over workers.
+          | 'ReshuffleRowGroups' >> beam.Reshuffle()
+          | 'ReadRowGroups' >> beam.FlatMap(_ReadRowGroup, parquet_config))
 
 
 class Executor(BaseExampleGenExecutor):
@@ -80,8 +223,12 @@ class Executor(BaseExampleGenExecutor):
       Missing value will be converted to empty tf.train.Feature().
       Parquet data might lose precision, e.g., int96.
 
-    For details, check the dict_to_example function in example_gen.utils.
+    For details, check the record_batch_to_serialized_examples function in
+    example_gen.utils.
 
+  Columns to convert and filters on rows can be given by an
+  example_gen_pb2.ParquetConfig packed in custom_config. Only the given columns
+  are read, and row groups which no row passes the filters of are skipped.
 
   Example usage:
 
@@ -89,11 +236,15 @@ class Executor(BaseExampleGenExecutor):
     FileBasedExampleGen
     from tfx.components.example_gen.custom_executors import
     parquet_executor
+    from tfx.components.example_gen import utils as example_gen_utils
+    from tfx.proto import example_gen_pb2
     from tfx.utils.dsl_utils import external_input
 
     example_gen = FileBasedExampleGen(
         input=external_input(parquet_dir_path),
-        executor_class=parquet_executor.Executor)
+        executor_class=parquet_executor.Executor,
+        custom_config=example_gen_utils.make_custom_config(
+            example_gen_pb2.ParquetConfig(columns=['fare', 'company'])))
   """
 
   def GetInputSourceToExamplePTransform(self) -> beam.PTransform:
@@ -21,8 +21,11 @@ from __future__ import print_function
 import os
 import apache_beam as beam
 from apache_beam.testing import util
+import pyarrow as pa
+from pyarrow import parquet as pq
 import tensorflow as tf
 from google.protobuf import json_format
+from tfx.components.example_gen import utils
 from tfx.components.example_gen.base_example_gen_executor import INPUT_KEY
 from tfx.components.example_gen.custom_executors import parquet_executor
 from tfx.proto import example_gen_pb2
@@ -55,10 +58,116 @@ class ExecutorTest(tf.test.TestCase):
         # We use Python assertion here to avoid Beam serialization error in
         # pickling tf.test.TestCase.
         assert (10000 == len(got)), 'Unexpected example count'
-        assert (18 == len(got[0].features.feature)), 'Example not match'
+        assert (18 == len(tf.train.Example.FromString(
+            got[0]).features.feature)), 'Example not match'
 
       util.assert_that(examples, check_result)
 
+  def testParquetToExampleMatchesDictToExample(self):
+    table = pq.read_table(
+        os.path.join(self._input_dict[INPUT_KEY][0].uri, 'parquet',
+                     'data.parquet'))
+    columns = table.to_pydict()
+    expected = sorted(
+        utils.dict_to_example({name: columns[name][row] for name in columns
+                              }).SerializeToString(deterministic=True)
+        for row in range(table.num_rows))
+
+    with beam.Pipeline() as pipeline:
+      examples = (
+          pipeline
+          | 'ToTFExample' >> parquet_executor._ParquetToExample(
+              input_dict=self._input_dict,
+              exec_properties={},
+              split_pattern='parquet/*'))
+
+      def check_result(got):
+        assert expected == sorted(got), 'Examples not match'
+
+      util.assert_that(examples, check_result)
+
+  def testParquetToExampleWithColumnsAndFilters(self):
+    filter_type = example_gen_pb2.ParquetConfig.Filter
+    parquet_config = example_gen_pb2.ParquetConfig(
+        columns=['fare', 'company'],
+        filters=[
+            filter_type(
+                column='payment_type',
+                operator=filter_type.EQ,
+                string_value='Cash'),
+            filter_type(
+                column='trip_start_hour', operator=filter_type.GE,
+                int_value=12),
+        ])
+    exec_properties = {
+        'custom_config':
+            json_format.MessageToJson(
+                utils.make_custom_config(parquet_config),
+                preserving_proto_field_name=True)
+    }
+    columns = pq.read_table(
+        os.path.join(self._input_dict[INPUT_KEY][0].uri, 'parquet',
+                     'data.parquet'),
+        columns=['payment_type', 'trip_start_hour']).to_pydict()
+    expected_count = sum(
+        1 for payment_type, hour in zip(columns['payment_type'],
+                                        columns['trip_start_hour'])
+        if payment_type == 'Cash' and hour is not None and hour >= 12)
+
+    with beam.Pipeline() as pipeline:
+      examples = (
+          pipeline
+          | 'ToTFExample' >> parquet_executor._ParquetToExample(
+              input_dict=self._input_dict,
+              exec_properties=exec_properties,
+              split_pattern='parquet/*'))
+
+      def check_result(got):
+        assert (expected_count == len(got)), 'Unexpected example count'
+        assert (['company', 'fare'] == sorted(
+            tf.train.Example.FromString(got[0]).features.feature)
+               ), 'Example not match'
+
+      util.assert_that(examples, check_result)
+
+  def testListRowGroupsSkippedByStatistics(self):
+    path = os.path.join(self.get_temp_dir(), 'row_groups.parquet')
+    pq.write_table(
+        pa.Table.from_arrays([
+            pa.array(list(range(400))),
+            pa.array(['value_{:03d}'.format(i) for i in range(400)])
+        ], ['id', 'name']),
+        path,
+        row_group_size=100)
+    filter_type = example_gen_pb2.ParquetConfig.Filter
+
+    def row_groups(*filters):
+      return [
+          index for _, index in parquet_executor._ListRowGroups(
+              path, example_gen_pb2.ParquetConfig(filters=filters))
+      ]
+
+    self.assertEqual([0, 1, 2, 3], row_groups())
+    self.assertEqual([0, 1, 2],
+                     row_groups(
+                         filter_type(
+                             column='id', operator=filter_type.LT,
+                             int_value=250)))
+    self.assertEqual([1],
+                     row_groups(
+                         filter_type(
+                             column='id', operator=filter_type.EQ,
+                             int_value=150)))
+    self.assertEqual([3],
+                     row_groups(
+                         filter_type(
+                             column='name',
+                             operator=filter_type.GE,
+                             string_value='value_300'),
+                         filter_type(
+                             column='id', operator=filter_type.NE,
+                             int_value=0)))
+
   def testDo(self):
     output_data_dir = os.path.join(
         os.environ.get('TEST_UNDECLARED_OUTPUTS_DIR', self.get_temp_dir()),
@@ -20,17 +20,20 @@ from __future__ import print_function
 
 import os
 import re
-from typing import Any, Dict, List, Text
+from typing import Any, Dict, List, Optional, Text
 
 import absl
 import tensorflow as tf
 
 from google.protobuf import json_format
+from ml_metadata.proto import metadata_store_pb2
 from tfx import types
 from tfx.components.base import base_driver
 from tfx.orchestration import data_types
+from tfx.orchestration import metadata
 from tfx.proto import example_gen_pb2
 from tfx.types import channel_utils
+from tfx.types import standard_artifacts
 from tfx.utils import io_utils
 
 # Fingerprint custom property.
@@ -45,7 +48,8 @@ class Driver(base_driver.BaseDriver):
   """Custom driver for ExampleGen.
 
   This driver supports file based ExampleGen, it registers external file path as
-  an artifact, e.g., for CsvExampleGen and ImportExampleGen.
+  an artifact, e.g., for CsvExampleGen and ImportExampleGen. Other inputs, e.g.,
+  an optional schema, are resolved from metadata as usual.
   """
 
   def _glob_to_regex(self, glob_pattern: Text) -> Text:
@@ -59,41 +63,180 @@ class Driver(base_driver.BaseDriver):
     regex_pattern = regex_pattern.replace(')', '\\)')
     return regex_pattern
 
-  def _retrieve_latest_span(self, uri: Text,
-                            split: example_gen_pb2.Input.Split) -> Text:
+  def _retrieve_spans(self, uri: Text,
+                      split: example_gen_pb2.Input.Split) -> List[Text]:
+    """Returns the spans found for a split, sorted by span number.
+
+    Spans are returned as str instead of int because of zero padding digits. If
+    the path before the component with {SPAN} has no wildcard, only the
+    directory holding that component is listed, so that the files of the spans
+    are not. Otherwise all the files of all the spans are matched.
+
+    Args:
+      uri: uri of the input base.
+      split: input split whose pattern has {SPAN}.
+
+    Returns:
+      List of spans, which may hold no file of the split.
+    """
     split_pattern = os.path.join(uri, split.pattern)
     assert split_pattern.count(
         _SPAN_SPEC) == 1, 'Only one {SPAN} is allowed in %s' % (
             split_pattern)
 
-    split_glob_pattern = split_pattern.replace(_SPAN_SPEC, '*')
-    absl.logging.info('Glob pattern for split %s: %s' %
-                      (split.name, split_glob_pattern))
-    split_regex_pattern = self._glob_to_regex(split_pattern).replace(
-        _SPAN_SPEC, '(.*)')
+    span_index = split_pattern.index(_SPAN_SPEC)
+    span_dir = os.path.dirname(split_pattern[:span_index])
+    component_end = split_pattern.find('/', span_index)
+    if component_end == -1:
+      component_end = len(split_pattern)
+    component = split_pattern[len(span_dir) + 1:component_end]
+
+    if span_dir and not any(c in span_dir for c in '*?['):
+      absl.logging.info('Span directory for split %s: %s' %
+                        (split.name, span_dir))
+      split_regex_pattern = '^%s$' % self._glob_to_regex(component).replace(
+          _SPAN_SPEC, '(.*)')
+      if tf.io.gfile.isdir(span_dir):
+        # Directories may be listed with a trailing slash, e.g., on GCS.
+        paths = [
+            os.path.join(span_dir, name.rstrip('/'))
+            for name in tf.io.gfile.listdir(span_dir)
+        ]
+      else:
+        paths = []
+      get_name = os.path.basename
+    else:
+      split_glob_pattern = split_pattern.replace(_SPAN_SPEC, '*')
+      absl.logging.info('Glob pattern for split %s: %s' %
+                        (split.name, split_glob_pattern))
+      split_regex_pattern = self._glob_to_regex(split_pattern).replace(
+          _SPAN_SPEC, '(.*)')
+      paths = tf.io.gfile.glob(split_glob_pattern)
+      get_name = lambda path: path
     absl.logging.info('Regex pattern for split %s: %s' %
                       (split.name, split_regex_pattern))
     assert re.compile(
         split_regex_pattern).groups == 1, 'Regex should have only one group'
 
-    files = tf.io.gfile.glob(split_glob_pattern)
-    latest_span = None
-    for file_path in files:
-      result = re.search(split_regex_pattern, file_path)
-      assert result is not None, ('Glob pattern does not match regex pattern')
+    spans = set()
+    for path in paths:
+      result = re.search(split_regex_pattern, get_name(path))
+      if result is None:
+        # Other entries of the listed directory.
+        continue
       try:
-        span = int(result.group(1))
+        int(result.group(1))
       except ValueError:
         raise ValueError('Cannot not find span number from %s based on %s' %
-                         (file_path, split_regex_pattern))
-      if latest_span is None or span >= int(latest_span):
-        # Uses str instead of int because of zero padding digits.
-        latest_span = result.group(1)
+                         (path, split_regex_pattern))
+      spans.add(result.group(1))
+    return sorted(spans, key=int)
+
+  def _has_span_files(self, uri: Text, split: example_gen_pb2.Input.Split,
+                      span: Text) -> bool:
+    """Returns whether a span holds files of a split."""
+    return bool(
+        tf.io.gfile.glob(
+            os.path.join(uri, split.pattern.replace(_SPAN_SPEC, span))))
+
+  def _retrieve_latest_span(self, uri: Text,
+                            split: example_gen_pb2.Input.Split) -> Text:
+    """Returns the latest span holding files of a split."""
+    for span in reversed(self._retrieve_spans(uri, split)):
+      if self._has_span_files(uri, split, span):
+        return span
+    raise ValueError('Cannot not find matching for split %s based on %s' %
+                     (split.name, split.pattern))
+
+  def _retrieve_new_spans(self, uri: Text,
+                          splits: List[example_gen_pb2.Input.Split],
+                          latest_processed_span: Optional[int],
+                          max_new_spans: int) -> List[Text]:
+    """Returns the oldest spans newer than the processed spans.
+
+    Args:
+      uri: uri of the input base.
+      splits: input splits whose patterns have {SPAN}.
+      latest_processed_span: latest span processed by a previous run, or None
+        if no span was processed.
+      max_new_spans: maximum number of returned spans.
+
+    Returns:
+      List of at most max_new_spans spans newer than latest_processed_span, in
+      order, which hold files of every split. It stops before the first span
+      missing files of any split, e.g., still being written, so that later
+      spans are never processed before it. If there is no such span, the
+      latest processed span is returned again.
+
+    Raises:
+      ValueError: if there is neither a new span nor a processed span with
+        files of every split.
+    """
+    spans = set()
+    for split in splits:
+      spans.update(self._retrieve_spans(uri, split))
+
+    new_spans = []
+    processed_span = None
+    for span in sorted(spans, key=int):
+      if latest_processed_span is not None and int(
+          span) <= latest_processed_span:
+        if int(span) == latest_processed_span:
+          processed_span = span
+        continue
+      if len(new_spans) == max_new_spans or not all(
+          self._has_span_files(uri, split, span) for split in splits):
+        break
+      new_spans.append(span)
+    if new_spans:
+      return new_spans
+    if processed_span is not None and all(
+        self._has_span_files(uri, split, processed_span) for split in splits):
+      return [processed_span]
+    raise ValueError('Cannot not find a new span with files of every split '
+                     'based on %s' %
+                     ', '.join(split.pattern for split in splits))
+
+  def _retrieve_latest_processed_span(self, uri: Text) -> Optional[int]:
+    """Returns the latest span processed by a previous run for a uri.
 
-    if latest_span is None:
-      raise ValueError('Cannot not find matching for split %s based on %s' %
-                       (split.name, split.pattern))
-    return latest_span
+    Input artifacts registered in metadata index the spans of previous runs,
+    with the fingerprint of their files. They are registered before the run
+    executes, so that only the spans of runs that completed, or reused the
+    outputs of a completed run, are processed.
+
+    Args:
+      uri: uri of the input base.
+
+    Returns:
+      The latest processed span, or None if no span was processed.
+    """
+    span_artifacts = dict(
+        (artifact.id, artifact)
+        for artifact in self._metadata_handler.get_artifacts_by_uri(uri)
+        if _SPAN in artifact.custom_properties)
+    if not span_artifacts:
+      return None
+    store = self._metadata_handler.store
+    input_events = [
+        event for event in store.get_events_by_artifact_ids(
+            list(span_artifacts.keys()))
+        if event.type == metadata_store_pb2.Event.INPUT
+    ]
+    if not input_events:
+      return None
+    final_execution_ids = set(
+        execution.id for execution in store.get_executions_by_id(
+            list(set(event.execution_id for event in input_events)))
+        if execution.properties['state'].string_value in
+        metadata.FINAL_EXECUTION_STATES)
+    spans = [
+        int(span_artifacts[event.artifact_id].custom_properties[_SPAN]
+            .string_value)
+        for event in input_events
+        if event.execution_id in final_execution_ids
+    ]
+    return max(spans) if spans else None
 
   def resolve_input_artifacts(
       self,
@@ -103,13 +246,18 @@ class Driver(base_driver.BaseDriver):
       pipeline_info: data_types.PipelineInfo,
   ) -> Dict[Text, List[types.Artifact]]:
     """Overrides BaseDriver.resolve_input_artifacts()."""
-    del driver_args  # unused
-    del pipeline_info  # unused
-
     input_config = example_gen_pb2.Input()
     json_format.Parse(exec_properties['input_config'], input_config)
 
-    input_dict = channel_utils.unwrap_channel_dict(input_channels)
+    external_channels = {}
+    other_channels = {}
+    for key, channel in input_channels.items():
+      if channel.type_name == standard_artifacts.ExternalArtifact.TYPE_NAME:
+        external_channels[key] = channel
+      else:
+        other_channels[key] = channel
+
+    input_dict = channel_utils.unwrap_channel_dict(external_channels)
     for input_list in input_dict.values():
       for single_input in input_list:
         absl.logging.debug('Processing input %s.' % single_input.uri)
@@ -117,30 +265,55 @@ class Driver(base_driver.BaseDriver):
         absl.logging.debug('single_input.mlmd_artifact %s.' %
                            single_input.mlmd_artifact)
 
-        # Set the fingerprint of input.
-        split_fingerprints = []
-        select_span = None
-        for split in input_config.splits:
-          # If SPAN is specified, pipeline will process the latest span, note
-          # that this span number must be the same for all splits and it will
-          # be stored in metadata as the span of input artifact.
-          if _SPAN_SPEC in split.pattern:
-            latest_span = self._retrieve_latest_span(single_input.uri, split)
-            if select_span is None:
-              select_span = latest_span
-            if select_span != latest_span:
+        # If SPAN is specified, pipeline will process the latest span, or the
+        # new spans with Input.max_new_spans. Note that these spans are the
+        # same for all splits, and the latest processed span will be stored in
+        # metadata as the span of input artifact.
+        select_spans = None
+        span_splits = [
+            split for split in input_config.splits
+            if _SPAN_SPEC in split.pattern
+        ]
+        if span_splits and input_config.max_new_spans > 0:
+          select_spans = self._retrieve_new_spans(
+              single_input.uri, span_splits,
+              self._retrieve_latest_processed_span(single_input.uri),
+              input_config.max_new_spans)
+        else:
+          for split in span_splits:
+            spans = [self._retrieve_latest_span(single_input.uri, split)]
+            if select_spans is not None and select_spans != spans:
               raise ValueError(
                   'Latest span should be the same for each split: %s != %s' %
-                  (select_span, latest_span))
-            split.pattern = split.pattern.replace(_SPAN_SPEC, select_span)
+                  (select_spans[0], spans[0]))
+            select_spans = spans
+
+        # Splits are repeated for each selected span.
+        resolved_splits = []
+        for split in input_config.splits:
+          if _SPAN_SPEC in split.pattern:
+            for span in select_spans:
+              resolved_splits.append(
+                  example_gen_pb2.Input.Split(
+                      name=split.name,
+                      pattern=split.pattern.replace(_SPAN_SPEC, span)))
+          else:
+            resolved_splits.append(split)
+        del input_config.splits[:]
+        input_config.splits.extend(resolved_splits)
 
+        # Set the fingerprint of input.
+        split_fingerprints = []
+        for split in input_config.splits:
           pattern = os.path.join(single_input.uri, split.pattern)
           split_fingerprints.append(
-              io_utils.generate_fingerprint(split.name, pattern))
+              io_utils.generate_fingerprint(
+                  split.name,
+                  pattern,
+                  content_hash=input_config.fingerprint_by_content))
         fingerprint = '\n'.join(split_fingerprints)
         single_input.set_string_custom_property(_FINGERPRINT, fingerprint)
-        if select_span is None:
-          select_span = '0'
+        select_span = select_spans[-1] if select_spans else '0'
         single_input.set_string_custom_property(_SPAN, select_span)
 
         matched_artifacts = []
@@ -169,4 +342,10 @@ class Driver(base_driver.BaseDriver):
 
     exec_properties['input_config'] = json_format.MessageToJson(
         input_config, sort_keys=True, preserving_proto_field_name=True)
+    if other_channels:
+      input_dict.update(
+          super(Driver, self).resolve_input_artifacts(other_channels,
+                                                      exec_properties,
+                                                      driver_args,
+                                                      pipeline_info))
     return input_dict
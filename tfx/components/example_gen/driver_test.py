@@ -24,6 +24,7 @@ import tensorflow as tf
 from google.protobuf import json_format
 from ml_metadata.proto import metadata_store_pb2
 from tfx.components.example_gen import driver
+from tfx.orchestration import data_types
 from tfx.proto import example_gen_pb2
 from tfx.types import channel_utils
 from tfx.types import standard_artifacts
@@ -64,6 +65,29 @@ class DriverTest(tf.test.TestCase):
                 preserving_proto_field_name=True),
     }
 
+  def _register_span_artifacts(self, span_states):
+    """Mocks input artifacts of spans, each read by an execution in a state."""
+    artifacts = []
+    events = []
+    executions = []
+    for i, (span, state) in enumerate(span_states, 1):
+      artifact = metadata_store_pb2.Artifact()
+      artifact.id = i
+      artifact.uri = self._input_base_path
+      artifact.custom_properties['span'].string_value = span
+      artifacts.append(artifact)
+      events.append(
+          metadata_store_pb2.Event(
+              artifact_id=i,
+              execution_id=i,
+              type=metadata_store_pb2.Event.INPUT))
+      execution = metadata_store_pb2.Execution(id=i)
+      execution.properties['state'].string_value = state
+      executions.append(execution)
+    self._mock_metadata.get_artifacts_by_uri.return_value = artifacts
+    self._mock_metadata.store.get_events_by_artifact_ids.return_value = events
+    self._mock_metadata.store.get_executions_by_id.return_value = executions
+
   def testResolveInputArtifacts(self):
     # Create input splits.
     split1 = os.path.join(self._input_base_path, 'split1', 'data')
@@ -121,6 +145,69 @@ class DriverTest(tf.test.TestCase):
     self.assertEqual(3, updated_input_base.id)
     self.assertEqual(self._input_base_path, updated_input_base.uri)
 
+  def testResolveInputArtifactsFingerprintByContent(self):
+    io_utils.write_string_file(
+        os.path.join(self._input_base_path, 'split1', 'data'), 'testing')
+    exec_properties = {
+        'input_config':
+            json_format.MessageToJson(
+                example_gen_pb2.Input(
+                    splits=[
+                        example_gen_pb2.Input.Split(
+                            name='s1', pattern='split1/*')
+                    ],
+                    fingerprint_by_content=True),
+                preserving_proto_field_name=True),
+    }
+    self._mock_metadata.get_artifacts_by_uri.return_value = []
+    self._mock_metadata.publish_artifacts.return_value = [
+        metadata_store_pb2.Artifact()
+    ]
+
+    updated_input_dict = self._example_gen_driver.resolve_input_artifacts(
+        self._input_channels, exec_properties, None, None)
+
+    self.assertStartsWith(
+        updated_input_dict['input_base'][0].get_string_custom_property(
+            'input_fingerprint'),
+        'split:s1,num_files:1,total_bytes:7,xor_content_checksum:')
+
+  def testResolveSchemaFromMetadata(self):
+    io_utils.write_string_file(
+        os.path.join(self._input_base_path, 'split1', 'data'), 'testing')
+    exec_properties = {
+        'input_config':
+            json_format.MessageToJson(
+                example_gen_pb2.Input(splits=[
+                    example_gen_pb2.Input.Split(name='s1', pattern='split1/*')
+                ]),
+                preserving_proto_field_name=True),
+    }
+    schema = standard_artifacts.Schema()
+    schema.uri = 'schema_uri'
+    input_channels = dict(self._input_channels)
+    input_channels['schema'] = channel_utils.as_channel([schema])
+    self._mock_metadata.get_artifacts_by_uri.return_value = []
+    self._mock_metadata.publish_artifacts.return_value = [
+        metadata_store_pb2.Artifact()
+    ]
+    self._mock_metadata.search_artifacts_in_bulk.return_value = {
+        'schema': [schema]
+    }
+
+    updated_input_dict = self._example_gen_driver.resolve_input_artifacts(
+        input_channels, exec_properties, data_types.DriverArgs(),
+        data_types.PipelineInfo('name', 'root', 'run_id'))
+
+    self.assertEqual(['input_base', 'schema'], sorted(updated_input_dict))
+    self.assertEqual(self._input_base_path,
+                     updated_input_dict['input_base'][0].uri)
+    self.assertEqual([schema], updated_input_dict['schema'])
+    # Only the schema is searched in metadata.
+    artifact_queries = self._mock_metadata.search_artifacts_in_bulk.call_args[
+        1]['artifact_queries']
+    self.assertEqual(['schema'], list(artifact_queries))
+
   def testGlobToRegex(self):
     glob_pattern = 'a(b)c'
     self.assertEqual(1, re.compile(glob_pattern).groups)
@@ -190,6 +277,149 @@ class DriverTest(tf.test.TestCase):
           pattern: "span02/split2/*"
         }""", updated_input_config)
 
+  def testResolveInputArtifactsWithNewSpans(self):
+    for span in ['01', '02', '03', '04']:
+      for split in ['split1', 'split2']:
+        io_utils.write_string_file(
+            os.path.join(self._input_base_path, 'span' + span, split, 'data'),
+            'testing')
+    # Span 04 is still being written.
+    tf.io.gfile.remove(
+        os.path.join(self._input_base_path, 'span04', 'split2', 'data'))
+    exec_properties = {
+        'input_config':
+            json_format.MessageToJson(
+                example_gen_pb2.Input(
+                    splits=[
+                        example_gen_pb2.Input.Split(
+                            name='s1', pattern='span{SPAN}/split1/*'),
+                        example_gen_pb2.Input.Split(
+                            name='s2', pattern='span{SPAN}/split2/*')
+                    ],
+                    max_new_spans=3),
+                preserving_proto_field_name=True),
+    }
+
+    # Span 01 was processed by a complete run.
+    self._register_span_artifacts([('01', 'complete')])
+    self._mock_metadata.publish_artifacts.return_value = [
+        metadata_store_pb2.Artifact()
+    ]
+    updated_input_dict = self._example_gen_driver.resolve_input_artifacts(
+        self._input_channels, exec_properties, None, None)
+
+    updated_input_config = example_gen_pb2.Input()
+    json_format.Parse(exec_properties['input_config'], updated_input_config)
+    # Spans newer than span 01 are processed, up to the incomplete span 04.
+    self.assertProtoEquals(
+        """
+        splits {
+          name: "s1"
+          pattern: "span02/split1/*"
+        }
+        splits {
+          name: "s1"
+          pattern: "span03/split1/*"
+        }
+        splits {
+          name: "s2"
+          pattern: "span02/split2/*"
+        }
+        splits {
+          name: "s2"
+          pattern: "span03/split2/*"
+        }
+        max_new_spans: 3""", updated_input_config)
+    self.assertEqual(
+        '03',
+        updated_input_dict['input_base'][0].get_string_custom_property('span'))
+
+  def testResolveInputArtifactsWithNewSpansAfterFailedRun(self):
+    for span in ['01', '02', '03']:
+      io_utils.write_string_file(
+          os.path.join(self._input_base_path, 'span' + span, 'split1', 'data'),
+          'testing')
+    exec_properties = {
+        'input_config':
+            json_format.MessageToJson(
+                example_gen_pb2.Input(
+                    splits=[
+                        example_gen_pb2.Input.Split(
+                            name='s1', pattern='span{SPAN}/split1/*')
+                    ],
+                    max_new_spans=2),
+                preserving_proto_field_name=True),
+    }
+
+    # The run of span 02 registered its input, but failed.
+    self._register_span_artifacts([('01', 'complete'), ('02', 'running')])
+    self._mock_metadata.publish_artifacts.return_value = [
+        metadata_store_pb2.Artifact()
+    ]
+    updated_input_dict = self._example_gen_driver.resolve_input_artifacts(
+        self._input_channels, exec_properties, None, None)
+
+    updated_input_config = example_gen_pb2.Input()
+    json_format.Parse(exec_properties['input_config'], updated_input_config)
+    self.assertEqual(['span02/split1/*', 'span03/split1/*'],
+                     [split.pattern for split in updated_input_config.splits])
+    self.assertEqual(
+        '03',
+        updated_input_dict['input_base'][0].get_string_custom_property('span'))
+
+  def testRetrieveNewSpansStopsAtIncompleteSpan(self):
+    for span in ['04', '05', '06']:
+      for split in ['split1', 'split2']:
+        io_utils.write_string_file(
+            os.path.join(self._input_base_path, 'span' + span, split, 'data'),
+            'testing')
+    # Span 05 is still being written.
+    tf.io.gfile.remove(
+        os.path.join(self._input_base_path, 'span05', 'split1', 'data'))
+    splits = [
+        example_gen_pb2.Input.Split(name='s1', pattern='span{SPAN}/split1/*'),
+        example_gen_pb2.Input.Split(name='s2', pattern='span{SPAN}/split2/*')
+    ]
+
+    # Span 06 is not processed before span 05, the processed span is instead.
+    self.assertEqual(['04'],
+                     self._example_gen_driver._retrieve_new_spans(
+                         self._input_base_path, splits, 3, 3))
+    self.assertEqual(['04'],
+                     self._example_gen_driver._retrieve_new_spans(
+                         self._input_base_path, splits, 4, 3))
+    io_utils.write_string_file(
+        os.path.join(self._input_base_path, 'span05', 'split1', 'data'),
+        'testing')
+    self.assertEqual(['05', '06'],
+                     self._example_gen_driver._retrieve_new_spans(
+                         self._input_base_path, splits, 4, 3))
+
+    # No span is ready and none was processed.
+    tf.io.gfile.remove(
+        os.path.join(self._input_base_path, 'span04', 'split2', 'data'))
+    with self.assertRaisesRegexp(ValueError, 'Cannot not find a new span'):
+      self._example_gen_driver._retrieve_new_spans(self._input_base_path,
+                                                   splits, None, 3)
+
+  def testRetrieveSpansListsSpanDirectory(self):
+    for span in ['1', '2', '10']:
+      io_utils.write_string_file(
+          os.path.join(self._input_base_path, 'span' + span, 'split1', 'data'),
+          'testing')
+    io_utils.write_string_file(
+        os.path.join(self._input_base_path, 'other', 'data'), 'testing')
+    split = example_gen_pb2.Input.Split(
+        name='s1', pattern='span{SPAN}/split1/*')
+
+    with tf.compat.v1.test.mock.patch.object(
+        tf.io.gfile, 'glob', wraps=tf.io.gfile.glob) as mock_glob:
+      self.assertEqual(['1', '2', '10'],
+                       self._example_gen_driver._retrieve_spans(
+                           self._input_base_path, split))
+      # Files of the spans are not matched.
+      mock_glob.assert_not_called()
+
 
 if __name__ == '__main__':
   tf.test.main()
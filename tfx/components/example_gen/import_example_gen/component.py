@@ -23,6 +23,7 @@ from typing import Any, Dict, Optional, Text, Union
 from tfx import types
 from tfx.components.base import executor_spec
 from tfx.components.example_gen import component
+from tfx.components.example_gen import utils
 from tfx.components.example_gen.import_example_gen import executor
 from tfx.proto import example_gen_pb2
 
@@ -47,7 +48,8 @@ class ImportExampleGen(component.FileBasedExampleGen):  # pylint: disable=protec
                                                                  Any]]] = None,
       example_artifacts: Optional[types.Channel] = None,
       input_base: Optional[types.Channel] = None,
-      instance_name: Optional[Text] = None):
+      instance_name: Optional[Text] = None,
+      import_config: Optional[example_gen_pb2.ImportConfig] = None):
     """Construct an ImportExampleGen component.
 
     Args:
@@ -69,11 +71,21 @@ class ImportExampleGen(component.FileBasedExampleGen):  # pylint: disable=protec
       input_base: Backwards compatibility alias for the 'input' argument.
       instance_name: Optional unique instance name. Necessary if multiple
         ImportExampleGen components are declared in the same pipeline.
+      import_config: An optional example_gen_pb2.ImportConfig instance. With
+        passthrough, input records are not parsed and serialized again, and
+        input files are copied as is when output splits are the input splits
+        written without shuffle, e.g. with output_config
+        `Output(shuffle_mode=Output.NO_SHUFFLE)` and an input_config with
+        several splits.
     """
+    custom_config = None
+    if import_config:
+      custom_config = utils.make_custom_config(import_config)
     super(ImportExampleGen, self).__init__(
         input=input,
         input_config=input_config,
         output_config=output_config,
+        custom_config=custom_config,
         example_artifacts=example_artifacts,
         input_base=input_base,
         instance_name=instance_name)
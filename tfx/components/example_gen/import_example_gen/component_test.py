@@ -20,9 +20,11 @@ from __future__ import print_function
 
 import tensorflow as tf
 from tfx.components.example_gen.import_example_gen import component
+from tfx.proto import example_gen_pb2
 from tfx.types import artifact_utils
 from tfx.types import channel_utils
 from tfx.types import standard_artifacts
+from google.protobuf import json_format
 
 
 class ComponentTest(tf.test.TestCase):
@@ -39,6 +41,21 @@ class ComponentTest(tf.test.TestCase):
                      artifact_utils.decode_split_names(
                          artifact_collection[0].split_names))
 
+  def testConstructWithImportConfig(self):
+    input_base = standard_artifacts.ExternalArtifact()
+    import_config = example_gen_pb2.ImportConfig(
+        passthrough=True, link_input_files=True)
+    import_example_gen = component.ImportExampleGen(
+        input=channel_utils.as_channel([input_base]),
+        import_config=import_config)
+
+    custom_config = example_gen_pb2.CustomConfig()
+    json_format.Parse(import_example_gen.exec_properties['custom_config'],
+                      custom_config)
+    unpacked_config = example_gen_pb2.ImportConfig()
+    custom_config.custom_config.Unpack(unpacked_config)
+    self.assertEqual(import_config, unpacked_config)
+
 
 if __name__ == '__main__':
   tf.test.main()
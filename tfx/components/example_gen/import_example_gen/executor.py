@@ -18,30 +18,42 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import errno
 import os
-from typing import Any, Dict, List, Text
+from typing import Any, Dict, List, Optional, Text
 
 import absl
 import apache_beam as beam
 import tensorflow as tf
 
 from tfx import types
+from tfx.components.example_gen import base_example_gen_executor
+from tfx.components.example_gen import utils
 from tfx.components.example_gen.base_example_gen_executor import BaseExampleGenExecutor
 from tfx.components.example_gen.base_example_gen_executor import INPUT_KEY
+from tfx.components.util import examples_utils
+from tfx.proto import example_gen_pb2
 from tfx.types import artifact_utils
+from google.protobuf import json_format
+
+# Suffixes of the compressed TFRecord files ReadFromTFRecord detects.
+_COMPRESSED_SUFFIXES = ('.gz', '.bz2', '.deflate')
 
 
 @beam.ptransform_fn
 @beam.typehints.with_input_types(beam.Pipeline)
-@beam.typehints.with_output_types(tf.train.Example)
+@beam.typehints.with_output_types(beam.typehints.Union[tf.train.Example,
+                                                        bytes])
 def _ImportExample(  # pylint: disable=invalid-name
     pipeline: beam.Pipeline,
     input_dict: Dict[Text, List[types.Artifact]],
-    exec_properties: Dict[Text, Any],  # pylint: disable=unused-argument
+    exec_properties: Dict[Text, Any],
     split_pattern: Text) -> beam.pvalue.PCollection:
   """Read TFRecord files to PCollection of TF examples.
 
   Note that each input split will be transformed by this function separately.
+  With ImportConfig.passthrough, records are output as is instead of being
+  parsed as TF examples.
 
   Args:
     pipeline: beam pipeline.
@@ -52,20 +64,61 @@ def _ImportExample(  # pylint: disable=invalid-name
       that maps to input files with root directory given by input_base.
 
   Returns:
-    PCollection of TF examples.
+    PCollection of TF examples, or of serialized TF examples with passthrough.
   """
+  import_config = utils.unpack_custom_config(exec_properties,
+                                             example_gen_pb2.ImportConfig())
   input_base_uri = artifact_utils.get_single_uri(input_dict[INPUT_KEY])
   input_split_pattern = os.path.join(input_base_uri, split_pattern)
   absl.logging.info(
       'Reading input TFExample data {}.'.format(input_split_pattern))
 
   # TODO(jyzhao): profile input examples.
-  return (pipeline
-          # TODO(jyzhao): support multiple input format.
-          | 'ReadFromTFRecord' >>
-          beam.io.ReadFromTFRecord(file_pattern=input_split_pattern)
-          # TODO(jyzhao): consider move serialization out of base example gen.
-          | 'ToTFExample' >> beam.Map(tf.train.Example.FromString))
+  # TODO(jyzhao): support multiple input format.
+  records = (
+      pipeline
+      | 'ReadFromTFRecord' >>
+      beam.io.ReadFromTFRecord(file_pattern=input_split_pattern))
+  if import_config.passthrough:
+    return records
+  # TODO(jyzhao): consider move serialization out of base example gen.
+  return records | 'ToTFExample' >> beam.Map(tf.train.Example.FromString)
+
+
+def _OutputFileSuffix(output_config: example_gen_pb2.Output) -> Optional[Text]:
+  """Returns the suffix of output TFRecord files, None if not TFRecord."""
+  if output_config.file_format in (
+      example_gen_pb2.Output.FILE_FORMAT_UNSPECIFIED,
+      example_gen_pb2.Output.FORMAT_TFRECORDS_GZIP):
+    return '.gz'
+  if output_config.file_format == (
+      example_gen_pb2.Output.FORMAT_TFRECORDS_UNCOMPRESSED):
+    return ''
+  return None
+
+
+def _HasSuffix(file_path: Text, suffix: Text) -> bool:
+  """Returns whether a TFRecord file path has a given compression suffix."""
+  if suffix:
+    return file_path.endswith(suffix)
+  return not file_path.endswith(_COMPRESSED_SUFFIXES)
+
+
+def _IsLocal(path: Text) -> bool:
+  return '://' not in path
+
+
+def _CopyFile(src: Text, dst: Text, link: bool) -> None:
+  """Copies a file, or hard links it if asked and possible."""
+  if link and _IsLocal(src) and _IsLocal(dst):
+    try:
+      os.link(src, dst)
+      return
+    except OSError as e:
+      # Input and output are on different devices.
+      if e.errno != errno.EXDEV:
+        raise
+  tf.io.gfile.copy(src, dst, overwrite=True)
 
 
 class Executor(BaseExampleGenExecutor):
@@ -74,3 +127,95 @@ class Executor(BaseExampleGenExecutor):
   def GetInputSourceToExamplePTransform(self) -> beam.PTransform:
     """Returns PTransform for importing TF examples."""
     return _ImportExample
+
+  def _GetPassthroughFiles(
+      self, input_dict: Dict[Text, List[types.Artifact]],
+      exec_properties: Dict[Text, Any]) -> Optional[Dict[Text, List[Text]]]:
+    """Returns input files by split if they can be copied as output splits.
+
+    Args:
+      input_dict: Input dict from input key to a list of Artifacts.
+      exec_properties: A dict of execution properties.
+
+    Returns:
+      Dict from split name to the input files of the split, or None if the
+      input files cannot be copied as is, e.g., because they are re-split,
+      sampled, shuffled, recompressed or also written in additional file
+      formats.
+    """
+    import_config = utils.unpack_custom_config(exec_properties,
+                                               example_gen_pb2.ImportConfig())
+    if not import_config.passthrough:
+      return None
+    input_config = example_gen_pb2.Input()
+    json_format.Parse(exec_properties['input_config'], input_config)
+    output_config = example_gen_pb2.Output()
+    json_format.Parse(exec_properties['output_config'], output_config)
+    suffix = _OutputFileSuffix(output_config)
+    if (output_config.split_config.splits or
+        output_config.shuffle_mode != example_gen_pb2.Output.NO_SHUFFLE or
+        output_config.num_shards or output_config.additional_file_formats or
+        output_config.sampling or suffix is None):
+      return None
+
+    input_base_uri = artifact_utils.get_single_uri(input_dict[INPUT_KEY])
+    split_files = {}
+    for split in input_config.splits:
+      files = sorted(
+          tf.io.gfile.glob(os.path.join(input_base_uri, split.pattern)))
+      if not files or not all(_HasSuffix(f, suffix) for f in files):
+        return None
+      split_files.setdefault(split.name, []).extend(files)
+    return split_files
+
+  def Do(self, input_dict: Dict[Text, List[types.Artifact]],
+         output_dict: Dict[Text, List[types.Artifact]],
+         exec_properties: Dict[Text, Any]) -> None:
+    """Imports TF examples, copying input files as is when possible.
+
+    Input files are copied, or hard linked with ImportConfig.link_input_files,
+    when ImportConfig.passthrough is set and output splits are the input splits
+    written without shuffle, in the compression of the input files. Otherwise
+    examples are generated by the Beam pipeline of the base executor.
+
+    Args:
+      input_dict: Input dict from input key to a list of Artifacts.
+        - input_base: input dir that contains tf example data.
+      output_dict: Output dict from output key to a list of Artifacts.
+        - examples: splits of tf examples.
+      exec_properties: A dict of execution properties.
+        - input_config: JSON string of example_gen_pb2.Input instance.
+        - output_config: JSON string of example_gen_pb2.Output instance.
+        - custom_config: Optional JSON string of example_gen_pb2.CustomConfig
+          instance packing an example_gen_pb2.ImportConfig.
+
+    Returns:
+      None
+    """
+    split_files = self._GetPassthroughFiles(input_dict, exec_properties)
+    if split_files is None:
+      super(Executor, self).Do(input_dict, output_dict, exec_properties)
+      return
+
+    self._log_startup(input_dict, output_dict, exec_properties)
+    import_config = utils.unpack_custom_config(exec_properties,
+                                               example_gen_pb2.ImportConfig())
+    output_config = example_gen_pb2.Output()
+    json_format.Parse(exec_properties['output_config'], output_config)
+    suffix = _OutputFileSuffix(output_config)
+
+    absl.logging.info('Copying input files as examples.')
+    for split_name, files in split_files.items():
+      output_split_path = artifact_utils.get_split_uri(
+          output_dict['examples'], split_name)
+      tf.io.gfile.makedirs(output_split_path)
+      for index, input_file in enumerate(files):
+        output_file = os.path.join(
+            output_split_path, '{}-{:05d}-of-{:05d}{}'.format(
+                base_example_gen_executor.DEFAULT_FILE_NAME, index, len(files),
+                suffix))
+        _CopyFile(input_file, output_file, import_config.link_input_files)
+
+    for examples in output_dict['examples']:
+      examples_utils.set_file_format(examples, output_config.file_format)
+    absl.logging.info('Examples generated.')
@@ -24,6 +24,7 @@ from apache_beam.testing import util
 import tensorflow as tf
 from google.protobuf import json_format
 from tfx.components.example_gen.base_example_gen_executor import INPUT_KEY
+from tfx.components.example_gen import utils
 from tfx.components.example_gen.import_example_gen import executor
 from tfx.proto import example_gen_pb2
 from tfx.types import artifact_utils
@@ -58,6 +59,120 @@ class ExecutorTest(tf.test.TestCase):
 
       util.assert_that(examples, check_result)
 
+  def testImportExamplePassthrough(self):
+    exec_properties = {
+        'custom_config':
+            json_format.MessageToJson(
+                utils.make_custom_config(
+                    example_gen_pb2.ImportConfig(passthrough=True)),
+                preserving_proto_field_name=True)
+    }
+    with beam.Pipeline() as pipeline:
+      examples = (
+          pipeline
+          | 'ToTFExample' >> executor._ImportExample(
+              input_dict=self._input_dict,
+              exec_properties=exec_properties,
+              split_pattern='tfrecord/*'))
+
+      def check_result(got):
+        assert (15000 == len(got)), 'Unexpected example count'
+        assert isinstance(got[0], bytes), 'Example not passed through'
+        assert (18 == len(tf.train.Example.FromString(
+            got[0]).features.feature)), 'Example not match'
+
+      util.assert_that(examples, check_result)
+
+  def _RunPassthrough(self, output_config, link_input_files=False):
+    """Runs the executor with passthrough on two input splits."""
+    output_data_dir = os.path.join(
+        os.environ.get('TEST_UNDECLARED_OUTPUTS_DIR', self.get_temp_dir()),
+        self._testMethodName)
+    examples = standard_artifacts.Examples()
+    examples.uri = output_data_dir
+    examples.split_names = artifact_utils.encode_split_names(['train', 'eval'])
+    output_dict = {'examples': [examples]}
+    exec_properties = {
+        'input_config':
+            json_format.MessageToJson(
+                example_gen_pb2.Input(splits=[
+                    example_gen_pb2.Input.Split(
+                        name='train', pattern='tfrecord/*-00000-of-00002.gz'),
+                    example_gen_pb2.Input.Split(
+                        name='eval', pattern='tfrecord/*-00001-of-00002.gz'),
+                ]),
+                preserving_proto_field_name=True),
+        'output_config':
+            json_format.MessageToJson(
+                output_config, preserving_proto_field_name=True),
+        'custom_config':
+            json_format.MessageToJson(
+                utils.make_custom_config(
+                    example_gen_pb2.ImportConfig(
+                        passthrough=True, link_input_files=link_input_files)),
+                preserving_proto_field_name=True),
+    }
+    executor.Executor().Do(self._input_dict, output_dict, exec_properties)
+    return examples
+
+  def testDoPassthroughCopiesInputFiles(self):
+    examples = self._RunPassthrough(
+        example_gen_pb2.Output(shuffle_mode=example_gen_pb2.Output.NO_SHUFFLE))
+
+    input_file = os.path.join(self._input_dict[INPUT_KEY][0].uri, 'tfrecord',
+                              'data_tfrecord-00000-of-00002.gz')
+    train_output_file = os.path.join(examples.uri, 'train',
+                                     'data_tfrecord-00000-of-00001.gz')
+    self.assertTrue(
+        tf.io.gfile.exists(
+            os.path.join(examples.uri, 'eval',
+                         'data_tfrecord-00000-of-00001.gz')))
+    with tf.io.gfile.GFile(input_file, 'rb') as f:
+      input_bytes = f.read()
+    with tf.io.gfile.GFile(train_output_file, 'rb') as f:
+      self.assertEqual(input_bytes, f.read())
+    self.assertNotEqual(os.stat(input_file).st_ino,
+                        os.stat(train_output_file).st_ino)
+    self.assertEqual('FORMAT_TFRECORDS_GZIP',
+                     examples.get_string_custom_property('file_format'))
+
+  def testDoPassthroughLinksInputFiles(self):
+    input_file = os.path.join(self.get_temp_dir(), 'input', 'tfrecord',
+                              'data_tfrecord-00000-of-00002.gz')
+    tf.io.gfile.makedirs(os.path.dirname(input_file))
+    tf.io.gfile.copy(
+        os.path.join(self._input_dict[INPUT_KEY][0].uri, 'tfrecord',
+                     'data_tfrecord-00000-of-00002.gz'), input_file)
+    tf.io.gfile.copy(
+        os.path.join(self._input_dict[INPUT_KEY][0].uri, 'tfrecord',
+                     'data_tfrecord-00001-of-00002.gz'),
+        input_file.replace('00000-of', '00001-of'))
+    self._input_dict[INPUT_KEY][0].uri = os.path.join(self.get_temp_dir(),
+                                                      'input')
+
+    examples = self._RunPassthrough(
+        example_gen_pb2.Output(shuffle_mode=example_gen_pb2.Output.NO_SHUFFLE),
+        link_input_files=True)
+
+    train_output_file = os.path.join(examples.uri, 'train',
+                                     'data_tfrecord-00000-of-00001.gz')
+    self.assertEqual(os.stat(input_file).st_ino,
+                     os.stat(train_output_file).st_ino)
+
+  def testDoPassthroughWithShuffle(self):
+    examples = self._RunPassthrough(example_gen_pb2.Output())
+
+    # Input files are not copied as is, as their records are shuffled.
+    input_file = os.path.join(self._input_dict[INPUT_KEY][0].uri, 'tfrecord',
+                              'data_tfrecord-00000-of-00002.gz')
+    train_output_file = os.path.join(examples.uri, 'train',
+                                     'data_tfrecord-00000-of-00001.gz')
+    self.assertTrue(tf.io.gfile.exists(train_output_file))
+    with tf.io.gfile.GFile(input_file, 'rb') as f:
+      input_bytes = f.read()
+    with tf.io.gfile.GFile(train_output_file, 'rb') as f:
+      self.assertNotEqual(input_bytes, f.read())
+
   def testDo(self):
     output_data_dir = os.path.join(
         os.environ.get('TEST_UNDECLARED_OUTPUTS_DIR', self.get_temp_dir()),
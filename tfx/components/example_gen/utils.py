@@ -18,16 +18,37 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-from typing import Any, Dict, List, Text, Union
+import collections
+from typing import Any, Dict, List, Optional, Sequence, Text, Tuple, Union
 
+import numpy as np
+import pyarrow as pa
 import six
 import tensorflow as tf
 
 from tfx.proto import example_gen_pb2
 from google.protobuf import json_format
+from google.protobuf import message
 
 _DEFAULT_ENCODING = 'utf-8'
 
+# Tags of the fields of tf.train.Example and its nested messages in the proto
+# wire format. All of them are length delimited.
+# Example.features and Features.feature (a map whose entries are messages).
+_FEATURES_TAG = b'\n'
+# Key and value of a map entry.
+_MAP_KEY_TAG = b'\n'
+_MAP_VALUE_TAG = b'\x12'
+# Feature.bytes_list, Feature.float_list and Feature.int64_list.
+_BYTES_LIST_TAG = b'\n'
+_FLOAT_LIST_TAG = b'\x12'
+_INT64_LIST_TAG = b'\x1a'
+# BytesList.value, and the packed FloatList.value and Int64List.value.
+_LIST_VALUE_TAG = b'\n'
+# Serialized tf.train.Example with an empty feature map.
+_EMPTY_EXAMPLE = _FEATURES_TAG + b'\x00'
+_ONE_BYTE_VARINTS = [six.int2byte(i) for i in range(128)]
+
 
 def dict_to_example(instance: Dict[Text, Any]) -> tf.train.Example:
   """Converts dict to tf example."""
@@ -67,6 +88,386 @@ def dict_to_example(instance: Dict[Text, Any]) -> tf.train.Example:
   return tf.train.Example(features=tf.train.Features(feature=feature))
 
 
+def _encode_varint(value: int) -> bytes:
+  """Encodes an int64 as a proto varint."""
+  if 0 <= value < 128:
+    return _ONE_BYTE_VARINTS[value]
+  # Negative values are encoded as their 64 bits two's complement.
+  value &= 0xFFFFFFFFFFFFFFFF
+  result = bytearray()
+  while value > 0x7F:
+    result.append((value & 0x7F) | 0x80)
+    value >>= 7
+  result.append(value)
+  return bytes(result)
+
+
+def _encode_varints(values: List[int]) -> List[bytes]:
+  """Encodes int64s as proto varints, all at once."""
+  if not values:
+    return []
+  # Negative values are encoded as their 64 bits two's complement.
+  unsigned = np.asarray(values, dtype=np.int64).view(np.uint64)
+  # Varints hold 7 bits per byte, in up to 10 bytes.
+  groups = np.empty((len(values), 10), dtype=np.uint8)
+  sizes = np.ones(len(values), dtype=np.int64)
+  for i in range(10):
+    shifted = unsigned >> np.uint64(7 * i)
+    groups[:, i] = shifted & np.uint64(0x7F)
+    if i:
+      sizes += shifted > 0
+  # All bytes but the last have their most significant bit set.
+  groups |= np.where(
+      np.arange(10)[np.newaxis, :] < sizes[:, np.newaxis] - 1, 0x80,
+      0).astype(np.uint8)
+  data = groups.tobytes()
+  return [data[10 * i:10 * i + size] for i, size in enumerate(sizes.tolist())]
+
+
+def _length_delimited(tag: bytes, payload: bytes) -> bytes:
+  return tag + _encode_varint(len(payload)) + payload
+
+
+def _encode_entry(key: bytes, feature_tag: bytes, list_value: bytes) -> bytes:
+  """Encodes a Features.feature map entry.
+
+  Args:
+    key: encoded key field of the entry.
+    feature_tag: tag of the list field of the feature.
+    list_value: serialized BytesList, FloatList or Int64List of the feature.
+
+  Returns:
+    The serialized map entry.
+  """
+  return _length_delimited(
+      _FEATURES_TAG,
+      key + _length_delimited(_MAP_VALUE_TAG,
+                              _length_delimited(feature_tag, list_value)))
+
+
+def _encode_single_value_entries(key: bytes, feature_tag: bytes,
+                                 empty_entry: bytes,
+                                 values: List[Optional[bytes]]) -> List[bytes]:
+  """Encodes the feature map entries of a column of single values.
+
+  The entries only differ by their value and the lengths preceding it, so the
+  bytes preceding the value are computed once for each value length.
+
+  Args:
+    key: encoded key field of the entries.
+    feature_tag: tag of the list field of the features.
+    empty_entry: entry of an empty feature.
+    values: encoded value of each row, None for an empty feature.
+
+  Returns:
+    List of serialized map entries, one for each row.
+  """
+  prefixes = {}
+  entries = []
+  for value in values:
+    if value is None:
+      entries.append(empty_entry)
+      continue
+    size = len(value)
+    prefix = prefixes.get(size)
+    if prefix is None:
+      entry = _encode_entry(key, feature_tag,
+                            _length_delimited(_LIST_VALUE_TAG, b'\x00' * size))
+      prefix = entry[:len(entry) - size]
+      prefixes[size] = prefix
+    entries.append(prefix + value)
+  return entries
+
+
+def _encode_column(name: Text, column: pa.Array) -> List[bytes]:
+  """Encodes a column as the entries of the feature map of each row.
+
+  Args:
+    name: column name, used as feature name.
+    column: column of a RecordBatch, of a primitive type or list of it.
+
+  Returns:
+    List of serialized Features.feature map entries, one for each row.
+
+  Raises:
+    RuntimeError: if the column type is not supported.
+  """
+  key = _length_delimited(_MAP_KEY_TAG, name.encode(_DEFAULT_ENCODING))
+  empty_entry = _length_delimited(_FEATURES_TAG,
+                                  key + _length_delimited(_MAP_VALUE_TAG, b''))
+  value_type = column.type
+  is_list = pa.types.is_list(value_type)
+  if is_list:
+    value_type = value_type.value_type
+  # Rows as lists of values, None or an empty list for an empty feature.
+  rows = column.to_pylist()
+  if not is_list:
+    rows = [None if v is None else [v] for v in rows]
+
+  if pa.types.is_null(value_type):
+    return [empty_entry] * len(rows)
+  if pa.types.is_integer(value_type) or pa.types.is_boolean(value_type):
+    feature_tag = _INT64_LIST_TAG
+    varints = iter(_encode_varints([v for r in rows if r for v in r]))
+    rows = [[next(varints) for _ in r] if r else None for r in rows]
+  elif pa.types.is_floating(value_type):
+    feature_tag = _FLOAT_LIST_TAG
+    # Casts all the values to little endian float32 at once, the same way as
+    # FloatList does. Values out of the float32 range become infinities.
+    with np.errstate(over='ignore'):
+      data = np.asarray([v for r in rows if r for v in r],
+                        dtype=np.float64).astype('<f4').tobytes()
+    chunks = iter([data[i:i + 4] for i in range(0, len(data), 4)])
+    rows = [[next(chunks) for _ in r] if r else None for r in rows]
+  elif pa.types.is_binary(value_type) or pa.types.is_string(value_type):
+    feature_tag = _BYTES_LIST_TAG
+    if pa.types.is_string(value_type):
+      rows = [[v.encode(_DEFAULT_ENCODING) for v in r] if r else None
+              for r in rows]
+  else:
+    raise RuntimeError('Column type {} is not supported.'.format(value_type))
+
+  if not is_list:
+    return _encode_single_value_entries(key, feature_tag, empty_entry,
+                                        [r[0] if r else None for r in rows])
+  entries = []
+  for r in rows:
+    if not r:
+      entries.append(empty_entry)
+    elif feature_tag == _BYTES_LIST_TAG:
+      entries.append(
+          _encode_entry(
+              key, feature_tag,
+              b''.join(_length_delimited(_LIST_VALUE_TAG, v) for v in r)))
+    else:
+      # Int64List and FloatList values are packed.
+      entries.append(
+          _encode_entry(key, feature_tag,
+                        _length_delimited(_LIST_VALUE_TAG, b''.join(r))))
+  return entries
+
+
+def record_batch_to_serialized_examples(
+    record_batch: pa.RecordBatch,
+    column_names: Optional[Sequence[Text]] = None) -> List[bytes]:
+  """Converts an Arrow RecordBatch to serialized tf examples, column by column.
+
+  Each row gives the same bytes as
+  `dict_to_example(row).SerializeToString(deterministic=True)`, where nulls
+  and empty lists become empty features, without building any proto message.
+
+  Args:
+    record_batch: RecordBatch whose columns have integer, boolean, floating,
+      string or binary values, or lists of them.
+    column_names: optional names of the columns to convert, defaults to all.
+
+  Returns:
+    List of serialized tf examples, one for each row.
+
+  Raises:
+    RuntimeError: if a column type is not supported.
+  """
+  names = record_batch.schema.names
+  if column_names is None:
+    column_names = names
+  columns = sorted(
+      ((name, record_batch.column(names.index(name))) for name in column_names),
+      key=lambda c: c[0].encode(_DEFAULT_ENCODING))
+  if not columns:
+    return [_EMPTY_EXAMPLE] * record_batch.num_rows
+  encoded_columns = [_encode_column(name, column) for name, column in columns]
+  return [
+      _length_delimited(_FEATURES_TAG, b''.join(entries))
+      for entries in zip(*encoded_columns)
+  ]
+
+
+def _infer_arrow_type(value: Any) -> Optional[pa.DataType]:
+  """Returns the Arrow type of a value as converted by dict_to_example.
+
+  Args:
+    value: a value of a row.
+
+  Returns:
+    The Arrow type, or None if the value is None or an empty list.
+
+  Raises:
+    RuntimeError: if the value type is not supported.
+  """
+  if value is None:
+    return None
+  if isinstance(value, bool):
+    return pa.bool_()
+  if isinstance(value, six.integer_types):
+    return pa.int64()
+  if isinstance(value, float):
+    return pa.float64()
+  if isinstance(value, (six.text_type, str)):
+    return pa.string()
+  if isinstance(value, bytes):
+    return pa.binary()
+  if isinstance(value, list):
+    if not value:
+      return None
+    value_type = _infer_arrow_type(value[0])
+    if value_type is None or pa.types.is_list(value_type):
+      raise RuntimeError('Column type `list of {}` is not supported.'.format(
+          type(value[0])))
+    return pa.list_(value_type)
+  raise RuntimeError('Column type {} is not supported.'.format(type(value)))
+
+
+def _python_types(value_type: pa.DataType) -> Tuple[type, ...]:
+  """Returns the Python types dict_to_example converts to an Arrow type."""
+  if pa.types.is_boolean(value_type):
+    return (bool,)
+  if pa.types.is_integer(value_type):
+    return six.integer_types
+  if pa.types.is_floating(value_type):
+    return (float,)
+  if pa.types.is_string(value_type):
+    return (six.text_type, str)
+  if pa.types.is_binary(value_type):
+    return (bytes,)
+  return ()
+
+
+def _check_column_values(name: Text, arrow_type: pa.DataType,
+                         values: List[Any]) -> None:
+  """Checks that dict_to_example converts values to the type of a column.
+
+  Arrow would otherwise coerce values, e.g. truncate floats of an integer
+  column, while dict_to_example converts each value by its own type.
+
+  Args:
+    name: column name.
+    arrow_type: Arrow type of the column.
+    values: values of the column, one for each row.
+
+  Raises:
+    ValueError: if a value is not of the type of the column.
+  """
+  is_list = pa.types.is_list(arrow_type)
+  value_type = arrow_type.value_type if is_list else arrow_type
+  first_types = _python_types(value_type)
+  if not first_types:
+    # Unsupported types are reported when the column is encoded.
+    return
+  # dict_to_example converts a list by the type of its first value, and
+  # FloatList also takes integers.
+  other_types = first_types
+  if pa.types.is_floating(value_type):
+    other_types += six.integer_types
+  for value in values:
+    if value is None:
+      continue
+    if not is_list:
+      if type(value) in first_types:
+        continue
+    elif isinstance(value, list):
+      if not value or (type(value[0]) in first_types and
+                       all(type(v) in other_types for v in value[1:])):
+        continue
+    raise ValueError('Value {!r} of column {} is not of type {}.'.format(
+        value, name, arrow_type))
+
+
+class ExampleEncoder(object):
+  """Encodes batches of rows to serialized tf examples by a per column plan.
+
+  The plan gives the Arrow type of the values of each column. Rows are
+  converted column by column through an Arrow RecordBatch, see
+  record_batch_to_serialized_examples, without building any tf.train.Feature.
+  Use make_example_encoder to build an encoder.
+  """
+
+  def __init__(self, columns: List[Tuple[Text, Optional[pa.DataType]]]):
+    """Initializes the encoder.
+
+    Args:
+      columns: names and Arrow types of the columns of the rows. Columns with
+        a None type get the type of their first value in the encoded rows.
+    """
+    self._columns = list(columns)
+
+  def encode_batch(self, rows: Sequence[Dict[Text, Any]]) -> List[bytes]:
+    """Encodes rows to serialized tf examples.
+
+    Each row gives the same bytes as
+    `dict_to_example(row).SerializeToString(deterministic=True)`.
+
+    Args:
+      rows: rows as dicts from column name to value, all with the columns of
+        the plan and values of their type, or None.
+
+    Returns:
+      List of serialized tf examples, one for each row.
+
+    Raises:
+      ValueError: if rows do not have the columns of the plan, or values are
+        not converted to the type of their column by dict_to_example, e.g. an
+        int in a floating column.
+      RuntimeError: if the type of a value is not supported.
+    """
+    if any(len(row) != len(self._columns) for row in rows):
+      raise ValueError('Rows do not have the {} columns of the plan.'.format(
+          len(self._columns)))
+    if not self._columns:
+      return [_EMPTY_EXAMPLE] * len(rows)
+    arrays = []
+    for index, (name, arrow_type) in enumerate(self._columns):
+      try:
+        values = [row[name] for row in rows]
+      except KeyError:
+        raise ValueError('Rows do not have column {}.'.format(name))
+      if arrow_type is None:
+        arrow_type = next((t for t in (_infer_arrow_type(v) for v in values)
+                           if t is not None), None)
+        if arrow_type is None:
+          # Only None or empty lists, converted to empty features.
+          arrays.append(pa.array([None] * len(values), type=pa.null()))
+          continue
+        self._columns[index] = (name, arrow_type)
+      _check_column_values(name, arrow_type, values)
+      try:
+        arrays.append(pa.array(values, type=arrow_type))
+      except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        raise ValueError('Values of column {} are not of type {}: {}'.format(
+            name, arrow_type, e))
+    record_batch = pa.RecordBatch.from_arrays(
+        arrays, [name for name, _ in self._columns])
+    return record_batch_to_serialized_examples(record_batch)
+
+  def encode(self, row: Dict[Text, Any]) -> bytes:
+    """Encodes a row to a serialized tf example, see encode_batch."""
+    return self.encode_batch([row])[0]
+
+
+def make_example_encoder(
+    schema_or_row: Union[pa.Schema, Dict[Text, Any]]) -> ExampleEncoder:
+  """Makes an encoder of rows to serialized tf examples.
+
+  The types of the columns are given by a schema, or inferred once from a first
+  row the same way as dict_to_example does, instead of for each value.
+
+  Args:
+    schema_or_row: Arrow schema of the columns, whose types are integer,
+      boolean, floating, string, binary or lists of them, or a row as a dict
+      from column name to value. Columns with None or an empty list in the row
+      get the type of their first value in the encoded rows.
+
+  Returns:
+    An ExampleEncoder.
+
+  Raises:
+    RuntimeError: if the type of a value of the row is not supported.
+  """
+  if isinstance(schema_or_row, pa.Schema):
+    return ExampleEncoder([(field.name, field.type) for field in schema_or_row])
+  return ExampleEncoder([(name, _infer_arrow_type(value))
+                         for name, value in schema_or_row.items()])
+
+
 def generate_output_split_names(
     input_config: Union[example_gen_pb2.Input, Dict[Text, Any]],
     output_config: Union[example_gen_pb2.Output, Dict[Text,
@@ -74,7 +475,8 @@ def generate_output_split_names(
   """Return output split name based on input and output config.
 
   Return output split name if it's specified and input only contains one split,
-  otherwise output split will be same as input.
+  otherwise output split will be same as input. Input splits with the same name,
+  e.g., the spans of a range of spans, are one split.
 
   Args:
     input_config: example_gen_pb2.Input instance. If any field is provided as a
@@ -90,7 +492,7 @@ def generate_output_split_names(
   Raises:
     RuntimeError: if configs are not valid, including:
       - Missing field.
-      - Duplicated split.
+      - Duplicated output split.
       - Output split is specified while input has more than one split.
       - Missing train and eval split.
   """
@@ -114,7 +516,7 @@ def generate_output_split_names(
       raise RuntimeError(
           'ExampleGen instance specified output splits but no input split '
           'is specified.')
-    if len(input_config['splits']) != 1:
+    if len(set(split.get('name') for split in input_config['splits'])) != 1:
       # If output is specified, then there should only be one input split.
       raise RuntimeError(
           'ExampleGen instance specified output splits but at the same time '
@@ -132,7 +534,8 @@ def generate_output_split_names(
         if not split['name'] or not split['pattern']:
           raise RuntimeError('Str-typed input split name and pattern '
                              'are required.')
-        result.append(split['name'])
+        if split['name'] not in result:
+          result.append(split['name'])
 
   if not result:
     raise RuntimeError('ExampleGen splits are missing.')
@@ -142,6 +545,26 @@ def generate_output_split_names(
   return result
 
 
+def get_split_patterns(
+    input_config: example_gen_pb2.Input) -> Dict[Text, List[Text]]:
+  """Returns the input patterns of each split name, in the order of the config.
+
+  Input splits with the same name, e.g., the spans of a range of spans, are read
+  together as one split.
+
+  Args:
+    input_config: example_gen_pb2.Input instance.
+
+  Returns:
+    OrderedDict from split name to the patterns of the input splits with this
+    name.
+  """
+  result = collections.OrderedDict()
+  for split in input_config.splits:
+    result.setdefault(split.name, []).append(split.pattern)
+  return result
+
+
 def make_default_input_config(
     split_pattern: Text = '*') -> example_gen_pb2.Input:
   """Returns default input config."""
@@ -151,6 +574,34 @@ def make_default_input_config(
   ])
 
 
+def make_custom_config(config: message.Message) -> example_gen_pb2.CustomConfig:
+  """Returns a CustomConfig packing the config of an ExampleGen executor."""
+  custom_config = example_gen_pb2.CustomConfig()
+  custom_config.custom_config.Pack(config)
+  return custom_config
+
+
+def unpack_custom_config(exec_properties: Dict[Text, Any],
+                         config: message.Message) -> message.Message:
+  """Unpacks the config packed in the custom_config execution property.
+
+  Args:
+    exec_properties: A dict of execution properties, with an optional
+      custom_config holding the JSON string of an example_gen_pb2.CustomConfig.
+    config: Config message to fill. It is left unchanged if custom_config is
+      unset or packs a message of another type.
+
+  Returns:
+    The config message.
+  """
+  if exec_properties.get('custom_config'):
+    custom_config = example_gen_pb2.CustomConfig()
+    json_format.Parse(exec_properties['custom_config'], custom_config)
+    if custom_config.custom_config.Is(config.DESCRIPTOR):
+      custom_config.custom_config.Unpack(config)
+  return config
+
+
 def make_default_output_config(
     input_config: Union[example_gen_pb2.Input, Dict[Text, Any]]
 ) -> example_gen_pb2.Output:
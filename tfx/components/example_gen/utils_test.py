@@ -20,12 +20,14 @@ from __future__ import print_function
 from typing import Text
 # Standard Imports
 
+import pyarrow as pa
 import tensorflow as tf
 
 from tfx.components.example_gen import utils
 from tfx.orchestration import data_types
 from tfx.proto import example_gen_pb2
 from tfx.utils import json_utils
+from google.protobuf import json_format
 
 
 class UtilsTest(tf.test.TestCase):
@@ -108,6 +110,108 @@ class UtilsTest(tf.test.TestCase):
         }
         """, example)
 
+  def testRecordBatchToSerializedExamples(self):
+    record_batch = pa.RecordBatch.from_arrays([
+        pa.array([10, None, -1], type=pa.int64()),
+        pa.array([5.0, 0.1, None], type=pa.float64()),
+        pa.array(['abc', None, ''], type=pa.string()),
+        pa.array([[1, 2], [], None], type=pa.list_(pa.int64())),
+        pa.array([[3.0], None, [1e40]], type=pa.list_(pa.float64())),
+        pa.array([['ab', 'cd'], ['e'], []], type=pa.list_(pa.string())),
+        pa.array([None, None, None], type=pa.null()),
+    ], ['int', 'float', 'str', 'int_list', 'float_list', 'str_list', 'none'])
+
+    serialized_examples = utils.record_batch_to_serialized_examples(
+        record_batch)
+
+    columns = dict(
+        (name, record_batch.column(index).to_pylist())
+        for index, name in enumerate(record_batch.schema.names))
+    for row, serialized_example in enumerate(serialized_examples):
+      instance = dict((name, values[row]) for name, values in columns.items())
+      self.assertEqual(
+          utils.dict_to_example(instance).SerializeToString(
+              deterministic=True), serialized_example)
+    self.assertLen(
+        utils.record_batch_to_serialized_examples(
+            record_batch, column_names=['float', 'int']), 3)
+
+  def testMakeExampleEncoderFromRow(self):
+    rows = [{
+        'int': 1,
+        'float': 2.5,
+        'str': 'a',
+        'int_list': [1, 2],
+        'float_list': [1.5],
+        'str_list': ['b', ''],
+        'none': None,
+        'empty_list': [],
+    }, {
+        'int': None,
+        'float': None,
+        'str': '',
+        'int_list': [],
+        'float_list': None,
+        'str_list': [],
+        'none': 3,
+        'empty_list': ['c'],
+    }]
+    encoder = utils.make_example_encoder(rows[0])
+    self.assertEqual([
+        utils.dict_to_example(row).SerializeToString(deterministic=True)
+        for row in rows
+    ], encoder.encode_batch(rows))
+    self.assertEqual(
+        utils.dict_to_example(rows[0]).SerializeToString(deterministic=True),
+        encoder.encode(rows[0]))
+
+  def testMakeExampleEncoderFromSchema(self):
+    encoder = utils.make_example_encoder(
+        pa.schema([('int', pa.int64()), ('str', pa.string())]))
+    row = {'int': 1, 'str': 'a'}
+    self.assertEqual(
+        utils.dict_to_example(row).SerializeToString(deterministic=True),
+        encoder.encode(row))
+    with self.assertRaisesRegexp(ValueError, 'columns'):
+      encoder.encode({'int': 1})
+    with self.assertRaisesRegexp(ValueError, 'column str'):
+      encoder.encode({'int': 1, 'other': 'a'})
+    with self.assertRaisesRegexp(ValueError, 'column int'):
+      encoder.encode({'int': 'a', 'str': 'a'})
+
+  def testMakeExampleEncoderValueTypeMismatch(self):
+    encoder = utils.make_example_encoder(
+        pa.schema([('float', pa.float64()), ('int', pa.int64()),
+                   ('float_list', pa.list_(pa.float64()))]))
+    row = {'float': 1.5, 'int': 3, 'float_list': [1.5, 2]}
+    self.assertEqual(
+        utils.dict_to_example(row).SerializeToString(deterministic=True),
+        encoder.encode(row))
+    # dict_to_example converts values by their own type, not the column's.
+    for row in [{
+        'float': 3,
+        'int': None,
+        'float_list': None
+    }, {
+        'float': None,
+        'int': 3.7,
+        'float_list': None
+    }, {
+        'float': None,
+        'int': None,
+        'float_list': [1, 2.5]
+    }]:
+      with self.assertRaisesRegexp(ValueError, 'is not of type'):
+        encoder.encode(row)
+
+    rows = [{'float': 1.5}, {'float': 2}]
+    with self.assertRaisesRegexp(ValueError, 'Value 2 of column float'):
+      utils.make_example_encoder(rows[0]).encode_batch(rows)
+
+  def testMakeExampleEncoderUnsupportedType(self):
+    with self.assertRaisesRegexp(RuntimeError, 'not supported'):
+      utils.make_example_encoder({'dict': {}})
+
   def testMakeOutputSplitNames(self):
     split_names = utils.generate_output_split_names(
         input_config=example_gen_pb2.Input(splits=[
@@ -128,6 +232,38 @@ class UtilsTest(tf.test.TestCase):
             ])))
     self.assertListEqual(['train', 'eval'], split_names)
 
+  def testMakeOutputSplitNamesWithSameInputSplitName(self):
+    split_names = utils.generate_output_split_names(
+        input_config=example_gen_pb2.Input(splits=[
+            example_gen_pb2.Input.Split(name='train', pattern='span1/train/*'),
+            example_gen_pb2.Input.Split(name='eval', pattern='span1/eval/*'),
+            example_gen_pb2.Input.Split(name='train', pattern='span2/train/*')
+        ]),
+        output_config=example_gen_pb2.Output())
+    self.assertListEqual(['train', 'eval'], split_names)
+
+    split_names = utils.generate_output_split_names(
+        input_config=example_gen_pb2.Input(splits=[
+            example_gen_pb2.Input.Split(name='single', pattern='span1/*'),
+            example_gen_pb2.Input.Split(name='single', pattern='span2/*')
+        ]),
+        output_config=example_gen_pb2.Output(
+            split_config=example_gen_pb2.SplitConfig(splits=[
+                example_gen_pb2.SplitConfig.Split(name='train', hash_buckets=2),
+                example_gen_pb2.SplitConfig.Split(name='eval', hash_buckets=1)
+            ])))
+    self.assertListEqual(['train', 'eval'], split_names)
+
+  def testGetSplitPatterns(self):
+    split_patterns = utils.get_split_patterns(
+        example_gen_pb2.Input(splits=[
+            example_gen_pb2.Input.Split(name='train', pattern='span1/train/*'),
+            example_gen_pb2.Input.Split(name='eval', pattern='span1/eval/*'),
+            example_gen_pb2.Input.Split(name='train', pattern='span2/train/*')
+        ]))
+    self.assertEqual([('train', ['span1/train/*', 'span2/train/*']),
+                      ('eval', ['span1/eval/*'])], list(split_patterns.items()))
+
   def testMakeDefaultOutputConfig(self):
     output_config = utils.make_default_output_config(
         utils.make_default_input_config())
@@ -195,6 +331,27 @@ class UtilsTest(tf.test.TestCase):
     })
     self.assertEqual(0, len(output_config.split_config.splits))
 
+  def testUnpackCustomConfig(self):
+    csv_config = example_gen_pb2.CsvConfig(type_inference_sample_size=10)
+    exec_properties = {
+        'custom_config':
+            json_format.MessageToJson(
+                utils.make_custom_config(csv_config),
+                preserving_proto_field_name=True)
+    }
+    self.assertEqual(
+        csv_config,
+        utils.unpack_custom_config(exec_properties,
+                                   example_gen_pb2.CsvConfig()))
+    # Configs of other types are left unchanged.
+    self.assertEqual(
+        example_gen_pb2.ImportConfig(),
+        utils.unpack_custom_config(exec_properties,
+                                   example_gen_pb2.ImportConfig()))
+    self.assertEqual(
+        example_gen_pb2.CsvConfig(),
+        utils.unpack_custom_config({}, example_gen_pb2.CsvConfig()))
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -26,6 +26,8 @@ from tensorflow_serving.apis import classification_pb2
 from tensorflow_serving.apis import regression_pb2
 from tfx import types
 from tfx.components.infra_validator import types as infra_validator_types
+from tfx.components.util import examples_utils
+from tfx.proto import example_gen_pb2
 from tfx.proto import infra_validator_pb2
 from tfx.types import artifact_utils
 
@@ -107,8 +109,8 @@ class RequestBuilder(object):
     self._signature_name = signature_name
 
   # TODO(jjong): The method strongly assumes that the output of ExampleGen is
-  # a gzipped TFRecords of tf.Example. We need a better abstraction (e.g. TFXIO)
-  # to accept arbitrary file format and convert it to appropriate request types.
+  # TFRecords of tf.Example. We need a better abstraction (e.g. TFXIO) to accept
+  # arbitrary file format and convert it to appropriate request types.
   def ReadFromExamplesArtifact(self, examples: types.Artifact,
                                split_name: Optional[Text] = None):
     """Read up to `self._max_examples` `tf.Example`s from `Examples` artifact.
@@ -126,8 +128,20 @@ class RequestBuilder(object):
       raise ValueError('No split_name {}; available split names: {}'.format(
           split_name, ', '.join(available_splits)))
 
+    file_format = examples_utils.get_file_format(examples)
+    if not examples_utils.is_tfrecord(file_format):
+      raise ValueError('Unsupported file format {} of examples.'.format(
+          example_gen_pb2.Output.FileFormat.Name(file_format)))
+    if file_format == example_gen_pb2.Output.FORMAT_TFRECORDS_UNCOMPRESSED:
+      file_name_suffix = ''
+      compression_type = ''
+    else:
+      file_name_suffix = '.gz'
+      compression_type = 'GZIP'
+
     # ExampleGen generates artifacts under each split_name directory.
-    glob_pattern = os.path.join(examples.uri, split_name, '*.gz')
+    glob_pattern = os.path.join(examples.uri, split_name,
+                                '*' + file_name_suffix)
     try:
       filenames = tf.io.gfile.glob(glob_pattern)
     except tf.errors.NotFoundError:
@@ -141,7 +155,7 @@ class RequestBuilder(object):
       return
 
     self._ReadFromDataset(
-        tf.data.TFRecordDataset(filenames, compression_type='GZIP'))
+        tf.data.TFRecordDataset(filenames, compression_type=compression_type))
 
   def _ReadFromDataset(self, dataset):
     """Read up to `self._max_examples` `Example`s from `tf.data.Dataset`.
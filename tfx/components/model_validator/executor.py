@@ -22,13 +22,13 @@ import os
 from typing import Any, Dict, List, Text
 
 import absl
-import apache_beam as beam
 import tensorflow as tf
 import tensorflow_model_analysis as tfma
 
 from tfx import types
 from tfx.components.base import base_executor
 from tfx.components.model_validator import constants
+from tfx.components.util import examples_utils
 from tfx.types import artifact_utils
 from tfx.utils import io_utils
 from tfx.utils import path_utils
@@ -92,7 +92,8 @@ class Executor(base_executor.BaseExecutor):
   def _generate_blessing_result(self, eval_examples_uri: Text,
                                 slice_spec: List[tfma.slicer.SingleSliceSpec],
                                 current_model_dir: Text,
-                                blessed_model_dir: Text) -> bool:
+                                blessed_model_dir: Text,
+                                eval_examples_file_format: int) -> bool:
     current_model_eval_result_path = os.path.join(
         self._temp_path, constants.CURRENT_MODEL_EVAL_RESULT_PATH)
     blessed_model_eval_result_path = os.path.join(
@@ -100,8 +101,9 @@ class Executor(base_executor.BaseExecutor):
 
     with self._make_beam_pipeline() as pipeline:
       eval_data = (
-          pipeline | 'ReadData' >> beam.io.ReadFromTFRecord(
-              file_pattern=io_utils.all_files_pattern(eval_examples_uri)))
+          pipeline | 'ReadData' >> examples_utils.ReadSerializedExamples(  # pylint: disable=no-value-for-parameter
+              io_utils.all_files_pattern(eval_examples_uri),
+              eval_examples_file_format))
 
       current_model = tfma.default_eval_shared_model(
           eval_saved_model_path=path_utils.eval_model_path(current_model_dir))
@@ -200,7 +202,10 @@ class Executor(base_executor.BaseExecutor):
         eval_examples_uri=eval_examples_uri,
         slice_spec=[tfma.slicer.SingleSliceSpec()],
         current_model_dir=current_model.uri,
-        blessed_model_dir=blessed_model_dir)
+        blessed_model_dir=blessed_model_dir,
+        eval_examples_file_format=examples_utils.get_file_format(
+            artifact_utils.get_single_instance(
+                input_dict[constants.EXAMPLES_KEY])))
 
     if blessed:
       io_utils.write_string_file(
@@ -30,6 +30,7 @@ from tensorflow_data_validation.statistics import stats_options as options
 from tensorflow_metadata.proto.v0 import statistics_pb2
 from tfx import types
 from tfx.components.base import base_executor
+from tfx.components.util import examples_utils
 from tfx.types import artifact_utils
 from tfx.utils import io_utils
 
@@ -108,11 +109,12 @@ class Executor(base_executor.BaseExecutor):
 
     split_uris = []
     for artifact in input_dict[EXAMPLES_KEY]:
+      file_format = examples_utils.get_file_format(artifact)
       for split in artifact_utils.decode_split_names(artifact.split_names):
         uri = os.path.join(artifact.uri, split)
-        split_uris.append((split, uri))
+        split_uris.append((split, uri, file_format))
     with self._make_beam_pipeline() as p:
-      for split, uri in split_uris:
+      for split, uri, file_format in split_uris:
         absl.logging.info('Generating statistics for split {}'.format(split))
         input_uri = io_utils.all_files_pattern(uri)
         output_uri = artifact_utils.get_split_uri(output_dict[STATISTICS_KEY],
@@ -120,8 +122,8 @@ class Executor(base_executor.BaseExecutor):
         output_path = os.path.join(output_uri, _DEFAULT_FILE_NAME)
         _ = (
             p
-            | 'ReadData.' + split >>
-            beam.io.ReadFromTFRecord(file_pattern=input_uri)
+            | 'ReadData.' + split >> examples_utils.ReadSerializedExamples(  # pylint: disable=no-value-for-parameter
+                input_uri, file_format)
             | 'DecodeData.' + split >> tf_example_decoder.DecodeTFExample()
             | 'GenerateStatistics.' + split >>
             stats_api.GenerateStatistics(stats_options)
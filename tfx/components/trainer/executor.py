@@ -32,6 +32,7 @@ from tensorflow.python.lib.io import file_io  # pylint: disable=g-direct-tensorf
 from tensorflow_metadata.proto.v0 import schema_pb2
 from tfx import types
 from tfx.components.base import base_executor
+from tfx.components.util import examples_utils
 from tfx.proto import trainer_pb2
 from tfx.types import artifact_utils
 from tfx.utils import import_utils
@@ -153,6 +154,8 @@ class GenericExecutor(base_executor.BaseExecutor):
         _all_files_pattern(
             artifact_utils.get_split_uri(input_dict[EXAMPLES_KEY], 'eval'))
     ]
+    file_format = examples_utils.get_file_format(
+        artifact_utils.get_single_instance(input_dict[EXAMPLES_KEY]))
     schema_file = io_utils.get_only_uri_in_dir(
         artifact_utils.get_single_uri(input_dict[SCHEMA_KEY]))
     # TODO(ruoyu): Make this a dict of tag -> uri instead of list.
@@ -197,6 +200,8 @@ class GenericExecutor(base_executor.BaseExecutor):
         eval_model_dir=eval_model_dir,
         # A list of uris for eval files.
         eval_files=eval_files,
+        # The example_gen_pb2.Output.FileFormat of train and eval files.
+        file_format=file_format,
         # A single uri for schema file.
         schema_file=schema_file,
         # Number of train steps.
@@ -28,6 +28,8 @@ import tensorflow as tf
 from google.protobuf import json_format
 from tfx.components.testdata.module_file import trainer_module
 from tfx.components.trainer import executor
+from tfx.components.util import examples_utils
+from tfx.proto import example_gen_pb2
 from tfx.proto import trainer_pb2
 from tfx.types import artifact_utils
 from tfx.types import standard_artifacts
@@ -150,6 +152,20 @@ class ExecutorTest(tf.test.TestCase):
     with self.assertRaises(ValueError):
       self._do(self._trainer_executor)
 
+  def testGetFnArgsFileFormat(self):
+    fn_args = self._trainer_executor._GetFnArgs(
+        self._input_dict, self._output_dict, self._exec_properties)
+    self.assertEqual(example_gen_pb2.Output.FORMAT_TFRECORDS_GZIP,
+                     fn_args.file_format)
+
+    examples_utils.set_file_format(
+        self._input_dict[executor.EXAMPLES_KEY][0],
+        example_gen_pb2.Output.FORMAT_TFRECORDS_UNCOMPRESSED)
+    fn_args = self._trainer_executor._GetFnArgs(
+        self._input_dict, self._output_dict, self._exec_properties)
+    self.assertEqual(example_gen_pb2.Output.FORMAT_TFRECORDS_UNCOMPRESSED,
+                     fn_args.file_format)
+
   def testDoWithHyperParameters(self):
     hp_artifact = standard_artifacts.HyperParameters()
     hp_artifact.uri = os.path.join(self._output_data_dir, 'hyperparameters/')
@@ -47,7 +47,9 @@ from tfx.components.base import base_executor
 from tfx.components.transform import labels
 from tfx.components.transform import stats_options as transform_stats_options
 from tfx.components.transform import messages
+from tfx.components.util import examples_utils
 from tfx.components.util import value_utils
+from tfx.proto import example_gen_pb2
 from tfx.types import artifact_utils
 from tfx.utils import import_utils
 from tfx.utils import io_utils
@@ -313,6 +315,12 @@ class Executor(base_executor.BaseExecutor):
                                                   'train')
     eval_data_uri = artifact_utils.get_split_uri(input_dict[EXAMPLES_KEY],
                                                  'eval')
+    if examples_utils.is_tfrecord(
+        examples_utils.get_file_format(
+            artifact_utils.get_single_instance(input_dict[EXAMPLES_KEY]))):
+      examples_file_format = labels.FORMAT_TFRECORD
+    else:
+      examples_file_format = labels.FORMAT_PARQUET
     schema_file = io_utils.get_only_uri_in_dir(
         artifact_utils.get_single_uri(input_dict[SCHEMA_KEY]))
     transform_output = artifact_utils.get_single_uri(
@@ -340,13 +348,13 @@ class Executor(base_executor.BaseExecutor):
         labels.ANALYZE_DATA_PATHS_LABEL:
             io_utils.all_files_pattern(train_data_uri),
         labels.ANALYZE_PATHS_FILE_FORMATS_LABEL:
-            labels.FORMAT_TFRECORD,
+            examples_file_format,
         labels.TRANSFORM_DATA_PATHS_LABEL: [
             io_utils.all_files_pattern(train_data_uri),
             io_utils.all_files_pattern(eval_data_uri)
         ],
         labels.TRANSFORM_PATHS_FILE_FORMATS_LABEL: [
-            labels.FORMAT_TFRECORD, labels.FORMAT_TFRECORD
+            examples_file_format, examples_file_format
         ],
         labels.TFT_STATISTICS_USE_TFDV_LABEL:
             True,
@@ -430,16 +438,25 @@ class Executor(base_executor.BaseExecutor):
       A PCollection containing KV pairs of bytes.
     """
     del input_dataset_metadata
-    assert dataset.file_format == labels.FORMAT_TFRECORD, dataset.file_format
-
-    return (
-        pipeline
-        | 'Read' >> beam.io.ReadFromTFRecord(
-            dataset.file_pattern,
-            coder=beam.coders.BytesCoder(),
-            # TODO(b/114938612): Eventually remove this override.
-            validate=False)
-        | 'AddKey' >> beam.Map(lambda x: (None, x)))
+    assert dataset.file_format in (labels.FORMAT_TFRECORD,
+                                   labels.FORMAT_PARQUET), dataset.file_format
+
+    if dataset.file_format == labels.FORMAT_PARQUET:
+      # Parquet files are read the same for any compression.
+      examples = (
+          pipeline
+          | 'Read' >> examples_utils.ReadSerializedExamples(  # pylint: disable=no-value-for-parameter
+              dataset.file_pattern,
+              example_gen_pb2.Output.FORMAT_PARQUET_SNAPPY))
+    else:
+      examples = (
+          pipeline
+          | 'Read' >> beam.io.ReadFromTFRecord(
+              dataset.file_pattern,
+              coder=beam.coders.BytesCoder(),
+              # TODO(b/114938612): Eventually remove this override.
+              validate=False))
+    return examples | 'AddKey' >> beam.Map(lambda x: (None, x))
 
   @staticmethod
   @beam.ptransform_fn
@@ -957,8 +974,10 @@ class Executor(base_executor.BaseExecutor):
 
     stats_use_tfdv = value_utils.GetSoleValue(
         inputs, labels.TFT_STATISTICS_USE_TFDV_LABEL)
+    # Transformed examples are written as GZIP TFRecords whatever the file
+    # format of the input examples.
     materialization_format = (
-        transform_paths_file_formats[-1] if materialize_output_paths else None)
+        labels.FORMAT_TFRECORD if materialize_output_paths else None)
     self._RunBeamImpl(use_tfxio, analyze_data_list, transform_data_list,
                       preprocessing_fn, input_dataset_metadata,
                       transform_output_path, raw_examples_data_format,
@@ -1537,6 +1556,9 @@ class Executor(base_executor.BaseExecutor):
   def _CreateTFXIO(self, dataset: _Dataset,
                    schema: schema_pb2.Schema) -> tfxio.TFXIO:
     """Creates a TFXIO instance for `dataset`."""
+    if dataset.file_format != labels.FORMAT_TFRECORD:
+      raise ValueError('TFXIO only supports {} datasets, got {}.'.format(
+          labels.FORMAT_TFRECORD, dataset.file_format))
     if self._ShouldDecodeAsRawExample(dataset.data_format):
       return raw_tf_record.RawTfRecordTFXIO(dataset.file_pattern,
                                             RAW_EXAMPLE_KEY)
@@ -21,6 +21,8 @@ from __future__ import print_function
 import os
 import tempfile
 
+import pyarrow as pa
+import pyarrow.parquet as pq
 import tensorflow as tf
 import tensorflow_transform as tft
 from tensorflow_transform.beam import tft_unit
@@ -28,6 +30,8 @@ from tfx import types
 from tfx.components.testdata.module_file import transform_module
 from tfx.components.transform import executor
 from tfx.components.transform import labels
+from tfx.components.util import examples_utils
+from tfx.proto import example_gen_pb2
 from tfx.types import artifact_utils
 from tfx.types import standard_artifacts
 
@@ -206,6 +210,36 @@ class ExecutorTest(tft_unit.TransformTestCase):
       self._transform_executor.Do(self._input_dict, self._output_dict,
                                   self._exec_properties)
 
+  def testDoWithParquetExamples(self):
+    examples = self._input_dict[executor.EXAMPLES_KEY][0]
+    parquet_uri = os.path.join(self._output_data_dir, 'parquet_examples')
+    for split_name in ('train', 'eval'):
+      split_uri = os.path.join(parquet_uri, split_name)
+      tf.io.gfile.makedirs(split_uri)
+      serialized_examples = [
+          record.numpy() for record in tf.data.TFRecordDataset(
+              tf.io.gfile.glob(
+                  os.path.join(examples.uri, split_name, '*')),
+              compression_type='GZIP')
+      ]
+      pq.write_table(
+          pa.Table.from_arrays([pa.array(serialized_examples, pa.binary())],
+                               schema=examples_utils.PARQUET_SCHEMA),
+          os.path.join(split_uri, 'data.parquet'),
+          compression='snappy')
+    examples.uri = parquet_uri
+    examples_utils.set_file_format(
+        examples, example_gen_pb2.Output.FORMAT_PARQUET_SNAPPY)
+
+    self._exec_properties['module_file'] = self._module_file
+    self._transform_executor.Do(self._input_dict, self._output_dict,
+                                self._exec_properties)
+    self._verify_transform_outputs()
+    # Transformed examples are GZIP TFRecords whatever the input file format.
+    self.assertTrue(
+        tf.io.gfile.glob(
+            os.path.join(self._transformed_examples.uri, 'train', '*.gz')))
+
   def testCounters(self):
     self._exec_properties['preprocessing_fn'] = self._preprocessing_fn
     metrics = self._runPipelineGetMetrics(self._input_dict, self._output_dict,
@@ -44,6 +44,8 @@ TEMP_OUTPUT_LABEL = 'temp_path'
 
 # Examples File Format
 FORMAT_TFRECORD = 'FORMAT_TFRECORD'
+# Parquet files of serialized examples, as written by ExampleGen.
+FORMAT_PARQUET = 'FORMAT_PARQUET'
 
 # Examples Data Format
 # Indicates that the data format is tf.Example.
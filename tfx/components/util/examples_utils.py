@@ -0,0 +1,189 @@
+# Lint as: python2, python3
+# Copyright 2020 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Utilities to read the files of Examples artifacts in their file format."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from typing import Dict, List, Text
+
+import apache_beam as beam
+import pyarrow as pa
+
+from tfx import types
+from tfx.proto import example_gen_pb2
+
+# Custom property of Examples artifacts holding the name of the
+# example_gen_pb2.Output.FileFormat of their files. Artifacts without it hold
+# GZIP compressed TFRecords.
+FILE_FORMAT_PROPERTY = 'file_format'
+
+# Custom property of Examples artifacts holding the comma separated names of the
+# additional example_gen_pb2.Output.FileFormat of their files.
+ADDITIONAL_FILE_FORMATS_PROPERTY = 'additional_file_formats'
+
+# Custom property of Examples artifacts holding the comma separated
+# 'split_name:rate' of their sampled splits, see
+# example_gen_pb2.Output.sampling.
+SAMPLING_RATES_PROPERTY = 'sampling_rates'
+
+# Column of the serialized examples in Parquet files.
+PARQUET_EXAMPLE_COLUMN = 'serialized_example'
+PARQUET_SCHEMA = pa.schema([(PARQUET_EXAMPLE_COLUMN, pa.binary())])
+
+# Parquet codecs of the Parquet file formats.
+PARQUET_CODECS = {
+    example_gen_pb2.Output.FORMAT_PARQUET_SNAPPY: 'snappy',
+    example_gen_pb2.Output.FORMAT_PARQUET_ZSTD: 'zstd',
+}
+
+# Parquet codecs of the file formats with a column per feature.
+PARQUET_FEATURES_CODECS = {
+    example_gen_pb2.Output.FORMAT_PARQUET_FEATURES_SNAPPY: 'snappy',
+}
+
+# tf.data.TFRecordDataset compression types of the TFRecord file formats.
+_TFRECORD_COMPRESSION_TYPES = {
+    example_gen_pb2.Output.FILE_FORMAT_UNSPECIFIED: 'GZIP',
+    example_gen_pb2.Output.FORMAT_TFRECORDS_GZIP: 'GZIP',
+    example_gen_pb2.Output.FORMAT_TFRECORDS_UNCOMPRESSED: '',
+}
+
+
+def get_file_format(examples: types.Artifact) -> int:
+  """Returns the example_gen_pb2.Output.FileFormat of an Examples artifact."""
+  if FILE_FORMAT_PROPERTY not in examples.mlmd_artifact.custom_properties:
+    return example_gen_pb2.Output.FORMAT_TFRECORDS_GZIP
+  return example_gen_pb2.Output.FileFormat.Value(
+      examples.get_string_custom_property(FILE_FORMAT_PROPERTY))
+
+
+def set_file_format(examples: types.Artifact, file_format: int) -> None:
+  """Records the example_gen_pb2.Output.FileFormat of an Examples artifact."""
+  if file_format == example_gen_pb2.Output.FILE_FORMAT_UNSPECIFIED:
+    file_format = example_gen_pb2.Output.FORMAT_TFRECORDS_GZIP
+  examples.set_string_custom_property(
+      FILE_FORMAT_PROPERTY, example_gen_pb2.Output.FileFormat.Name(file_format))
+
+
+def get_additional_file_formats(examples: types.Artifact) -> List[int]:
+  """Returns the additional file formats of an Examples artifact."""
+  if ADDITIONAL_FILE_FORMATS_PROPERTY not in (
+      examples.mlmd_artifact.custom_properties):
+    return []
+  names = examples.get_string_custom_property(ADDITIONAL_FILE_FORMATS_PROPERTY)
+  return [
+      example_gen_pb2.Output.FileFormat.Value(name)
+      for name in names.split(',')
+      if name
+  ]
+
+
+def set_additional_file_formats(examples: types.Artifact,
+                                file_formats: List[int]) -> None:
+  """Records the additional file formats of an Examples artifact."""
+  examples.set_string_custom_property(
+      ADDITIONAL_FILE_FORMATS_PROPERTY, ','.join(
+          example_gen_pb2.Output.FileFormat.Name(file_format)
+          for file_format in file_formats))
+
+
+def get_sampling_rates(examples: types.Artifact) -> Dict[Text, float]:
+  """Returns the sampling rate of each sampled split of an Examples artifact."""
+  if SAMPLING_RATES_PROPERTY not in examples.mlmd_artifact.custom_properties:
+    return {}
+  rates = {}
+  for split_rate in examples.get_string_custom_property(
+      SAMPLING_RATES_PROPERTY).split(','):
+    if split_rate:
+      split_name, rate = split_rate.rsplit(':', 1)
+      rates[split_name] = float(rate)
+  return rates
+
+
+def set_sampling_rates(examples: types.Artifact,
+                       sampling_rates: Dict[Text, float]) -> None:
+  """Records the sampling rate of each sampled split of an Examples artifact."""
+  # Rates are float32 in example_gen_pb2.Output.sampling.
+  examples.set_string_custom_property(
+      SAMPLING_RATES_PROPERTY, ','.join(
+          '{}:{:.7g}'.format(split_name, sampling_rates[split_name])
+          for split_name in sorted(sampling_rates)))
+
+
+def get_format_split_uri(examples: types.Artifact, split_name: Text,
+                         file_format: int) -> Text:
+  """Returns the directory of the files of a split in an additional format."""
+  format_name = example_gen_pb2.Output.FileFormat.Name(file_format)
+  return os.path.join(examples.uri, format_name.lower(), split_name)
+
+
+def is_tfrecord(file_format: int) -> bool:
+  """Returns whether a file format is a TFRecord file format."""
+  return (file_format not in PARQUET_CODECS and
+          file_format not in PARQUET_FEATURES_CODECS)
+
+
+def get_tfrecord_compression_type(file_format: int) -> Text:
+  """Returns the tf.data.TFRecordDataset compression type of a file format.
+
+  Args:
+    file_format: an example_gen_pb2.Output.FileFormat value.
+
+  Returns:
+    The compression_type argument of tf.data.TFRecordDataset for the files.
+
+  Raises:
+    ValueError: if the file format is not a TFRecord file format.
+  """
+  if file_format not in _TFRECORD_COMPRESSION_TYPES:
+    raise ValueError('Files in {} are not TFRecords.'.format(
+        example_gen_pb2.Output.FileFormat.Name(file_format)))
+  return _TFRECORD_COMPRESSION_TYPES[file_format]
+
+
+@beam.ptransform_fn
+@beam.typehints.with_input_types(beam.Pipeline)
+@beam.typehints.with_output_types(bytes)
+def ReadSerializedExamples(  # pylint: disable=invalid-name
+    pipeline: beam.Pipeline, file_pattern: Text,
+    file_format: int) -> beam.pvalue.PCollection:
+  """Reads serialized examples from files in a given file format.
+
+  Args:
+    pipeline: beam pipeline.
+    file_pattern: pattern of the files to read, e.g., all the files of a split.
+    file_format: an example_gen_pb2.Output.FileFormat value.
+
+  Returns:
+    PCollection of serialized examples.
+
+  Raises:
+    ValueError: if examples cannot be read from the file format.
+  """
+  if file_format in PARQUET_FEATURES_CODECS:
+    raise ValueError('Examples cannot be read from files in {}.'.format(
+        example_gen_pb2.Output.FileFormat.Name(file_format)))
+  if is_tfrecord(file_format):
+    # The compression of TFRecords is detected from the file name suffix.
+    return pipeline | 'ReadFromTFRecord' >> beam.io.ReadFromTFRecord(
+        file_pattern=file_pattern)
+  return (pipeline
+          | 'ReadFromParquet' >> beam.io.ReadFromParquet(
+              file_pattern, columns=[PARQUET_EXAMPLE_COLUMN])
+          | 'ToSerializedExample' >> beam.Map(
+              lambda row: row[PARQUET_EXAMPLE_COLUMN]))
@@ -0,0 +1,112 @@
+# Lint as: python2, python3
+# Copyright 2020 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for tfx.components.util.examples_utils."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+import tensorflow as tf
+from tfx.components.util import examples_utils
+from tfx.proto import example_gen_pb2
+from tfx.types import standard_artifacts
+
+
+class ExamplesUtilsTest(tf.test.TestCase):
+
+  def testGetFileFormat(self):
+    examples = standard_artifacts.Examples()
+    self.assertEqual(example_gen_pb2.Output.FORMAT_TFRECORDS_GZIP,
+                     examples_utils.get_file_format(examples))
+
+    examples_utils.set_file_format(
+        examples, example_gen_pb2.Output.FORMAT_PARQUET_ZSTD)
+    self.assertEqual('FORMAT_PARQUET_ZSTD',
+                     examples.get_string_custom_property('file_format'))
+    self.assertEqual(example_gen_pb2.Output.FORMAT_PARQUET_ZSTD,
+                     examples_utils.get_file_format(examples))
+
+    examples_utils.set_file_format(
+        examples, example_gen_pb2.Output.FILE_FORMAT_UNSPECIFIED)
+    self.assertEqual(example_gen_pb2.Output.FORMAT_TFRECORDS_GZIP,
+                     examples_utils.get_file_format(examples))
+
+  def testGetTFRecordCompressionType(self):
+    self.assertEqual(
+        'GZIP',
+        examples_utils.get_tfrecord_compression_type(
+            example_gen_pb2.Output.FORMAT_TFRECORDS_GZIP))
+    self.assertEqual(
+        '',
+        examples_utils.get_tfrecord_compression_type(
+            example_gen_pb2.Output.FORMAT_TFRECORDS_UNCOMPRESSED))
+    with self.assertRaisesRegexp(ValueError, 'FORMAT_PARQUET_SNAPPY'):
+      examples_utils.get_tfrecord_compression_type(
+          example_gen_pb2.Output.FORMAT_PARQUET_SNAPPY)
+
+  def testGetAdditionalFileFormats(self):
+    examples = standard_artifacts.Examples()
+    examples.uri = '/examples'
+    self.assertEqual([], examples_utils.get_additional_file_formats(examples))
+
+    examples_utils.set_additional_file_formats(examples, [
+        example_gen_pb2.Output.FORMAT_PARQUET_SNAPPY,
+        example_gen_pb2.Output.FORMAT_PARQUET_FEATURES_SNAPPY
+    ])
+    self.assertEqual(
+        'FORMAT_PARQUET_SNAPPY,FORMAT_PARQUET_FEATURES_SNAPPY',
+        examples.get_string_custom_property('additional_file_formats'))
+    self.assertEqual([
+        example_gen_pb2.Output.FORMAT_PARQUET_SNAPPY,
+        example_gen_pb2.Output.FORMAT_PARQUET_FEATURES_SNAPPY
+    ], examples_utils.get_additional_file_formats(examples))
+    self.assertEqual(
+        os.path.join('/examples', 'format_parquet_features_snappy', 'train'),
+        examples_utils.get_format_split_uri(
+            examples, 'train',
+            example_gen_pb2.Output.FORMAT_PARQUET_FEATURES_SNAPPY))
+
+  def testGetSamplingRates(self):
+    examples = standard_artifacts.Examples()
+    self.assertEqual({}, examples_utils.get_sampling_rates(examples))
+
+    examples_utils.set_sampling_rates(examples, {
+        'train': 0.009999999776482582,
+        'eval': 0.5
+    })
+    self.assertEqual(
+        'eval:0.5,train:0.01',
+        examples.get_string_custom_property('sampling_rates'))
+    self.assertEqual({
+        'train': 0.01,
+        'eval': 0.5
+    }, examples_utils.get_sampling_rates(examples))
+
+  def testIsTfRecord(self):
+    self.assertTrue(
+        examples_utils.is_tfrecord(
+            example_gen_pb2.Output.FORMAT_TFRECORDS_UNCOMPRESSED))
+    self.assertFalse(
+        examples_utils.is_tfrecord(
+            example_gen_pb2.Output.FORMAT_PARQUET_SNAPPY))
+    self.assertFalse(
+        examples_utils.is_tfrecord(
+            example_gen_pb2.Output.FORMAT_PARQUET_FEATURES_SNAPPY))
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -18,6 +18,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import itertools
 from typing import Dict, Optional, Text
 
 from tfx import types
@@ -49,25 +50,23 @@ class LatestArtifactsResolver(base_resolver.BaseResolver):
     if pipeline_context is None:
       raise RuntimeError('Pipeline context absent for %s' % pipeline_context)
     for k, c in source_channels.items():
-      candidate_artifacts = metadata_handler.get_qualified_artifacts(
-          context=pipeline_context,
-          type_name=c.type_name,
-          producer_component_id=c.producer_component_id,
-          output_key=c.output_key)
-      previous_artifacts = sorted(
-          candidate_artifacts, key=lambda a: a.artifact.id, reverse=True)
-      if len(previous_artifacts) >= self._desired_num_of_artifact:
-        artifacts_dict[k] = [
-            artifact_utils.deserialize_artifact(a.type, a.artifact)
-            for a in previous_artifacts[:self._desired_num_of_artifact]
-        ]
-        resolve_state_dict[k] = True
-      else:
-        artifacts_dict[k] = [
-            artifact_utils.deserialize_artifact(a.type, a.artifact)
-            for a in previous_artifacts
-        ]
-        resolve_state_dict[k] = False
+      # Qualified artifacts are iterated from the latest, so only the desired
+      # number of artifacts is fetched.
+      previous_artifacts = list(
+          itertools.islice(
+              metadata_handler.iter_qualified_artifacts(
+                  context=pipeline_context,
+                  type_name=c.type_name,
+                  producer_component_id=c.producer_component_id,
+                  output_key=c.output_key,
+                  batch_size=self._desired_num_of_artifact),
+              self._desired_num_of_artifact))
+      artifacts_dict[k] = [
+          artifact_utils.deserialize_artifact(a.type, a.artifact)
+          for a in previous_artifacts
+      ]
+      resolve_state_dict[k] = (
+          len(previous_artifacts) >= self._desired_num_of_artifact)
 
     return base_resolver.ResolveResult(
         per_key_resolve_result=artifacts_dict,
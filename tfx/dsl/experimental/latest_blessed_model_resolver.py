@@ -65,44 +65,49 @@ class LatestBlessedModelResolver(base_resolver.BaseResolver):
     if pipeline_context is None:
       raise RuntimeError('Pipeline context absent for %s' % pipeline_context)
 
-    # Gets all models in the search space and sort in reverse order by id.
-    all_models = metadata_handler.get_qualified_artifacts(
+    # Iterates models and model blessings in the search space from the latest.
+    models = metadata_handler.iter_qualified_artifacts(
         context=pipeline_context,
         type_name=model_channel.type_name,
         producer_component_id=model_channel.producer_component_id,
         output_key=model_channel.output_key)
-    all_models.sort(key=lambda a: a.artifact.id, reverse=True)
-    # Gets all ModelBlessing artifacts in the search space.
-    all_model_blessings = metadata_handler.get_qualified_artifacts(
+    model_blessings = metadata_handler.iter_qualified_artifacts(
         context=pipeline_context,
         type_name=model_blessing_channel.type_name,
         producer_component_id=model_blessing_channel.producer_component_id,
         output_key=model_blessing_channel.output_key)
-    # Makes a dict of {model_id : ModelBlessing artifact} for blessed models.
-    all_blessed_model_ids = dict(
-        (  # pylint: disable=g-complex-comprehension
-            a.artifact.custom_properties[
-                evaluator.ARTIFACT_PROPERTY_CURRENT_MODEL_ID_KEY].int_value, a)
-        for a in all_model_blessings
-        if a.artifact.custom_properties[
-            evaluator.ARTIFACT_PROPERTY_BLESSED_KEY].int_value == 1)
 
     artifacts_dict = {model_channel_key: [], model_blessing_channel_key: []}
     resolve_state_dict = {
         model_channel_key: False,
         model_blessing_channel_key: False
     }
-    # Iterates all models, if blessed, set as result. As the model list was
-    # sorted, it is guaranteed to get the latest blessed model.
-    for model in all_models:
-      if model.artifact.id in all_blessed_model_ids:
+    # Dict of {model_id : latest ModelBlessing artifact} for blessed models.
+    blessed_model_ids = {}
+    model_blessing = next(model_blessings, None)
+    # Iterates all models, if blessed, set as result. As models are iterated
+    # from the latest, it is guaranteed to get the latest blessed model. A model
+    # blessing is registered after the model it refers to, so all blessings of
+    # a model have a larger id than the model, and older blessings do not need
+    # to be read before the result is found.
+    for model in models:
+      while (model_blessing is not None and
+             model_blessing.artifact.id > model.artifact.id):
+        if model_blessing.artifact.custom_properties[
+            evaluator.ARTIFACT_PROPERTY_BLESSED_KEY].int_value == 1:
+          blessed_model_ids.setdefault(
+              model_blessing.artifact.custom_properties[
+                  evaluator.ARTIFACT_PROPERTY_CURRENT_MODEL_ID_KEY].int_value,
+              model_blessing)
+        model_blessing = next(model_blessings, None)
+      if model.artifact.id in blessed_model_ids:
         artifacts_dict[model_channel_key] = [
             artifact_utils.deserialize_artifact(model.type, model.artifact)
         ]
-        model_blessing = all_blessed_model_ids[model.artifact.id]
+        blessing = blessed_model_ids[model.artifact.id]
         artifacts_dict[model_blessing_channel_key] = [
-            artifact_utils.deserialize_artifact(model_blessing.type,
-                                                model_blessing.artifact)
+            artifact_utils.deserialize_artifact(blessing.type,
+                                                blessing.artifact)
         ]
         resolve_state_dict[model_channel_key] = True
         resolve_state_dict[model_blessing_channel_key] = True
@@ -19,18 +19,41 @@ from __future__ import division
 from __future__ import print_function
 
 import datetime
-from typing import Any, Dict, Iterable, List, Text, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Text, Tuple
 
 import apache_beam as beam
 import prestodb
 from proto import presto_config_pb2
+import pyarrow as pa
+import six
 import tensorflow as tf
 
 from google.protobuf import json_format
 from tfx import types
 from tfx.components.example_gen import base_example_gen_executor
+from tfx.components.example_gen import utils
 from tfx.proto import example_gen_pb2
 
+# Maximum number of Presto result rows converted together.
+_MAX_BATCH_SIZE = 1000
+
+# Default number of rows fetched at a time from query results.
+_DEFAULT_FETCH_SIZE = 1000
+
+# Arrow types of the values of Presto types converted to features.
+_ARROW_TYPES = {
+    'tinyint': pa.int64(),
+    'smallint': pa.int64(),
+    'integer': pa.int64(),
+    'bigint': pa.int64(),
+    'real': pa.float64(),
+    'double': pa.float64(),
+    'decimal': pa.float64(),
+    'varchar': pa.string(),
+    'char': pa.string(),
+    'timestamp': pa.int64(),
+}
+
 
 @beam.typehints.with_input_types(Text)
 @beam.typehints.with_output_types(beam.typehints.Iterable[Tuple[Text, Text,
@@ -42,12 +65,18 @@ class _ReadPrestoDoFn(beam.DoFn):
     cursor: A prestodb.dbapi.Cursor object that reads records from Presto table.
   """
 
-  def __init__(self, client: prestodb.dbapi.Connection):
+  def __init__(self,
+               client: prestodb.dbapi.Connection,
+               fetch_size: int = _DEFAULT_FETCH_SIZE):
     self.cursor = client.cursor()
+    self._fetch_size = fetch_size
 
-  def process(self, query: Text) -> Iterable[Tuple[Text, Text, Any]]:
+  def process(self, query: Text) -> Iterable[List[Tuple[Text, Text, Any]]]:
     """Yields rows from query results.
 
+    Results are fetched fetch_size rows at a time, so that they are never all
+    held in memory.
+
     Args:
       query: A SQL query used to return results from Presto table.
 
@@ -56,18 +85,115 @@ class _ReadPrestoDoFn(beam.DoFn):
       contains information on column name, column data type, data.
     """
     self.cursor.execute(query)
-    rows = self.cursor.fetchall()
-    if rows:
-      cols = []
-      col_types = []
-      # Returns a list of (column_name, column_type, None, ...)
-      # https://github.com/prestodb/presto-python-client/blob/master/prestodb/dbapi.py#L199
-      for metadata in self.cursor.description:
-        cols.append(metadata[0])
-        col_types.append(metadata[1])
-
+    cols = None
+    col_types = None
+    while True:
+      rows = self.cursor.fetchmany(self._fetch_size)
+      if not rows:
+        break
+      if cols is None:
+        # Returns a list of (column_name, column_type, None, ...)
+        # https://github.com/prestodb/presto-python-client/blob/master/prestodb/dbapi.py#L199
+        cols = [metadata[0] for metadata in self.cursor.description]
+        col_types = [metadata[1] for metadata in self.cursor.description]
       for r in rows:
-        yield zip(cols, col_types, r)
+        yield list(zip(cols, col_types, r))
+
+  def teardown(self):
+    if self.cursor:
+      self.cursor.close()
+
+
+def _format_literal(value: Any) -> Text:
+  return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def _partition_query(query: Text, column: Text, num_partitions: int,
+                     minimum: Any, maximum: Any) -> List[Text]:
+  """Splits a query into subqueries over ranges of values of a column.
+
+  Args:
+    query: A SQL query.
+    column: Numeric column of the query results.
+    num_partitions: Number of subqueries.
+    minimum: Minimum value of the column in the query results.
+    maximum: Maximum value of the column in the query results.
+
+  Returns:
+    Subqueries whose results are together the results of the query, or the
+    query itself if the range of values cannot be split.
+  """
+  query = query.strip().rstrip(';')
+  if isinstance(minimum, six.integer_types) and isinstance(
+      maximum, six.integer_types):
+    width = maximum - minimum + 1
+    bounds = [minimum + width * i // num_partitions
+              for i in range(1, num_partitions)]
+  else:
+    bounds = [minimum + (maximum - minimum) * i / num_partitions
+              for i in range(1, num_partitions)]
+  bounds = sorted(set(b for b in bounds if minimum < b <= maximum))
+  if not bounds:
+    return [query]
+
+  conditions = ['{0} IS NULL OR {0} < {1}'.format(
+      column, _format_literal(bounds[0]))]
+  for lower, upper in zip(bounds, bounds[1:]):
+    conditions.append('{0} >= {1} AND {0} < {2}'.format(
+        column, _format_literal(lower), _format_literal(upper)))
+  conditions.append('{} >= {}'.format(column, _format_literal(bounds[-1])))
+  return [
+      'SELECT * FROM ({}) AS partitioned WHERE {}'.format(query, condition)
+      for condition in conditions
+  ]
+
+
+@beam.typehints.with_input_types(Text)
+@beam.typehints.with_output_types(Text)
+class _PartitionPrestoQueryDoFn(beam.DoFn):
+  """Beam DoFn class that splits Presto queries into range partitions.
+
+  Attributes:
+    cursor: A prestodb.dbapi.Cursor object that reads the range of values of the
+      partition column.
+  """
+
+  def __init__(self, client: prestodb.dbapi.Connection,
+               partition: presto_config_pb2.PrestoConnConfig.PartitionConfig):
+    self.cursor = client.cursor()
+    self._column = partition.column
+    self._num_partitions = partition.num_partitions
+
+  def process(self, query: Text) -> Iterable[Text]:
+    """Yields range partitioned subqueries of a query.
+
+    Args:
+      query: A SQL query used to return results from Presto table.
+
+    Yields:
+      Subqueries whose results are together the results of the query.
+
+    Raises:
+      ValueError: if the partition column is not numeric.
+    """
+    self.cursor.execute(
+        'SELECT min({0}), max({0}) FROM ({1}) AS partitioned'.format(
+            self._column,
+            query.strip().rstrip(';')))
+    minimum, maximum = self.cursor.fetchone()
+    if minimum is None:
+      # No result, or only null values.
+      yield query
+      return
+    for value in (minimum, maximum):
+      if (isinstance(value, bool) or
+          not isinstance(value, six.integer_types + (float,))):
+        raise ValueError(
+            'Partition column {} must be numeric, got {!r}.'.format(
+                self._column, value))
+    for subquery in _partition_query(query, self._column, self._num_partitions,
+                                     minimum, maximum):
+      yield subquery
 
   def teardown(self):
     if self.cursor:
@@ -106,6 +232,7 @@ def _deserialize_conn_config(
     params['max_attempts'] = conn_config.max_attempts
   if conn_config.HasField('request_timeout'):
     params['request_timeout'] = conn_config.request_timeout
+  # fetch_size and partition are read options, not client parameters.
 
   return prestodb.dbapi.connect(**params)
 
@@ -133,6 +260,10 @@ def _deserialize_auth_config(
     raise RuntimeError('Authentication type not supported.')
 
 
+def _timestamp_to_int(value: Text) -> int:
+  return int(datetime.datetime.fromisoformat(value).timestamp())
+
+
 def _row_to_example(
     instance: Iterable[Tuple[Text, Text, Any]]) -> tf.train.Example:
   """Convert presto result row to tf example."""
@@ -150,7 +281,7 @@ def _row_to_example(
       feature[key] = tf.train.Feature(
           bytes_list=tf.train.BytesList(value=[tf.compat.as_bytes(value)]))
     elif data_type in {'timestamp'}:
-      value = int(datetime.datetime.fromisoformat(value).timestamp())
+      value = _timestamp_to_int(value)
       feature[key] = tf.train.Feature(
           int64_list=tf.train.Int64List(value=[value]))
     else:
@@ -161,15 +292,83 @@ def _row_to_example(
   return tf.train.Example(features=tf.train.Features(feature=feature))
 
 
+def _columns(
+    row: List[Tuple[Text, Text, Any]]) -> Tuple[Tuple[Text, Text], ...]:
+  """Returns the sorted names and types of the columns of a row."""
+  return tuple(sorted((key, data_type) for key, data_type, _ in row))
+
+
+class _RowsToSerializedExamplesFn(beam.DoFn):
+  """Beam DoFn class that converts batches of presto result rows.
+
+  Rows are converted column by column by an encoder built once per set of
+  columns and types, and give the same bytes as serializing deterministically
+  the result of _row_to_example, which converts rows the encoder does not
+  support.
+  """
+
+  def __init__(self):
+    super(_RowsToSerializedExamplesFn, self).__init__()
+    # Example encoders by the columns and types of the rows they encode.
+    self._encoders = {}
+
+  def _get_encoder(
+      self, columns: Tuple[Tuple[Text, Text], ...]
+  ) -> Optional[utils.ExampleEncoder]:
+    """Returns the encoder of rows with given columns, None if unsupported."""
+    if columns not in self._encoders:
+      arrow_types = [_ARROW_TYPES.get(data_type) for _, data_type in columns]
+      self._encoders[columns] = None
+      if all(t is not None for t in arrow_types):
+        self._encoders[columns] = utils.make_example_encoder(
+            pa.schema([(key, arrow_type) for (key, _), arrow_type in zip(
+                columns, arrow_types)]))
+    return self._encoders[columns]
+
+  def _encode(
+      self,
+      rows: List[List[Tuple[Text, Text, Any]]]) -> Optional[List[bytes]]:
+    """Encodes rows with the encoder of their columns, None if unsupported."""
+    columns = _columns(rows[0])
+    encoder = self._get_encoder(columns)
+    if encoder is None:
+      return None
+    instances = []
+    for row in rows:
+      if _columns(row) != columns:
+        return None
+      instances.append({
+          key: (_timestamp_to_int(value)
+                if data_type == 'timestamp' and value is not None else value)
+          for key, data_type, value in row
+      })
+    try:
+      return encoder.encode_batch(instances)
+    except ValueError:
+      return None
+
+  def process(
+      self, rows: List[Iterable[Tuple[Text, Text, Any]]]) -> Iterable[bytes]:
+    rows = [list(row) for row in rows]
+    serialized_examples = self._encode(rows) if rows else None
+    if serialized_examples is None:
+      serialized_examples = [
+          _row_to_example(row).SerializeToString(deterministic=True)
+          for row in rows
+      ]
+    for serialized_example in serialized_examples:
+      yield serialized_example
+
+
 @beam.ptransform_fn
 @beam.typehints.with_input_types(beam.Pipeline)
-@beam.typehints.with_output_types(tf.train.Example)
+@beam.typehints.with_output_types(bytes)
 def _PrestoToExample(  # pylint: disable=invalid-name
     pipeline: beam.Pipeline,
     input_dict: Dict[Text, List[types.Artifact]],  # pylint: disable=unused-argument
     exec_properties: Dict[Text, Any],
     split_pattern: Text) -> beam.pvalue.PCollection:
-  """Read from Presto and transform to TF examples.
+  """Read from Presto and transform to serialized TF examples.
 
   Args:
     pipeline: beam pipeline.
@@ -178,7 +377,7 @@ def _PrestoToExample(  # pylint: disable=invalid-name
     split_pattern: Split.pattern in Input config, a Presto sql string.
 
   Returns:
-    PCollection of TF examples.
+    PCollection of serialized TF examples.
   """
   conn_config = example_gen_pb2.CustomConfig()
   json_format.Parse(exec_properties['custom_config'], conn_config)
@@ -186,10 +385,22 @@ def _PrestoToExample(  # pylint: disable=invalid-name
   conn_config.custom_config.Unpack(presto_config)
 
   client = _deserialize_conn_config(presto_config)
-  return (pipeline
-          | 'Query' >> beam.Create([split_pattern])
-          | 'QueryTable' >> beam.ParDo(_ReadPrestoDoFn(client))
-          | 'ToTFExample' >> beam.Map(_row_to_example))
+  fetch_size = _DEFAULT_FETCH_SIZE
+  if presto_config.HasField('fetch_size'):
+    fetch_size = presto_config.fetch_size
+  queries = pipeline | 'Query' >> beam.Create([split_pattern])
+  if presto_config.HasField('partition'):
+    queries = (
+        queries
+        | 'PartitionQuery' >> beam.ParDo(
+            _PartitionPrestoQueryDoFn(client, presto_config.partition))
+        # Spreads the subqueries over workers.
+        | 'ReshuffleQueries' >> beam.Reshuffle())
+  return (queries
+          | 'QueryTable' >> beam.ParDo(_ReadPrestoDoFn(client, fetch_size))
+          | 'BatchRows' >> beam.BatchElements(max_batch_size=_MAX_BATCH_SIZE)
+          | 'ToSerializedTFExample' >> beam.ParDo(
+              _RowsToSerializedExamplesFn()))
 
 
 class Executor(base_example_gen_executor.BaseExampleGenExecutor):
@@ -20,6 +20,7 @@ from __future__ import print_function
 
 import os
 import random
+import sqlite3
 
 import apache_beam as beam
 from apache_beam.testing import util
@@ -37,7 +38,7 @@ from tfx.types import standard_artifacts
 
 class _MockReadPrestoDoFn(beam.DoFn):
 
-  def __init__(self, client):
+  def __init__(self, client, fetch_size):
     pass
 
   def process(self, query):
@@ -49,13 +50,68 @@ class _MockReadPrestoDoFn(beam.DoFn):
 
 class _MockReadPrestoDoFn2(beam.DoFn):
 
-  def __init__(self, client):
+  def __init__(self, client, fetch_size):
     pass
 
   def process(self, query):
     yield {('i', 'integer', 1), ('f', 'double', 2.0), ('s', 'varchar', 'abc')}
 
 
+class _FakeCursor(object):
+  """DB-API cursor of a sqlite3 database, with Presto column types."""
+
+  def __init__(self, connection, column_types):
+    self._cursor = connection.cursor()
+    self._column_types = column_types
+    self.fetch_sizes = []
+
+  def execute(self, query):
+    self._cursor.execute(query)
+
+  @property
+  def description(self):
+    return [(d[0], self._column_types[d[0]]) + tuple(d[2:])
+            for d in self._cursor.description]
+
+  def fetchone(self):
+    return self._cursor.fetchone()
+
+  def fetchmany(self, size):
+    self.fetch_sizes.append(size)
+    return self._cursor.fetchmany(size)
+
+  def fetchall(self):
+    raise AssertionError('Query results must be streamed.')
+
+  def close(self):
+    self._cursor.close()
+
+
+class _FakeConnection(object):
+  """Local DB-API connection to a table t of integer i, double f, varchar s."""
+
+  def __init__(self, rows):
+    self._connection = sqlite3.connect(':memory:')
+    self._connection.execute('CREATE TABLE t (i INTEGER, f REAL, s TEXT)')
+    self._connection.executemany('INSERT INTO t VALUES (?, ?, ?)', rows)
+    self.cursors = []
+
+  def cursor(self):
+    cursor = _FakeCursor(self._connection, {
+        'i': 'integer',
+        'f': 'double',
+        's': 'varchar',
+        'min(i)': 'integer',
+        'max(i)': 'integer',
+        'min(f)': 'double',
+        'max(f)': 'double',
+        'min(s)': 'varchar',
+        'max(s)': 'varchar',
+    })
+    self.cursors.append(cursor)
+    return cursor
+
+
 def _mock_deserialize_conn_config(input_config):  # pylint: disable=invalid-name, unused-argument
   return prestodb.dbapi.connect('localhost')
 
@@ -75,6 +131,62 @@ class ExecutorTest(tf.test.TestCase):
                      deseralized_conn.auth)  # test for default auth value
     self.assertEqual(truth_conn.max_attempts, deseralized_conn.max_attempts)
 
+  def testReadPrestoDoFnStreamsResults(self):
+    rows = [(i, float(i), str(i)) for i in range(25)]
+    connection = _FakeConnection(rows)
+    do_fn = executor._ReadPrestoDoFn(connection, fetch_size=10)
+
+    results = do_fn.process('SELECT i, f, s FROM t ORDER BY i')
+    self.assertEqual([('i', 'integer', 0), ('f', 'double', 0.0),
+                      ('s', 'varchar', '0')], next(results))
+    # Only the first chunk of results is fetched.
+    self.assertEqual([10], connection.cursors[0].fetch_sizes)
+
+    self.assertLen(list(results), 24)
+    self.assertEqual([10, 10, 10, 10], connection.cursors[0].fetch_sizes)
+
+  def testPartitionPrestoQueryDoFn(self):
+    rows = [(i, i / 4.0, None) for i in range(100)] + [(None, None, 'null')]
+    connection = _FakeConnection(rows)
+    query = 'SELECT i, f, s FROM t;'
+    expected = sorted(
+        executor._ReadPrestoDoFn(connection).process(query),
+        key=lambda row: repr(row))
+
+    for column in ('i', 'f'):
+      do_fn = executor._PartitionPrestoQueryDoFn(
+          connection,
+          presto_config_pb2.PrestoConnConfig.PartitionConfig(
+              column=column, num_partitions=4))
+      subqueries = list(do_fn.process(query))
+      self.assertLen(subqueries, 4)
+      results = [
+          list(executor._ReadPrestoDoFn(connection).process(subquery))
+          for subquery in subqueries
+      ]
+      self.assertEqual([26, 25, 25, 25], [len(r) for r in results])
+      self.assertEqual(expected,
+                       sorted(sum(results, []), key=lambda row: repr(row)))
+
+    with self.assertRaisesRegexp(ValueError, 'must be numeric'):
+      list(
+          executor._PartitionPrestoQueryDoFn(
+              connection,
+              presto_config_pb2.PrestoConnConfig.PartitionConfig(
+                  column='s', num_partitions=4)).process(query))
+
+  def testPartitionQuery(self):
+    self.assertEqual([
+        'SELECT * FROM (SELECT * FROM t) AS partitioned WHERE i IS NULL OR '
+        'i < 1',
+        'SELECT * FROM (SELECT * FROM t) AS partitioned WHERE i >= 1 AND i < 2',
+        'SELECT * FROM (SELECT * FROM t) AS partitioned WHERE i >= 2',
+    ], executor._partition_query('SELECT * FROM t', 'i', 4, 0, 2))
+    # Ranges of a single value are not split.
+    self.assertEqual(['SELECT * FROM t'],
+                     executor._partition_query('SELECT * FROM t', 'f', 4, 1.5,
+                                               1.5))
+
   @mock.patch.multiple(
       executor,
       _ReadPrestoDoFn=_MockReadPrestoDoFn2,
@@ -105,7 +217,31 @@ class ExecutorTest(tf.test.TestCase):
           bytes_list=tf.train.BytesList(value=[tf.compat.as_bytes('abc')]))
       example_proto = tf.train.Example(
           features=tf.train.Features(feature=feature))
-      util.assert_that(examples, util.equal_to([example_proto]))
+      util.assert_that(
+          examples,
+          util.equal_to([example_proto.SerializeToString(deterministic=True)]))
+
+  def testRowsToSerializedExamples(self):
+    rows = [
+        [('i', 'integer', 1), ('f', 'double', 2.0), ('s', 'varchar', 'abc'),
+         ('t', 'timestamp', '2020-01-01 00:00:00')],
+        [('s', 'varchar', None), ('i', 'integer', None), ('f', 'double', None),
+         ('t', 'timestamp', None)],
+        [('i', 'integer', 3), ('d', 'date', None)],
+    ]
+    do_fn = executor._RowsToSerializedExamplesFn()
+    self.assertEqual([
+        executor._row_to_example(row).SerializeToString(deterministic=True)
+        for row in rows[:2]
+    ], list(do_fn.process(rows[:2])))
+    self.assertIsNotNone(
+        do_fn._encoders[(('f', 'double'), ('i', 'integer'), ('s', 'varchar'),
+                         ('t', 'timestamp'))])
+
+    # Rows with columns of unsupported types are converted row by row.
+    self.assertEqual([
+        executor._row_to_example(rows[2]).SerializeToString(deterministic=True)
+    ], list(do_fn.process(rows[2:])))
 
   @mock.patch.multiple(
       executor,
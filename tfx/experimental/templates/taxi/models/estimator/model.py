@@ -26,13 +26,16 @@ import tensorflow_model_analysis as tfma
 import tensorflow_transform as tft
 from tensorflow_transform.tf_metadata import schema_utils
 
+from tfx.components.util import examples_utils
 from tfx.experimental.templates.taxi.models import features
 from tfx.experimental.templates.taxi.models.estimator import hparams
 
 
-def _gzip_reader_fn(filenames):
-  """Small utility returning a record reader that can read gzip'ed files."""
-  return tf.data.TFRecordDataset(filenames, compression_type='GZIP')
+def _make_reader_fn(file_format):
+  """Returns a record reader of TFRecord files in the given file format."""
+  compression_type = examples_utils.get_tfrecord_compression_type(file_format)
+  return lambda filenames: tf.data.TFRecordDataset(  # pylint: disable=g-long-lambda
+      filenames, compression_type=compression_type)
 
 
 # Tf.Transform considers these features as "raw"
@@ -159,11 +162,12 @@ def _eval_input_receiver_fn(tf_transform_output, schema):
           features.LABEL_KEY)])
 
 
-def _input_fn(filenames, tf_transform_output, batch_size=200):
+def _input_fn(filenames, file_format, tf_transform_output, batch_size=200):
   """Generates features and labels for training or evaluation.
 
   Args:
-    filenames: [str] list of CSV files to read data from.
+    filenames: [str] list of TFRecord files to read data from.
+    file_format: The example_gen_pb2.Output.FileFormat of the files.
     tf_transform_output: A TFTransformOutput.
     batch_size: int First dimension size of the Tensors returned by input_fn
 
@@ -175,7 +179,10 @@ def _input_fn(filenames, tf_transform_output, batch_size=200):
       tf_transform_output.transformed_feature_spec().copy())
 
   dataset = tf.data.experimental.make_batched_features_dataset(
-      filenames, batch_size, transformed_feature_spec, reader=_gzip_reader_fn)
+      filenames,
+      batch_size,
+      transformed_feature_spec,
+      reader=_make_reader_fn(file_format))
 
   transformed_features = tf.compat.v1.data.make_one_shot_iterator(
       dataset).get_next()
@@ -205,11 +212,13 @@ def trainer_fn(trainer_fn_args, schema):
 
   train_input_fn = lambda: _input_fn(  # pylint: disable=g-long-lambda
       trainer_fn_args.train_files,
+      trainer_fn_args.file_format,
       tf_transform_output,
       batch_size=hparams.TRAIN_BATCH_SIZE)
 
   eval_input_fn = lambda: _input_fn(  # pylint: disable=g-long-lambda
       trainer_fn_args.eval_files,
+      trainer_fn_args.file_format,
       tf_transform_output,
       batch_size=hparams.EVAL_BATCH_SIZE)
 
@@ -21,6 +21,7 @@ import tensorflow as tf
 from tensorflow_metadata.proto.v0 import schema_pb2
 from tfx.components.trainer import executor as trainer_executor
 from tfx.experimental.templates.taxi.models.estimator import model
+from tfx.proto import example_gen_pb2
 
 
 class ModelTest(tf.test.TestCase):
@@ -31,6 +32,7 @@ class ModelTest(tf.test.TestCase):
         transform_output='/path/to/transform_output',
         serving_model_dir='/path/to/model_dir',
         eval_files='/path/to/eval.file',
+        file_format=example_gen_pb2.Output.FORMAT_TFRECORDS_GZIP,
         schema_file='/path/to/schema_file',
         train_steps=1000,
         eval_steps=100,
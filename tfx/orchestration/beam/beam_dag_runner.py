@@ -18,9 +18,12 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
+import concurrent.futures
 import datetime
 import os
-from typing import Any, Iterable, List, Optional, Text, Type
+import time
+from typing import Any, Dict, Iterable, List, Optional, Text, Tuple, Type
 
 import absl
 import apache_beam as beam
@@ -36,6 +39,24 @@ from tfx.orchestration.config import pipeline_config
 from tfx.orchestration.launcher import base_component_launcher
 from tfx.utils import telemetry_utils
 
+# Scheduler modes supported by BeamDagRunner.
+#  - SCHEDULER_BEAM builds a Beam pipeline with one ParDo per component and
+#    leaves parallelism to the Beam runner's stage fusion.
+#  - SCHEDULER_THREAD and SCHEDULER_PROCESS run ready components on a bounded
+#    thread or process pool, starting each component as soon as all of its
+#    upstream nodes have completed.
+SCHEDULER_BEAM = 'beam'
+SCHEDULER_THREAD = 'thread'
+SCHEDULER_PROCESS = 'process'
+_SCHEDULERS = frozenset((SCHEDULER_BEAM, SCHEDULER_THREAD, SCHEDULER_PROCESS))
+
+# Per-node timing recorded by the pool schedulers. All values are in seconds.
+#  - queue_secs: time between the node becoming ready and starting to run.
+#  - run_secs: time spent launching the node (driver, executor and publisher).
+#  - finish_secs: time between pipeline start and node completion.
+NodeTiming = collections.namedtuple(
+    'NodeTiming', ['component_id', 'queue_secs', 'run_secs', 'finish_secs'])
+
 
 # TODO(jyzhao): confirm it's re-executable, add test case.
 @beam.typehints.with_input_types(Any)
@@ -47,7 +68,8 @@ class _ComponentAsDoFn(beam.DoFn):
                component_launcher_class: Type[
                    base_component_launcher.BaseComponentLauncher],
                component_config: base_component_config.BaseComponentConfig,
-               tfx_pipeline: pipeline.Pipeline):
+               tfx_pipeline: pipeline.Pipeline,
+               batch_metadata_writes: bool = False):
     """Initialize the _ComponentAsDoFn.
 
     Args:
@@ -56,10 +78,12 @@ class _ComponentAsDoFn(beam.DoFn):
         component.
       component_config: component config to launch the component.
       tfx_pipeline: Logical pipeline that contains pipeline related information.
+      batch_metadata_writes: Whether the launch writes to MLMD in batch mode.
     """
     driver_args = data_types.DriverArgs(enable_cache=tfx_pipeline.enable_cache)
     metadata_connection = metadata.Metadata(
-        tfx_pipeline.metadata_connection_config)
+        tfx_pipeline.metadata_connection_config,
+        batch_writes=batch_metadata_writes)
     self._component_launcher = component_launcher_class.create(
         component=component,
         pipeline_info=tfx_pipeline.pipeline_info,
@@ -87,23 +111,118 @@ class _ComponentAsDoFn(beam.DoFn):
     absl.logging.info('Component %s is finished.', self._component_id)
 
 
+def _launch_component(
+    component: base_component.BaseComponent,
+    component_launcher_class: Type[
+        base_component_launcher.BaseComponentLauncher],
+    component_config: base_component_config.BaseComponentConfig,
+    tfx_pipeline: pipeline.Pipeline,
+    batch_metadata_writes: bool) -> Tuple[float, float]:
+  """Launches a single component on a pool worker.
+
+  Args:
+    component: Component that to be executed.
+    component_launcher_class: The class of the launcher to launch the
+      component.
+    component_config: component config to launch the component.
+    tfx_pipeline: Logical pipeline that contains pipeline related information.
+    batch_metadata_writes: Whether the launch writes to MLMD in batch mode.
+
+  Returns:
+    A (start, end) tuple of wall clock timestamps of the launch.
+  """
+  start = time.time()
+  _ComponentAsDoFn(component, component_launcher_class, component_config,
+                   tfx_pipeline, batch_metadata_writes)._run_component()
+  return start, time.time()
+
+
+def _critical_path(components: List[base_component.BaseComponent],
+                   timings: Dict[Text, NodeTiming]) -> List[Text]:
+  """Returns ids of the chain of components that determined the wall time.
+
+  Walks back from the last finishing component, each time following the
+  upstream node that finished last, i.e. the one the component waited on.
+
+  Args:
+    components: components of the pipeline.
+    timings: NodeTiming of each component keyed by component id.
+
+  Returns:
+    Component ids on the critical path, in execution order.
+  """
+  finished = [c for c in components if c.id in timings]
+  if not finished:
+    return []
+  node = max(finished, key=lambda c: timings[c.id].finish_secs)
+  path = [node.id]
+  while node.upstream_nodes:
+    node = max(node.upstream_nodes, key=lambda c: timings[c.id].finish_secs)
+    path.append(node.id)
+  return list(reversed(path))
+
+
 class BeamDagRunner(tfx_runner.TfxRunner):
   """Tfx runner on Beam."""
 
   def __init__(self,
                beam_orchestrator_args: Optional[List[Text]] = None,
-               config: Optional[pipeline_config.PipelineConfig] = None):
+               config: Optional[pipeline_config.PipelineConfig] = None,
+               scheduler: Text = SCHEDULER_BEAM,
+               max_workers: Optional[int] = None,
+               batch_metadata_writes: bool = False):
     """Initializes BeamDagRunner as a TFX orchestrator.
 
     Args:
       beam_orchestrator_args: beam args for the beam orchestrator. Note that
         this is different from the beam_pipeline_args within
         additional_pipeline_args, which is for beam pipelines in components.
+        Ignored by the pool schedulers.
       config: Optional pipeline config for customizing the launching
         of each component.
+      scheduler: One of SCHEDULER_BEAM (default), SCHEDULER_THREAD or
+        SCHEDULER_PROCESS. The latter two run each component on a bounded
+        worker pool as soon as its upstream nodes complete, and record a
+        NodeTiming per component. With SCHEDULER_PROCESS, the pipeline, its
+        components and their executor, driver and launcher classes are sent
+        to the worker processes with pickle, so they must be picklable, e.g.
+        classes defined at module level and no lambdas in exec properties.
+      max_workers: Maximum number of components running at the same time with
+        the pool schedulers. Defaults to the pool's own default.
+      batch_metadata_writes: If True, each component launch writes its
+        registration, output artifacts and publication to MLMD in as few
+        calls as possible, see `Metadata`. Output artifacts then get no MLMD
+        id or PENDING state until the execution is published.
+
+    Raises:
+      ValueError: if the scheduler is unknown.
     """
     super(BeamDagRunner, self).__init__(config)
+    if scheduler not in _SCHEDULERS:
+      raise ValueError('Unknown scheduler %s, expected one of %s.' %
+                       (scheduler, sorted(_SCHEDULERS)))
     self._beam_orchestrator_args = beam_orchestrator_args
+    self._scheduler = scheduler
+    self._max_workers = max_workers
+    self._batch_metadata_writes = batch_metadata_writes
+    self._node_timings = {}
+    self._critical_path = []
+
+  @property
+  def node_timings(self) -> Dict[Text, NodeTiming]:
+    """NodeTiming of each component of the last run, keyed by component id.
+
+    Only populated by the pool schedulers.
+    """
+    return self._node_timings
+
+  @property
+  def critical_path(self) -> List[Text]:
+    """Component ids on the critical path of the last run.
+
+    Only populated by the pool schedulers.
+    """
+    return self._critical_path
 
   def run(self, tfx_pipeline: pipeline.Pipeline) -> None:
     """Deploys given logical pipeline on Beam.
@@ -119,36 +238,111 @@ class BeamDagRunner(tfx_runner.TfxRunner):
     tfx_pipeline.pipeline_info.run_id = datetime.datetime.now().isoformat()
 
     with telemetry_utils.scoped_labels({telemetry_utils.TFX_RUNNER: 'beam'}):
-      with beam.Pipeline(argv=self._beam_orchestrator_args) as p:
-        # Uses for triggering the component DoFns.
-        root = p | 'CreateRoot' >> beam.Create([None])
-
-        # Stores mapping of component to its signal.
-        signal_map = {}
-        # pipeline.components are in topological order.
-        for component in tfx_pipeline.components:
-          component_id = component.id
-
-          # Signals from upstream components.
-          signals_to_wait = []
-          if component.upstream_nodes:
-            for upstream_node in component.upstream_nodes:
-              assert upstream_node in signal_map, ('Components is not in '
-                                                   'topological order')
-              signals_to_wait.append(signal_map[upstream_node])
-          absl.logging.info('Component %s depends on %s.', component_id,
-                            [s.producer.full_label for s in signals_to_wait])
+      if self._scheduler == SCHEDULER_BEAM:
+        self._run_as_beam_pipeline(tfx_pipeline)
+      else:
+        self._run_on_pool(tfx_pipeline)
+
+  def _run_as_beam_pipeline(self, tfx_pipeline: pipeline.Pipeline) -> None:
+    """Runs each component as a ParDo of a Beam pipeline."""
+    with beam.Pipeline(argv=self._beam_orchestrator_args) as p:
+      # Uses for triggering the component DoFns.
+      root = p | 'CreateRoot' >> beam.Create([None])
+
+      # Stores mapping of component to its signal.
+      signal_map = {}
+      # pipeline.components are in topological order.
+      for component in tfx_pipeline.components:
+        component_id = component.id
+
+        # Signals from upstream components.
+        signals_to_wait = []
+        if component.upstream_nodes:
+          for upstream_node in component.upstream_nodes:
+            assert upstream_node in signal_map, ('Components is not in '
+                                                 'topological order')
+            signals_to_wait.append(signal_map[upstream_node])
+        absl.logging.info('Component %s depends on %s.', component_id,
+                          [s.producer.full_label for s in signals_to_wait])
+
+        (component_launcher_class,
+         component_config) = config_utils.find_component_launch_info(
+             self._config, component)
+
+        # Each signal is an empty PCollection. AsIter ensures component will
+        # be triggered after upstream components are finished.
+        signal_map[component] = (
+            root
+            | 'Run[%s]' % component_id >> beam.ParDo(
+                _ComponentAsDoFn(component, component_launcher_class,
+                                 component_config, tfx_pipeline,
+                                 self._batch_metadata_writes),
+                *[beam.pvalue.AsIter(s) for s in signals_to_wait]))
+        absl.logging.info('Component %s is scheduled.', component_id)
 
+  def _run_on_pool(self, tfx_pipeline: pipeline.Pipeline) -> None:
+    """Runs components on a worker pool as soon as their upstreams complete.
+
+    Args:
+      tfx_pipeline: Logical pipeline containing pipeline args and components.
+    """
+    if self._scheduler == SCHEDULER_PROCESS:
+      pool_class = concurrent.futures.ProcessPoolExecutor
+    else:
+      pool_class = concurrent.futures.ThreadPoolExecutor
+    # Maps each pending component to the set of upstream nodes it still waits
+    # on. pipeline.components are in topological order.
+    pending = collections.OrderedDict(
+        (c, set(c.upstream_nodes)) for c in tfx_pipeline.components)
+    ready_at = {}
+    running = {}
+    self._node_timings = {}
+    self._critical_path = []
+    pipeline_start = time.time()
+
+    with pool_class(max_workers=self._max_workers) as pool:
+
+      def _submit_ready_components():
+        for component in [c for c, deps in pending.items() if not deps]:
+          del pending[component]
           (component_launcher_class,
            component_config) = config_utils.find_component_launch_info(
                self._config, component)
+          ready_at[component.id] = time.time()
+          future = pool.submit(_launch_component, component,
+                               component_launcher_class, component_config,
+                               tfx_pipeline, self._batch_metadata_writes)
+          running[future] = component
+          absl.logging.info('Component %s is scheduled.', component.id)
+
+      _submit_ready_components()
+      while running:
+        done, _ = concurrent.futures.wait(
+            list(running.keys()),
+            return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+          component = running.pop(future)
+          try:
+            start, end = future.result()
+          except Exception:
+            # Do not start any more components; the pool waits for the ones
+            # already running before the error propagates.
+            pending.clear()
+            raise
+          self._node_timings[component.id] = NodeTiming(
+              component_id=component.id,
+              queue_secs=max(start - ready_at[component.id], 0.0),
+              run_secs=end - start,
+              finish_secs=end - pipeline_start)
+          for deps in pending.values():
+            deps.discard(component)
+        _submit_ready_components()
 
-          # Each signal is an empty PCollection. AsIter ensures component will
-          # be triggered after upstream components are finished.
-          signal_map[component] = (
-              root
-              | 'Run[%s]' % component_id >> beam.ParDo(
-                  _ComponentAsDoFn(component, component_launcher_class,
-                                   component_config, tfx_pipeline),
-                  *[beam.pvalue.AsIter(s) for s in signals_to_wait]))
-          absl.logging.info('Component %s is scheduled.', component_id)
+    assert not pending, 'Components is not in topological order'
+    self._critical_path = _critical_path(tfx_pipeline.components,
+                                         self._node_timings)
+    absl.logging.info(
+        'Pipeline finished in %.2fs, critical path %s took %.2fs.',
+        time.time() - pipeline_start, self._critical_path,
+        sum(self._node_timings[c].run_secs + self._node_timings[c].queue_secs
+            for c in self._critical_path))
@@ -18,6 +18,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import os
+
 import mock
 import tensorflow as tf
 from ml_metadata.proto import metadata_store_pb2
@@ -27,6 +29,8 @@ from tfx.components.base import base_executor
 from tfx.components.base import executor_spec
 from tfx.orchestration import pipeline
 from tfx.orchestration.beam import beam_dag_runner
+from tfx.orchestration.config import pipeline_config
+from tfx.orchestration.launcher import base_component_launcher
 from tfx.types.component_spec import ChannelParameter
 
 _executed_components = []
@@ -58,6 +62,24 @@ class _FakeComponentAsDoFn(beam_dag_runner._ComponentAsDoFn):
     _executed_components.append(self._component_id)
 
 
+class _FakeComponentLauncher(base_component_launcher.BaseComponentLauncher):
+  """Records the process each component is launched in under pipeline root."""
+
+  @classmethod
+  def can_launch(cls, component_executor_spec, component_config):
+    return True
+
+  def _run_executor(self, execution_id, input_dict, output_dict,
+                    exec_properties):
+    pass
+
+  def launch(self):
+    pid_path = os.path.join(self._pipeline_info.pipeline_root,
+                            self._component_info.component_id)
+    with open(pid_path, 'w') as f:
+      f.write(str(os.getpid()))
+
+
 # We define fake component spec classes below for testing. Note that we can't
 # programmatically generate component using anonymous classes for testing
 # because of a limitation in the "dill" pickler component used by Apache Beam.
@@ -115,44 +137,45 @@ class _FakeComponent(base_component.BaseComponent):
                                          instance_name=instance_name)
 
 
+def _create_test_pipeline(pipeline_root='y'):
+  component_a = _FakeComponent(
+      _FakeComponentSpecA(output=types.Channel(type=_ArtifactTypeA)))
+  component_b = _FakeComponent(
+      _FakeComponentSpecB(
+          a=component_a.outputs['output'],
+          output=types.Channel(type=_ArtifactTypeB)))
+  component_c = _FakeComponent(
+      _FakeComponentSpecC(
+          a=component_a.outputs['output'],
+          output=types.Channel(type=_ArtifactTypeC)))
+  component_d = _FakeComponent(
+      _FakeComponentSpecD(
+          b=component_b.outputs['output'],
+          c=component_c.outputs['output'],
+          output=types.Channel(type=_ArtifactTypeD)))
+  component_e = _FakeComponent(
+      _FakeComponentSpecE(
+          a=component_a.outputs['output'],
+          b=component_b.outputs['output'],
+          d=component_d.outputs['output'],
+          output=types.Channel(type=_ArtifactTypeE)))
+
+  return pipeline.Pipeline(
+      pipeline_name='x',
+      pipeline_root=pipeline_root,
+      metadata_connection_config=metadata_store_pb2.ConnectionConfig(),
+      components=[
+          component_d, component_c, component_a, component_b, component_e
+      ])
+
+
 class BeamDagRunnerTest(tf.test.TestCase):
 
-  @mock.patch.multiple(
-      beam_dag_runner,
-      _ComponentAsDoFn=_FakeComponentAsDoFn,
-  )
-  def testRun(self):
-    component_a = _FakeComponent(
-        _FakeComponentSpecA(output=types.Channel(type=_ArtifactTypeA)))
-    component_b = _FakeComponent(
-        _FakeComponentSpecB(
-            a=component_a.outputs['output'],
-            output=types.Channel(type=_ArtifactTypeB)))
-    component_c = _FakeComponent(
-        _FakeComponentSpecC(
-            a=component_a.outputs['output'],
-            output=types.Channel(type=_ArtifactTypeC)))
-    component_d = _FakeComponent(
-        _FakeComponentSpecD(
-            b=component_b.outputs['output'],
-            c=component_c.outputs['output'],
-            output=types.Channel(type=_ArtifactTypeD)))
-    component_e = _FakeComponent(
-        _FakeComponentSpecE(
-            a=component_a.outputs['output'],
-            b=component_b.outputs['output'],
-            d=component_d.outputs['output'],
-            output=types.Channel(type=_ArtifactTypeE)))
-
-    test_pipeline = pipeline.Pipeline(
-        pipeline_name='x',
-        pipeline_root='y',
-        metadata_connection_config=metadata_store_pb2.ConnectionConfig(),
-        components=[
-            component_d, component_c, component_a, component_b, component_e
-        ])
-
-    beam_dag_runner.BeamDagRunner().run(test_pipeline)
+  def setUp(self):
+    super(BeamDagRunnerTest, self).setUp()
+    del _executed_components[:]
+
+  def _assertExecutionOrder(self):
     self.assertCountEqual(_executed_components, [
         '_FakeComponent.a', '_FakeComponent.b', '_FakeComponent.c',
         '_FakeComponent.d', '_FakeComponent.e'
@@ -161,6 +184,82 @@ class BeamDagRunnerTest(tf.test.TestCase):
     self.assertEqual(_executed_components[3], '_FakeComponent.d')
     self.assertEqual(_executed_components[4], '_FakeComponent.e')
 
+  @mock.patch.multiple(
+      beam_dag_runner,
+      _ComponentAsDoFn=_FakeComponentAsDoFn,
+  )
+  def testRun(self):
+    beam_dag_runner.BeamDagRunner().run(_create_test_pipeline())
+    self._assertExecutionOrder()
+
+  @mock.patch.multiple(
+      beam_dag_runner,
+      _ComponentAsDoFn=_FakeComponentAsDoFn,
+  )
+  def testRunOnThreadPool(self):
+    runner = beam_dag_runner.BeamDagRunner(
+        scheduler=beam_dag_runner.SCHEDULER_THREAD, max_workers=2)
+    runner.run(_create_test_pipeline())
+    self._assertExecutionOrder()
+    self.assertCountEqual(runner.node_timings.keys(), _executed_components)
+    for timing in runner.node_timings.values():
+      self.assertGreaterEqual(timing.queue_secs, 0.0)
+      self.assertGreaterEqual(timing.run_secs, 0.0)
+    self.assertEqual(runner.critical_path[0], '_FakeComponent.a')
+    self.assertEqual(runner.critical_path[-2:],
+                     ['_FakeComponent.d', '_FakeComponent.e'])
+
+  def testRunOnProcessPool(self):
+    pipeline_root = self.get_temp_dir()
+    runner = beam_dag_runner.BeamDagRunner(
+        config=pipeline_config.PipelineConfig(
+            supported_launcher_classes=[_FakeComponentLauncher]),
+        scheduler=beam_dag_runner.SCHEDULER_PROCESS,
+        max_workers=2)
+    runner.run(_create_test_pipeline(pipeline_root))
+
+    component_ids = [
+        '_FakeComponent.a', '_FakeComponent.b', '_FakeComponent.c',
+        '_FakeComponent.d', '_FakeComponent.e'
+    ]
+    self.assertCountEqual(runner.node_timings.keys(), component_ids)
+    for component_id in component_ids:
+      with open(os.path.join(pipeline_root, component_id)) as f:
+        self.assertNotEqual(str(os.getpid()), f.read())
+    # Each component finishes after the components it depends on.
+    finish_secs = dict((component_id, timing.finish_secs)
+                       for component_id, timing in runner.node_timings.items())
+    for upstream_id, component_id in [('a', 'b'), ('a', 'c'), ('b', 'd'),
+                                      ('c', 'd'), ('d', 'e')]:
+      self.assertLessEqual(finish_secs['_FakeComponent.' + upstream_id],
+                           finish_secs['_FakeComponent.' + component_id])
+    self.assertEqual(runner.critical_path[0], '_FakeComponent.a')
+    self.assertEqual(runner.critical_path[-2:],
+                     ['_FakeComponent.d', '_FakeComponent.e'])
+
+  @mock.patch.object(beam_dag_runner.metadata, 'Metadata', autospec=True)
+  def testBatchMetadataWritesIsOptIn(self, mock_metadata_cls):
+    for batch_metadata_writes in (None, True):
+      mock_metadata_cls.reset_mock()
+      kwargs = {}
+      if batch_metadata_writes is not None:
+        kwargs['batch_metadata_writes'] = batch_metadata_writes
+      runner = beam_dag_runner.BeamDagRunner(
+          config=pipeline_config.PipelineConfig(
+              supported_launcher_classes=[_FakeComponentLauncher]),
+          scheduler=beam_dag_runner.SCHEDULER_THREAD,
+          **kwargs)
+      runner.run(_create_test_pipeline(self.get_temp_dir()))
+
+      self.assertLen(mock_metadata_cls.call_args_list, 5)
+      for call in mock_metadata_cls.call_args_list:
+        self.assertEqual(bool(batch_metadata_writes),
+                         call[1]['batch_writes'])
+
+  def testUnknownScheduler(self):
+    with self.assertRaises(ValueError):
+      beam_dag_runner.BeamDagRunner(scheduler='unknown')
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -19,7 +19,10 @@ from __future__ import division
 from __future__ import print_function
 
 import abc
-from typing import Any, Dict, List, Optional, Text
+import asyncio
+import concurrent.futures
+import functools
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Text, TypeVar
 
 import absl
 from six import with_metaclass
@@ -32,6 +35,54 @@ from tfx.orchestration import metadata
 from tfx.orchestration import publisher
 from tfx.orchestration.config import base_component_config
 
+_T = TypeVar('_T')
+
+
+def run_in_thread(fn: Callable[..., _T], *args: Any) -> Awaitable[_T]:
+  """Runs a blocking call in the default executor of the current event loop.
+
+  Used for short blocking calls (MLMD, container APIs) made from coroutines.
+
+  Args:
+    fn: the blocking function to call.
+    *args: positional arguments of fn.
+
+  Returns:
+    An awaitable with the result of fn.
+  """
+  return asyncio.get_event_loop().run_in_executor(None,
+                                                  functools.partial(fn, *args))
+
+
+def _in_running_event_loop() -> bool:
+  try:
+    return asyncio.get_event_loop().is_running()
+  except RuntimeError:
+    # No event loop is set in a non-main thread.
+    return False
+
+
+def run_until_complete(coroutine: Awaitable[_T]) -> _T:
+  """Runs a coroutine to completion on a new event loop and returns its result.
+
+  If the calling thread is already running an event loop (e.g. in a notebook),
+  the coroutine runs on a new event loop in a separate thread.
+
+  Args:
+    coroutine: the coroutine to run.
+
+  Returns:
+    The result of the coroutine.
+  """
+  if _in_running_event_loop():
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+      return pool.submit(run_until_complete, coroutine).result()
+  loop = asyncio.new_event_loop()
+  try:
+    return loop.run_until_complete(coroutine)
+  finally:
+    loop.close()
+
 
 class BaseComponentLauncher(with_metaclass(abc.ABCMeta, object)):
   """Responsible for launching driver, executor and publisher of component."""
@@ -176,6 +227,25 @@ class BaseComponentLauncher(with_metaclass(abc.ABCMeta, object)):
     """Execute underlying component implementation."""
     raise NotImplementedError
 
+  async def _run_executor_async(
+      self, execution_id: int, input_dict: Dict[Text, List[types.Artifact]],
+      output_dict: Dict[Text, List[types.Artifact]],
+      exec_properties: Dict[Text, Any]) -> None:
+    """Execute underlying component implementation without blocking the loop.
+
+    Defaults to running _run_executor in a thread. Launchers which wait on an
+    external system, e.g. container launchers, override this to await the
+    completion of the executor instead.
+
+    Args:
+      execution_id: The ID of the execution.
+      input_dict: Input dict from input key to a list of Artifacts.
+      output_dict: Output dict from output key to a list of Artifacts.
+      exec_properties: A dict of execution properties.
+    """
+    await run_in_thread(self._run_executor, execution_id, input_dict,
+                        output_dict, exec_properties)
+
   def _run_publisher(self, output_dict: Dict[Text,
                                              List[types.Artifact]]) -> None:
     """Publish execution result to ml metadata."""
@@ -185,31 +255,86 @@ class BaseComponentLauncher(with_metaclass(abc.ABCMeta, object)):
       p.publish_execution(
           component_info=self._component_info, output_artifacts=output_dict)
 
-  def launch(self) -> data_types.ExecutionInfo:
-    """Execute the component, includes driver, executor and publisher.
+  def _flush_pending_writes(self) -> None:
+    """Writes metadata updates deferred by the driver, e.g. when launch fails.
+
+    In batch_writes mode, the registration of the outputs of an execution is
+    deferred until the execution is published, and is lost otherwise.
+    """
+    with self._metadata_connection as m:
+      m.flush_pending_writes()
+
+  async def _call(self, in_thread: bool, fn: Callable[..., _T],
+                  *args: Any) -> _T:
+    """Calls a blocking function, in a thread if in_thread is set."""
+    if in_thread:
+      return await run_in_thread(fn, *args)
+    return fn(*args)
+
+  async def _launch(self, in_thread: bool) -> data_types.ExecutionInfo:
+    """Runs driver, executor and publisher of the component in sequence.
+
+    Args:
+      in_thread: Whether the event loop must be left free while the component
+        runs. Driver and publisher then run in threads of the event loop's
+        default executor, and the executor runs through _run_executor_async.
+        Otherwise they all block the calling thread.
 
     Returns:
       The execution decision of the launch.
     """
     absl.logging.info('Running driver for %s',
                       self._component_info.component_id)
-    execution_decision = self._run_driver(self._input_dict, self._output_dict,
+    execution_decision = await self._call(in_thread, self._run_driver,
+                                          self._input_dict, self._output_dict,
                                           self._exec_properties)
 
-    if not execution_decision.use_cached_results:
-      absl.logging.info('Running executor for %s',
-                        self._component_info.component_id)
-      self._run_executor(execution_decision.execution_id,
+    try:
+      if not execution_decision.use_cached_results:
+        absl.logging.info('Running executor for %s',
+                          self._component_info.component_id)
+        executor_args = (execution_decision.execution_id,
                          execution_decision.input_dict,
                          execution_decision.output_dict,
                          execution_decision.exec_properties)
+        if in_thread:
+          await self._run_executor_async(*executor_args)
+        else:
+          self._run_executor(*executor_args)
 
-    absl.logging.info('Running publisher for %s',
-                      self._component_info.component_id)
-    self._run_publisher(output_dict=execution_decision.output_dict)
+      absl.logging.info('Running publisher for %s',
+                        self._component_info.component_id)
+      await self._call(in_thread, self._run_publisher,
+                       execution_decision.output_dict)
+    except Exception:
+      await self._call(in_thread, self._flush_pending_writes)
+      raise
 
     return data_types.ExecutionInfo(
         input_dict=execution_decision.input_dict,
         output_dict=execution_decision.output_dict,
         exec_properties=execution_decision.exec_properties,
         execution_id=execution_decision.execution_id)
+
+  def launch(self) -> data_types.ExecutionInfo:
+    """Execute the component, includes driver, executor and publisher.
+
+    Driver, executor and publisher run in the calling thread, or in a separate
+    thread if the calling thread already runs an event loop.
+
+    Returns:
+      The execution decision of the launch.
+    """
+    return run_until_complete(self._launch(in_thread=False))
+
+  async def launch_async(self) -> data_types.ExecutionInfo:
+    """Execute the component, includes driver, executor and publisher.
+
+    Driver and publisher run in threads of the event loop's default executor.
+    Many components can be launched concurrently from a single event loop, e.g.
+    with asyncio.gather.
+
+    Returns:
+      The execution decision of the launch.
+    """
+    return await self._launch(in_thread=True)
@@ -18,6 +18,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import asyncio
 import os
 import mock
 import tensorflow as tf
@@ -82,6 +83,86 @@ class ComponentRunnerTest(tf.test.TestCase):
     contents = file_io.read_file_to_string(output_path)
     self.assertEqual('test', contents)
 
+  def _create_launcher(self, test_dir, name):
+    connection_config = metadata_store_pb2.ConnectionConfig()
+    connection_config.sqlite.SetInParent()
+    input_path = os.path.join(test_dir, name, 'input')
+    tf.io.gfile.makedirs(os.path.dirname(input_path))
+    file_io.write_string_to_file(input_path, name)
+    input_artifact = test_utils._InputArtifact()
+    input_artifact.uri = input_path
+    component = test_utils._FakeComponent(
+        name=name, input_channel=channel_utils.as_channel([input_artifact]))
+    return in_process_component_launcher.InProcessComponentLauncher.create(
+        component=component,
+        pipeline_info=data_types.PipelineInfo(
+            pipeline_name='Test',
+            pipeline_root=os.path.join(test_dir, name, 'Test'),
+            run_id='123'),
+        driver_args=data_types.DriverArgs(enable_cache=True),
+        metadata_connection=metadata.Metadata(connection_config),
+        beam_pipeline_args=[],
+        additional_pipeline_args={})
+
+  @mock.patch.object(publisher, 'Publisher')
+  @mock.patch.object(metadata.Metadata, 'flush_pending_writes')
+  def testLaunchFailureFlushesPendingWrites(self, mock_flush_pending_writes,
+                                            mock_publisher):
+    test_dir = os.path.join(
+        os.environ.get('TEST_UNDECLARED_OUTPUTS_DIR', self.get_temp_dir()),
+        self._testMethodName)
+    launcher = self._create_launcher(test_dir, 'Component')
+
+    with mock.patch.object(
+        launcher, '_run_executor', side_effect=RuntimeError('Failed')):
+      with self.assertRaisesRegexp(RuntimeError, 'Failed'):
+        launcher.launch()
+    mock_flush_pending_writes.assert_called_once_with()
+    mock_publisher.assert_not_called()
+
+  @mock.patch.object(publisher, 'Publisher')
+  def testLaunchAsyncConcurrently(self, mock_publisher):
+    mock_publisher.return_value.publish_execution.return_value = {}
+    test_dir = os.path.join(
+        os.environ.get('TEST_UNDECLARED_OUTPUTS_DIR', self.get_temp_dir()),
+        self._testMethodName)
+    names = ['Component1', 'Component2', 'Component3']
+    launchers = [self._create_launcher(test_dir, name) for name in names]
+
+    loop = asyncio.new_event_loop()
+    try:
+      loop.run_until_complete(
+          asyncio.gather(*[launcher.launch_async() for launcher in launchers]))
+    finally:
+      loop.close()
+
+    for name in names:
+      self.assertEqual(
+          name,
+          file_io.read_file_to_string(
+              os.path.join(test_dir, name, 'Test', 'output')))
+
+  @mock.patch.object(publisher, 'Publisher')
+  def testLaunchInRunningEventLoop(self, mock_publisher):
+    mock_publisher.return_value.publish_execution.return_value = {}
+    test_dir = os.path.join(
+        os.environ.get('TEST_UNDECLARED_OUTPUTS_DIR', self.get_temp_dir()),
+        self._testMethodName)
+    launcher = self._create_launcher(test_dir, 'Component')
+
+    async def _launch():
+      return launcher.launch()
+
+    loop = asyncio.new_event_loop()
+    try:
+      loop.run_until_complete(_launch())
+    finally:
+      loop.close()
+
+    self.assertTrue(
+        tf.io.gfile.exists(os.path.join(test_dir, 'Component', 'Test',
+                                        'output')))
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -18,6 +18,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import asyncio
+import concurrent.futures
 from typing import Any, Dict, List, Text, cast
 
 import absl
@@ -31,6 +33,24 @@ from tfx.orchestration.launcher import base_component_launcher
 from tfx.orchestration.launcher import container_common
 
 
+def _stream_logs(container: docker.models.containers.Container) -> None:
+  """Logs the output of a container until it exits."""
+  for log in container.logs(stream=True):
+    absl.logging.info('Docker: ' + log.decode('utf-8'))
+
+
+def _check_exit_code(wait_result: Dict[Text, Any]) -> None:
+  """Raises RuntimeError if a container did not exit successfully."""
+  exit_code = wait_result['StatusCode']
+  if exit_code != 0:
+    raise RuntimeError(
+        'Container exited with error code "{}"'.format(exit_code))
+  # TODO(b/141192583): Report data to publisher
+  # - report container digest
+  # - report replaced command line entrypoints
+  # - report docker run args
+
+
 class DockerComponentLauncher(base_component_launcher.BaseComponentLauncher):
   """Responsible for launching a container executor."""
 
@@ -51,7 +71,54 @@ class DockerComponentLauncher(base_component_launcher.BaseComponentLauncher):
                     output_dict: Dict[Text, List[types.Artifact]],
                     exec_properties: Dict[Text, Any]) -> None:
     """Execute underlying component implementation."""
+    container = self._run_container(input_dict, output_dict, exec_properties)
+
+    # Streaming logs
+    _stream_logs(container)
+    _check_exit_code(container.wait())
+
+  async def _run_executor_async(
+      self, execution_id: int, input_dict: Dict[Text, List[types.Artifact]],
+      output_dict: Dict[Text, List[types.Artifact]],
+      exec_properties: Dict[Text, Any]) -> None:
+    """Runs the executor container and awaits its completion.
 
+    Container logs are streamed while the container runs, and its completion
+    is awaited, each in a thread. The Docker API offers only blocking calls
+    for both, so each running container holds two threads of its own, outside
+    the event loop's default executor. The number of concurrent launches is
+    then bounded by the threads a process may start, not by the size of the
+    default executor.
+
+    Args:
+      execution_id: The ID of the execution.
+      input_dict: Input dict from input key to a list of Artifacts.
+      output_dict: Output dict from output key to a list of Artifacts.
+      exec_properties: A dict of execution properties.
+
+    Raises:
+      RuntimeError: when the container exits with a non-zero code.
+    """
+    container = await base_component_launcher.run_in_thread(
+        self._run_container, input_dict, output_dict, exec_properties)
+
+    loop = asyncio.get_event_loop()
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    try:
+      # Streaming logs
+      _, wait_result = await asyncio.gather(
+          loop.run_in_executor(pool, _stream_logs, container),
+          loop.run_in_executor(pool, container.wait))
+    finally:
+      # Does not block the event loop if the launch is cancelled.
+      pool.shutdown(wait=False)
+    _check_exit_code(wait_result)
+
+  def _run_container(
+      self, input_dict: Dict[Text, List[types.Artifact]],
+      output_dict: Dict[Text, List[types.Artifact]],
+      exec_properties: Dict[Text, Any]) -> docker.models.containers.Container:
+    """Starts the executor container, detached from the caller."""
     executor_container_spec = cast(executor_spec.ExecutorContainerSpec,
                                    self._component_executor_spec)
     if self._component_config:
@@ -77,21 +144,9 @@ class DockerComponentLauncher(base_component_launcher.BaseComponentLauncher):
       client = docker.from_env()
 
     run_args = docker_config.to_run_args()
-    container = client.containers.run(
+    return client.containers.run(
         image=executor_container_spec.image,
         entrypoint=executor_container_spec.command,
         command=executor_container_spec.args,
         detach=True,
         **run_args)
-
-    # Streaming logs
-    for log in container.logs(stream=True):
-      absl.logging.info('Docker: ' + log.decode('utf-8'))
-    exit_code = container.wait()['StatusCode']
-    if exit_code != 0:
-      raise RuntimeError(
-          'Container exited with error code "{}"'.format(exit_code))
-    # TODO(b/141192583): Report data to publisher
-    # - report container digest
-    # - report replaced command line entrypoints
-    # - report docker run args
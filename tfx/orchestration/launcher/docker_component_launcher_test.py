@@ -18,7 +18,10 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import asyncio
+import concurrent.futures
 import os
+import threading
 
 import docker
 import mock
@@ -106,6 +109,59 @@ class DockerComponentLauncherTest(tf.test.TestCase):
     with self.assertRaises(RuntimeError):
       launcher.launch()
 
+  @mock.patch.object(publisher, 'Publisher', autospec=True)
+  @mock.patch.object(docker, 'from_env', autospec=True)
+  def testLaunchAsyncStreamsLogs(self, mock_docker_client, mock_publisher):
+    mock_publisher.return_value.publish_execution.return_value = {}
+    mock_run = mock_docker_client.return_value.containers.run
+    mock_container = mock_run.return_value
+    mock_container.logs.return_value = [b'line-1\n', b'line-2\n']
+    mock_container.wait.return_value = {'StatusCode': 0}
+    launcher = self._create_launcher_context()['launcher']
+
+    loop = asyncio.new_event_loop()
+    try:
+      loop.run_until_complete(launcher.launch_async())
+    finally:
+      loop.close()
+
+    mock_container.logs.assert_called_once_with(stream=True)
+    mock_container.wait.assert_called_once_with()
+    mock_container.reload.assert_not_called()
+
+  @mock.patch.object(publisher, 'Publisher', autospec=True)
+  @mock.patch.object(docker, 'from_env', autospec=True)
+  def testLaunchAsyncWaitsOutsideDefaultExecutor(self, mock_docker_client,
+                                                 mock_publisher):
+    mock_publisher.return_value.publish_execution.return_value = {}
+    mock_container = mock_docker_client.return_value.containers.run.return_value
+    wait_called = threading.Event()
+
+    def _logs(stream):
+      del stream
+      # Logs end only once the container is waited on.
+      self.assertTrue(wait_called.wait(timeout=10))
+      return [b'line-1\n']
+
+    def _wait():
+      wait_called.set()
+      return {'StatusCode': 0}
+
+    mock_container.logs.side_effect = _logs
+    mock_container.wait.side_effect = _wait
+    launcher = self._create_launcher_context()['launcher']
+
+    loop = asyncio.new_event_loop()
+    # A default executor too small to run the log stream and the wait.
+    loop.set_default_executor(
+        concurrent.futures.ThreadPoolExecutor(max_workers=1))
+    try:
+      loop.run_until_complete(launcher.launch_async())
+    finally:
+      loop.close()
+
+    mock_container.wait.assert_called_once_with()
+
   def _create_launcher_context(self, component_config=None):
     test_dir = self.get_temp_dir()
 
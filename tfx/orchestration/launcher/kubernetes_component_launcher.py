@@ -18,11 +18,12 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-import datetime
+import asyncio
+import math
 import os
 import re
 import time
-from typing import Any, Callable, Dict, List, Text, cast
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Text, cast
 
 import absl
 from kubernetes import client
@@ -34,6 +35,7 @@ from tfx.orchestration.config import base_component_config
 from tfx.orchestration.config import kubernetes_component_config
 from tfx.orchestration.launcher import base_component_launcher
 from tfx.orchestration.launcher import container_common
+from tfx.orchestration.launcher import kubernetes_pod_informer
 
 # Pod env names from:
 # https://github.com/kubeflow/pipelines/blob/0.1.32/sdk/python/kfp/compiler/_default_transformers.py
@@ -44,6 +46,14 @@ _KFP_NAMESPACE_ENV = 'KFP_NAMESPACE'
 _POD_PENDING_PHASE = 'Pending'
 _POD_SUCCEEDED_PHASE = 'Succeeded'
 _POD_FAILED_PHASE = 'Failed'
+# Initial and maximum interval between pod status checks. Pods are polled in
+# case the pod watch misses an event or is not available.
+_POLL_INTERVAL_SECS = 1.0
+_MAX_POLL_INTERVAL_SECS = 5.0
+# Seconds of logs read again on each read of the logs of a running pod, so
+# that lines written while the previous read was in flight are not missed.
+# Lines logged already are skipped.
+_LOG_OVERLAP_SECS = 5
 
 
 def _pod_is_not_pending(resp: client.V1Pod):
@@ -60,6 +70,88 @@ def _sanitize_pod_name(pod_name: Text) -> Text:
   return re.sub(r'[-]+', '-', pod_name)
 
 
+def _iter_lines(chunks: Iterable[bytes]) -> Iterator[Text]:
+  """Splits a stream of byte chunks into lines, without line breaks."""
+  pending = b''
+  for chunk in chunks:
+    lines = (pending + chunk).split(b'\n')
+    pending = lines.pop()
+    for line in lines:
+      yield line.decode('utf-8', 'replace')
+  if pending:
+    yield pending.decode('utf-8', 'replace')
+
+
+def _timestamp_key(timestamp: Text) -> Text:
+  """Returns a sortable key of an RFC 3339 UTC timestamp of a log line."""
+  # Trailing zeros of the fraction of seconds are omitted by the API server.
+  seconds, _, fraction = timestamp.rstrip('Z').partition('.')
+  return '%s.%s' % (seconds, fraction.ljust(9, '0'))
+
+
+class _PodLogReader(object):
+  """Logs the output of the main container of a POD as it is read.
+
+  Each read fetches the lines logged since the previous read, so no thread is
+  held while the POD runs. Lines are read with the timestamps of the API
+  server, which tell the lines logged already by the previous read.
+  """
+
+  def __init__(self, core_api: client.CoreV1Api, pod_name: Text,
+               namespace: Text):
+    self._core_api = core_api
+    self._pod_name = pod_name
+    self._namespace = namespace
+    self._last_read_time = None  # type: Optional[float]
+    # Timestamp of the last line logged, and number of lines logged with it.
+    self._last_key = None  # type: Optional[Text]
+    self._last_key_count = 0
+
+  def read(self) -> None:
+    """Logs the lines written since the previous read.
+
+    Raises:
+      RuntimeError: When it fails to read the logs from Kubernetes API.
+    """
+    kwargs = {}
+    read_time = time.time()
+    if self._last_read_time is not None:
+      # Seconds measured on one clock, as the API server applies them to the
+      # timestamps of its node.
+      kwargs['since_seconds'] = int(
+          math.ceil(read_time - self._last_read_time)) + _LOG_OVERLAP_SECS
+    try:
+      logs = self._core_api.read_namespaced_pod_log(
+          name=self._pod_name,
+          namespace=self._namespace,
+          container='main',
+          timestamps=True,
+          _preload_content=False,
+          **kwargs).stream()
+    except client.rest.ApiException as e:
+      raise RuntimeError(
+          'Failed to read the logs from the pod!\nReason: %s\nBody: %s' %
+          (e.reason, e.body))
+    self._last_read_time = read_time
+
+    seen_count = 0
+    for line in _iter_lines(logs):
+      timestamp, _, text = line.partition(' ')
+      key = _timestamp_key(timestamp)
+      if self._last_key is not None and key <= self._last_key:
+        if key < self._last_key:
+          continue
+        seen_count += 1
+        if seen_count <= self._last_key_count:
+          continue
+      if key == self._last_key:
+        self._last_key_count += 1
+      else:
+        self._last_key = key
+        self._last_key_count = 1
+      absl.logging.info(text)
+
+
 class KubernetesComponentLauncher(base_component_launcher.BaseComponentLauncher
                                  ):
   """Responsible for launching a container executor on Kubernetes."""
@@ -84,10 +176,21 @@ class KubernetesComponentLauncher(base_component_launcher.BaseComponentLauncher
                     input_dict: Dict[Text, List[types.Artifact]],
                     output_dict: Dict[Text, List[types.Artifact]],
                     exec_properties: Dict[Text, Any]) -> None:
+    """Execute underlying component implementation."""
+    base_component_launcher.run_until_complete(
+        self._run_executor_async(execution_id, input_dict, output_dict,
+                                 exec_properties))
+
+  async def _run_executor_async(
+      self, execution_id: int, input_dict: Dict[Text, List[types.Artifact]],
+      output_dict: Dict[Text, List[types.Artifact]],
+      exec_properties: Dict[Text, Any]) -> None:
     """Execute underlying component implementation.
 
-    Runs executor container in a Kubernetes Pod and wait until it goes into
-    `Succeeded` or `Failed` state.
+    Runs executor container in a Kubernetes Pod and awaits until it goes into
+    `Succeeded` or `Failed` state. No thread is held while the pod runs: its
+    completion is awaited through the pod watch, and its logs are read each
+    time its status is polled.
 
     Args:
       execution_id: The ID of the execution.
@@ -133,7 +236,8 @@ class KubernetesComponentLauncher(base_component_launcher.BaseComponentLauncher
 
     if is_in_cluster:
       launcher_pod_name = os.getenv(_KFP_POD_NAME_ENV)
-      launcher_pod = self._get_pod(core_api, launcher_pod_name, namespace)
+      launcher_pod = await base_component_launcher.run_in_thread(
+          self._get_pod, core_api, launcher_pod_name, namespace)
       pod_manifest['spec']['serviceAccount'] = launcher_pod.spec.service_account
       pod_manifest['spec'][
           'serviceAccountName'] = launcher_pod.spec.service_account_name
@@ -142,14 +246,16 @@ class KubernetesComponentLauncher(base_component_launcher.BaseComponentLauncher
               launcher_pod.metadata.owner_references)
 
     absl.logging.info('Looking for pod "%s:%s".' % (namespace, pod_name))
-    resp = self._get_pod(core_api, pod_name, namespace)
+    resp = await base_component_launcher.run_in_thread(self._get_pod, core_api,
+                                                       pod_name, namespace)
     if not resp:
       absl.logging.info('Pod "%s:%s" does not exist. Creating it...' %
                         (namespace, pod_name))
       absl.logging.info('Pod manifest: ' + str(pod_manifest))
       try:
-        resp = core_api.create_namespaced_pod(
-            namespace=namespace, body=pod_manifest)
+        resp = await base_component_launcher.run_in_thread(
+            lambda: core_api.create_namespaced_pod(  # pylint: disable=g-long-lambda
+                namespace=namespace, body=pod_manifest))
       except client.rest.ApiException as e:
         raise RuntimeError(
             'Failed to created container executor pod!\nReason: %s\nBody: %s' %
@@ -157,36 +263,26 @@ class KubernetesComponentLauncher(base_component_launcher.BaseComponentLauncher
 
     absl.logging.info('Waiting for pod "%s:%s" to start.' %
                       (namespace, pod_name))
-    self._wait_pod(
+    await self._wait_pod(
         core_api,
         pod_name,
         namespace,
         exit_condition_lambda=_pod_is_not_pending,
         condition_description='non-pending status')
 
-    absl.logging.info('Start log streaming for pod "%s:%s".' %
+    absl.logging.info('Start log reading for pod "%s:%s".' %
                       (namespace, pod_name))
-    try:
-      logs = core_api.read_namespaced_pod_log(
-          name=pod_name,
-          namespace=namespace,
-          container='main',
-          follow=True,
-          _preload_content=False).stream()
-    except client.rest.ApiException as e:
-      raise RuntimeError(
-          'Failed to stream the logs from the pod!\nReason: %s\nBody: %s' %
-          (e.reason, e.body))
-
-    for log in logs:
-      absl.logging.info(log.decode().rstrip('\n'))
-
-    resp = self._wait_pod(
+    log_reader = _PodLogReader(core_api, pod_name, namespace)
+    resp = await self._wait_pod(
         core_api,
         pod_name,
         namespace,
         exit_condition_lambda=_pod_is_done,
-        condition_description='done state')
+        condition_description='done state',
+        timeout_sec=None,
+        on_poll=log_reader.read)
+    # Logs written since the last poll.
+    await base_component_launcher.run_in_thread(log_reader.read)
 
     if resp.status.phase == _POD_FAILED_PHASE:
       raise RuntimeError('Pod "%s:%s" failed with status "%s".' %
@@ -225,6 +321,11 @@ class KubernetesComponentLauncher(base_component_launcher.BaseComponentLauncher
     # dict.
     metadata = pod_manifest.setdefault('metadata', {})  # type: Dict[Text, Any]
     metadata.update({'name': pod_name})
+    labels = metadata.setdefault('labels', {})  # type: Dict[Text, Text]
+    labels.update({
+        kubernetes_pod_informer.LAUNCHER_POD_LABEL_KEY:
+            kubernetes_pod_informer.LAUNCHER_POD_LABEL_VALUE
+    })
     spec = pod_manifest.setdefault('spec', {})  # type: Dict[Text, Any]
     spec.update({'restartPolicy': 'Never'})
     containers = spec.setdefault('containers',
@@ -267,15 +368,22 @@ class KubernetesComponentLauncher(base_component_launcher.BaseComponentLauncher
                            (e.reason, e.body))
       return None
 
-  def _wait_pod(self,
-                core_api: client.CoreV1Api,
-                pod_name: Text,
-                namespace: Text,
-                exit_condition_lambda: Callable[[client.V1Pod], bool],
-                condition_description: Text,
-                timeout_sec: int = 100) -> client.V1Pod:
+  async def _wait_pod(self,
+                      core_api: client.CoreV1Api,
+                      pod_name: Text,
+                      namespace: Text,
+                      exit_condition_lambda: Callable[[client.V1Pod], bool],
+                      condition_description: Text,
+                      timeout_sec: Optional[int] = 100,
+                      on_poll: Optional[Callable[[], None]] = None
+                     ) -> client.V1Pod:
     """Wait for a POD to meet an exit condition.
 
+    The wait ends as soon as the shared watch of the namespace's pods sees the
+    POD meet the condition. The POD is also polled with exponential backoff
+    between _POLL_INTERVAL_SECS and _MAX_POLL_INTERVAL_SECS, in case the watch
+    is not available.
+
     Args:
       core_api: Client of Core V1 API of Kubernetes API.
       pod_name: The name of the POD.
@@ -284,7 +392,10 @@ class KubernetesComponentLauncher(base_component_launcher.BaseComponentLauncher
         for a POD to exit. The function returns True to exit.
       condition_description: The description of the exit condition which will be
         set in the error message if the wait times out.
-      timeout_sec: The seconds for the function to wait. Defaults to 100s.
+      timeout_sec: The seconds for the function to wait. Defaults to 100s. None
+        waits until the POD meets the condition.
+      on_poll: Optional blocking function called in a thread each time the POD
+        is polled, e.g. to read its logs.
 
     Returns:
       The POD object which meets the exit condition.
@@ -292,19 +403,36 @@ class KubernetesComponentLauncher(base_component_launcher.BaseComponentLauncher
     Raises:
       RuntimeError: when the function times out.
     """
-    start_time = datetime.datetime.utcnow()
-    while True:
-      resp = self._get_pod(core_api, pod_name, namespace)
-      absl.logging.info(resp.status.phase)
-      if exit_condition_lambda(resp):
-        return resp
-      elapse_time = datetime.datetime.utcnow() - start_time
-      if elapse_time.seconds >= timeout_sec:
-        raise RuntimeError(
-            'Pod "%s:%s" does not reach "%s" within %s seconds.' %
-            (namespace, pod_name, condition_description, timeout_sec))
-      # TODO(hongyes): add exponential backoff here.
-      time.sleep(1)
+    informer = kubernetes_pod_informer.get_pod_informer(namespace)
+    watched_pod = informer.add_waiter(core_api, pod_name, exit_condition_lambda)
+    try:
+      start_time = time.time()
+      poll_interval = _POLL_INTERVAL_SECS
+      while True:
+        resp = await base_component_launcher.run_in_thread(
+            self._get_pod, core_api, pod_name, namespace)
+        absl.logging.info(resp.status.phase)
+        if on_poll:
+          await base_component_launcher.run_in_thread(on_poll)
+        if exit_condition_lambda(resp):
+          return resp
+        wait_sec = poll_interval
+        if timeout_sec is not None:
+          remaining_sec = start_time + timeout_sec - time.time()
+          if remaining_sec <= 0:
+            raise RuntimeError(
+                'Pod "%s:%s" does not reach "%s" within %s seconds.' %
+                (namespace, pod_name, condition_description, timeout_sec))
+          wait_sec = min(poll_interval, remaining_sec)
+        try:
+          resp = await asyncio.wait_for(
+              asyncio.shield(watched_pod), timeout=wait_sec)
+          absl.logging.info(resp.status.phase)
+          return resp
+        except asyncio.TimeoutError:
+          poll_interval = min(poll_interval * 2, _MAX_POLL_INTERVAL_SECS)
+    finally:
+      informer.remove_waiter(pod_name, watched_pod)
 
   def _build_pod_name(self, execution_id: int) -> Text:
     if self._pipeline_info.run_id:
@@ -18,6 +18,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import asyncio
 import os
 from kubernetes import client
 from kubernetes import config
@@ -32,6 +33,7 @@ from tfx.orchestration import metadata
 from tfx.orchestration import publisher
 from tfx.orchestration.config import kubernetes_component_config
 from tfx.orchestration.launcher import kubernetes_component_launcher
+from tfx.orchestration.launcher import kubernetes_pod_informer
 from tfx.orchestration.launcher import test_utils
 from tfx.types import channel_utils
 
@@ -68,7 +70,7 @@ class KubernetesComponentLauncherTest(tf.test.TestCase):
     # Mock successful pod creation.
     core_api.create_namespaced_pod.return_value = client.V1Pod()
     core_api.read_namespaced_pod_log.return_value.stream.return_value = [
-        b'log-1'
+        b'2020-01-01T00:00:00.1Z log-1\n'
     ]
     context = self._create_launcher_context()
 
@@ -76,7 +78,8 @@ class KubernetesComponentLauncherTest(tf.test.TestCase):
 
     self.assertEqual(5, core_api.read_namespaced_pod.call_count)
     core_api.create_namespaced_pod.assert_called_once()
-    core_api.read_namespaced_pod_log.assert_called_once()
+    # Logs are read when the done pod is polled, and once the wait is over.
+    self.assertEqual(2, core_api.read_namespaced_pod_log.call_count)
     _, mock_kwargs = core_api.create_namespaced_pod.call_args
     self.assertEqual('ns-1', mock_kwargs['namespace'])
     pod_manifest = mock_kwargs['body']
@@ -87,6 +90,9 @@ class KubernetesComponentLauncherTest(tf.test.TestCase):
             'metadata': {
                 'name':
                     'test-123-fakecomponent-fakecomponent-123',
+                'labels': {
+                    'tfx.orchestration/launcher': 'kubernetes'
+                },
                 'ownerReferences': [{
                     'apiVersion': 'argoproj.io/v1alpha1',
                     'kind': 'Workflow',
@@ -128,7 +134,7 @@ class KubernetesComponentLauncherTest(tf.test.TestCase):
     # Mock successful pod creation.
     core_api.create_namespaced_pod.return_value = client.V1Pod()
     core_api.read_namespaced_pod_log.return_value.stream.return_value = [
-        b'log-1'
+        b'2020-01-01T00:00:00.1Z log-1\n'
     ]
     context = self._create_launcher_context()
 
@@ -136,7 +142,8 @@ class KubernetesComponentLauncherTest(tf.test.TestCase):
 
     self.assertEqual(4, core_api.read_namespaced_pod.call_count)
     core_api.create_namespaced_pod.assert_called_once()
-    core_api.read_namespaced_pod_log.assert_called_once()
+    # Logs are read when the done pod is polled, and once the wait is over.
+    self.assertEqual(2, core_api.read_namespaced_pod_log.call_count)
     _, mock_kwargs = core_api.create_namespaced_pod.call_args
     self.assertEqual('kubeflow', mock_kwargs['namespace'])
     pod_manifest = mock_kwargs['body']
@@ -146,6 +153,9 @@ class KubernetesComponentLauncherTest(tf.test.TestCase):
             'kind': 'Pod',
             'metadata': {
                 'name': 'test-123-fakecomponent-fakecomponent-123',
+                'labels': {
+                    'tfx.orchestration/launcher': 'kubernetes'
+                },
             },
             'spec': {
                 'restartPolicy':
@@ -181,7 +191,7 @@ class KubernetesComponentLauncherTest(tf.test.TestCase):
     # Mock successful pod creation.
     core_api.create_namespaced_pod.return_value = client.V1Pod()
     core_api.read_namespaced_pod_log.return_value.stream.return_value = [
-        b'log-1'
+        b'2020-01-01T00:00:00.1Z log-1\n'
     ]
     component_config = kubernetes_component_config.KubernetesComponentConfig(
         client.V1Pod(
@@ -197,7 +207,8 @@ class KubernetesComponentLauncherTest(tf.test.TestCase):
 
     self.assertEqual(5, core_api.read_namespaced_pod.call_count)
     core_api.create_namespaced_pod.assert_called_once()
-    core_api.read_namespaced_pod_log.assert_called_once()
+    # Logs are read when the done pod is polled, and once the wait is over.
+    self.assertEqual(2, core_api.read_namespaced_pod_log.call_count)
     _, mock_kwargs = core_api.create_namespaced_pod.call_args
     self.assertEqual('ns-1', mock_kwargs['namespace'])
     pod_manifest = mock_kwargs['body']
@@ -209,6 +220,9 @@ class KubernetesComponentLauncherTest(tf.test.TestCase):
             'metadata': {
                 'name':
                     'test-123-fakecomponent-fakecomponent-123',
+                'labels': {
+                    'tfx.orchestration/launcher': 'kubernetes'
+                },
                 'ownerReferences': [{
                     'apiVersion': 'argoproj.io/v1alpha1',
                     'kind': 'Workflow',
@@ -234,6 +248,67 @@ class KubernetesComponentLauncherTest(tf.test.TestCase):
             }
         }, pod_manifest)
 
+  def testWaitPodReturnsOnWatchEvent(self):
+    core_api = mock.Mock()
+    core_api.read_namespaced_pod.return_value = self._mock_executor_pod(
+        'Running')
+    done_pod = client.V1Pod(
+        metadata=client.V1ObjectMeta(name='pod-1'),
+        status=client.V1PodStatus(phase='Succeeded'))
+    informer = kubernetes_pod_informer.PodInformer(
+        'ns',
+        stream_fn=lambda *unused_args: iter([{
+            'type': 'MODIFIED',
+            'object': done_pod
+        }]))
+    launcher = self._create_launcher_context()['launcher']
+
+    loop = asyncio.new_event_loop()
+    try:
+      with mock.patch.object(
+          kubernetes_pod_informer, 'get_pod_informer', return_value=informer):
+        resp = loop.run_until_complete(
+            launcher._wait_pod(
+                core_api,
+                'pod-1',
+                'ns',
+                exit_condition_lambda=kubernetes_component_launcher
+                ._pod_is_done,
+                condition_description='done state'))
+    finally:
+      loop.close()
+
+    self.assertEqual('Succeeded', resp.status.phase)
+    # The pod is read once, the end of the wait comes from the watch.
+    self.assertEqual(1, core_api.read_namespaced_pod.call_count)
+
+  def testPodLogReaderLogsEachLineOnce(self):
+    core_api = mock.Mock()
+    core_api.read_namespaced_pod_log.return_value.stream.side_effect = [
+        [b'2020-01-01T00:00:01Z line-1\n2020-01-01T00:00:01.5Z li', b'ne-2\n'],
+        [
+            b'2020-01-01T00:00:01.5Z line-2\n',
+            b'2020-01-01T00:00:01.5Z line-3\n',
+            b'2020-01-01T00:00:01.25Z line-4\n'
+        ],
+    ]
+    reader = kubernetes_component_launcher._PodLogReader(
+        core_api, 'pod-1', 'ns')
+
+    with mock.patch.object(
+        kubernetes_component_launcher.absl.logging, 'info') as mock_info:
+      reader.read()
+      reader.read()
+
+    self.assertEqual(['line-1', 'line-2', 'line-3'],
+                     [args[0] for args, _ in mock_info.call_args_list])
+    first_kwargs = core_api.read_namespaced_pod_log.call_args_list[0][1]
+    second_kwargs = core_api.read_namespaced_pod_log.call_args_list[1][1]
+    self.assertTrue(first_kwargs['timestamps'])
+    self.assertNotIn('since_seconds', first_kwargs)
+    self.assertGreaterEqual(second_kwargs['since_seconds'],
+                            kubernetes_component_launcher._LOG_OVERLAP_SECS)
+
   def _create_launcher_context(self, component_config=None):
     test_dir = self.get_temp_dir()
 
@@ -0,0 +1,221 @@
+# Lint as: python2, python3
+# Copyright 2020 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Shared watch of Kubernetes pods for launchers waiting on pod state."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import asyncio
+import collections
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Text
+
+import absl
+from kubernetes import client
+from kubernetes import watch
+
+# Label of the pods created by KubernetesComponentLauncher. The watch only
+# lists the pods with this label.
+LAUNCHER_POD_LABEL_KEY = 'tfx.orchestration/launcher'
+LAUNCHER_POD_LABEL_VALUE = 'kubernetes'
+# Server side timeout of a single watch request. The watch is restarted when it
+# times out, as long as some pod is waited on, from the last resource version
+# it observed.
+_WATCH_TIMEOUT_SECS = 60
+# Status of a watch request whose resource version is too old to resume from.
+_HTTP_GONE = 410
+# Initial and maximum delay before restarting a watch which failed, or which
+# the server closed without any event well before its timeout.
+_RETRY_INTERVAL_SECS = 1.0
+_MAX_RETRY_INTERVAL_SECS = 30.0
+
+# Function streaming watch events of the launcher pods of a namespace after a
+# resource version, or of their current states if it is None. Each event is a
+# dict with a 'type' key and an 'object' key holding a client.V1Pod.
+StreamFn = Callable[[client.CoreV1Api, Text, int, Optional[Text]],
+                    Iterator[Dict[Text, Any]]]
+
+
+def _watch_pods(core_api: client.CoreV1Api, namespace: Text, timeout_sec: int,
+                resource_version: Optional[Text]) -> Iterator[Dict[Text, Any]]:
+  """Streams watch events of the launcher pods of a namespace."""
+  kwargs = {}
+  if resource_version is not None:
+    kwargs['resource_version'] = resource_version
+  return watch.Watch().stream(
+      core_api.list_namespaced_pod,
+      namespace=namespace,
+      label_selector='%s=%s' % (LAUNCHER_POD_LABEL_KEY,
+                                LAUNCHER_POD_LABEL_VALUE),
+      timeout_seconds=timeout_sec,
+      **kwargs)
+
+
+def _get_error_status(status: Any) -> Optional[int]:
+  """Returns the HTTP status code of the object of an ERROR watch event."""
+  if isinstance(status, dict):
+    return status.get('code')
+  return getattr(status, 'code', None)
+
+
+def _set_result(future: asyncio.Future, pod: client.V1Pod) -> None:
+  if not future.done():
+    future.set_result(pod)
+
+
+class _Waiter(object):
+  """A pending wait for a pod to meet a condition."""
+
+  def __init__(self, condition: Callable[[client.V1Pod], bool],
+               loop: asyncio.AbstractEventLoop):
+    self.condition = condition
+    self.loop = loop
+    self.future = loop.create_future()
+
+
+class PodInformer(object):
+  """Watches the launcher pods of a namespace on behalf of many waiters.
+
+  A single watch, run by a daemon thread, serves all the pods waited on in a
+  namespace. The thread runs only while some pod is waited on. Each watch
+  request resumes from the last resource version observed, and starts over
+  from the current pod states when that version expired. Waiters get an
+  asyncio future which is resolved with the first pod state observed by the
+  watch which meets their condition.
+
+  The watch only shortens the wait: a waiter must still read the pod itself
+  before waiting on its future, since states reached before the waiter was
+  added may not be observed, and should poll the pod in case the watch is not
+  available (e.g. missing permission to list pods).
+  """
+
+  def __init__(self, namespace: Text, stream_fn: Optional[StreamFn] = None):
+    self._namespace = namespace
+    self._stream_fn = stream_fn or _watch_pods
+    self._lock = threading.Lock()
+    self._waiters = collections.defaultdict(list)
+    self._core_api = None
+    self._thread = None
+
+  def add_waiter(self, core_api: client.CoreV1Api, pod_name: Text,
+                 condition: Callable[[client.V1Pod], bool]) -> asyncio.Future:
+    """Waits for a pod to meet a condition.
+
+    Must be called from a coroutine. The waiter must be removed with
+    remove_waiter once done.
+
+    Args:
+      core_api: Client of Core V1 API of Kubernetes API, used to start the
+        watch if it is not running.
+      pod_name: The name of the pod.
+      condition: Returns True when the wait is over.
+
+    Returns:
+      A future resolved with the pod once it meets the condition.
+    """
+    waiter = _Waiter(condition, asyncio.get_event_loop())
+    with self._lock:
+      self._waiters[pod_name].append(waiter)
+      self._core_api = core_api
+      if self._thread is None:
+        self._thread = threading.Thread(
+            target=self._run, name='PodInformer-%s' % self._namespace)
+        self._thread.daemon = True
+        self._thread.start()
+    return waiter.future
+
+  def remove_waiter(self, pod_name: Text, future: asyncio.Future) -> None:
+    """Removes the waiter owning a future returned by add_waiter."""
+    with self._lock:
+      waiters = [w for w in self._waiters[pod_name] if w.future is not future]
+      if waiters:
+        self._waiters[pod_name] = waiters
+      else:
+        del self._waiters[pod_name]
+
+  def _dispatch(self, pod: client.V1Pod) -> None:
+    with self._lock:
+      waiters = list(self._waiters.get(pod.metadata.name, ()))
+    for waiter in waiters:
+      if waiter.condition(pod):
+        waiter.loop.call_soon_threadsafe(_set_result, waiter.future, pod)
+
+  def _run(self) -> None:
+    """Runs watches of the namespace until no pod is waited on."""
+    retry_interval = _RETRY_INTERVAL_SECS
+    resource_version = None
+    while True:
+      with self._lock:
+        if not self._waiters:
+          self._thread = None
+          return
+        core_api = self._core_api
+      has_events = False
+      failed = False
+      start_time = time.time()
+      try:
+        for event in self._stream_fn(core_api, self._namespace,
+                                     _WATCH_TIMEOUT_SECS, resource_version):
+          if event.get('type') == 'ERROR':
+            # Some clients report errors, e.g. an expired resource version, as
+            # events instead of raising them.
+            raise client.rest.ApiException(
+                status=_get_error_status(event.get('object')),
+                reason=str(event.get('object')))
+          has_events = True
+          pod = event.get('object')
+          if isinstance(pod, client.V1Pod) and pod.metadata:
+            resource_version = pod.metadata.resource_version
+            self._dispatch(pod)
+          with self._lock:
+            if not self._waiters:
+              break
+      except client.rest.ApiException as e:
+        if e.status == _HTTP_GONE:
+          absl.logging.info(
+              'Watch of pods in namespace "%s" expired, restarting it.',
+              self._namespace)
+          resource_version = None
+          continue
+        absl.logging.warning('Watch of pods in namespace "%s" failed: %s',
+                             self._namespace, e)
+        failed = True
+      except Exception as e:  # pylint: disable=broad-except
+        absl.logging.warning('Watch of pods in namespace "%s" failed: %s',
+                             self._namespace, e)
+        failed = True
+      # A watch which timed out without events is restarted at once, as pods
+      # usually run longer than a watch request.
+      closed_early = (not has_events and
+                      time.time() - start_time < _WATCH_TIMEOUT_SECS / 2)
+      if failed or closed_early:
+        time.sleep(retry_interval)
+        retry_interval = min(retry_interval * 2, _MAX_RETRY_INTERVAL_SECS)
+      else:
+        retry_interval = _RETRY_INTERVAL_SECS
+
+
+_informers = {}  # type: Dict[Text, PodInformer]
+_informers_lock = threading.Lock()
+
+
+def get_pod_informer(namespace: Text) -> PodInformer:
+  """Returns the process wide PodInformer of a namespace."""
+  with _informers_lock:
+    if namespace not in _informers:
+      _informers[namespace] = PodInformer(namespace)
+    return _informers[namespace]
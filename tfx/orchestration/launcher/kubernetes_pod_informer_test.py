@@ -0,0 +1,198 @@
+# Lint as: python2, python3
+# Copyright 2020 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for tfx.orchestration.launcher.kubernetes_pod_informer."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import asyncio
+import threading
+
+from kubernetes import client
+import mock
+from six.moves import queue
+import tensorflow as tf
+
+from tfx.orchestration.launcher import kubernetes_pod_informer
+
+
+def _pod(name, phase, resource_version=None):
+  return client.V1Pod(
+      metadata=client.V1ObjectMeta(
+          name=name, resource_version=resource_version),
+      status=client.V1PodStatus(phase=phase))
+
+
+def _is_done(pod):
+  return pod.status.phase == 'Succeeded'
+
+
+class _FakePodWatch(object):
+  """Fake API server side of a pod watch, fed with events by the test."""
+
+  def __init__(self):
+    self.events = queue.Queue()
+    self.fail_next = False
+    self.expire_next = False
+    self.resource_versions = []
+
+  @property
+  def stream_count(self):
+    return len(self.resource_versions)
+
+  def stream(self, core_api, namespace, timeout_sec, resource_version):
+    del core_api, namespace
+    self.resource_versions.append(resource_version)
+    if self.fail_next:
+      self.fail_next = False
+      raise client.rest.ApiException(status=500)
+    if self.expire_next:
+      self.expire_next = False
+      yield {'type': 'ERROR', 'object': {'code': 410}}
+    while True:
+      try:
+        pod = self.events.get(timeout=min(timeout_sec, 0.1))
+      except queue.Empty:
+        return
+      yield {'type': 'MODIFIED', 'object': pod}
+
+
+class PodInformerTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(PodInformerTest, self).setUp()
+    self._watch = _FakePodWatch()
+    self._informer = kubernetes_pod_informer.PodInformer(
+        'ns', stream_fn=self._watch.stream)
+    self._loop = asyncio.new_event_loop()
+    self.addCleanup(self._loop.close)
+
+  def _wait(self, pod_names, events):
+    """Waits for pods to be done while the fake watch sends events."""
+
+    async def _wait_all():
+      futures = [
+          self._informer.add_waiter(None, name, _is_done) for name in pod_names
+      ]
+      for pod in events:
+        self._watch.events.put(pod)
+      try:
+        return await asyncio.wait_for(asyncio.gather(*futures), timeout=10)
+      finally:
+        for name, future in zip(pod_names, futures):
+          self._informer.remove_waiter(name, future)
+
+    return self._loop.run_until_complete(_wait_all())
+
+  def testWaitersResolvedByWatchEvents(self):
+    pods = self._wait(['pod-1', 'pod-2'], [
+        _pod('pod-1', 'Running'),
+        _pod('pod-2', 'Succeeded'),
+        _pod('other-pod', 'Succeeded'),
+        _pod('pod-1', 'Succeeded'),
+    ])
+
+    self.assertEqual(['pod-1', 'pod-2'], [p.metadata.name for p in pods])
+    self.assertEqual(['Succeeded', 'Succeeded'],
+                     [p.status.phase for p in pods])
+    # One watch serves all the pods of the namespace.
+    self.assertEqual(1, self._watch.stream_count)
+
+  @mock.patch.object(kubernetes_pod_informer, '_RETRY_INTERVAL_SECS', 0)
+  def testWatchRestartsAfterFailure(self):
+    self._watch.fail_next = True
+
+    [pod] = self._wait(['pod-1'], [_pod('pod-1', 'Succeeded')])
+
+    self.assertEqual('Succeeded', pod.status.phase)
+    self.assertGreaterEqual(self._watch.stream_count, 2)
+
+  def testWatchResumesFromLastResourceVersion(self):
+
+    async def _wait_pod_1():
+      future = self._informer.add_waiter(None, 'pod-1', _is_done)
+      self._watch.events.put(_pod('pod-1', 'Running', '5'))
+      # Lets the first watch request time out before the next event.
+      while self._watch.stream_count < 2:
+        await asyncio.sleep(0.01)
+      self._watch.events.put(_pod('pod-1', 'Succeeded', '7'))
+      try:
+        return await asyncio.wait_for(future, timeout=10)
+      finally:
+        self._informer.remove_waiter('pod-1', future)
+
+    pod = self._loop.run_until_complete(_wait_pod_1())
+
+    self.assertEqual('Succeeded', pod.status.phase)
+    self.assertEqual([None, '5'], self._watch.resource_versions[:2])
+
+  @mock.patch.object(kubernetes_pod_informer, '_WATCH_TIMEOUT_SECS', 0.1)
+  def testWatchRestartsAtOnceAfterTimeout(self):
+
+    async def _wait_pod_1():
+      future = self._informer.add_waiter(None, 'pod-1', _is_done)
+      self._watch.events.put(_pod('pod-1', 'Running', '5'))
+      # Lets two watch requests time out without events.
+      while self._watch.stream_count < 3:
+        await asyncio.sleep(0.01)
+      self._watch.events.put(_pod('pod-1', 'Succeeded', '7'))
+      try:
+        return await asyncio.wait_for(future, timeout=10)
+      finally:
+        self._informer.remove_waiter('pod-1', future)
+
+    with mock.patch.object(kubernetes_pod_informer.time, 'sleep') as mock_sleep:
+      pod = self._loop.run_until_complete(_wait_pod_1())
+
+    self.assertEqual('Succeeded', pod.status.phase)
+    self.assertEqual(['5', '5'], self._watch.resource_versions[1:3])
+    mock_sleep.assert_not_called()
+
+  def testWatchStartsOverWhenResourceVersionExpired(self):
+    self._watch.expire_next = True
+
+    [pod] = self._wait(['pod-1'], [_pod('pod-1', 'Succeeded', '3')])
+
+    self.assertEqual('Succeeded', pod.status.phase)
+    self.assertEqual([None, None], self._watch.resource_versions[:2])
+
+  @mock.patch.object(kubernetes_pod_informer.watch, 'Watch', autospec=True)
+  def testWatchPodsSelectsLauncherPods(self, mock_watch_cls):
+    core_api = mock.Mock()
+
+    kubernetes_pod_informer._watch_pods(core_api, 'ns', 60, '5')
+
+    mock_watch_cls.return_value.stream.assert_called_once_with(
+        core_api.list_namespaced_pod,
+        namespace='ns',
+        label_selector='tfx.orchestration/launcher=kubernetes',
+        timeout_seconds=60,
+        resource_version='5')
+
+  @mock.patch.object(kubernetes_pod_informer, '_RETRY_INTERVAL_SECS', 0)
+  def testWatchStopsWithoutWaiters(self):
+    self._wait(['pod-1'], [_pod('pod-1', 'Succeeded')])
+    thread = self._informer._thread
+    if thread is not None:
+      thread.join(timeout=10)
+
+    self.assertIsNone(self._informer._thread)
+    self.assertNotIn(
+        'PodInformer-ns', [t.name for t in threading.enumerate()])
+
+
+if __name__ == '__main__':
+  tf.test.main()
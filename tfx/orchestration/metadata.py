@@ -19,15 +19,14 @@ from __future__ import division
 from __future__ import print_function
 
 import collections
-import copy
 import hashlib
-import itertools
+import json
 import os
-import random
+import threading
 import time
 import types
 
-from typing import Any, Dict, List, Optional, Set, Text, Tuple, Type, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Text, Tuple, Type, Union
 
 import absl
 import six
@@ -44,9 +43,29 @@ from tfx.types.artifact import ArtifactState
 
 # Number of times to retry initialization of connection.
 _MAX_INIT_RETRY = 10
+# Initial backoff between connection initialization retries, in seconds. The
+# backoff doubles after every failed attempt.
+_INIT_RETRY_BACKOFF_SECS = 0.1
+# Default maximum number of MetadataStore connections kept open per connection
+# config in one process.
+DEFAULT_CONNECTION_POOL_SIZE = 4
+# Maximum time to wait for a connection of a full pool to be released.
+_CONNECTION_POOL_TIMEOUT_SECS = 300
 
 # Maximum number of executions we look at for previous result.
 MAX_EXECUTIONS_FOR_CACHE = 100
+# Number of artifacts fetched per store call when iterating qualified
+# artifacts from the latest to the earliest.
+_QUALIFIED_ARTIFACTS_BATCH_SIZE = 20
+# Number of executions fetched per store call when scanning the executions
+# newer than the watermark of an output artifact index.
+_EXECUTION_SCAN_BATCH_SIZE = 100
+# MLMD leaves gaps in ids, e.g. of aborted transactions. A scan of the newest
+# entities doubles the window of ids it reads while the windows are empty, up
+# to _MAX_SCAN_WINDOW_BATCHES batches, and ends after _MAX_EMPTY_SCAN_WINDOWS
+# empty windows in a row.
+_MAX_SCAN_WINDOW_BATCHES = 16
+_MAX_EMPTY_SCAN_WINDOWS = 8
 # Execution state constant. We should replace this with MLMD enum once that is
 # ready.
 EXECUTION_STATE_CACHED = 'cached'
@@ -63,6 +82,17 @@ FINAL_EXECUTION_STATES = frozenset(
 _CONTEXT_TYPE_PIPELINE = 'pipeline'
 _CONTEXT_TYPE_PIPELINE_RUN = 'run'
 _CONTEXT_TYPE_COMPONENT_RUN = 'component_run'
+# Cache key context indexes complete executions by the fingerprint of their
+# component, execution properties and input artifacts. It is named by the
+# fingerprint, so that a cache lookup is a single lookup by context name.
+_CONTEXT_TYPE_CACHE_KEY = 'cache_key'
+# Output artifact index context indexes the output artifacts of the executions
+# in a context by producer component and output key, see _OutputArtifactIndex.
+# Indexed artifacts are attributed to it, and its watermark custom property
+# holds the id up to which executions were scanned, so that lookups in any
+# process only read newer executions.
+_CONTEXT_TYPE_OUTPUT_ARTIFACT_INDEX = 'output_artifact_index'
+_CONTEXT_KEY_WATERMARK = 'watermark'
 # Keys of context type properties.
 _CONTEXT_TYPE_KEY_COMPONENT_ID = 'component_id'
 _CONTEXT_TYPE_KEY_PIPELINE_NAME = 'pipeline_name'
@@ -124,40 +154,388 @@ def mysql_metadata_connection_config(
           password=password))
 
 
+def _connect(
+    connection_config: Union[metadata_store_pb2.ConnectionConfig,
+                             metadata_store_pb2.MetadataStoreClientConfig]
+) -> metadata_store.MetadataStore:
+  """Opens a new MetadataStore connection.
+
+  MetadataStore could raise Aborted error if multiple concurrent connections try
+  to execute initialization DDL in database. This is safe to retry, and is
+  retried with exponential backoff.
+
+  Args:
+    connection_config: config of the connection to open.
+
+  Returns:
+    A connected MetadataStore.
+
+  Raises:
+    RuntimeError: if the connection can not be established.
+  """
+  backoff = _INIT_RETRY_BACKOFF_SECS
+  for _ in range(_MAX_INIT_RETRY):
+    try:
+      return metadata_store.MetadataStore(connection_config)
+    except RuntimeError:
+      time.sleep(backoff)
+      backoff *= 2
+  raise RuntimeError('Failed to establish connection to Metadata storage.')
+
+
+def _iter_entities_from(get_by_id_fn: Callable[[List[int]], List[Any]],
+                        first_id: int, batch_size: int) -> Iterator[List[Any]]:
+  """Iterates MLMD entities from an id on, by ascending id in batches.
+
+  MLMD has no call listing the entities newer than an id, so windows of ids
+  are read one after the other, skipping gaps in the ids as described at
+  _MAX_EMPTY_SCAN_WINDOWS.
+
+  Args:
+    get_by_id_fn: store method fetching entities by a list of ids.
+    first_id: smallest id to fetch.
+    batch_size: number of ids requested per call, unless skipping a gap.
+
+  Yields:
+    Non-empty lists of entities.
+  """
+  window_size = batch_size
+  empty_windows = 0
+  while empty_windows < _MAX_EMPTY_SCAN_WINDOWS:
+    entities = get_by_id_fn(list(range(first_id, first_id + window_size)))
+    first_id += window_size
+    if entities:
+      window_size = batch_size
+      empty_windows = 0
+      yield entities
+    else:
+      window_size = min(window_size * 2, batch_size * _MAX_SCAN_WINDOW_BATCHES)
+      empty_windows += 1
+
+
+def _is_poolable(
+    connection_config: Union[metadata_store_pb2.ConnectionConfig,
+                             metadata_store_pb2.MetadataStoreClientConfig]
+) -> bool:
+  """Returns whether connections of the config can be shared.
+
+  In-memory databases (fake database or sqlite without a file) start empty on
+  every connection, so sharing them would change what callers observe.
+
+  Args:
+    connection_config: config of the connection.
+  """
+  if not isinstance(connection_config, metadata_store_pb2.ConnectionConfig):
+    return True
+  if connection_config.HasField('fake_database'):
+    return False
+  if connection_config.HasField('sqlite'):
+    return bool(connection_config.sqlite.filename_uri)
+  return True
+
+
+# Hit and miss counts of a type registry.
+TypeRegistryStats = collections.namedtuple('TypeRegistryStats',
+                                           ['hits', 'misses', 'hit_rate'])
+
+
+class _TypeRegistry(object):
+  """Cache of the ids of types registered in one metadata store.
+
+  Entries are keyed by the kind, name and property schema of a type. When a
+  schema that is not cached yet gets registered for a type name, the other
+  cached schemas of that name are dropped, since the type in MLMD may have
+  gained fields.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._type_ids = {}
+    self._hits = 0
+    self._misses = 0
+
+  def __getstate__(self) -> Dict[Text, Any]:
+    state = self.__dict__.copy()
+    del state['_lock']
+    return state
+
+  def __setstate__(self, state: Dict[Text, Any]) -> None:
+    self.__dict__.update(state)
+    self._lock = threading.Lock()
+
+  def get_or_register(self, kind: Text, name: Text, schema: Any,
+                      register_fn: Callable[[], int]) -> int:
+    """Gets the id of a type, registering it with register_fn on cache miss.
+
+    Args:
+      kind: kind of the type, e.g. 'artifact'.
+      name: name of the type.
+      schema: hashable representation of the property schema of the type.
+      register_fn: function registering the type and returning its id.
+
+    Returns:
+      id of the type.
+    """
+    key = (kind, name, schema)
+    with self._lock:
+      type_id = self._type_ids.get(key)
+      if type_id is not None:
+        self._hits += 1
+        return type_id
+      self._misses += 1
+    type_id = register_fn()
+    with self._lock:
+      for stale_key in [k for k in self._type_ids if k[:2] == (kind, name)]:
+        del self._type_ids[stale_key]
+      self._type_ids[key] = type_id
+    return type_id
+
+  def stats(self) -> TypeRegistryStats:
+    with self._lock:
+      total = self._hits + self._misses
+      return TypeRegistryStats(
+          hits=self._hits,
+          misses=self._misses,
+          hit_rate=float(self._hits) / total if total else 0.0)
+
+
+class _OutputArtifactIndex(object):
+  """Incremental index of output artifacts of the executions in a context.
+
+  For each (context id, producer component id, output key), the index keeps
+  the ids of the matching output artifacts seen so far and a watermark: all
+  matching executions up to the watermark execution id were in a final state
+  when scanned, so later lookups only read newer executions.
+
+  The index is persisted in MLMD by output artifact index contexts, and this
+  class caches it for the life of the process.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._entries = {}
+
+  def __getstate__(self) -> Dict[Text, Any]:
+    state = self.__dict__.copy()
+    del state['_lock']
+    return state
+
+  def __setstate__(self, state: Dict[Text, Any]) -> None:
+    self.__dict__.update(state)
+    self._lock = threading.Lock()
+
+  def get(self, key: Tuple[int, Optional[Text],
+                           Optional[Text]]) -> Tuple[int, Set[int]]:
+    """Returns the watermark execution id and artifact ids of a key."""
+    with self._lock:
+      watermark, artifact_ids = self._entries.get(key, (0, set()))
+      return watermark, set(artifact_ids)
+
+  def update(self, key: Tuple[int, Optional[Text], Optional[Text]],
+             watermark: int, new_artifact_ids: Set[int]) -> None:
+    """Adds artifact ids to a key and advances its watermark."""
+    with self._lock:
+      old_watermark, artifact_ids = self._entries.get(key, (0, set()))
+      self._entries[key] = (max(old_watermark, watermark),
+                            artifact_ids | new_artifact_ids)
+
+  def reset(self, key: Tuple[int, Optional[Text], Optional[Text]],
+            watermark: int, artifact_ids: Set[int]) -> None:
+    """Replaces the watermark and artifact ids of a key."""
+    with self._lock:
+      self._entries[key] = (watermark, set(artifact_ids))
+
+  def discard(self, key: Tuple[int, Optional[Text], Optional[Text]],
+              artifact_ids: Set[int]) -> None:
+    """Removes artifact ids that can never qualify from a key."""
+    with self._lock:
+      if key in self._entries:
+        watermark, current_ids = self._entries[key]
+        self._entries[key] = (watermark, current_ids - artifact_ids)
+
+
+class _ConnectionPool(object):
+  """A bounded pool of MetadataStore connections sharing one config."""
+
+  def __init__(
+      self,
+      connection_config: Union[metadata_store_pb2.ConnectionConfig,
+                               metadata_store_pb2.MetadataStoreClientConfig],
+      max_size: int):
+    self._connection_config = connection_config
+    self._max_size = max_size
+    self._idle = []
+    self._num_open = 0
+    self._condition = threading.Condition()
+    # Types registered through connections of this pool, shared by all
+    # Metadata instances using the pool for the life of the process.
+    self.type_registry = _TypeRegistry()
+    self.output_artifact_index = _OutputArtifactIndex()
+
+  def resize(self, max_size: int) -> None:
+    with self._condition:
+      self._max_size = max_size
+      self._condition.notify_all()
+
+  def acquire(self) -> metadata_store.MetadataStore:
+    """Returns an idle connection, opening one if the pool is not full.
+
+    Raises:
+      RuntimeError: if the pool stays full for _CONNECTION_POOL_TIMEOUT_SECS.
+    """
+    deadline = time.time() + _CONNECTION_POOL_TIMEOUT_SECS
+    with self._condition:
+      while not self._idle and self._num_open >= self._max_size:
+        remaining_secs = deadline - time.time()
+        if remaining_secs <= 0:
+          raise RuntimeError(
+              'No Metadata connection was released within %s seconds.' %
+              _CONNECTION_POOL_TIMEOUT_SECS)
+        self._condition.wait(remaining_secs)
+      if self._idle:
+        return self._idle.pop()
+      self._num_open += 1
+    try:
+      return _connect(self._connection_config)
+    except Exception:
+      with self._condition:
+        self._num_open -= 1
+        self._condition.notify()
+      raise
+
+  def release(self, store: metadata_store.MetadataStore) -> None:
+    """Returns a connection obtained by acquire() to the pool."""
+    with self._condition:
+      self._idle.append(store)
+      self._condition.notify()
+
+  def discard(self, store: metadata_store.MetadataStore) -> None:
+    """Closes a connection obtained by acquire() instead of reusing it."""
+    del store
+    with self._condition:
+      self._num_open -= 1
+      self._condition.notify()
+
+
+# Connection pools of the process, keyed by connection config.
+_connection_pools = {}
+_connection_pools_lock = threading.Lock()
+
+
+def _get_connection_pool(
+    connection_config: Union[metadata_store_pb2.ConnectionConfig,
+                             metadata_store_pb2.MetadataStoreClientConfig],
+    pool_size: Optional[int]) -> _ConnectionPool:
+  """Gets or creates the process wide pool for the connection config."""
+  key = (type(connection_config).__name__,
+         connection_config.SerializeToString(deterministic=True))
+  with _connection_pools_lock:
+    pool = _connection_pools.get(key)
+    if pool is None:
+      pool = _ConnectionPool(connection_config,
+                             pool_size or DEFAULT_CONNECTION_POOL_SIZE)
+      _connection_pools[key] = pool
+    elif pool_size:
+      pool.resize(pool_size)
+    return pool
+
+
+# Updates of an execution that are deferred in batch_writes mode.
+_PendingExecutionUpdate = collections.namedtuple(
+    '_PendingExecutionUpdate',
+    ['input_artifacts', 'output_artifacts', 'contexts'])
+
+
 # TODO(ruoyu): Figure out the story mutable UDFs. We should not reuse previous
 # run when having different UDFs.
 class Metadata(object):
-  """Helper class to handle metadata I/O."""
+  """Helper class to handle metadata I/O.
+
+  Connections to persistent stores are taken from a process wide pool shared by
+  all Metadata instances with the same connection config, so that driver,
+  executor and publisher of components running in one process reuse the same
+  sessions. Entering an instance that is already entered reuses its
+  connection.
+
+  In batch_writes mode, the instance keeps what it registered for a component
+  launch in memory: executions, their contexts and events are not read back
+  from the store, and execution updates that do not move an execution to a
+  final state are deferred and written together with the next update that
+  does (typically when the execution is published). Type ids are cached for
+  the life of the process in either mode.
+  """
 
   def __init__(
       self,
       connection_config: Union[metadata_store_pb2.ConnectionConfig,
-                               metadata_store_pb2.MetadataStoreClientConfig]
+                               metadata_store_pb2.MetadataStoreClientConfig],
+      pool_size: Optional[int] = None,
+      batch_writes: bool = False
   ) -> None:
+    """Initializes a Metadata handler.
+
+    Args:
+      connection_config: config of the metadata store connection.
+      pool_size: maximum number of connections kept open for the connection
+        config in this process. Defaults to DEFAULT_CONNECTION_POOL_SIZE. Set to
+        0 to open a new connection on every enter instead of pooling.
+      batch_writes: whether to gather the writes of a component launch into as
+        few store calls as possible. The same instance should then be used for
+        registering and publishing an execution, and deferred updates of
+        executions that are never published need flush_pending_writes(), which
+        component launchers call when a launch fails.
+    """
     self._connection_config = connection_config
+    self._pool_size = pool_size
+    self._batch_writes = batch_writes
     self._store = None
+    self._enter_count = 0
+    self._reset_session_state()
+
+  def _reset_session_state(self) -> None:
+    """Drops what this instance remembers about the store content."""
+    self._local_type_registry = _TypeRegistry()
+    self._local_output_artifact_index = _OutputArtifactIndex()
+    # Component run context name -> (execution, contexts) registered by this
+    # instance in batch_writes mode.
+    self._registered_executions = {}
+    # Execution id -> events written by this instance in batch_writes mode.
+    self._execution_events = {}
+    # Execution id -> _PendingExecutionUpdate in batch_writes mode.
+    self._pending_updates = {}
+
+  def _pooled(self) -> bool:
+    return self._pool_size != 0 and _is_poolable(self._connection_config)
 
   def __enter__(self) -> 'Metadata':
-    # TODO(ruoyu): Establishing a connection pool instead of newing
-    # a connection every time. Until then, check self._store before usage
-    # in every method.
-    for _ in range(_MAX_INIT_RETRY):
-      try:
-        self._store = metadata_store.MetadataStore(self._connection_config)
-      except RuntimeError:
-        # MetadataStore could raise Aborted error if multiple concurrent
-        # connections try to execute initialization DDL in database.
-        # This is safe to retry.
-        time.sleep(random.random())
-        continue
+    if self._enter_count == 0:
+      if self._pooled():
+        self._store = _get_connection_pool(self._connection_config,
+                                           self._pool_size).acquire()
       else:
-        return self
-
-    raise RuntimeError('Failed to establish connection to Metadata storage.')
+        self._store = _connect(self._connection_config)
+        if not _is_poolable(self._connection_config):
+          # Every connection to an in-memory store opens a fresh store. Other
+          # stores keep their content, and so does this instance, e.g. pending
+          # writes between the driver and publisher scopes.
+          self._reset_session_state()
+    self._enter_count += 1
+    return self
 
   def __exit__(self, exc_type: Optional[Type[Exception]],
                exc_value: Optional[Exception],
                exc_tb: Optional[types.TracebackType]) -> None:
+    self._enter_count -= 1
+    if self._enter_count > 0:
+      return
+    if self._pooled():
+      pool = _get_connection_pool(self._connection_config, self._pool_size)
+      if exc_type is None:
+        pool.release(self._store)
+      else:
+        # The connection may be left in a bad state, e.g. in the middle of a
+        # transaction, by the failure of its scope.
+        pool.discard(self._store)
     self._store = None
 
   @property
@@ -171,14 +549,37 @@ class Metadata(object):
       raise RuntimeError('Metadata object is not in enter state')
     return self._store
 
+  def _type_registry(self) -> _TypeRegistry:
+    """Returns the registry of types of the current store."""
+    if self._pooled():
+      return _get_connection_pool(self._connection_config, None).type_registry
+    return self._local_type_registry
+
+  def _output_artifact_index(self) -> _OutputArtifactIndex:
+    """Returns the output artifact index of the current store."""
+    if self._pooled():
+      return _get_connection_pool(self._connection_config,
+                                  None).output_artifact_index
+    return self._local_output_artifact_index
+
+  def type_registry_stats(self) -> TypeRegistryStats:
+    """Returns hit and miss counts of the type registry of the store.
+
+    The registry is shared by all Metadata instances with the same connection
+    config in the process, unless the store is in memory.
+    """
+    return self._type_registry().stats()
+
   def _prepare_artifact_type(
       self, artifact_type: metadata_store_pb2.ArtifactType
   ) -> metadata_store_pb2.ArtifactType:
     if artifact_type.id:
       return artifact_type
-    type_id = self.store.put_artifact_type(
-        artifact_type=artifact_type, can_add_fields=True)
-    artifact_type.id = type_id
+    artifact_type.id = self._type_registry().get_or_register(
+        'artifact', artifact_type.name,
+        frozenset(artifact_type.properties.items()),
+        lambda: self.store.put_artifact_type(
+            artifact_type=artifact_type, can_add_fields=True))
     return artifact_type
 
   def update_artifact_state(self, artifact: metadata_store_pb2.Artifact,
@@ -287,7 +688,82 @@ class Metadata(object):
       output_key: output key constraint to filter artifacts
 
     Returns:
-      A list of ArtifactAndType, containing qualified artifacts.
+      A list of ArtifactAndType, containing qualified artifacts from the latest
+      to the earliest.
+    """
+    return list(
+        self.iter_qualified_artifacts(
+            context=context,
+            type_name=type_name,
+            producer_component_id=producer_component_id,
+            output_key=output_key))
+
+  def iter_qualified_artifacts(
+      self,
+      context: metadata_store_pb2.Context,
+      type_name: Text,
+      producer_component_id: Optional[Text] = None,
+      output_key: Optional[Text] = None,
+      batch_size: int = _QUALIFIED_ARTIFACTS_BATCH_SIZE
+  ) -> Iterator[metadata_store_service_pb2.ArtifactAndType]:
+    """Iterates qualified artifacts from the latest to the earliest.
+
+    Candidate artifacts come from an incremental index, persisted in MLMD,
+    that only reads the executions newer than the last lookup of any process,
+    and are fetched lazily in batches, so taking the latest N artifacts does
+    not read the whole history.
+
+    Args:
+      context: context constraint to filter artifacts
+      type_name: type constraint to filter artifacts
+      producer_component_id: producer constraint to filter artifacts
+      output_key: output key constraint to filter artifacts
+      batch_size: number of artifacts fetched per store call.
+
+    Yields:
+      ArtifactAndType of qualified artifacts, by descending artifact id.
+    """
+    try:
+      artifact_type = self.store.get_artifact_type(type_name)
+      if not artifact_type:
+        raise tf.errors.NotFoundError(
+            None, None, 'No artifact type found for %s.' % type_name)
+    except tf.errors.NotFoundError:
+      return
+
+    index_key = (context.id, producer_component_id, output_key)
+    candidate_ids = sorted(
+        self._get_output_artifact_ids(context, producer_component_id,
+                                      output_key),
+        reverse=True)
+    for start in range(0, len(candidate_ids), batch_size):
+      candidate_artifacts = self.store.get_artifacts_by_id(
+          candidate_ids[start:start + batch_size])
+      candidate_artifacts.sort(key=lambda a: a.id, reverse=True)
+      # The type of an artifact never changes, so artifacts of another type
+      # are dropped from the index.
+      self._output_artifact_index().discard(
+          index_key,
+          set(a.id for a in candidate_artifacts
+              if a.type_id != artifact_type.id))
+      for a in candidate_artifacts:
+        if (a.type_id == artifact_type.id and
+            self._get_artifact_state(a) == ArtifactState.PUBLISHED):
+          yield metadata_store_service_pb2.ArtifactAndType(
+              artifact=a, type=artifact_type)
+
+  def _get_output_artifact_ids(self, context: metadata_store_pb2.Context,
+                               producer_component_id: Optional[Text],
+                               output_key: Optional[Text]) -> Set[int]:
+    """Gets ids of output artifacts of matching executions in the context.
+
+    Args:
+      context: context constraint to filter artifacts
+      producer_component_id: producer constraint to filter artifacts
+      output_key: output key constraint to filter artifacts
+
+    Returns:
+      A set of artifact ids.
     """
 
     def _match_producer_component_id(execution, component_id):
@@ -304,35 +780,93 @@ class Metadata(object):
       else:
         return event.type == metadata_store_pb2.Event.OUTPUT
 
-    try:
-      artifact_type = self.store.get_artifact_type(type_name)
-      if not artifact_type:
-        raise tf.errors.NotFoundError(
-            None, None, 'No artifact type found for %s.' % type_name)
-    except tf.errors.NotFoundError:
-      return []
-
-    executions_within_context = self.store.get_executions_by_context(context.id)
-    qualified_producer_executions = [
-        e.id
-        for e in executions_within_context
-        if _match_producer_component_id(e, producer_component_id)
+    index = self._output_artifact_index()
+    index_key = (context.id, producer_component_id, output_key)
+    watermark, artifact_ids = index.get(index_key)
+    index_context_name = json.dumps(list(index_key))
+    index_context = self.store.get_context_by_type_and_name(
+        _CONTEXT_TYPE_OUTPUT_ARTIFACT_INDEX, index_context_name)
+    stored_watermark = 0
+    if index_context is not None:
+      stored_watermark = index_context.custom_properties[
+          _CONTEXT_KEY_WATERMARK].int_value
+    if watermark != stored_watermark:
+      # The index in MLMD was advanced by another process, e.g. a previous run
+      # of the component, or by a concurrent lookup which overwrote it.
+      watermark = stored_watermark
+      artifact_ids = set()
+      if index_context is not None:
+        artifact_ids = set(
+            a.id for a in self.store.get_artifacts_by_context(index_context.id))
+      index.reset(index_key, watermark, artifact_ids)
+
+    new_watermark = watermark
+    candidate_executions = []
+    for executions in _iter_entities_from(self.store.get_executions_by_id,
+                                          watermark + 1,
+                                          _EXECUTION_SCAN_BATCH_SIZE):
+      new_watermark = max(new_watermark, max(e.id for e in executions))
+      candidate_executions.extend(
+          e for e in executions
+          if _match_producer_component_id(e, producer_component_id))
+    new_executions = [
+        e for e in candidate_executions
+        if context.id in set(
+            c.id for c in self.store.get_contexts_by_execution(e.id))
     ]
-    qualified_output_events = [
-        ev for ev in self.store.get_events_by_execution_ids(
-            qualified_producer_executions) if _match_output_key(ev, output_key)
+    new_artifact_ids = set()
+    if new_executions:
+      new_artifact_ids = set(
+          ev.artifact_id
+          for ev in self.store.get_events_by_execution_ids(
+              [e.id for e in new_executions])
+          if _match_output_key(ev, output_key))
+    # Executions that are not final yet may still gain outputs, so the
+    # watermark stops right before the earliest of them.
+    pending_execution_ids = [
+        e.id for e in new_executions
+        if e.properties[_EXECUTION_TYPE_KEY_STATE].string_value not in
+        FINAL_EXECUTION_STATES
     ]
+    if pending_execution_ids:
+      new_watermark = min(pending_execution_ids) - 1
+    if new_watermark <= watermark and not new_artifact_ids:
+      return artifact_ids
+    index.update(index_key, new_watermark, new_artifact_ids)
+    self._store_output_artifact_index(index_context, index_context_name,
+                                      new_watermark, new_artifact_ids)
+    return artifact_ids | new_artifact_ids
+
+  def _store_output_artifact_index(
+      self, index_context: Optional[metadata_store_pb2.Context],
+      index_context_name: Text, watermark: int,
+      new_artifact_ids: Set[int]) -> None:
+    """Persists new artifacts and the watermark of an output artifact index.
+
+    Artifacts are attributed to the index context before its watermark
+    advances, so that a failure in between only causes a rescan.
 
-    candidate_artifacts = self.store.get_artifacts_by_id(
-        list(set(ev.artifact_id for ev in qualified_output_events)))
-    qualified_artifacts = [
-        a for a in candidate_artifacts if a.type_id == artifact_type.id and
-        self._get_artifact_state(a) == ArtifactState.PUBLISHED
-    ]
-    return [
-        metadata_store_service_pb2.ArtifactAndType(
-            artifact=a, type=artifact_type) for a in qualified_artifacts
-    ]
+    Args:
+      index_context: the index context, or None if it does not exist yet.
+      index_context_name: the name of the index context.
+      watermark: the new watermark.
+      new_artifact_ids: ids of the artifacts to add to the index.
+    """
+    if index_context is None:
+      index_context = self._register_context_if_not_exist(
+          context_type_name=_CONTEXT_TYPE_OUTPUT_ARTIFACT_INDEX,
+          context_name=index_context_name,
+          properties={})
+    if new_artifact_ids:
+      self.store.put_attributions_and_associations([
+          metadata_store_pb2.Attribution(
+              artifact_id=artifact_id, context_id=index_context.id)
+          for artifact_id in sorted(new_artifact_ids)
+      ], [])
+    stored_watermark = index_context.custom_properties[_CONTEXT_KEY_WATERMARK]
+    if watermark != stored_watermark.int_value:
+      stored_watermark.int_value = watermark
+      self.store.put_contexts([index_context])
 
   def _prepare_event(self,
                      event_type: metadata_store_pb2.Event.Type,
@@ -372,6 +906,13 @@ class Metadata(object):
     Raises:
       ValueError if new execution type conflicts with existing schema in MLMD.
     """
+    return self._type_registry().get_or_register(
+        'execution', type_name, frozenset(exec_properties.keys()),
+        lambda: self._register_execution_type(type_name, exec_properties))
+
+  def _register_execution_type(self, type_name: Text,
+                               exec_properties: Dict[Text, Any]) -> int:
+    """Registers the execution type in MLMD, see _prepare_execution_type."""
     try:
       existing_execution_type = self.store.get_execution_type(type_name)
       if existing_execution_type is None:
@@ -525,6 +1066,44 @@ class Metadata(object):
                                    index=index)))
     return result
 
+  def _get_execution_events(
+      self, execution_id: int) -> List[metadata_store_pb2.Event]:
+    """Gets events of an execution, from memory if written by this instance."""
+    if execution_id in self._execution_events:
+      return self._execution_events[execution_id]
+    return self.store.get_events_by_execution_ids([execution_id])
+
+  def _put_execution(
+      self, execution: metadata_store_pb2.Execution,
+      artifacts_and_events: List[Tuple[metadata_store_pb2.Artifact,
+                                       Optional[metadata_store_pb2.Event]]],
+      contexts: List[metadata_store_pb2.Context]) -> List[int]:
+    """Writes an execution with its artifacts, events and contexts.
+
+    Ids of written artifacts are reflected inline. In batch_writes mode, the
+    written events are also remembered so that they are not read back.
+
+    Args:
+      execution: the execution to write.
+      artifacts_and_events: [Artifact, [Optional]Event] tuples to write.
+      contexts: contexts the execution and artifacts to be linked to.
+
+    Returns:
+      Ids of the contexts.
+    """
+    execution_id, a_ids, context_ids = self.store.put_execution(
+        execution, artifacts_and_events, contexts)
+    for artifact_and_event, a_id in zip(artifacts_and_events, a_ids):
+      artifact_and_event[0].id = a_id
+    if self._batch_writes and execution.id in self._execution_events:
+      for artifact_and_event, a_id in zip(artifacts_and_events, a_ids):
+        if len(artifact_and_event) > 1:
+          event = artifact_and_event[1]
+          event.artifact_id = a_id
+          event.execution_id = execution_id
+          self._execution_events[execution_id].append(event)
+    return context_ids
+
   def update_execution(
       self,
       execution: metadata_store_pb2.Execution,
@@ -538,7 +1117,9 @@ class Metadata(object):
     """Updates the given execution in MLMD based on given information.
 
     All artifacts provided will be registered if not already. Registered id will
-    be reflected inline.
+    be reflected inline. In batch_writes mode, updates that do not move the
+    execution to a final state are only applied to the execution proto, and
+    written along with the next update that does.
 
     Args:
       execution: the execution to be updated. It is required that the execution
@@ -556,7 +1137,58 @@ class Metadata(object):
     """
     if not execution.id:
       raise RuntimeError('No id attached to the execution to be updated.')
-    events = self.store.get_events_by_execution_ids([execution.id])
+    # If execution properties change, we need to potentially update execution
+    # schema.
+    if exec_properties:
+      execution.type_id = self._prepare_execution_type(
+          component_info.component_type, exec_properties)
+    if exec_properties or execution_state:
+      self._update_execution_proto(
+          execution=execution,
+          exec_properties=exec_properties,
+          state=execution_state,
+          pipeline_info=component_info.pipeline_info,
+          component_info=component_info)
+    # Merges updates deferred earlier, later artifacts of the same key win.
+    pending = self._pending_updates.pop(execution.id, None)
+    if pending is not None:
+      merged_input_artifacts = dict(pending.input_artifacts)
+      merged_input_artifacts.update(input_artifacts or {})
+      input_artifacts = merged_input_artifacts
+      merged_output_artifacts = dict(pending.output_artifacts)
+      merged_output_artifacts.update(output_artifacts or {})
+      output_artifacts = merged_output_artifacts
+      context_ids = set(c.id for c in contexts or [])
+      contexts = list(contexts or []) + [
+          c for c in pending.contexts if c.id not in context_ids
+      ]
+    if (self._batch_writes and
+        execution_state not in FINAL_EXECUTION_STATES):
+      self._pending_updates[execution.id] = _PendingExecutionUpdate(
+          input_artifacts=input_artifacts or {},
+          output_artifacts=output_artifacts or {},
+          contexts=list(contexts or []))
+      return
+    self._write_execution_update(
+        execution=execution,
+        component_info=component_info,
+        input_artifacts=input_artifacts,
+        output_artifacts=output_artifacts,
+        execution_state=execution_state,
+        artifact_state=artifact_state,
+        contexts=contexts)
+
+  def _write_execution_update(
+      self,
+      execution: metadata_store_pb2.Execution,
+      component_info: data_types.ComponentInfo,
+      input_artifacts: Optional[Dict[Text, List[Artifact]]],
+      output_artifacts: Optional[Dict[Text, List[Artifact]]],
+      execution_state: Optional[Text],
+      artifact_state: Optional[Text],
+      contexts: Optional[List[metadata_store_pb2.Context]]) -> None:
+    """Writes an execution update with one put_execution call."""
+    events = self._get_execution_events(execution.id)
     registered_input_artifact_ids = set(
         e.artifact_id
         for e in events
@@ -582,22 +1214,39 @@ class Metadata(object):
               event_type=metadata_store_pb2.Event.OUTPUT,
               new_state=artifact_state,
               registered_artifacts_ids=registered_output_artifact_ids))
-    # If execution properties change, we need to potentially update execution
-    # schema.
-    if exec_properties:
-      execution.type_id = self._prepare_execution_type(
-          component_info.component_type, exec_properties)
-    if exec_properties or execution_state:
-      self._update_execution_proto(
+    contexts = list(contexts or [])
+    if execution_state == EXECUTION_STATE_COMPLETE:
+      cache_context = self._register_cache_key_context(
           execution=execution,
-          exec_properties=exec_properties,
-          state=execution_state,
           pipeline_info=component_info.pipeline_info,
-          component_info=component_info)
-    _, a_ids, _ = self.store.put_execution(execution, artifacts_and_events,
-                                           contexts or [])
-    for artifact_and_event, a_id in zip(artifacts_and_events, a_ids):
-      artifact_and_event[0].id = a_id
+          input_events=[
+              e for e in events if e.type == metadata_store_pb2.Event.INPUT
+          ],
+          input_artifacts=input_artifacts)
+      if cache_context is not None:
+        contexts.append(cache_context)
+    self._put_execution(execution, artifacts_and_events, contexts)
+
+  def flush_pending_writes(self) -> None:
+    """Writes execution updates deferred in batch_writes mode.
+
+    Raises:
+      RuntimeError: if this instance is not in enter state.
+    """
+    for execution_id in list(self._pending_updates.keys()):
+      for execution, contexts in self._registered_executions.values():
+        if execution.id != execution_id:
+          continue
+        pending = self._pending_updates.pop(execution_id)
+        self._write_execution_update(
+            execution=execution,
+            component_info=None,
+            input_artifacts=pending.input_artifacts,
+            output_artifacts=pending.output_artifacts,
+            execution_state=None,
+            artifact_state=None,
+            contexts=pending.contexts)
+        break
 
   def register_execution(
       self,
@@ -646,6 +1295,13 @@ class Metadata(object):
           contexts=contexts + [component_run_context])
       execution.id = execution_id
       component_run_context.id = context_ids[-1]
+      if self._batch_writes:
+        # The execution is new, so its events are exactly the ones written.
+        self._execution_events[execution_id] = []
+        for artifact_and_event, a_id in zip(artifacts_and_events, a_ids):
+          artifact_and_event[1].artifact_id = a_id
+          artifact_and_event[1].execution_id = execution_id
+          self._execution_events[execution_id].append(artifact_and_event[1])
     except tf.errors.AlreadyExistsError:
       component_run_context = self.get_component_run_context(component_info)
       absl.logging.debug(
@@ -661,6 +1317,10 @@ class Metadata(object):
     contexts.append(component_run_context)
     for artifact_and_event, a_id in zip(artifacts_and_events, a_ids):
       artifact_and_event[0].id = a_id
+    if self._batch_writes:
+      self._registered_executions[
+          component_info.component_run_context_name] = (execution,
+                                                        list(contexts))
     return execution
 
   def publish_execution(
@@ -671,41 +1331,105 @@ class Metadata(object):
     """Publishes an execution with input and output artifacts info.
 
     This method will publish any execution with non-final states. It will
-    register unseen artifacts and publish events for them.
+    register unseen artifacts and publish events for them. In batch_writes mode,
+    an execution registered by this instance is published together with its
+    deferred updates, without reading it back from the store.
 
     Args:
       component_info: component information.
       output_artifacts: output artifacts produced by the execution.
       exec_properties: execution properties for the execution to be published.
     """
-    component_run_context = self.get_component_run_context(component_info)
-    [execution] = self.store.get_executions_by_context(component_run_context.id)
-    contexts = [
-        component_run_context,
-        self.get_pipeline_run_context(component_info.pipeline_info),
-        self.get_pipeline_context(component_info.pipeline_info)
-    ]
-    contexts = [ctx for ctx in contexts if ctx is not None]
+    registered = self._registered_executions.pop(
+        component_info.component_run_context_name, None)
+    if registered is not None:
+      execution, contexts = registered
+    else:
+      component_run_context = self.get_component_run_context(component_info)
+      [execution] = self.store.get_executions_by_context(
+          component_run_context.id)
+      contexts = [
+          component_run_context,
+          self.get_pipeline_run_context(component_info.pipeline_info),
+          self.get_pipeline_context(component_info.pipeline_info)
+      ]
+      contexts = [ctx for ctx in contexts if ctx is not None]
     # If execution state is already in final state, skips publishing.
     if execution.properties[
-        _EXECUTION_TYPE_KEY_STATE].string_value in FINAL_EXECUTION_STATES:
-      return
-    self.update_execution(
-        execution=execution,
-        component_info=component_info,
-        output_artifacts=output_artifacts,
-        exec_properties=exec_properties,
-        execution_state=EXECUTION_STATE_COMPLETE,
-        artifact_state=ArtifactState.PUBLISHED,
-        contexts=contexts)
+        _EXECUTION_TYPE_KEY_STATE].string_value not in FINAL_EXECUTION_STATES:
+      self.update_execution(
+          execution=execution,
+          component_info=component_info,
+          output_artifacts=output_artifacts,
+          exec_properties=exec_properties,
+          execution_state=EXECUTION_STATE_COMPLETE,
+          artifact_state=ArtifactState.PUBLISHED,
+          contexts=contexts)
+    self._execution_events.pop(execution.id, None)
+
+  def _get_cache_key(self, execution: metadata_store_pb2.Execution,
+                     pipeline_info: data_types.PipelineInfo,
+                     input_ids: Dict[Text, Set[int]]) -> Text:
+    """Computes the cache key of an execution.
+
+    The key is a deterministic fingerprint of the pipeline, the execution type
+    and properties (except run id and state, which differ between otherwise
+    identical executions) and the ids of the input artifacts of each key.
+
+    Args:
+      execution: the execution to compute the cache key for.
+      pipeline_info: info of the pipeline the execution belongs to.
+      input_ids: input artifact ids of the execution, keyed by input key.
 
-  def _is_eligible_previous_execution(
-      self, current_execution: metadata_store_pb2.Execution,
-      target_execution: metadata_store_pb2.Execution) -> bool:
-    current_execution.properties['run_id'].string_value = ''
-    target_execution.properties['run_id'].string_value = ''
-    current_execution.id = target_execution.id
-    return current_execution == target_execution
+    Returns:
+      Hex digest of the fingerprint.
+    """
+    fingerprint = hashlib.sha256()
+    fingerprint.update(tf.compat.as_bytes(pipeline_info.pipeline_context_name))
+    fingerprint.update(tf.compat.as_bytes('\0%d' % execution.type_id))
+    for k in sorted(execution.properties.keys()):
+      if k in (_EXECUTION_TYPE_KEY_RUN_ID, _EXECUTION_TYPE_KEY_STATE):
+        continue
+      fingerprint.update(tf.compat.as_bytes('\0%s\0' % k))
+      fingerprint.update(execution.properties[k].SerializeToString())
+    for key in sorted(input_ids.keys()):
+      fingerprint.update(tf.compat.as_bytes('\0%s\0%s' % (key, ','.join(
+          str(i) for i in sorted(input_ids[key])))))
+    return fingerprint.hexdigest()
+
+  def _register_cache_key_context(
+      self, execution: metadata_store_pb2.Execution,
+      pipeline_info: data_types.PipelineInfo,
+      input_events: List[metadata_store_pb2.Event],
+      input_artifacts: Optional[Dict[Text, List[Artifact]]] = None
+  ) -> Optional[metadata_store_pb2.Context]:
+    """Registers the cache key context of a complete execution.
+
+    Args:
+      execution: the complete execution.
+      pipeline_info: info of the pipeline the execution belongs to.
+      input_events: input events already registered for the execution.
+      input_artifacts: input artifacts being added to the execution.
+
+    Returns:
+      The cache key context, or None if the execution can not be cached.
+    """
+    if not pipeline_info:
+      return None
+    input_ids = collections.defaultdict(set)
+    for event in input_events:
+      input_ids[event.path.steps[0].key].add(event.artifact_id)
+    for key, input_list in (input_artifacts or {}).items():
+      for single_input in input_list:
+        if not single_input.id:
+          return None
+        input_ids[key].add(single_input.id)
+    return self._register_context_if_not_exist(
+        context_type_name=_CONTEXT_TYPE_CACHE_KEY,
+        context_name=self._get_cache_key(execution, pipeline_info, input_ids),
+        properties={
+            _CONTEXT_TYPE_KEY_PIPELINE_NAME: pipeline_info.pipeline_name
+        })
 
   def get_cached_outputs(
       self, input_artifacts: Dict[Text, List[Artifact]],
@@ -716,7 +1440,12 @@ class Metadata(object):
 
     Returns the output artifacts of a cached execution if any. An eligible
     cached execution should take the same input artifacts, execution properties
-    and is associated with the same pipeline context.
+    and is associated with the same pipeline context, and none of its outputs
+    may have been deleted.
+
+    Complete executions are indexed by their cache key when published, so the
+    lookup does not depend on the number of historical executions. Executions
+    published before the index existed are not considered.
 
     Args:
       input_artifacts: inputs used by the run.
@@ -735,64 +1464,41 @@ class Metadata(object):
          'component_info %s') %
         (input_artifacts, exec_properties, component_info))
 
-    # Step 0: Finds the context of the pipeline. No context means no valid cache
-    # results.
-    context = self.get_pipeline_context(pipeline_info)
-    if context is None:
-      absl.logging.warning('Pipeline context not available for %s' %
-                           pipeline_info)
-      return None
-
-    # Step 1: Finds historical executions related to the context in step 0.
-    historical_executions = dict(
-        (e.id, e) for e in self._store.get_executions_by_context(context.id))
-
-    # Step 2: Filters historical executions to find those that used all the
-    # given inputs as input artifacts. The result of this step is a set of
-    # reversely sorted execution ids.
+    # Step 0: Computes the cache key of the expected execution.
     input_ids = collections.defaultdict(set)
     for key, input_list in input_artifacts.items():
       for single_input in input_list:
         input_ids[key].add(single_input.mlmd_artifact.id)
-    artifact_to_executions = collections.defaultdict(set)
-    for event in self.store.get_events_by_artifact_ids(
-        list(set(itertools.chain.from_iterable(input_ids.values())))):
-      if event.type == metadata_store_pb2.Event.INPUT:
-        artifact_to_executions[event.artifact_id].add(event.execution_id)
-    common_execution_ids = sorted(
-        set.intersection(
-            set(historical_executions.keys()),
-            *(artifact_to_executions.values())),
-        reverse=True)
-
-    # Step 3: Filters candidate executions further based on the followings:
-    #   - Shares the given properties
-    #   - Is in complete state
-    # The maximum number of candidates is capped by MAX_EXECUTIONS_FOR_CACHE.
     expected_previous_execution = self._prepare_execution(
         EXECUTION_STATE_COMPLETE,
         exec_properties,
         pipeline_info=pipeline_info,
         component_info=component_info)
-
-    candidate_execution_ids = [
-        e_id for e_id in common_execution_ids  # pylint: disable=g-complex-comprehension
-        if self._is_eligible_previous_execution(
-            copy.deepcopy(expected_previous_execution),
-            copy.deepcopy(historical_executions[e_id]))
-    ]
-    candidate_execution_ids = candidate_execution_ids[
-        0:min(len(candidate_execution_ids), MAX_EXECUTIONS_FOR_CACHE)]
-
-    # Step 4: Traverse all candidates, if the input artifacts of a candidate
+    cache_key = self._get_cache_key(expected_previous_execution, pipeline_info,
+                                    input_ids)
+
+    # Step 1: Finds executions indexed under the cache key. No context means no
+    # valid cache results.
+    cache_context = self.store.get_context_by_type_and_name(
+        _CONTEXT_TYPE_CACHE_KEY, cache_key)
+    if cache_context is None:
+      return None
+    candidate_execution_ids = sorted(
+        (e.id
+         for e in self.store.get_executions_by_context(cache_context.id)
+         if e.properties[_EXECUTION_TYPE_KEY_STATE].string_value ==
+         EXECUTION_STATE_COMPLETE),
+        reverse=True)[:MAX_EXECUTIONS_FOR_CACHE]
+
+    # Step 2: Traverse all candidates, if the input artifacts of a candidate
     # match given input artifacts, return the output artifacts of that execution
-    # as result. Note that this is necessary since a candidate execution might
-    # use more than the given artifacts.
+    # as result. This guards against fingerprint collisions.
     candidate_execution_to_events = collections.defaultdict(list)
     for event in self.store.get_events_by_execution_ids(
         candidate_execution_ids):
       candidate_execution_to_events[event.execution_id].append(event)
-    for execution_id, events in candidate_execution_to_events.items():
+    for execution_id in candidate_execution_ids:
+      events = candidate_execution_to_events[execution_id]
       # Creates the {key -> artifact id set} for the candidate execution.
       current_input_ids = collections.defaultdict(set)
       for event in events:
@@ -818,7 +1524,8 @@ class Metadata(object):
       events: events related to the execution id.
 
     Returns:
-      A dict of key -> List[Artifact] as the result
+      A dict of key -> List[Artifact] as the result, or None if any of the
+      outputs has been deleted, e.g. by garbage collection.
     """
 
     absl.logging.debug('Execution %s matches all inputs' % execution_id)
@@ -831,6 +1538,12 @@ class Metadata(object):
     output_events.sort(key=lambda e: e.path.steps[1].index)
     cached_output_artifacts = self.store.get_artifacts_by_id(
         [e.artifact_id for e in output_events])
+    if any(
+        self._get_artifact_state(a) == ArtifactState.DELETED
+        for a in cached_output_artifacts):
+      absl.logging.debug('Outputs of execution %s have been deleted' %
+                         execution_id)
+      return None
     artifact_types = self.store.get_artifact_types_by_id(
         [a.type_id for a in cached_output_artifacts])
 
@@ -862,45 +1575,92 @@ class Metadata(object):
     Raises:
       RuntimeError: when no matching execution is found given producer info.
     """
-    producer_execution = None
-    matching_artifact_ids = set()
+    return self.search_artifacts_in_bulk(
+        artifact_queries={
+            artifact_name: (artifact_name, producer_component_id)
+        },
+        pipeline_info=pipeline_info)[artifact_name]
+
+  def search_artifacts_in_bulk(
+      self, artifact_queries: Dict[Text, Tuple[Text, Text]],
+      pipeline_info: data_types.PipelineInfo) -> Dict[Text, List[Artifact]]:
+    """Search artifacts of several producer outputs in the pipeline run.
+
+    All queries are resolved with a constant number of store calls: executions
+    of the pipeline run are indexed by component id, then events, artifacts and
+    artifact types are fetched in one batched call each.
+
+    Args:
+      artifact_queries: key -> (artifact name, producer component id) for each
+        group of artifacts to search. The artifact name is the output key set
+        by the producer component.
+      pipeline_info: the information of the current pipeline
+
+    Returns:
+      key -> list of Artifacts matching the query, in output order.
+
+    Raises:
+      RuntimeError: when no matching execution is found given producer info.
+    """
+    if not artifact_queries:
+      return {}
     # TODO(ruoyu): We need to revisit this when adding support for async
     # execution.
     context = self.get_pipeline_run_context(pipeline_info)
     if context is None:
       raise RuntimeError('Pipeline run context for %s does not exist' %
                          pipeline_info)
+    producer_executions = {}
     for execution in self.store.get_executions_by_context(context.id):
-      if execution.properties[
-          'component_id'].string_value == producer_component_id:
-        producer_execution = execution
-        break
-    if not producer_execution:
-      raise RuntimeError('Cannot find matching execution with pipeline name %s,'
-                         'run id %s and component id %s' %
-                         (pipeline_info.pipeline_name, pipeline_info.run_id,
-                          producer_component_id))
-    for event in self.store.get_events_by_execution_ids([producer_execution.id
-                                                        ]):
-      if (event.type == metadata_store_pb2.Event.OUTPUT and
-          event.path.steps[0].key == artifact_name):
-        matching_artifact_ids.add(event.artifact_id)
+      producer_executions.setdefault(
+          execution.properties['component_id'].string_value, execution)
+    for _, producer_component_id in artifact_queries.values():
+      if producer_component_id not in producer_executions:
+        raise RuntimeError(
+            'Cannot find matching execution with pipeline name %s,'
+            'run id %s and component id %s' %
+            (pipeline_info.pipeline_name, pipeline_info.run_id,
+             producer_component_id))
+
+    # (producer execution id, artifact name) -> output events.
+    output_events = collections.defaultdict(list)
+    for event in self.store.get_events_by_execution_ids(
+        list(set(producer_executions[producer_component_id].id
+                 for _, producer_component_id in artifact_queries.values()))):
+      if event.type == metadata_store_pb2.Event.OUTPUT:
+        output_events[(event.execution_id,
+                       event.path.steps[0].key)].append(event)
+    for events in output_events.values():
+      events.sort(key=lambda e: e.path.steps[-1].index)
 
     # Get relevant artifacts along with their types.
-    artifacts_by_id = self.store.get_artifacts_by_id(
-        list(matching_artifact_ids))
-    matching_artifact_type_ids = list(set(a.type_id for a in artifacts_by_id))
+    matching_artifact_ids = set(
+        e.artifact_id
+        for events in output_events.values()
+        for e in events)
+    artifacts_by_id = dict(
+        (a.id, a)
+        for a in self.store.get_artifacts_by_id(list(matching_artifact_ids)))
+    matching_artifact_type_ids = list(
+        set(a.type_id for a in artifacts_by_id.values()))
     matching_artifact_types = self.store.get_artifact_types_by_id(
         matching_artifact_type_ids)
     artifact_types = dict(
         zip(matching_artifact_type_ids, matching_artifact_types))
 
-    result_artifacts = []
-    for a in artifacts_by_id:
-      tfx_artifact = artifact_utils.deserialize_artifact(
-          artifact_types[a.type_id], a)
-      result_artifacts.append(tfx_artifact)
-    return result_artifacts
+    result = {}
+    for key, (artifact_name, producer_component_id) in artifact_queries.items():
+      producer_execution = producer_executions[producer_component_id]
+      result[key] = []
+      seen_artifact_ids = set()
+      for event in output_events[(producer_execution.id, artifact_name)]:
+        if event.artifact_id in seen_artifact_ids:
+          continue
+        seen_artifact_ids.add(event.artifact_id)
+        a = artifacts_by_id[event.artifact_id]
+        result[key].append(
+            artifact_utils.deserialize_artifact(artifact_types[a.type_id], a))
+    return result
 
   def _register_context_type_if_not_exist(
       self, context_type_name: Text,
@@ -917,10 +1677,9 @@ class Metadata(object):
     context_type = metadata_store_pb2.ContextType(name=context_type_name)
     for k, t in properties.items():
       context_type.properties[k] = t
-    context_type_id = self.store.put_context_type(
-        context_type, can_add_fields=True)
-
-    return context_type_id
+    return self._type_registry().get_or_register(
+        'context', context_type_name, frozenset(properties.items()),
+        lambda: self.store.put_context_type(context_type, can_add_fields=True))
 
   def _prepare_context(
       self,
@@ -0,0 +1,387 @@
+# Lint as: python2, python3
+# Copyright 2020 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Garbage collection of artifacts and history in ML metadata.
+
+MLMD does not support deleting executions, events or artifacts, so garbage
+collection removes (or archives) the payload of expired output artifacts under
+the pipeline root and marks the artifacts as deleted. Deleted artifacts are
+never qualified as inputs or cached outputs again. As no MLMD row is removed,
+garbage collection frees space under the pipeline root, but does not make
+queries of the store faster.
+
+All functions stream over MLMD ids in fixed size batches, up to the largest id
+of the store. MLMD has no call returning this id, so unless the caller gives
+it, it is found by probing windows of ids past the largest id seen so far,
+growing them over gaps in the ids until a run of them is empty. Memory use is
+bounded by the window size instead of the size of the store.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Text, Tuple
+
+import absl
+import tensorflow as tf
+
+from ml_metadata.proto import metadata_store_pb2
+from tfx.orchestration import metadata
+from tfx.types.artifact import ArtifactState
+
+# Default number of MLMD entities read per store call.
+_DEFAULT_BATCH_SIZE = 100
+# Number of consecutive empty windows of ids past the largest id found, which
+# ends the search for the largest id. Windows double in size from one batch
+# up to _MAX_PROBE_BATCHES batches, so that with the default batch size, gaps
+# of up to 7900 ids are skipped.
+_MAX_EMPTY_PROBES = 8
+_MAX_PROBE_BATCHES = 16
+# System properties that legacy artifact types declare as type properties
+# instead of storing them as custom properties.
+_LEGACY_SYSTEM_PROPERTIES = ('name', 'state', 'pipeline_name',
+                             'producer_component')
+
+
+class RetentionPolicy(object):
+  """Retention policy for the executions of a pipeline or a component.
+
+  Attributes:
+    pipeline_name: name of the pipeline the policy applies to.
+    component_id: optional id of the component the policy applies to. If not
+      set, the policy applies to every component of the pipeline that has no
+      policy of its own.
+    keep_last_n: number of latest final executions of each component whose
+      output artifacts are kept.
+  """
+
+  def __init__(self,
+               pipeline_name: Text,
+               keep_last_n: int,
+               component_id: Optional[Text] = None):
+    if keep_last_n < 1:
+      raise ValueError('keep_last_n must be positive, got %d.' % keep_last_n)
+    self.pipeline_name = pipeline_name
+    self.component_id = component_id
+    self.keep_last_n = keep_last_n
+
+
+class GarbageCollectionReport(object):
+  """Summary of a garbage collection pass.
+
+  Attributes:
+    executions_scanned: number of executions read.
+    executions_expired: number of executions past their retention.
+    artifacts_deleted: number of artifacts marked as deleted.
+    artifacts_retained: number of outputs of expired executions kept because a
+      retained execution consumed them or reused them as cached outputs, or
+      because they are not under the pipeline root.
+    bytes_freed: size of the payloads removed from (or archived out of) the
+      pipeline root.
+    elapsed_secs: wall time of the pass.
+  """
+
+  def __init__(self):
+    self.executions_scanned = 0
+    self.executions_expired = 0
+    self.artifacts_deleted = 0
+    self.artifacts_retained = 0
+    self.bytes_freed = 0
+    self.elapsed_secs = 0.0
+
+  def __repr__(self):
+    return ('GarbageCollectionReport(executions_scanned=%d, '
+            'executions_expired=%d, artifacts_deleted=%d, '
+            'artifacts_retained=%d, bytes_freed=%d, elapsed_secs=%.2f)') % (
+                self.executions_scanned, self.executions_expired,
+                self.artifacts_deleted, self.artifacts_retained,
+                self.bytes_freed, self.elapsed_secs)
+
+
+def _find_max_id(get_by_id_fn, batch_size: int) -> int:
+  """Returns the largest id of MLMD entities, or 0 if there are none.
+
+  Ids are allocated sequentially, but may have gaps left by aborted
+  transactions. Windows of ids past the largest id found are probed, growing
+  while they are empty, until _MAX_EMPTY_PROBES of them in a row are empty.
+
+  Args:
+    get_by_id_fn: store method fetching entities by a list of ids.
+    batch_size: number of ids of the first window probed after each hit.
+
+  Returns:
+    The largest id.
+  """
+  max_id = 0
+  first_id = 1
+  window_size = batch_size
+  empty_probes = 0
+  while empty_probes < _MAX_EMPTY_PROBES:
+    entities = get_by_id_fn(list(range(first_id, first_id + window_size)))
+    if entities:
+      max_id = max(entity.id for entity in entities)
+      first_id = max_id + 1
+      window_size = batch_size
+      empty_probes = 0
+    else:
+      first_id += window_size
+      window_size = min(window_size * 2, batch_size * _MAX_PROBE_BATCHES)
+      empty_probes += 1
+  return max_id
+
+
+def _iter_batches(get_by_id_fn, max_id: int,
+                  batch_size: int) -> Iterator[List[object]]:
+  """Iterates MLMD entities by ascending id in batches.
+
+  Args:
+    get_by_id_fn: store method fetching entities by a list of ids.
+    max_id: largest id to fetch.
+    batch_size: number of ids requested per call.
+
+  Yields:
+    Non-empty lists of entities.
+  """
+  # Ids are allocated sequentially, but may have gaps left by aborted
+  # transactions, so that empty batches do not end the iteration.
+  for first_id in range(1, max_id + 1, batch_size):
+    batch = get_by_id_fn(
+        list(range(first_id, min(first_id + batch_size, max_id + 1))))
+    if batch:
+      yield batch
+
+
+def _policy_key(execution: metadata_store_pb2.Execution,
+                policies: Dict[Tuple[Text, Optional[Text]], RetentionPolicy]
+               ) -> Optional[Tuple[Text, Text]]:
+  """Returns the (pipeline, component) retention key of an execution if any."""
+  pipeline_name = execution.properties['pipeline_name'].string_value
+  component_id = execution.properties['component_id'].string_value
+  if ((pipeline_name, component_id) in policies or
+      (pipeline_name, None) in policies):
+    return pipeline_name, component_id
+  return None
+
+
+def _is_final(execution: metadata_store_pb2.Execution) -> bool:
+  return (execution.properties['state'].string_value in
+          metadata.FINAL_EXECUTION_STATES)
+
+
+def _get_size(uri: Text) -> int:
+  """Returns the total size of the files under a uri."""
+  if not tf.io.gfile.isdir(uri):
+    return tf.io.gfile.stat(uri).length
+  size = 0
+  for dir_name, _, file_names in tf.io.gfile.walk(uri):
+    for file_name in file_names:
+      size += tf.io.gfile.stat(os.path.join(dir_name, file_name)).length
+  return size
+
+
+def _is_under(uri: Text, root: Text) -> bool:
+  return bool(root) and uri.startswith(root.rstrip('/') + '/')
+
+
+def _move(src: Text, dst: Text) -> None:
+  """Moves a file or a directory, by copying it and deleting the source."""
+  # Directories cannot be renamed on object stores such as GCS.
+  if not tf.io.gfile.isdir(src):
+    tf.io.gfile.makedirs(os.path.dirname(dst))
+    tf.io.gfile.copy(src, dst, overwrite=True)
+    tf.io.gfile.remove(src)
+    return
+  for dir_name, _, file_names in tf.io.gfile.walk(src):
+    dst_dir_name = os.path.join(dst, os.path.relpath(dir_name, src))
+    tf.io.gfile.makedirs(dst_dir_name)
+    for file_name in file_names:
+      tf.io.gfile.copy(
+          os.path.join(dir_name, file_name),
+          os.path.join(dst_dir_name, file_name),
+          overwrite=True)
+  tf.io.gfile.rmtree(src)
+
+
+def collect_garbage(metadata_handler: metadata.Metadata,
+                    policies: List[RetentionPolicy],
+                    archive_root: Optional[Text] = None,
+                    dry_run: bool = False,
+                    batch_size: int = _DEFAULT_BATCH_SIZE,
+                    max_execution_id: Optional[int] = None
+                   ) -> GarbageCollectionReport:
+  """Removes output artifacts of executions past their retention.
+
+  Output artifacts of expired executions are deleted, unless a retained
+  execution consumed them or reused them as cached outputs, or their uri is not
+  under the pipeline root of the producer execution (e.g. imported artifacts).
+  Their payload is removed, or moved under archive_root keeping its path
+  relative to the pipeline root, and they are marked as deleted in MLMD.
+
+  Two passes are made over the executions: the first finds, for each retained
+  component, the id of the oldest execution to keep, the second deletes the
+  outputs of older executions.
+
+  Args:
+    metadata_handler: an entered Metadata instance.
+    policies: retention policies to apply.
+    archive_root: if set, payloads are moved under this directory instead of
+      being removed.
+    dry_run: if True, only reports what would be collected.
+    batch_size: number of entities read per store call.
+    max_execution_id: largest execution id to scan. If not set, it is found by
+      probing the store.
+
+  Returns:
+    A GarbageCollectionReport.
+  """
+  start = time.time()
+  report = GarbageCollectionReport()
+  policy_map = dict(((p.pipeline_name, p.component_id), p) for p in policies)
+  store = metadata_handler.store
+  # Executions registered during the passes are newer than any retained one.
+  if max_execution_id is None:
+    max_execution_id = _find_max_id(store.get_executions_by_id, batch_size)
+
+  # Pass 1: finds the ids of the latest keep_last_n final executions of each
+  # component. Only keep_last_n ids are held per component.
+  latest_ids = {}
+  for executions in _iter_batches(store.get_executions_by_id, max_execution_id,
+                                  batch_size):
+    for execution in executions:
+      report.executions_scanned += 1
+      key = _policy_key(execution, policy_map)
+      if key is None or not _is_final(execution):
+        continue
+      policy = policy_map.get(key) or policy_map[(key[0], None)]
+      if key not in latest_ids:
+        latest_ids[key] = collections.deque(maxlen=policy.keep_last_n)
+      latest_ids[key].append(execution.id)
+  # Final executions of a component with an id below its threshold expired.
+  thresholds = dict((key, ids[0])
+                    for key, ids in latest_ids.items()
+                    if len(ids) == ids.maxlen)
+  del latest_ids
+
+  def _is_expired(execution):
+    key = _policy_key(execution, policy_map)
+    return (key in thresholds and _is_final(execution) and
+            execution.id < thresholds[key])
+
+  # Pass 2: deletes outputs of expired executions, batch by batch.
+  for executions in _iter_batches(store.get_executions_by_id, max_execution_id,
+                                  batch_size):
+    expired = dict((e.id, e) for e in executions if _is_expired(e))
+    if not expired:
+      continue
+    report.executions_expired += len(expired)
+    output_events = [
+        e for e in store.get_events_by_execution_ids(list(expired.keys()))
+        if e.type == metadata_store_pb2.Event.OUTPUT
+    ]
+    producer_of = dict((e.artifact_id, e.execution_id) for e in output_events)
+    if not producer_of:
+      continue
+    # Keeps artifacts held by any retained execution: consumed as inputs, or
+    # linked as outputs by a cached execution.
+    holder_ids = collections.defaultdict(set)
+    for event in store.get_events_by_artifact_ids(list(producer_of.keys())):
+      if event.type in (metadata_store_pb2.Event.INPUT,
+                        metadata_store_pb2.Event.OUTPUT):
+        holder_ids[event.artifact_id].add(event.execution_id)
+    all_holder_ids = set().union(*holder_ids.values())
+    retained_holder_ids = set(
+        e.id
+        for e in store.get_executions_by_id(list(all_holder_ids))
+        if not _is_expired(e)) if all_holder_ids else set()
+
+    for artifact in store.get_artifacts_by_id(list(producer_of.keys())):
+      if metadata_handler._get_artifact_state(artifact) in (  # pylint: disable=protected-access
+          ArtifactState.DELETED, ArtifactState.MISSING):
+        continue
+      pipeline_root = expired[producer_of[artifact.id]].properties[
+          'pipeline_root'].string_value
+      if (holder_ids[artifact.id] & retained_holder_ids or
+          not _is_under(artifact.uri, pipeline_root)):
+        report.artifacts_retained += 1
+        continue
+      report.artifacts_deleted += 1
+      if not tf.io.gfile.exists(artifact.uri):
+        size = 0
+      else:
+        size = _get_size(artifact.uri)
+      report.bytes_freed += size
+      if dry_run:
+        continue
+      if size or tf.io.gfile.exists(artifact.uri):
+        if archive_root:
+          _move(artifact.uri,
+                os.path.join(archive_root,
+                             os.path.relpath(artifact.uri, pipeline_root)))
+        elif tf.io.gfile.isdir(artifact.uri):
+          tf.io.gfile.rmtree(artifact.uri)
+        else:
+          tf.io.gfile.remove(artifact.uri)
+      metadata_handler.update_artifact_state(artifact, ArtifactState.DELETED)
+
+  report.elapsed_secs = time.time() - start
+  absl.logging.info('Metadata garbage collection finished: %s', report)
+  return report
+
+
+def migrate_legacy_artifact_properties(
+    metadata_handler: metadata.Metadata,
+    batch_size: int = _DEFAULT_BATCH_SIZE,
+    max_artifact_id: Optional[int] = None) -> int:
+  """Moves system properties of legacy artifacts into custom properties.
+
+  Legacy artifact types declare system properties such as the artifact state
+  as type properties. After migration, readers find them in custom properties,
+  the same as for current artifact types.
+
+  Args:
+    metadata_handler: an entered Metadata instance.
+    batch_size: number of artifacts read and written per store call.
+    max_artifact_id: largest artifact id to migrate. If not set, it is found by
+      probing the store.
+
+  Returns:
+    Number of migrated artifacts.
+  """
+  store = metadata_handler.store
+  migrated = 0
+  if max_artifact_id is None:
+    max_artifact_id = _find_max_id(store.get_artifacts_by_id, batch_size)
+  for artifacts in _iter_batches(store.get_artifacts_by_id, max_artifact_id,
+                                 batch_size):
+    legacy_artifacts = []
+    for artifact in artifacts:
+      legacy_keys = [
+          k for k in _LEGACY_SYSTEM_PROPERTIES if k in artifact.properties
+      ]
+      if not legacy_keys:
+        continue
+      for k in legacy_keys:
+        artifact.custom_properties[k].string_value = (
+            artifact.properties[k].string_value)
+        del artifact.properties[k]
+      legacy_artifacts.append(artifact)
+    if legacy_artifacts:
+      store.put_artifacts(legacy_artifacts)
+      migrated += len(legacy_artifacts)
+  absl.logging.info('Migrated %d legacy artifacts.', migrated)
+  return migrated
@@ -0,0 +1,292 @@
+# Lint as: python2, python3
+# Copyright 2020 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for tfx.orchestration.metadata_gc."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from typing import Dict, List, Optional, Text, Tuple
+
+import tensorflow as tf
+from ml_metadata.proto import metadata_store_pb2
+from tfx import types
+from tfx.orchestration import data_types
+from tfx.orchestration import metadata
+from tfx.orchestration import metadata_gc
+from tfx.types import standard_artifacts
+from tfx.types.artifact import ArtifactState
+
+
+class MetadataGcTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(MetadataGcTest, self).setUp()
+    self._connection_config = metadata_store_pb2.ConnectionConfig()
+    self._connection_config.sqlite.SetInParent()
+    self._pipeline_root = os.path.join(
+        os.environ.get('TEST_UNDECLARED_OUTPUTS_DIR', self.get_temp_dir()),
+        self._testMethodName)
+    self._pipeline_info = data_types.PipelineInfo(
+        pipeline_name='my_pipeline',
+        pipeline_root=self._pipeline_root,
+        run_id='my_run_id')
+    self._producer_info = data_types.ComponentInfo(
+        component_type='a.b.c',
+        component_id='producer',
+        pipeline_info=self._pipeline_info)
+    self._consumer_info = data_types.ComponentInfo(
+        component_type='a.b.d',
+        component_id='consumer',
+        pipeline_info=self._pipeline_info)
+
+  def _get_run_infos(
+      self, component_info: data_types.ComponentInfo, run: int
+  ) -> Tuple[data_types.PipelineInfo, data_types.ComponentInfo]:
+    """Returns the pipeline and component infos of a pipeline run."""
+    pipeline_info = data_types.PipelineInfo(
+        pipeline_name=self._pipeline_info.pipeline_name,
+        pipeline_root=self._pipeline_root,
+        run_id='run_%d' % run)
+    return pipeline_info, data_types.ComponentInfo(
+        component_type=component_info.component_type,
+        component_id=component_info.component_id,
+        pipeline_info=pipeline_info)
+
+  def _run_component(
+      self,
+      m: metadata.Metadata,
+      component_info: data_types.ComponentInfo,
+      run: int,
+      input_artifacts: Optional[Dict[Text, List[types.Artifact]]] = None
+  ) -> types.Artifact:
+    """Runs a component producing one output of 10 bytes."""
+    pipeline_info, component_info = self._get_run_infos(component_info, run)
+    contexts = m.register_pipeline_contexts_if_not_exists(pipeline_info)
+    m.register_execution(
+        input_artifacts=input_artifacts or {},
+        exec_properties={'run': run},
+        pipeline_info=pipeline_info,
+        component_info=component_info,
+        contexts=contexts)
+    output_artifact = standard_artifacts.Examples()
+    output_artifact.uri = os.path.join(self._pipeline_root,
+                                       component_info.component_id, 'output',
+                                       str(run))
+    tf.io.gfile.makedirs(output_artifact.uri)
+    with tf.io.gfile.GFile(os.path.join(output_artifact.uri, 'data'), 'w') as f:
+      f.write('0123456789')
+    m.publish_execution(
+        component_info=component_info,
+        output_artifacts={'output': [output_artifact]})
+    return output_artifact
+
+  def _get_cached_outputs(
+      self, m: metadata.Metadata, component_info: data_types.ComponentInfo,
+      run: int, cached_run: int) -> Optional[Dict[Text, List[types.Artifact]]]:
+    """Returns the outputs of cached_run a pipeline run would reuse."""
+    pipeline_info, component_info = self._get_run_infos(component_info, run)
+    return m.get_cached_outputs(
+        input_artifacts={},
+        exec_properties={'run': cached_run},
+        pipeline_info=pipeline_info,
+        component_info=component_info)
+
+  def _run_cached_component(self, m: metadata.Metadata,
+                            component_info: data_types.ComponentInfo, run: int,
+                            cached_run: int) -> None:
+    """Runs a component reusing the outputs of a previous run as cache."""
+    cached_outputs = self._get_cached_outputs(m, component_info, run,
+                                              cached_run)
+    self.assertIsNotNone(cached_outputs)
+    pipeline_info, component_info = self._get_run_infos(component_info, run)
+    contexts = m.register_pipeline_contexts_if_not_exists(pipeline_info)
+    execution = m.register_execution(
+        exec_properties={'run': cached_run},
+        pipeline_info=pipeline_info,
+        component_info=component_info,
+        contexts=contexts)
+    m.update_execution(
+        execution=execution,
+        component_info=component_info,
+        output_artifacts=cached_outputs,
+        execution_state=metadata.EXECUTION_STATE_CACHED,
+        contexts=contexts)
+    m.publish_execution(component_info=component_info)
+
+  def _get_state(self, m: metadata.Metadata, artifact: types.Artifact) -> Text:
+    [mlmd_artifact] = m.store.get_artifacts_by_id([artifact.id])
+    return m._get_artifact_state(mlmd_artifact)
+
+  def testCollectGarbage(self):
+    with metadata.Metadata(connection_config=self._connection_config) as m:
+      outputs = [self._run_component(m, self._producer_info, i)
+                 for i in range(3)]
+      report = metadata_gc.collect_garbage(
+          m, [metadata_gc.RetentionPolicy('my_pipeline', keep_last_n=1)],
+          batch_size=2)
+
+      self.assertEqual(report.executions_scanned, 3)
+      self.assertEqual(report.executions_expired, 2)
+      self.assertEqual(report.artifacts_deleted, 2)
+      self.assertEqual(report.bytes_freed, 20)
+      for artifact in outputs[:2]:
+        self.assertFalse(tf.io.gfile.exists(artifact.uri))
+        self.assertEqual(self._get_state(m, artifact), ArtifactState.DELETED)
+      self.assertTrue(tf.io.gfile.exists(outputs[2].uri))
+      self.assertEqual(self._get_state(m, outputs[2]), ArtifactState.PUBLISHED)
+
+      # Deleted artifacts are not collected again.
+      report = metadata_gc.collect_garbage(
+          m, [metadata_gc.RetentionPolicy('my_pipeline', keep_last_n=1)])
+      self.assertEqual(report.artifacts_deleted, 0)
+
+  def testCollectGarbageDryRun(self):
+    with metadata.Metadata(connection_config=self._connection_config) as m:
+      outputs = [self._run_component(m, self._producer_info, i)
+                 for i in range(2)]
+      report = metadata_gc.collect_garbage(
+          m, [metadata_gc.RetentionPolicy('my_pipeline', keep_last_n=1)],
+          dry_run=True)
+
+      self.assertEqual(report.artifacts_deleted, 1)
+      self.assertEqual(report.bytes_freed, 10)
+      self.assertTrue(tf.io.gfile.exists(outputs[0].uri))
+      self.assertEqual(self._get_state(m, outputs[0]), ArtifactState.PUBLISHED)
+
+  def testCollectGarbageArchives(self):
+    archive_root = os.path.join(self.get_temp_dir(), 'archive')
+    with metadata.Metadata(connection_config=self._connection_config) as m:
+      outputs = [self._run_component(m, self._producer_info, i)
+                 for i in range(2)]
+      metadata_gc.collect_garbage(
+          m, [metadata_gc.RetentionPolicy('my_pipeline', keep_last_n=1)],
+          archive_root=archive_root)
+
+      self.assertFalse(tf.io.gfile.exists(outputs[0].uri))
+      self.assertTrue(
+          tf.io.gfile.exists(
+              os.path.join(archive_root, 'producer', 'output', '0', 'data')))
+
+  def testCollectGarbageKeepsInputsOfRetainedExecutions(self):
+    with metadata.Metadata(connection_config=self._connection_config) as m:
+      producer_output = self._run_component(m, self._producer_info, 0)
+      self._run_component(m, self._producer_info, 1)
+      self._run_component(
+          m, self._consumer_info, 0, input_artifacts={'input': [
+              producer_output
+          ]})
+      report = metadata_gc.collect_garbage(m, [
+          metadata_gc.RetentionPolicy(
+              'my_pipeline', keep_last_n=1, component_id='producer')
+      ])
+
+      self.assertEqual(report.executions_expired, 1)
+      self.assertEqual(report.artifacts_deleted, 0)
+      self.assertEqual(report.artifacts_retained, 1)
+      self.assertTrue(tf.io.gfile.exists(producer_output.uri))
+
+  def testCollectGarbageKeepsOutputsOfRetainedCachedExecutions(self):
+    with metadata.Metadata(connection_config=self._connection_config) as m:
+      output = self._run_component(m, self._producer_info, 0)
+      self._run_cached_component(m, self._producer_info, 1, cached_run=0)
+      report = metadata_gc.collect_garbage(
+          m, [metadata_gc.RetentionPolicy('my_pipeline', keep_last_n=1)])
+
+      self.assertEqual(report.executions_expired, 1)
+      self.assertEqual(report.artifacts_deleted, 0)
+      self.assertEqual(report.artifacts_retained, 1)
+      self.assertTrue(tf.io.gfile.exists(output.uri))
+      # A later run still resolves the cached outputs, with their payload.
+      cached_outputs = self._get_cached_outputs(
+          m, self._producer_info, 2, cached_run=0)
+      self.assertEqual(cached_outputs['output'][0].uri, output.uri)
+
+  def testCollectGarbageDeletedOutputsAreNotCached(self):
+    with metadata.Metadata(connection_config=self._connection_config) as m:
+      self._run_component(m, self._producer_info, 0)
+      self._run_component(m, self._producer_info, 1)
+      metadata_gc.collect_garbage(
+          m, [metadata_gc.RetentionPolicy('my_pipeline', keep_last_n=1)])
+
+      self.assertIsNone(
+          self._get_cached_outputs(m, self._producer_info, 2, cached_run=0))
+      self.assertIsNotNone(
+          self._get_cached_outputs(m, self._producer_info, 2, cached_run=1))
+
+  def testIterBatchesSkipsGaps(self):
+    entities = dict((i, i) for i in [1, 2, 50, 51, 99])
+
+    def _get_by_id(ids):
+      return [entities[i] for i in ids if i in entities]
+
+    for batch_size in [1, 3, 100]:
+      self.assertEqual([1, 2, 50, 51, 99], [
+          entity for batch in metadata_gc._iter_batches(_get_by_id, 99,
+                                                         batch_size)
+          for entity in batch
+      ])
+
+  def testFindMaxIdProbesPastGaps(self):
+    entities = dict(
+        (i, metadata_store_pb2.Execution(id=i)) for i in [1, 2, 5, 300, 900])
+
+    def _get_by_id(ids):
+      self.assertLessEqual(len(ids), 10 * metadata_gc._MAX_PROBE_BATCHES)
+      return [entities[i] for i in ids if i in entities]
+
+    self.assertEqual(900, metadata_gc._find_max_id(_get_by_id, 10))
+    self.assertEqual(0, metadata_gc._find_max_id(lambda ids: [], 10))
+
+  def testCollectGarbageOtherPipeline(self):
+    with metadata.Metadata(connection_config=self._connection_config) as m:
+      for i in range(2):
+        self._run_component(m, self._producer_info, i)
+      report = metadata_gc.collect_garbage(
+          m, [metadata_gc.RetentionPolicy('other_pipeline', keep_last_n=1)])
+
+      self.assertEqual(report.executions_scanned, 2)
+      self.assertEqual(report.executions_expired, 0)
+
+  def testInvalidRetentionPolicy(self):
+    with self.assertRaises(ValueError):
+      metadata_gc.RetentionPolicy('my_pipeline', keep_last_n=0)
+
+  def testMigrateLegacyArtifactProperties(self):
+    with metadata.Metadata(connection_config=self._connection_config) as m:
+      artifact_type = metadata_store_pb2.ArtifactType(name='LegacyType')
+      artifact_type.properties['state'] = metadata_store_pb2.STRING
+      artifact_type.properties['span'] = metadata_store_pb2.INT
+      type_id = m.store.put_artifact_type(artifact_type)
+      artifact = metadata_store_pb2.Artifact(type_id=type_id, uri='my_uri')
+      artifact.properties['state'].string_value = ArtifactState.PUBLISHED
+      artifact.properties['span'].int_value = 1
+      [artifact_id] = m.store.put_artifacts([artifact])
+
+      self.assertEqual(metadata_gc.migrate_legacy_artifact_properties(m), 1)
+      [artifact] = m.store.get_artifacts_by_id([artifact_id])
+      self.assertNotIn('state', artifact.properties)
+      self.assertEqual(artifact.properties['span'].int_value, 1)
+      self.assertEqual(artifact.custom_properties['state'].string_value,
+                       ArtifactState.PUBLISHED)
+      self.assertEqual(m._get_artifact_state(artifact),
+                       ArtifactState.PUBLISHED)
+      # Migration is idempotent.
+      self.assertEqual(metadata_gc.migrate_legacy_artifact_properties(m), 0)
+
+
+if __name__ == '__main__':
+  tf.test.main()
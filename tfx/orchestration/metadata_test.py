@@ -18,9 +18,11 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import os
 from typing import Text
 
 # Standard Imports
+import mock
 import tensorflow as tf
 from ml_metadata.proto import metadata_store_pb2
 from tfx import types
@@ -521,6 +523,194 @@ class MetadataTest(tf.test.TestCase):
       self.assertProtoEquals(cached_output_artifacts['output'][0].mlmd_artifact,
                              output_artifact.mlmd_artifact)
 
+  def testFetchPreviousResultAcrossRuns(self):
+    with metadata.Metadata(connection_config=self._connection_config) as m:
+      exec_properties = {'log_root': 'path'}
+      contexts = m.register_pipeline_contexts_if_not_exists(self._pipeline_info)
+      input_artifacts = {'input': [standard_artifacts.Examples()]}
+      output_artifact = standard_artifacts.Examples()
+      output_artifact.uri = 'my_uri'
+      m.register_execution(
+          input_artifacts=input_artifacts,
+          exec_properties=exec_properties,
+          pipeline_info=self._pipeline_info,
+          component_info=self._component_info,
+          contexts=contexts)
+      m.publish_execution(
+          component_info=self._component_info,
+          output_artifacts={'output': [output_artifact]})
+      # The complete execution is indexed under its cache key.
+      [cache_context] = m.store.get_contexts_by_type(
+          metadata._CONTEXT_TYPE_CACHE_KEY)
+      self.assertLen(m.store.get_executions_by_context(cache_context.id), 1)
+
+      # A run with a different run id hits the cache.
+      component_info = data_types.ComponentInfo(
+          component_type='a.b.c',
+          component_id='my_component',
+          pipeline_info=self._pipeline_info2)
+      cached_output_artifacts = m.get_cached_outputs(
+          input_artifacts=input_artifacts,
+          exec_properties=exec_properties,
+          pipeline_info=self._pipeline_info2,
+          component_info=component_info)
+      self.assertProtoEquals(cached_output_artifacts['output'][0].mlmd_artifact,
+                             output_artifact.mlmd_artifact)
+      # Different execution properties or pipeline miss the cache.
+      self.assertIsNone(
+          m.get_cached_outputs(
+              input_artifacts=input_artifacts,
+              exec_properties={'log_root': 'another_path'},
+              pipeline_info=self._pipeline_info2,
+              component_info=component_info))
+      self.assertIsNone(
+          m.get_cached_outputs(
+              input_artifacts=input_artifacts,
+              exec_properties=exec_properties,
+              pipeline_info=self._pipeline_info3,
+              component_info=self._component_info3))
+
+  def testFetchPreviousResultWithDeletedOutputs(self):
+    with metadata.Metadata(connection_config=self._connection_config) as m:
+      exec_properties = {'log_root': 'path'}
+      contexts = m.register_pipeline_contexts_if_not_exists(self._pipeline_info)
+      input_artifacts = {'input': [standard_artifacts.Examples()]}
+      output_artifact = standard_artifacts.Examples()
+      output_artifact.uri = 'my_uri'
+      m.register_execution(
+          input_artifacts=input_artifacts,
+          exec_properties=exec_properties,
+          pipeline_info=self._pipeline_info,
+          component_info=self._component_info,
+          contexts=contexts)
+      m.publish_execution(
+          component_info=self._component_info,
+          output_artifacts={'output': [output_artifact]})
+      [mlmd_artifact] = m.store.get_artifacts_by_id([output_artifact.id])
+      m.update_artifact_state(mlmd_artifact, ArtifactState.DELETED)
+
+      self.assertIsNone(
+          m.get_cached_outputs(
+              input_artifacts=input_artifacts,
+              exec_properties=exec_properties,
+              pipeline_info=self._pipeline_info,
+              component_info=self._component_info))
+
+  def testBatchWrites(self):
+    with metadata.Metadata(
+        connection_config=self._connection_config, batch_writes=True) as m:
+      contexts = m.register_pipeline_contexts_if_not_exists(self._pipeline_info)
+      input_artifact = standard_artifacts.Examples()
+      output_artifact = standard_artifacts.Examples()
+      execution = m.register_execution(
+          input_artifacts={'input': [input_artifact]},
+          exec_properties={'arg_one': 1},
+          pipeline_info=self._pipeline_info,
+          component_info=self._component_info,
+          contexts=contexts)
+      # Non-final updates are deferred.
+      m.update_execution(
+          execution=execution,
+          component_info=self._component_info,
+          output_artifacts={'output': [output_artifact]},
+          contexts=contexts)
+      self.assertLen(m.store.get_events_by_execution_ids([execution.id]), 1)
+      self.assertFalse(output_artifact.id)
+
+      with tf.compat.v1.test.mock.patch.object(
+          m.store, 'get_events_by_execution_ids') as mock_get_events:
+        m.publish_execution(
+            component_info=self._component_info,
+            output_artifacts={'output': [output_artifact]})
+        mock_get_events.assert_not_called()
+      self.assertEqual(ArtifactState.PUBLISHED, output_artifact.state)
+      [execution] = m.store.get_executions_by_id([execution.id])
+      self.assertEqual(metadata.EXECUTION_STATE_COMPLETE,
+                       execution.properties['state'].string_value)
+      events = m.store.get_events_by_execution_ids([execution.id])
+      self.assertLen(events, 2)
+      self.assertEqual(output_artifact.id, events[1].artifact_id)
+      self.assertEqual(metadata_store_pb2.Event.OUTPUT, events[1].type)
+
+  def testFlushPendingWrites(self):
+    with metadata.Metadata(
+        connection_config=self._connection_config, batch_writes=True) as m:
+      contexts = m.register_pipeline_contexts_if_not_exists(self._pipeline_info)
+      output_artifact = standard_artifacts.Examples()
+      execution = m.register_execution(
+          pipeline_info=self._pipeline_info,
+          component_info=self._component_info,
+          contexts=contexts)
+      m.update_execution(
+          execution=execution,
+          component_info=self._component_info,
+          output_artifacts={'output': [output_artifact]},
+          contexts=contexts)
+      m.flush_pending_writes()
+      [event] = m.store.get_events_by_execution_ids([execution.id])
+      self.assertEqual(output_artifact.id, event.artifact_id)
+
+  def testPendingWritesAcrossUnpooledScopes(self):
+    connection_config = metadata_store_pb2.ConnectionConfig()
+    connection_config.sqlite.filename_uri = os.path.join(
+        self.get_temp_dir(), self._testMethodName, 'metadata.db')
+    tf.io.gfile.makedirs(os.path.dirname(connection_config.sqlite.filename_uri))
+    m = metadata.Metadata(
+        connection_config=connection_config, pool_size=0, batch_writes=True)
+    output_artifact = standard_artifacts.Examples()
+    with m:
+      contexts = m.register_pipeline_contexts_if_not_exists(self._pipeline_info)
+      execution = m.register_execution(
+          pipeline_info=self._pipeline_info,
+          component_info=self._component_info,
+          contexts=contexts)
+      m.update_execution(
+          execution=execution,
+          component_info=self._component_info,
+          output_artifacts={'output': [output_artifact]},
+          contexts=contexts)
+    # A new connection to a persistent store keeps the deferred update.
+    with m:
+      m.flush_pending_writes()
+      [event] = m.store.get_events_by_execution_ids([execution.id])
+      self.assertEqual(output_artifact.id, event.artifact_id)
+
+  def testTypeIdsAreCached(self):
+    with metadata.Metadata(connection_config=self._connection_config) as m:
+      artifact_type = standard_artifacts.Examples().artifact_type
+      type_id = m._prepare_artifact_type(artifact_type).id
+      with tf.compat.v1.test.mock.patch.object(
+          m.store, 'put_artifact_type') as mock_put_artifact_type:
+        self.assertEqual(
+            type_id,
+            m._prepare_artifact_type(
+                standard_artifacts.Examples().artifact_type).id)
+        mock_put_artifact_type.assert_not_called()
+
+  def testTypeRegistry(self):
+    with metadata.Metadata(connection_config=self._connection_config) as m:
+      m.register_pipeline_contexts_if_not_exists(self._pipeline_info)
+      with tf.compat.v1.test.mock.patch.object(
+          m.store, 'put_context_type') as mock_put_context_type:
+        m.register_pipeline_contexts_if_not_exists(self._pipeline_info2)
+        mock_put_context_type.assert_not_called()
+      stats = m.type_registry_stats()
+      self.assertEqual(stats.misses, 2)
+      self.assertEqual(stats.hits, 2)
+      self.assertEqual(stats.hit_rate, 0.5)
+
+      # A type gaining fields is registered again and reuses the same id.
+      artifact_type = metadata_store_pb2.ArtifactType(name='MyType')
+      artifact_type.properties['a'] = metadata_store_pb2.STRING
+      type_id = m._prepare_artifact_type(artifact_type).id
+      artifact_type = metadata_store_pb2.ArtifactType(name='MyType')
+      artifact_type.properties['a'] = metadata_store_pb2.STRING
+      artifact_type.properties['b'] = metadata_store_pb2.INT
+      self.assertEqual(type_id, m._prepare_artifact_type(artifact_type).id)
+      self.assertEqual(
+          m.store.get_artifact_type('MyType').properties['b'],
+          metadata_store_pb2.INT)
+
   def testSearchArtifacts(self):
     with metadata.Metadata(connection_config=self._connection_config) as m:
       exec_properties = {'log_root': 'path'}
@@ -542,6 +732,49 @@ class MetadataTest(tf.test.TestCase):
           producer_component_id=self._component_info.component_id)
       self.assertEqual(artifact.uri, output_artifact.uri)
 
+  def testSearchArtifactsInBulk(self):
+    with metadata.Metadata(connection_config=self._connection_config) as m:
+      contexts = m.register_pipeline_contexts_if_not_exists(self._pipeline_info)
+      outputs = {}
+      for component_info in (self._component_info, self._component_info2):
+        m.register_execution(
+            pipeline_info=self._pipeline_info,
+            component_info=component_info,
+            contexts=list(contexts))
+        outputs[component_info.component_id] = {
+            'output': [standard_artifacts.Examples() for _ in range(2)],
+            'another_output': [standard_artifacts.Schema()]
+        }
+        for artifacts in outputs[component_info.component_id].values():
+          for i, artifact in enumerate(artifacts):
+            artifact.uri = '%s/%d' % (component_info.component_id, i)
+        m.publish_execution(
+            component_info=component_info,
+            output_artifacts=outputs[component_info.component_id])
+
+      with tf.compat.v1.test.mock.patch.object(
+          m.store, 'get_events_by_execution_ids',
+          wraps=m.store.get_events_by_execution_ids) as mock_get_events:
+        result = m.search_artifacts_in_bulk(
+            artifact_queries={
+                'a': ('output', 'my_component'),
+                'b': ('another_output', 'my_component'),
+                'c': ('output', 'my_component_2'),
+            },
+            pipeline_info=self._pipeline_info)
+        mock_get_events.assert_called_once()
+      self.assertEqual(['my_component/0', 'my_component/1'],
+                       [a.uri for a in result['a']])
+      self.assertEqual(['my_component/0'], [a.uri for a in result['b']])
+      self.assertIsInstance(result['b'][0], standard_artifacts.Schema)
+      self.assertEqual(['my_component_2/0', 'my_component_2/1'],
+                       [a.uri for a in result['c']])
+
+      with self.assertRaises(RuntimeError):
+        m.search_artifacts_in_bulk(
+            artifact_queries={'a': ('output', 'unknown_component')},
+            pipeline_info=self._pipeline_info)
+
   def testPublishSkippedExecution(self):
     with metadata.Metadata(connection_config=self._connection_config) as m:
       exec_properties = {'log_root': 'path'}
@@ -714,6 +947,102 @@ class MetadataTest(tf.test.TestCase):
       self.assertEqual(len(result), 1)
       self.assertEqual(result[0].artifact.id, artifact_one.id)
 
+  def testIterQualifiedArtifactsIsIncremental(self):
+    with metadata.Metadata(connection_config=self._connection_config) as m:
+      contexts = m.register_pipeline_contexts_if_not_exists(self._pipeline_info)
+      models = []
+      for run_id in ('run_one', 'run_two', 'run_three'):
+        pipeline_info = data_types.PipelineInfo(
+            pipeline_name='my_pipeline', pipeline_root='/tmp', run_id=run_id)
+        component_info = data_types.ComponentInfo(
+            component_type='a.b.c',
+            component_id='my_component',
+            pipeline_info=pipeline_info)
+        m.register_execution(
+            pipeline_info=pipeline_info,
+            component_info=component_info,
+            contexts=list(contexts))
+        model = standard_artifacts.Model()
+        m.publish_execution(
+            component_info=component_info, output_artifacts={'k1': [model]})
+        models.append(model)
+
+      def _latest_model_id():
+        return next(
+            m.iter_qualified_artifacts(
+                context=contexts[0],
+                type_name=standard_artifacts.Model.TYPE_NAME,
+                producer_component_id='my_component',
+                output_key='k1',
+                batch_size=1)).artifact.id
+
+      self.assertEqual(models[-1].id, _latest_model_id())
+
+      # Only the events of the new execution are read on the next lookup.
+      execution = m.register_execution(
+          pipeline_info=self._pipeline_info,
+          component_info=self._component_info,
+          contexts=list(contexts))
+      model = standard_artifacts.Model()
+      m.publish_execution(
+          component_info=self._component_info,
+          output_artifacts={'k1': [model]})
+      with tf.compat.v1.test.mock.patch.object(
+          m.store, 'get_events_by_execution_ids',
+          wraps=m.store.get_events_by_execution_ids) as mock_get_events:
+        self.assertEqual(model.id, _latest_model_id())
+        mock_get_events.assert_called_once_with([execution.id])
+
+  def testIterQualifiedArtifactsResumesFromIndexInStore(self):
+    connection_config = metadata.sqlite_metadata_connection_config(
+        os.path.join(self.get_temp_dir(), self._testMethodName, 'metadata.db'))
+
+    def _publish_model(m, contexts):
+      execution = m.register_execution(
+          pipeline_info=self._pipeline_info,
+          component_info=self._component_info,
+          contexts=list(contexts))
+      model = standard_artifacts.Model()
+      m.publish_execution(
+          component_info=self._component_info,
+          output_artifacts={'k1': [model]})
+      return execution, model
+
+    def _qualified_model_ids(m, context):
+      return [
+          a.artifact.id for a in m.get_qualified_artifacts(
+              context=context,
+              type_name=standard_artifacts.Model.TYPE_NAME,
+              producer_component_id='my_component',
+              output_key='k1')
+      ]
+
+    # Without pooling, each instance starts with an empty index in memory, as
+    # a new process does.
+    with metadata.Metadata(
+        connection_config=connection_config, pool_size=0) as m:
+      contexts = m.register_pipeline_contexts_if_not_exists(self._pipeline_info)
+      old_models = [_publish_model(m, contexts)[1] for _ in range(2)]
+      self.assertEqual([old_models[1].id, old_models[0].id],
+                       _qualified_model_ids(m, contexts[0]))
+
+    with metadata.Metadata(
+        connection_config=connection_config, pool_size=0) as m:
+      contexts = m.register_pipeline_contexts_if_not_exists(self._pipeline_info)
+      new_execution, new_model = _publish_model(m, contexts)
+      with tf.compat.v1.test.mock.patch.object(
+          m.store, 'get_events_by_execution_ids',
+          wraps=m.store.get_events_by_execution_ids) as mock_get_events:
+        with tf.compat.v1.test.mock.patch.object(
+            m.store, 'get_executions_by_context',
+            wraps=m.store.get_executions_by_context) as mock_get_executions:
+          self.assertEqual(
+              [new_model.id, old_models[1].id, old_models[0].id],
+              _qualified_model_ids(m, contexts[0]))
+      # Only the execution newer than the index in the store is read.
+      mock_get_executions.assert_not_called()
+      mock_get_events.assert_called_once_with([new_execution.id])
+
   def testContext(self):
     with metadata.Metadata(connection_config=self._connection_config) as m:
       contexts = m.register_pipeline_contexts_if_not_exists(self._pipeline_info)
@@ -754,6 +1083,60 @@ class MetadataTest(tf.test.TestCase):
               metadata._CONTEXT_TYPE_PIPELINE_RUN,
               self._pipeline_info.pipeline_run_context_name))
 
+  def testConnectionPoolReusesStore(self):
+    connection_config = metadata.sqlite_metadata_connection_config(
+        os.path.join(self.get_temp_dir(), self._testMethodName, 'metadata.db'))
+    with metadata.Metadata(connection_config=connection_config) as m:
+      first_store = m.store
+      # Entering an already entered instance reuses its connection.
+      with m as nested:
+        self.assertIs(nested.store, first_store)
+      self.assertIs(m.store, first_store)
+    # Another instance with the same config reuses the released connection.
+    with metadata.Metadata(connection_config=connection_config) as m:
+      self.assertIs(m.store, first_store)
+      # The pool opens a new connection when all pooled ones are in use.
+      with metadata.Metadata(connection_config=connection_config) as m2:
+        self.assertIsNot(m2.store, first_store)
+
+  def testConnectionPoolDiscardsStoreOfFailedScope(self):
+    connection_config = metadata.sqlite_metadata_connection_config(
+        os.path.join(self.get_temp_dir(), self._testMethodName, 'metadata.db'))
+    with self.assertRaisesRegexp(ValueError, 'Failed'):
+      with metadata.Metadata(connection_config=connection_config) as m:
+        first_store = m.store
+        raise ValueError('Failed')
+    with metadata.Metadata(connection_config=connection_config) as m:
+      self.assertIsNot(m.store, first_store)
+
+  def testConnectionPoolAcquireTimesOut(self):
+    connection_config = metadata.sqlite_metadata_connection_config(
+        os.path.join(self.get_temp_dir(), self._testMethodName, 'metadata.db'))
+    with metadata.Metadata(connection_config=connection_config, pool_size=1):
+      with mock.patch.object(metadata, '_CONNECTION_POOL_TIMEOUT_SECS', 0.1):
+        with self.assertRaisesRegexp(RuntimeError, 'released within'):
+          with metadata.Metadata(connection_config=connection_config):
+            pass
+    # The connection is released once its scope ends.
+    with metadata.Metadata(connection_config=connection_config, pool_size=1):
+      pass
+
+  def testConnectionPoolDisabled(self):
+    connection_config = metadata.sqlite_metadata_connection_config(
+        os.path.join(self.get_temp_dir(), self._testMethodName, 'metadata.db'))
+    with metadata.Metadata(
+        connection_config=connection_config, pool_size=0) as m:
+      first_store = m.store
+    with metadata.Metadata(
+        connection_config=connection_config, pool_size=0) as m:
+      self.assertIsNot(m.store, first_store)
+
+  def testInMemoryStoreIsNotPooled(self):
+    with metadata.Metadata(connection_config=self._connection_config) as m:
+      m.register_pipeline_contexts_if_not_exists(self._pipeline_info)
+    with metadata.Metadata(connection_config=self._connection_config) as m:
+      self.assertIsNone(m.get_pipeline_context(self._pipeline_info))
+
 
 if __name__ == '__main__':
   tf.test.main()
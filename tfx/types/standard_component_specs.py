@@ -142,6 +142,14 @@ class FileBasedExampleGenSpec(ComponentSpec):
   }
 
 
+class CsvExampleGenSpec(FileBasedExampleGenSpec):
+  """CsvExampleGen component spec."""
+
+  INPUTS = dict(
+      FileBasedExampleGenSpec.INPUTS,
+      schema=ChannelParameter(type=standard_artifacts.Schema, optional=True))
+
+
 class InfraValidatorSpec(ComponentSpec):
   """InfraValidator component spec."""
 
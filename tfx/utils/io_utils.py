@@ -17,8 +17,10 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import concurrent.futures
+import hashlib
 import os
-from typing import List, Text
+from typing import List, Text, Tuple
 
 import tensorflow as tf
 
@@ -31,6 +33,12 @@ from tensorflow_metadata.proto.v0 import schema_pb2
 # Nano seconds per second.
 NANO_PER_SEC = 1000 * 1000 * 1000
 
+# Maximum number of files processed concurrently by generate_fingerprint.
+_FINGERPRINT_MAX_WORKERS = 16
+
+# Size of the chunks read to hash the content of a file.
+_HASH_CHUNK_SIZE = 1024 * 1024
+
 # If path starts with one of those, consider files are in remote filesystem.
 _REMOTE_FS_PREFIX = ['gs://', 'hdfs://', 's3://']
 
@@ -129,23 +137,80 @@ def all_files_pattern(file_pattern: Text) -> Text:
   return os.path.join(file_pattern, '*')
 
 
-def generate_fingerprint(split_name: Text, file_pattern: Text) -> Text:
-  """Generates a fingerprint for all files that match the pattern."""
+def _file_checksum(file_path: Text, content_hash: bool) -> Tuple[int, int]:
+  """Returns the size and the checksum of a file."""
+  if not content_hash:
+    stat = tf.io.gfile.stat(file_path)
+    # Take mtime only up to second-granularity.
+    return stat.length, int(stat.mtime_nsec / NANO_PER_SEC)
+  digest = hashlib.sha256()
+  length = 0
+  with tf.io.gfile.GFile(file_path, 'rb') as f:
+    while True:
+      chunk = f.read(_HASH_CHUNK_SIZE)
+      if not chunk:
+        break
+      length += len(chunk)
+      digest.update(chunk)
+  # Only 64 bits of the digest are kept, as for mtimes.
+  return length, int(digest.hexdigest()[:16], 16)
+
+
+def generate_fingerprint(split_name: Text,
+                         file_pattern: Text,
+                         content_hash: bool = False,
+                         max_workers: int = _FINGERPRINT_MAX_WORKERS) -> Text:
+  """Generates a fingerprint for all files that match the pattern.
+
+  Files are processed concurrently by a bounded pool of threads, as each stat
+  or read is a network round trip on remote filesystems.
+
+  Args:
+    split_name: name of the split, recorded in the fingerprint.
+    file_pattern: glob pattern of the files.
+    content_hash: if True, the checksum of each file is a hash of its content
+      instead of its modification time, for filesystems where modification
+      times are unreliable. All the files are then read.
+    max_workers: maximum number of files processed concurrently.
+
+  Returns:
+    The fingerprint of the files.
+  """
   files = tf.io.gfile.glob(file_pattern)
+  num_workers = min(max_workers, len(files))
+  if num_workers > 1:
+    # Each worker processes a slice of the files, so that there is no per file
+    # overhead of the pool.
+    def _slice_checksums(index):
+      return [
+          _file_checksum(f, content_hash) for f in files[index::num_workers]
+      ]
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=num_workers) as pool:
+      file_checksums = [
+          checksum for checksums in pool.map(_slice_checksums,
+                                             range(num_workers))
+          for checksum in checksums
+      ]
+  else:
+    file_checksums = [_file_checksum(f, content_hash) for f in files]
+
   total_bytes = 0
-  # Checksum used here is based on timestamp (mtime).
+  # Checksum used here is based on timestamp (mtime), or on content.
   # Checksums are xor'ed and sum'ed over the files so that they are order-
   # independent.
   xor_checksum = 0
   sum_checksum = 0
-  for f in files:
-    stat = tf.io.gfile.stat(f)
-    total_bytes += stat.length
-    # Take mtime only up to second-granularity.
-    mtime = int(stat.mtime_nsec / NANO_PER_SEC)
-    xor_checksum ^= mtime
-    sum_checksum += mtime
-
+  for length, checksum in file_checksums:
+    total_bytes += length
+    xor_checksum ^= checksum
+    sum_checksum += checksum
+
+  if content_hash:
+    return ('split:%s,num_files:%d,total_bytes:%d,xor_content_checksum:%d,'
+            'sum_content_checksum:%d' % (split_name, len(files), total_bytes,
+                                         xor_checksum, sum_checksum))
   return 'split:%s,num_files:%d,total_bytes:%d,xor_checksum:%d,sum_checksum:%d' % (
       split_name, len(files), total_bytes, xor_checksum, sum_checksum)
 
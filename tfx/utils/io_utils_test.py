@@ -112,6 +112,38 @@ class IoUtilsTest(tf.test.TestCase):
         'split:split,num_files:2,total_bytes:15,xor_checksum:2,sum_checksum:4',
         fingerprint)
 
+  def testGeneratesFingerprintConcurrently(self):
+    for i in range(20):
+      d_path = os.path.join(self._base_dir, 'fp', 'data%d' % i)
+      io_utils.write_string_file(d_path, 'testing%d' % i)
+      os.utime(d_path, (0, i))
+    file_pattern = os.path.join(self._base_dir, 'fp', '*')
+    self.assertEqual(
+        io_utils.generate_fingerprint('split', file_pattern, max_workers=1),
+        io_utils.generate_fingerprint('split', file_pattern, max_workers=4))
+
+  def testGeneratesFingerprintWithContentHash(self):
+    d1_path = os.path.join(self._base_dir, 'fp', 'data1')
+    io_utils.write_string_file(d1_path, 'testing')
+    d2_path = os.path.join(self._base_dir, 'fp', 'data2')
+    io_utils.write_string_file(d2_path, 'testing2')
+    file_pattern = os.path.join(self._base_dir, 'fp', '*')
+    fingerprint = io_utils.generate_fingerprint(
+        'split', file_pattern, content_hash=True)
+    self.assertStartsWith(
+        fingerprint,
+        'split:split,num_files:2,total_bytes:15,xor_content_checksum:')
+
+    # Modification times do not change the fingerprint, content does.
+    os.utime(d1_path, (0, 1))
+    self.assertEqual(
+        fingerprint,
+        io_utils.generate_fingerprint('split', file_pattern, content_hash=True))
+    io_utils.write_string_file(d1_path, 'tasting')
+    self.assertNotEqual(
+        fingerprint,
+        io_utils.generate_fingerprint('split', file_pattern, content_hash=True))
+
 
 if __name__ == '__main__':
   tf.test.main()